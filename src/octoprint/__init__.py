@@ -243,6 +243,8 @@ def init_logging(settings, use_logging_file=True, logging_file=None, default_con
 					"formatter": "simple",
 					"when": "D",
 					"backupCount": 6,
+					"compress": True,
+					"flushInterval": 1.0,
 					"filename": os.path.join(settings.getBaseFolder("logs"), "octoprint.log")
 				},
 				"serialFile": {
@@ -250,6 +252,9 @@ def init_logging(settings, use_logging_file=True, logging_file=None, default_con
 					"level": "DEBUG",
 					"formatter": "serial",
 					"backupCount": 3,
+					"maxBytes": 20 * 1024 * 1024,
+					"compress": True,
+					"flushInterval": 1.0,
 					"filename": os.path.join(settings.getBaseFolder("logs"), "serial.log"),
 					"delay": True
 				}
@@ -369,7 +374,10 @@ def init_pluginsystem(settings, safe_mode=False, ignore_blacklist=True, connecti
 	                    plugin_entry_points=plugin_entry_points,
 	                    plugin_disabled_list=plugin_disabled_list,
 	                    plugin_blacklist=plugin_blacklist,
-	                    plugin_validators=plugin_validators)
+	                    plugin_validators=plugin_validators,
+	                    plugin_discovery_cache=os.path.join(settings.getBaseFolder("data"),
+	                                                        "plugin_discovery_cache.json"),
+	                    plugin_lazy_import=settings.getBoolean(["plugins", "_lazyImport"]))
 
 	settings_overlays = dict()
 	disabled_from_overlays = dict()
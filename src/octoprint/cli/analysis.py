@@ -24,12 +24,22 @@ def util():
 @click.option("--speed-x", "speedx", type=float, default=6000)
 @click.option("--speed-y", "speedy", type=float, default=6000)
 @click.option("--speed-z", "speedz", type=float, default=300)
+@click.option("--speed-e", "speede", type=float, default=300)
 @click.option("--offset", "offset", type=(float, float), multiple=True)
 @click.option("--max-t", "maxt", type=int, default=10)
 @click.option("--g90-extruder", "g90_extruder", is_flag=True)
 @click.option("--progress", "progress", is_flag=True)
+@click.option("--toolpath", "toolpath", type=click.Path(), default=None,
+              help="Record the layer index and toolpath to PATH.json and PATH.bin.")
+@click.option("--kinematics", "kinematics", is_flag=True,
+              help="Estimate the print time with acceleration and jerk instead of feedrates only. Requires NumPy.")
+@click.option("--acceleration", "acceleration", type=(float, float, float, float), default=(None, None, None, None),
+              help="Maximum acceleration of the X, Y, Z and E axes in mm/s², for --kinematics.")
+@click.option("--jerk", "jerk", type=(float, float, float, float), default=(None, None, None, None),
+              help="Maximum jerk of the X, Y, Z and E axes in mm/s, for --kinematics.")
 @click.argument("path", type=click.Path())
-def gcode_command(path, speedx, speedy, speedz, offset, maxt, throttle, throttle_lines, g90_extruder, progress):
+def gcode_command(path, speedx, speedy, speedz, speede, offset, maxt, throttle, throttle_lines, g90_extruder, progress,
+                  toolpath, kinematics, acceleration, jerk):
 	"""Runs a GCODE file analysis."""
 
 	import time
@@ -60,13 +70,44 @@ def gcode_command(path, speedx, speedy, speedz, offset, maxt, throttle, throttle
 			click.echo("PROGRESS:{}".format(percentage))
 	interpreter = gcode(progress_callback=progress_callback)
 
-	interpreter.load(path,
-					 speedx=speedx,
-					 speedy=speedy,
-					 offsets=offsets,
-					 throttle=throttle_callback,
-					 max_extruders=maxt,
-					 g90_extruder=g90_extruder)
+	model = None
+	if kinematics:
+		from octoprint.util.kinematics import KinematicModel, available
+		if available():
+			model = KinematicModel(speed=dict(x=speedx, y=speedy, z=speedz, e=speede),
+			                       acceleration=dict(zip("xyze", acceleration)),
+			                       jerk=dict(zip("xyze", jerk)))
+		else:
+			# planning in pure python would slow the analysis down too much
+			click.echo("NumPy is not installed, falling back to the simple print time estimate", err=True)
+
+	recorder = None
+	if toolpath:
+		from octoprint.filemanager.toolpath import ToolpathRecorder
+		recorder = ToolpathRecorder(toolpath, path, clock=model)
+
+	try:
+		interpreter.load(path,
+						 speedx=speedx,
+						 speedy=speedy,
+						 offsets=offsets,
+						 throttle=throttle_callback,
+						 max_extruders=maxt,
+						 g90_extruder=g90_extruder,
+						 toolpath=recorder,
+						 kinematics=model)
+	except:
+		if recorder is not None:
+			recorder.abort()
+		raise
+
+	if recorder is not None:
+		# the toolpath is optional, failing to store it must not lose the analysis results
+		try:
+			recorder.finish(elapsed=interpreter.totalMoveTimeMinute * 60)
+		except Exception as e:
+			recorder.abort()
+			click.echo("Could not store the toolpath at {}: {}".format(toolpath, e), err=True)
 
 	click.echo("DONE:{}s".format(time.time() - start_time))
 	click.echo("RESULTS:")
@@ -64,13 +64,58 @@ def client_commands():
 	pass
 
 
+def create_fleet_client(baseurls=None, fleet_file=None, apikey=None, settings=None, max_workers=None):
+	"""
+	Creates a :class:`~octoprint_client.FleetClient` for the provided base URLs and the servers listed in the fleet
+	file.
+
+	The fleet file is a YAML list of servers, each either a base URL or a dictionary with keys ``baseurl`` and
+	``apikey``. Servers without an API key of their own use ``apikey``, or the one from ``settings``.
+	"""
+	targets = [dict(baseurl=baseurl) for baseurl in (baseurls or [])]
+
+	if fleet_file:
+		import yaml
+		with open(fleet_file, "rb") as f:
+			fleet = yaml.safe_load(f) or []
+
+		for entry in fleet:
+			if not isinstance(entry, dict):
+				entry = dict(baseurl=entry)
+			targets.append(entry)
+
+	if not apikey and any(not target.get("apikey") for target in targets):
+		apikey = settings.get(["api", "key"])
+
+	return octoprint_client.FleetClient.from_targets([(target["baseurl"], target.get("apikey") or apikey)
+	                                                  for target in targets],
+	                                                 max_workers=max_workers)
+
+
 @client_commands.group("client", context_settings=dict(ignore_unknown_options=True))
 @client_options
+@click.option("--baseurl", "baseurls", multiple=True, type=click.STRING,
+              help="Base URL of a server to target instead of host and port, may be provided multiple times to target "
+                   "a fleet of servers concurrently")
+@click.option("--fleet", "fleet_file", type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+              help="YAML file listing a fleet of servers to target concurrently")
+@click.option("--workers", type=click.INT, default=None, help="Maximum number of concurrent requests to a fleet")
 @click.pass_context
-def client(ctx, apikey, host, port, httpuser, httppass, https, prefix):
+def client(ctx, apikey, host, port, httpuser, httppass, https, prefix, baseurls, fleet_file, workers):
 	"""Basic API client."""
 	try:
 		settings = None
+		if baseurls or fleet_file:
+			if not apikey:
+				settings = init_settings(get_ctx_obj_option(ctx, "basedir", None), get_ctx_obj_option(ctx, "configfile", None))
+
+			ctx.obj.client = create_fleet_client(baseurls=baseurls,
+			                                     fleet_file=fleet_file,
+			                                     apikey=apikey,
+			                                     settings=settings,
+			                                     max_workers=workers)
+			return
+
 		if not host or not port or not apikey:
 			settings = init_settings(get_ctx_obj_option(ctx, "basedir", None), get_ctx_obj_option(ctx, "configfile", None))
 
@@ -90,6 +135,20 @@ def client(ctx, apikey, host, port, httpuser, httppass, https, prefix):
 
 
 def log_response(response, status_code=True, body=True, headers=False):
+	if isinstance(response, octoprint_client.FleetResults):
+		for result in response:
+			click.echo(">>> {}".format(result.baseurl))
+			if result.error is not None:
+				click.echo("!!! Error: {}".format(result.error))
+			else:
+				log_response(result.response, status_code=status_code, body=body, headers=headers)
+
+		failed = response.failed
+		click.echo(">>> {} of {} servers succeeded".format(len(response) - len(failed), len(response)))
+		if any(result.error is not None for result in failed):
+			click.get_current_context().exit(1)
+		return
+
 	if status_code:
 		click.echo("Status Code: {}".format(response.status_code))
 	if headers:
@@ -211,6 +270,10 @@ def delete(ctx, path, timeout):
 @client.command("listen")
 @click.pass_context
 def listen(ctx):
+	if isinstance(ctx.obj.client, octoprint_client.FleetClient):
+		click.echo("Listening is only supported for a single server", err=True)
+		ctx.exit(-1)
+
 	def on_connect(ws):
 		click.echo(">>> Connected!")
 
@@ -99,6 +99,7 @@ class Events(object):
 	POSTROLL_START = "PostRollStart"
 	POSTROLL_END = "PostRollEnd"
 	MOVIE_RENDERING = "MovieRendering"
+	MOVIE_PROGRESS = "MovieProgress"
 	MOVIE_DONE = "MovieDone"
 	MOVIE_FAILED = "MovieFailed"
 
@@ -16,6 +16,7 @@ from octoprint.events import eventManager, Events
 from .destinations import FileDestinations
 from .analysis import QueueEntry, AnalysisQueue
 from .storage import LocalFileStorage
+from .toolpath import toolpath_storage
 from .util import AbstractFileWrapper, StreamWrapper, DiskFileWrapper
 
 from collections import namedtuple
@@ -316,7 +317,8 @@ class FileManager(object):
 		absolute_source_path = self.path_on_disk(source_location, source_path)
 
 		def stlProcessed(source_location, source_path, tmp_path, dest_location, dest_path, start_time,
-		                 printer_profile_id, callback, callback_args, _error=None, _cancelled=False, _analysis=None):
+		                 printer_profile_id, callback, callback_args, _error=None, _cancelled=False, _analysis=None,
+		                 _exc=None):
 			try:
 				if _error:
 					eventManager().fire(Events.SLICING_FAILED, dict(stl=source_path,
@@ -495,6 +497,7 @@ class FileManager(object):
 		queue_entry = self._analysis_queue_entry(destination, path)
 		self._analysis_queue.dequeue(queue_entry)
 		self._storage(destination).remove_file(path)
+		self._update_toolpath(destination, "remove", path)
 
 		_, name = self._storage(destination).split_path(path)
 		eventManager().fire(Events.FILE_REMOVED, dict(storage=destination,
@@ -505,6 +508,7 @@ class FileManager(object):
 
 	def copy_file(self, destination, source, dst):
 		path_in_storage = self._storage(destination).copy_file(source, dst)
+		self._update_toolpath(destination, "copy", source, path_in_storage)
 		if not self.has_analysis(destination, path_in_storage):
 			queue_entry = self._analysis_queue_entry(destination, path_in_storage)
 			if queue_entry:
@@ -521,6 +525,7 @@ class FileManager(object):
 		queue_entry = self._analysis_queue_entry(destination, source)
 		self._analysis_queue.dequeue(queue_entry)
 		path = self._storage(destination).move_file(source, dst)
+		self._update_toolpath(destination, "move", source, path)
 		if not self.has_analysis(destination, path):
 			queue_entry = self._analysis_queue_entry(destination, path)
 			if queue_entry:
@@ -555,6 +560,7 @@ class FileManager(object):
 		self._analysis_queue.dequeue_folder(destination, path)
 		self._analysis_queue.pause()
 		self._storage(destination).remove_folder(path, recursive=recursive)
+		self._update_toolpath(destination, "remove_folder", path)
 		self._analysis_queue.resume()
 
 		_, name = self._storage(destination).split_path(path)
@@ -565,6 +571,7 @@ class FileManager(object):
 
 	def copy_folder(self, destination, source, dst):
 		path_in_storage = self._storage(destination).copy_folder(source, dst)
+		self._update_toolpath(destination, "copy_folder", source, path_in_storage)
 		self._determine_analysis_backlog(destination, self._storage(destination), root=path_in_storage)
 
 		_, name = self._storage(destination).split_path(path_in_storage)
@@ -577,6 +584,7 @@ class FileManager(object):
 		self._analysis_queue.dequeue_folder(destination, source)
 		self._analysis_queue.pause()
 		dst_path_in_storage = self._storage(destination).move_folder(source, dst)
+		self._update_toolpath(destination, "move_folder", source, dst_path_in_storage)
 		self._determine_analysis_backlog(destination, self._storage(destination), root=dst_path_in_storage)
 		self._analysis_queue.resume()
 
@@ -690,6 +698,17 @@ class FileManager(object):
 			raise NoSuchStorage("No storage configured for destination {destination}".format(**locals()))
 		return self._storage_managers[destination]
 
+	def _update_toolpath(self, destination, operation, *paths):
+		if destination != FileDestinations.LOCAL:
+			return
+
+		storage = self._storage(destination)
+		paths = [storage.path_in_storage(path) for path in paths]
+		try:
+			getattr(toolpath_storage(), operation)(destination, *paths)
+		except Exception:
+			self._logger.exception("Error while updating toolpaths for {} of {}".format(operation, ", ".join(paths)))
+
 	def _add_analysis_result(self, destination, path, result):
 		if not destination in self._storage_managers:
 			return
@@ -18,6 +18,7 @@ import time
 
 from octoprint.events import Events, eventManager
 from octoprint.settings import settings
+from octoprint.filemanager.toolpath import toolpath_storage
 
 
 class QueueEntry(collections.namedtuple("QueueEntry", "name, path, type, location, absolute_path, printer_profile")):
@@ -335,6 +336,18 @@ class GcodeAnalysisQueue(AbstractAnalysisQueue):
 
 		self._aborted = False
 		self._reenqueue = False
+		self._kinematics_unavailable_logged = False
+
+	def _kinematics_available(self):
+		from octoprint.util.kinematics import available
+		if available():
+			return True
+
+		if not self._kinematics_unavailable_logged:
+			self._logger.warn("Kinematic print time estimation is enabled but NumPy is not installed, falling back "
+			                  "to the simple print time estimate")
+			self._kinematics_unavailable_logged = True
+		return False
 
 	def _do_analysis(self, high_priority=False):
 		import sarge
@@ -347,8 +360,11 @@ class GcodeAnalysisQueue(AbstractAnalysisQueue):
 			throttle_lines = settings().getInt(["gcodeAnalysis", "throttle_lines"])
 			max_extruders = settings().getInt(["gcodeAnalysis", "maxExtruders"])
 			g90_extruder = settings().getBoolean(["feature", "g90InfluencesExtruder"])
-			speedx = self._current.printer_profile["axes"]["x"]["speed"]
-			speedy = self._current.printer_profile["axes"]["y"]["speed"]
+			toolpath = settings().getBoolean(["gcodeAnalysis", "toolpath"])
+			kinematics = settings().getBoolean(["gcodeAnalysis", "kinematics"]) and self._kinematics_available()
+			axes = self._current.printer_profile["axes"]
+			speedx = axes["x"]["speed"]
+			speedy = axes["y"]["speed"]
 			offsets = self._current.printer_profile["extruder"]["offsets"]
 
 			command = [sys.executable, "-m", "octoprint", "analysis", "gcode",
@@ -359,6 +375,20 @@ class GcodeAnalysisQueue(AbstractAnalysisQueue):
 				command += ["--offset", str(offset[0]), str(offset[1])]
 			if g90_extruder:
 				command += ["--g90-extruder"]
+			if kinematics:
+				from octoprint.printer.profile import PrinterProfileManager
+				default_axes = PrinterProfileManager.default["axes"]
+
+				def axis_value(axis, key):
+					return axes.get(axis, dict()).get(key, default_axes[axis][key])
+
+				command += ["--kinematics",
+				            "--speed-z={}".format(axis_value("z", "speed")), "--speed-e={}".format(axis_value("e", "speed")),
+				            "--acceleration"] + [str(axis_value(axis, "acceleration")) for axis in "xyze"] \
+				           + ["--jerk"] + [str(axis_value(axis, "jerk")) for axis in "xyze"]
+			if toolpath:
+				command += ["--toolpath={}".format(toolpath_storage().path_for(self._current.location,
+				                                                               self._current.path))]
 			command.append(self._current.absolute_path)
 
 			self._logger.info("Invoking analysis command: {}".format(" ".join(command)))
@@ -387,6 +417,8 @@ class GcodeAnalysisQueue(AbstractAnalysisQueue):
 					if self._aborted:
 						# oh, we shall abort, let's do so!
 						p.commands[0].terminate()
+						if toolpath:
+							toolpath_storage().remove(self._current.location, self._current.path)
 						raise AnalysisAborted(reenqueue=self._reenqueue)
 
 					# else continue
@@ -0,0 +1,634 @@
+# coding=utf-8
+"""
+This module contains the per layer index and compact toolpath of GCODE files. Both get recorded during the GCODE
+analysis and allow serving a file to the GCODE viewer layer by layer, instead of the viewer having to download and
+parse the whole file, as well as looking up file positions by layer or Z and the estimated print time at a file
+position without scanning the file.
+
+A toolpath is stored as two files:
+
+  * ``<name>.json``: The layer index. For every layer it contains the Z height, the byte range of the layer in the
+    GCODE file, the number of moves and the position and number of the layer's records in the toolpath. Additionally
+    it contains a sparse list of checkpoints, one at the start of every layer and one every ``CHECKPOINT_INTERVAL``
+    bytes, each consisting of the file position, the Z height, the estimated print time and the extruded filament
+    per tool up to that position.
+  * ``<name>.bin``: The toolpath. A sequence of records of four little endian float32 values ``x, y, e, tool``. The
+    first record of a layer is the position the layer starts at, every following record is a move to ``x, y``
+    extruding ``e`` mm of filament (0 for travel moves) with ``tool``.
+
+.. autoclass:: ToolpathRecorder
+   :members:
+
+.. autoclass:: ToolpathStorage
+   :members:
+
+.. autoclass:: PositionIndex
+   :members:
+
+.. autoclass:: Checkpoint
+
+.. autofunction:: toolpath_storage
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import array
+import bisect
+import collections
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+
+from octoprint.util import atomic_write
+
+VERSION = 1
+
+RECORD_FIELDS = ("x", "y", "e", "tool")
+RECORD_SIZE = 4 * len(RECORD_FIELDS)
+
+# Z changes smaller than this don't start a new layer, keeps spiral vase prints from creating a layer per move
+MIN_LAYER_HEIGHT = 0.02
+
+CHECKPOINT_FIELDS = ("position", "z", "elapsed", "extrusion")
+
+# maximum distance between two checkpoints, in bytes
+CHECKPOINT_INTERVAL = 64 * 1024
+
+# records of the current layer to buffer before writing them out
+_FLUSH_RECORDS = 16384 * len(RECORD_FIELDS)
+
+
+class ToolpathRecorder(object):
+	"""
+	Records the moves of a GCODE file while it gets interpreted, writing the toolpath and the layer index to
+	``<path>.bin`` and ``<path>.json`` on :meth:`finish`.
+
+	A new layer starts with the first extruding move at a Z height that differs by at least ``min_layer_height`` from
+	the current layer. Travel moves away from the height of the current layer are held back until it is clear whether
+	they lead to the next layer or back to the current one, like a z-hop does.
+
+	Arguments:
+	    path (str): Base path of the files to write, without extension.
+	    source (str): Path of the GCODE file. Its size and modification time get recorded to detect stale toolpaths.
+	    min_layer_height (float): Minimum Z difference between two layers.
+	    checkpoint_interval (int): Maximum distance between two checkpoints, in bytes.
+	    clock (octoprint.util.kinematics.KinematicModel): Model that calculates the print time of the moves, if they
+	        are not included in the print time passed to :meth:`move`.
+	"""
+
+	def __init__(self, path, source, min_layer_height=MIN_LAYER_HEIGHT, checkpoint_interval=CHECKPOINT_INTERVAL,
+	             clock=None):
+		self._path = path
+		self._min_layer_height = min_layer_height
+		self._checkpoint_interval = checkpoint_interval
+		self._clock = clock
+
+		stat = os.stat(source)
+		self._source = dict(size=stat.st_size, mtime=stat.st_mtime)
+
+		self._layers = []
+		self._layer = None
+		self._records = array.array("f")
+		self._written = 0
+
+		self._pending = None
+		self._pending_line = 0
+		self._pending_moves = 0
+		self._pending_checkpoint = None
+
+		self._z = 0.0
+		self._elapsed = 0.0
+		self._extruded = []
+		self._checkpoints = [[0, 0.0, 0.0, []]]
+		self._checkpoint_positions = [0]
+
+		folder = os.path.dirname(path)
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		self._file = io.open(path + ".bin.tmp", "wb")
+		self._finishing = False
+
+	def move(self, start, end, extrusion, tool, line_start, elapsed=0.0):
+		"""
+		Records a move.
+
+		Arguments:
+		    start (Vector3D): Position before the move.
+		    end (Vector3D): Position after the move, same as ``start`` for extrusion only moves.
+		    extrusion (float): Amount of filament extruded during the move, in mm, negative for retractions.
+		    tool (int): The active tool.
+		    line_start (int): Offset of the line containing the move in the GCODE file, in bytes.
+		    elapsed (float): Estimated print time up to the move, in seconds.
+		"""
+		self._z = start.z
+		self._elapsed = elapsed
+		if line_start - self._checkpoint_positions[-1] >= self._checkpoint_interval:
+			self._add_checkpoint(self._checkpoint(line_start))
+
+		if start != end:
+			self._move(start, end, extrusion if extrusion > 0 else 0.0, tool, line_start)
+
+		while len(self._extruded) <= tool:
+			self._extruded.append(0.0)
+		self._extruded[tool] += extrusion
+		self._z = end.z
+
+	def _move(self, start, end, extrusion, tool, line_start):
+		if self._layer is not None and abs(end.z - self._layer["z"]) < self._min_layer_height:
+			# at the height of the current layer, anything held back belongs to it
+			self._add_pending()
+			self._add(start, end, extrusion, tool)
+
+		elif extrusion > 0:
+			# printing at a new height, this starts a new layer
+			if self._pending is None:
+				self._hold_back(start, tool, line_start)
+			self._start_layer(end.z, self._pending_line if self._layers else 0)
+			self._add_checkpoint(self._pending_checkpoint)
+			self._add_pending(with_start=True)
+			self._add(start, end, extrusion, tool)
+
+		else:
+			if self._pending is None:
+				self._hold_back(start, tool, line_start)
+			self._pending_moves += 1
+			if start.x != end.x or start.y != end.y:
+				self._pending.append((end.x, end.y, 0.0, tool))
+
+	def finish(self, elapsed=None):
+		"""
+		Finishes recording and writes the toolpath and the layer index.
+
+		Arguments:
+		    elapsed (float): Estimated print time of the whole file, in seconds. Defaults to the print time up to the
+		        last move. With a clock, that clock has to have planned all moves before calling this.
+
+		Returns:
+		    dict: The layer index.
+		"""
+		self._finishing = True
+		self._finish_layer(self._source["size"])
+		self._file.close()
+
+		# os.rename doesn't replace an existing file on Windows
+		shutil.move(self._path + ".bin.tmp", self._path + ".bin")
+
+		checkpoint = self._checkpoint(self._source["size"])
+		if elapsed is not None:
+			checkpoint[2] = elapsed
+		self._add_checkpoint(checkpoint)
+
+		tools = len(self._extruded)
+		for checkpoint in self._checkpoints:
+			checkpoint[2] = round(float(checkpoint[2]), 3)
+			checkpoint[3] += [0.0] * (tools - len(checkpoint[3]))
+
+		index = dict(version=VERSION,
+		             source=self._source,
+		             fields=list(RECORD_FIELDS),
+		             layers=self._layers,
+		             checkpoint_fields=list(CHECKPOINT_FIELDS),
+		             checkpoints=self._checkpoints)
+		with atomic_write(self._path + ".json") as f:
+			json.dump(index, f)
+		return index
+
+	def abort(self):
+		"""
+		Aborts recording, removing anything written so far. If called after :meth:`finish` failed, any toolpath
+		stored previously under the same path is removed too, since it might only have been partially replaced.
+		"""
+		try:
+			self._file.close()
+		finally:
+			_remove(self._path + ".bin.tmp")
+			if self._finishing:
+				_remove(self._path + ".bin")
+				_remove(self._path + ".json")
+
+	def _add(self, start, end, extrusion, tool):
+		self._layer["moves"] += 1
+		if start.x != end.x or start.y != end.y:
+			self._records.extend((end.x, end.y, extrusion, tool))
+			if len(self._records) >= _FLUSH_RECORDS:
+				self._flush()
+
+	def _hold_back(self, start, tool, line_start):
+		self._pending = [(start.x, start.y, 0.0, tool)]
+		self._pending_line = line_start
+		self._pending_moves = 0
+		self._pending_checkpoint = self._checkpoint(line_start)
+
+	def _add_pending(self, with_start=False):
+		if self._pending is None:
+			return
+
+		# the first record is where the held back moves started, that's only needed as start of a new layer
+		records = self._pending if with_start else self._pending[1:]
+		for record in records:
+			self._records.extend(record)
+		self._layer["moves"] += self._pending_moves
+		self._pending = None
+
+	def _checkpoint(self, position):
+		# with a clock, the print time up to here is only known once the clock has planned the moves until here
+		elapsed = self._clock.mark(self._elapsed) if self._clock is not None else self._elapsed
+		return [position,
+		        round(self._z, 5),
+		        elapsed,
+		        [round(extruded, 5) for extruded in self._extruded]]
+
+	def _add_checkpoint(self, checkpoint):
+		# layer starts get added once the layer's first extrusion is seen, so they might have to go before
+		# checkpoints recorded in between
+		index = bisect.bisect_left(self._checkpoint_positions, checkpoint[0])
+		if index < len(self._checkpoint_positions) and self._checkpoint_positions[index] == checkpoint[0]:
+			return
+		self._checkpoint_positions.insert(index, checkpoint[0])
+		self._checkpoints.insert(index, checkpoint)
+
+	def _start_layer(self, z, line_start):
+		self._finish_layer(line_start)
+		self._layer = dict(z=round(z, 5),
+		                   start=line_start,
+		                   end=None,
+		                   moves=0,
+		                   offset=self._written,
+		                   count=0)
+		self._layers.append(self._layer)
+
+	def _finish_layer(self, line_start):
+		if self._layer is None:
+			return
+		self._flush()
+		self._layer["end"] = line_start
+		self._layer["count"] = self._written - self._layer["offset"]
+
+	def _flush(self):
+		if not self._records:
+			return
+		if sys.byteorder != "little":
+			self._records.byteswap()
+		self._file.write(self._records.tostring())
+		self._written += len(self._records) // len(RECORD_FIELDS)
+		self._records = array.array("f")
+
+
+Checkpoint = collections.namedtuple("Checkpoint", "position, z, elapsed, extrusion")
+"""
+The state of a print at a position in the GCODE file, before the line at that position.
+
+Attributes:
+    position (int): Position in the GCODE file, in bytes.
+    z (float): The Z height.
+    elapsed (float): Estimated print time up to the position, in seconds.
+    extrusion (list of float): Filament extruded per tool up to the position, in mm.
+"""
+
+
+class PositionIndex(object):
+	"""
+	Maps between positions in a GCODE file and layers, Z heights and estimated print times, based on its layer index.
+
+	All lookups are done through binary searches on the layers and checkpoints of the index.
+
+	Arguments:
+	    index (dict): The layer index as returned by :meth:`ToolpathStorage.get_index`.
+	"""
+
+	def __init__(self, index):
+		self.size = index["source"]["size"]
+
+		layers = index["layers"]
+		self._layer_starts = [layer["start"] for layer in layers]
+		self._layer_z = [layer["z"] for layer in layers]
+
+		# sequential printing might go back down, in which case a Z height might be printed more than once and
+		# the first layer at or above it has to be searched for linearly
+		self._z_ascending = all(a <= b for a, b in zip(self._layer_z, self._layer_z[1:]))
+
+		self._checkpoints = [Checkpoint(*checkpoint) for checkpoint in index.get("checkpoints", [])]
+		self._checkpoint_positions = [checkpoint.position for checkpoint in self._checkpoints]
+
+	@property
+	def layer_count(self):
+		return len(self._layer_starts)
+
+	@property
+	def total_time(self):
+		"""
+		Returns:
+		    float: Estimated print time of the whole file, in seconds, or None if unknown.
+		"""
+		if not self._checkpoints:
+			return None
+		return self._checkpoints[-1].elapsed
+
+	def position_for_layer(self, layer):
+		"""
+		Returns:
+		    int: Position of the start of ``layer`` in the file, or None if there is no such layer.
+		"""
+		if not 0 <= layer < len(self._layer_starts):
+			return None
+		return self._layer_starts[layer]
+
+	def position_for_z(self, z):
+		"""
+		Returns:
+		    int: Position of the start of the first layer at or above ``z`` in the file, or None if there is no
+		        such layer.
+		"""
+		layer = self.layer_for_z(z)
+		if layer is None:
+			return None
+		return self._layer_starts[layer]
+
+	def layer_for_z(self, z):
+		"""
+		Returns:
+		    int: The first layer at or above ``z``, or None if there is no such layer.
+		"""
+		if self._z_ascending:
+			layer = bisect.bisect_left(self._layer_z, z - 1e-5)
+			return layer if layer < len(self._layer_z) else None
+
+		for layer, layer_z in enumerate(self._layer_z):
+			if layer_z >= z - 1e-5:
+				return layer
+		return None
+
+	def layer_at(self, position):
+		"""
+		Returns:
+		    int: The layer ``position`` in the file belongs to, or None if it lies before the first layer.
+		"""
+		layer = bisect.bisect_right(self._layer_starts, position) - 1
+		return layer if layer >= 0 else None
+
+	def checkpoint_at(self, position):
+		"""
+		Returns:
+		    Checkpoint: The last checkpoint at or before ``position`` in the file, or None if the index has no
+		        checkpoints.
+		"""
+		index = bisect.bisect_right(self._checkpoint_positions, position) - 1
+		if index < 0:
+			return None
+		return self._checkpoints[index]
+
+	def elapsed_at(self, position):
+		"""
+		Returns:
+		    float: Estimated print time up to ``position`` in the file, in seconds, interpolated between the
+		        surrounding checkpoints, or None if the index has no checkpoints.
+		"""
+		index = bisect.bisect_right(self._checkpoint_positions, position) - 1
+		if index < 0:
+			return None
+
+		before = self._checkpoints[index]
+		if index + 1 >= len(self._checkpoints):
+			return before.elapsed
+
+		after = self._checkpoints[index + 1]
+		fraction = (position - before.position) / (after.position - before.position)
+		return before.elapsed + fraction * (after.elapsed - before.elapsed)
+
+	def progress_at(self, position):
+		"""
+		Returns:
+		    float: Fraction of the estimated print time elapsed up to ``position`` in the file, or None if unknown.
+		"""
+		total = self.total_time
+		if not total:
+			return None
+		return min(1.0, self.elapsed_at(position) / total)
+
+
+class ToolpathStorage(object):
+	"""
+	Manages the toolpaths of the files in a storage, mirroring the folder structure of the storage below
+	``basedir``.
+
+	Arguments:
+	    basedir (str): Folder to store the toolpaths in.
+	    cache_size (int): Number of layer indices to keep in memory.
+	"""
+
+	def __init__(self, basedir, cache_size=16):
+		self._logger = logging.getLogger(__name__)
+		self._basedir = basedir
+		self._cache_size = cache_size
+		self._cache = collections.OrderedDict()
+		self._mutex = threading.Lock()
+
+	def path_for(self, location, path):
+		"""
+		Returns:
+		    str: Base path of the toolpath files of ``path`` in storage ``location``, without extension.
+		"""
+		return os.path.join(self._basedir, location, *path.split("/"))
+
+	def recorder(self, location, path, source, **kwargs):
+		"""
+		Returns:
+		    ToolpathRecorder: A recorder for the toolpath of ``path`` in storage ``location``, located on disk at
+		        ``source``. Additional keyword arguments are passed on to the :class:`ToolpathRecorder`.
+		"""
+		return ToolpathRecorder(self.path_for(location, path), source, **kwargs)
+
+	def get_index(self, location, path, source):
+		"""
+		Fetches the layer index of ``path`` in storage ``location``.
+
+		Arguments:
+		    location (str): The storage.
+		    path (str): The path in the storage.
+		    source (str): Location of the file on disk, to check the toolpath isn't stale.
+
+		Returns:
+		    dict: The layer index, or None if no up to date toolpath is available.
+		"""
+		cached = self._get_cached(location, path, source)
+		return cached[1] if cached is not None else None
+
+	def get_position_index(self, location, path, source):
+		"""
+		Like :meth:`get_index`, but returns a :class:`PositionIndex` for the layer index.
+		"""
+		cached = self._get_cached(location, path, source)
+		return cached[2] if cached is not None else None
+
+	def _get_cached(self, location, path, source):
+		base = self.path_for(location, path)
+		try:
+			index_mtime = os.stat(base + ".json").st_mtime
+			source_stat = os.stat(source)
+		except OSError:
+			return None
+
+		with self._mutex:
+			cached = self._cache.pop(base, None)
+			if cached is not None and cached[0] == index_mtime:
+				self._cache[base] = cached
+			else:
+				cached = None
+
+		if cached is None:
+			try:
+				with io.open(base + ".json", "rb") as f:
+					index = json.loads(f.read().decode("utf-8"))
+				cached = (index_mtime, index, PositionIndex(index))
+			except Exception:
+				self._logger.exception("Error while reading layer index of {}:{}".format(location, path))
+				return None
+
+			with self._mutex:
+				self._cache[base] = cached
+				while len(self._cache) > self._cache_size:
+					self._cache.popitem(last=False)
+
+		index = cached[1]
+
+		# copies made with shutil.copy2 may lose some sub-microsecond mtime precision
+		if index.get("version") != VERSION \
+				or index["source"]["size"] != source_stat.st_size \
+				or abs(index["source"]["mtime"] - source_stat.st_mtime) > 0.001:
+			return None
+		return cached
+
+	def read_layers(self, location, path, index, layer, count=1):
+		"""
+		Reads the toolpath of ``count`` layers, starting at ``layer``.
+
+		Arguments:
+		    location (str): The storage.
+		    path (str): The path in the storage.
+		    index (dict): The layer index as returned by :meth:`get_index`.
+		    layer (int): The first layer to read.
+		    count (int): The number of layers to read.
+
+		Returns:
+		    bytes: The records of the layers, or None if the toolpath is not available (anymore).
+		"""
+		layers = index["layers"][layer:layer + count]
+		if not layers:
+			return b""
+
+		start = layers[0]["offset"] * RECORD_SIZE
+		end = (layers[-1]["offset"] + layers[-1]["count"]) * RECORD_SIZE
+		try:
+			with io.open(self.path_for(location, path) + ".bin", "rb") as f:
+				f.seek(start)
+				return f.read(end - start)
+		except (IOError, OSError):
+			# e.g. removed by a concurrent abort or removal since the index was read
+			return None
+
+	def remove(self, location, path):
+		"""Removes the toolpath of ``path`` in storage ``location``."""
+		base = self.path_for(location, path)
+		for extension in (".json", ".bin", ".bin.tmp"):
+			_remove(base + extension)
+
+	def move(self, location, source, destination):
+		"""Moves the toolpath of ``source`` in storage ``location`` to ``destination``."""
+		self._transfer(location, source, destination, os.rename)
+
+	def copy(self, location, source, destination):
+		"""Copies the toolpath of ``source`` in storage ``location`` to ``destination``."""
+		self._transfer(location, source, destination, _link_or_copy)
+
+	def remove_folder(self, location, path):
+		"""Removes the toolpaths of all files in folder ``path`` in storage ``location``."""
+		folder = self.path_for(location, path)
+		if os.path.isdir(folder):
+			shutil.rmtree(folder, ignore_errors=True)
+
+	def copy_folder(self, location, source, destination):
+		"""Copies the toolpaths of all files in folder ``source`` in storage ``location`` to ``destination``."""
+		src = self.path_for(location, source)
+		if not os.path.isdir(src):
+			return
+		dst = self.path_for(location, destination)
+		self.remove_folder(location, destination)
+
+		for root, _, files in os.walk(src):
+			target = os.path.join(dst, os.path.relpath(root, src))
+			_makedirs(target)
+			for name in files:
+				if not name.endswith(".tmp"):
+					_link_or_copy(os.path.join(root, name), os.path.join(target, name))
+
+	def move_folder(self, location, source, destination):
+		"""Moves the toolpaths of all files in folder ``source`` in storage ``location`` to ``destination``."""
+		src = self.path_for(location, source)
+		if not os.path.isdir(src):
+			return
+		dst = self.path_for(location, destination)
+		self.remove_folder(location, destination)
+		_makedirs(os.path.dirname(dst))
+		os.rename(src, dst)
+
+	def _transfer(self, location, source, destination, transfer):
+		src = self.path_for(location, source)
+		if not os.path.exists(src + ".json"):
+			return
+
+		dst = self.path_for(location, destination)
+		self.remove(location, destination)
+		_makedirs(os.path.dirname(dst))
+
+		# the index comes last, it marks the toolpath as complete
+		try:
+			transfer(src + ".bin", dst + ".bin")
+			transfer(src + ".json", dst + ".json")
+		except Exception:
+			self._logger.exception("Error while transferring toolpath of {}:{} to {}".format(location, source, destination))
+			self.remove(location, destination)
+
+
+def _remove(path):
+	try:
+		os.remove(path)
+	except OSError:
+		pass
+
+
+def _link_or_copy(src, dst):
+	# toolpaths are never modified in place, so sharing them between copies is safe
+	try:
+		os.link(src, dst)
+	except (AttributeError, OSError):
+		shutil.copyfile(src, dst)
+
+
+def _makedirs(path):
+	if not os.path.isdir(path):
+		os.makedirs(path)
+
+
+_instance = None
+_instance_mutex = threading.Lock()
+
+
+def toolpath_storage():
+	"""
+	Returns:
+	    ToolpathStorage: The shared :class:`ToolpathStorage` instance, storing toolpaths in the ``toolpaths`` folder
+	        below the data folder.
+	"""
+	global _instance
+	with _instance_mutex:
+		if _instance is None:
+			from octoprint.settings import settings
+			_instance = ToolpathStorage(os.path.join(settings().getBaseFolder("data"), "toolpaths"))
+		return _instance
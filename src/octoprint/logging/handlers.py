@@ -1,34 +1,340 @@
 # coding=utf-8
 from __future__ import absolute_import
 
+import collections
+import gzip
+import io
 import logging.handlers
 import os
 import re
+import shutil
+import threading
 import time
 
 # noinspection PyCompatibility
 import concurrent.futures
 
 
+COMPRESSED_SUFFIX = ".gz"
+
+_compression_executor = None
+_compression_mutex = threading.Lock()
+
+
+def compress_in_background(path):
+	"""
+	Compresses the rotated log file ``path`` with gzip on a background thread, replacing it with ``path + ".gz"``.
+
+	Returns:
+	    concurrent.futures.Future: Future for the compression.
+	"""
+	global _compression_executor
+	with _compression_mutex:
+		if _compression_executor is None:
+			_compression_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		return _compression_executor.submit(compress_file, path)
+
+
+def compress_file(path):
+	"""
+	Compresses ``path`` with gzip to ``path + ".gz"`` and removes it.
+
+	If the compression fails, the original file is kept. If the original file gets deleted while it's being compressed,
+	e.g. by the cleanup of old files, the compressed file gets deleted as well.
+	"""
+	target = path + COMPRESSED_SUFFIX
+	temp = target + ".tmp"
+	try:
+		with io.open(path, "rb") as source:
+			with io.open(temp, "wb") as f:
+				with gzip.GzipFile(filename=os.path.basename(path), mode="wb", fileobj=f) as destination:
+					shutil.copyfileobj(source, destination, 64 * 1024)
+
+		if not os.path.exists(path):
+			return
+
+		if os.path.exists(target):
+			os.remove(target)
+		os.rename(temp, target)
+
+		try:
+			os.remove(path)
+		except OSError:
+			if os.path.exists(path):
+				raise
+			os.remove(target)
+	finally:
+		if os.path.exists(temp):
+			os.remove(temp)
+
+
+def get_rotated_files(base_filename, pattern):
+	"""
+	Returns the rotated files of the log file ``base_filename``, compressed or not, oldest first.
+
+	Arguments:
+	    base_filename (str): Path of the log file.
+	    pattern: Compiled regular expression the suffixes of rotated files match, excluding the compression suffix.
+
+	Returns:
+	    list: Lists of the paths belonging to each rotated file, usually only one, but both the uncompressed and the
+	        compressed path while it's being compressed.
+	"""
+	folder, name = os.path.split(base_filename)
+	prefix = name + "."
+
+	result = dict()
+	for filename in os.listdir(folder):
+		if not filename.startswith(prefix):
+			continue
+
+		suffix = filename[len(prefix):]
+		if suffix.endswith(COMPRESSED_SUFFIX):
+			suffix = suffix[:-len(COMPRESSED_SUFFIX)]
+
+		if pattern.match(suffix):
+			result.setdefault(suffix, []).append(os.path.join(folder, filename))
+
+	return [sorted(result[suffix]) for suffix in sorted(result.keys())]
+
+
 class AsyncLogHandlerMixin(logging.Handler):
+	"""
+	Writes records on a dedicated writer thread.
+
+	Emitted records are put into a ring buffer of ``queueSize`` records. The writer thread drains it in batches of up
+	to ``batchSize`` records and writes each batch to the stream with a single ``write``. If the writer can't keep up,
+	e.g. due to a slow SD card, the oldest records in the buffer are dropped instead of blocking the logging thread or
+	growing without limit. The number of dropped records is written to the log once the writer has caught up and
+	available through :attr:`dropped`, the current queue depth through :attr:`queue_depth`.
+
+	If a ``flushInterval`` in seconds is provided, the stream is not flushed after every batch but at most once per
+	interval. Records are written no later than one interval after they were emitted.
+	"""
+
 	def __init__(self, *args, **kwargs):
-		self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		self.queue_size = max(1, kwargs.pop("queueSize", 10000))
+		self.batch_size = max(1, kwargs.pop("batchSize", 500))
+		self._flush_interval = kwargs.pop("flushInterval", None)
+
+		self._queue = collections.deque(maxlen=self.queue_size)
+		self._queue_condition = threading.Condition()
+		self._dropped = 0
+		self._reported_dropped = 0
+		self._flush_requested = False
+		self._flushed = threading.Event()
+		self._stopped = False
+
 		super(AsyncLogHandlerMixin, self).__init__(*args, **kwargs)
 
+		self._writer = threading.Thread(target=self._work, name="{} writer".format(type(self).__name__))
+		self._writer.daemon = True
+		self._writer.start()
+
+	@property
+	def queue_depth(self):
+		"""Number of records emitted but not yet written."""
+		return len(self._queue)
+
+	@property
+	def dropped(self):
+		"""Number of records dropped so far because the queue was full."""
+		return self._dropped
+
 	def emit(self, record):
+		with self._queue_condition:
+			if self._stopped:
+				stopped = True
+			else:
+				stopped = False
+				depth = len(self._queue)
+				if depth == self.queue_size:
+					# the deque drops the oldest record on append
+					self._dropped += 1
+				self._queue.append(record)
+
+				# an idle writer needs to learn about the first record, a waiting one about a full batch
+				if not depth or depth + 1 >= self.batch_size or not self._flush_interval:
+					self._queue_condition.notify()
+
+		if stopped:
+			# closed already, write directly
+			self._write_records([record])
+
+	def flush(self):
+		if threading.current_thread() is self._writer or not self._writer.is_alive():
+			self._flush_stream()
+			return
+
+		# have the writer thread write out everything queued so far and flush
+		with self._queue_condition:
+			self._flushed.clear()
+			self._flush_requested = True
+			self._queue_condition.notify()
+		self._flushed.wait(5.0)
+
+	def close(self):
+		with self._queue_condition:
+			self._stopped = True
+			self._queue_condition.notify()
+
+		if threading.current_thread() is not self._writer:
+			self._writer.join(5.0)
+
+		super(AsyncLogHandlerMixin, self).close()
+
+	def _work(self):
+		last_flush = 0
+		unflushed = False
+		while True:
+			with self._queue_condition:
+				while not self._stopped and not self._flush_requested and len(self._queue) < self.batch_size:
+					if not self._flush_interval:
+						if self._queue:
+							break
+						timeout = None
+					elif not self._queue and not unflushed:
+						timeout = None
+					else:
+						timeout = last_flush + self._flush_interval - time.time()
+						if timeout <= 0:
+							break
+					self._queue_condition.wait(timeout)
+
+				records = []
+				while self._queue and len(records) < self.batch_size:
+					records.append(self._queue.popleft())
+
+				dropped = self._dropped - self._reported_dropped
+				self._reported_dropped = self._dropped
+
+				# flush requests and stopping only take effect once the queue has been drained
+				flush_requested = self._flush_requested and not self._queue
+				if flush_requested:
+					self._flush_requested = False
+				stopped = self._stopped and not self._queue
+
+			if dropped:
+				records.append(self._dropped_record(dropped))
+
+			if records:
+				self._write_records(records)
+				unflushed = True
+
+			now = time.time()
+			if unflushed and (flush_requested or stopped or not self._flush_interval
+			                  or now - last_flush >= self._flush_interval):
+				self._flush_stream()
+				last_flush = now
+				unflushed = False
+
+			if flush_requested:
+				self._flushed.set()
+
+			if stopped:
+				break
+
+	def _dropped_record(self, count):
+		return logging.makeLogRecord(dict(name=__name__,
+		                                  levelno=logging.WARNING,
+		                                  levelname=logging.getLevelName(logging.WARNING),
+		                                  msg="Dropped {} log records, writing them out couldn't keep up".format(count)))
+
+	def _write_records(self, records):
+		chunk = []
+		size = 0
+		for record in records:
+			try:
+				message = self._encode(self.format(record) + "\n")
+				if self._should_rollover_batch(record, message, size):
+					self._write_chunk(chunk)
+					chunk = []
+					size = 0
+					# noinspection PyUnresolvedReferences
+					self.doRollover()
+
+				chunk.append(message)
+				size += len(message)
+			except Exception:
+				self.handleError(record)
+
 		try:
-			self._executor.submit(self._emit, record)
-		except:
-			self.handleError(record)
+			self._write_chunk(chunk)
+		except Exception:
+			self.handleError(records[-1])
 
-	def _emit(self, record):
-		# noinspection PyUnresolvedReferences
-		super(AsyncLogHandlerMixin, self).emit(record)
+	def _should_rollover_batch(self, record, message, pending):
+		"""
+		Whether to roll over before writing ``message``. ``pending`` bytes of the batch are not yet written to the
+		stream.
+		"""
+		if isinstance(self, logging.handlers.BaseRotatingHandler):
+			# noinspection PyUnresolvedReferences
+			return self.shouldRollover(record)
+		return False
+
+	def _encode(self, message):
+		if isinstance(message, bytes) or getattr(self, "encoding", None) is not None:
+			return message
+		return message.encode("utf-8")
+
+	def _write_chunk(self, chunk):
+		if not chunk:
+			return
+
+		stream = self._get_stream()
+		if stream is not None:
+			stream.write(type(chunk[0])().join(chunk))
+
+	def _get_stream(self):
+		stream = getattr(self, "stream", None)
+		if stream is None and hasattr(self, "_open"):
+			# file handlers opened with delay
+			# noinspection PyUnresolvedReferences
+			self.stream = stream = self._open()
+		return stream
+
+	def _flush_stream(self):
+		stream = getattr(self, "stream", None)
+		if stream is not None and hasattr(stream, "flush"):
+			try:
+				stream.flush()
+			except Exception:
+				pass
+
+
+def get_queue_statistics():
+	"""
+	Returns the queue statistics of all configured :class:`AsyncLogHandlerMixin` handlers.
+
+	Returns:
+	    list: A dict per handler with its ``name``, ``queue_depth``, ``queue_size`` and number of ``dropped`` records.
+	"""
+	loggers = [logging.getLogger()] + [logger for logger in logging.Logger.manager.loggerDict.values()
+	                                   if isinstance(logger, logging.Logger)]
+
+	result = []
+	seen = set()
+	for logger in loggers:
+		for handler in logger.handlers:
+			if not isinstance(handler, AsyncLogHandlerMixin) or id(handler) in seen:
+				continue
+			seen.add(id(handler))
+			result.append(dict(name=handler.get_name(),
+			                   queue_depth=handler.queue_depth,
+			                   queue_size=handler.queue_size,
+			                   dropped=handler.dropped))
+	return result
 
 
 class CleaningTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+	"""
+	Timed rotating file handler that deletes superfluous old files on start and optionally compresses rotated files
+	with gzip on a background thread (``compress``).
+	"""
 
 	def __init__(self, *args, **kwargs):
+		self.compress = kwargs.pop("compress", False)
 		super(CleaningTimedRotatingFileHandler, self).__init__(*args, **kwargs)
 
 		# clean up old files on handler start
@@ -36,6 +342,27 @@ class CleaningTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler
 			for s in self.getFilesToDelete():
 				os.remove(s)
 
+		# compress anything left over from before
+		self.compressRotatedFiles()
+
+	def getFilesToDelete(self):
+		rotated = get_rotated_files(self.baseFilename, self.extMatch)
+		if len(rotated) <= self.backupCount:
+			return []
+		return [path for paths in rotated[:len(rotated) - self.backupCount] for path in paths]
+
+	def compressRotatedFiles(self):
+		if not self.compress:
+			return
+
+		for paths in get_rotated_files(self.baseFilename, self.extMatch):
+			if len(paths) == 1 and not paths[0].endswith(COMPRESSED_SUFFIX):
+				compress_in_background(paths[0])
+
+	def doRollover(self):
+		super(CleaningTimedRotatingFileHandler, self).doRollover()
+		self.compressRotatedFiles()
+
 
 class OctoPrintLogHandler(AsyncLogHandlerMixin, CleaningTimedRotatingFileHandler):
 	rollover_callbacks = []
@@ -57,50 +384,64 @@ class OctoPrintStreamHandler(AsyncLogHandlerMixin, logging.StreamHandler):
 
 
 class SerialLogHandler(AsyncLogHandlerMixin, logging.handlers.RotatingFileHandler):
+	"""
+	Rolls the serial log over whenever a new connection is opened and, if ``maxBytes`` is set, whenever it would exceed
+	that size. Rotated files are optionally compressed with gzip on a background thread (``compress``).
+	"""
 
 	do_rollover = False
 	suffix_template = "%Y-%m-%d_%H-%M-%S"
-	file_pattern = re.compile(r"^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
+	file_pattern = re.compile(r"^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(-\d+)?$")
 
 	@classmethod
 	def on_open_connection(cls):
 		cls.do_rollover = True
 
 	def __init__(self, *args, **kwargs):
+		self.compress = kwargs.pop("compress", False)
 		super(SerialLogHandler, self).__init__(*args, **kwargs)
 		self.cleanupFiles()
+		self.compressRotatedFiles()
 
 	def shouldRollover(self, record):
-		return self.do_rollover
+		return type(self).do_rollover or super(SerialLogHandler, self).shouldRollover(record)
+
+	def _should_rollover_batch(self, record, message, pending):
+		if type(self).do_rollover:
+			return True
+
+		if self.maxBytes > 0:
+			stream = self._get_stream()
+			stream.seek(0, os.SEEK_END)
+			size = stream.tell() + pending
+			return size > 0 and size + len(message) >= self.maxBytes
+
+		return False
 
 	def getFilesToDelete(self):
 		"""
 		Determine the files to delete when rolling over.
 		"""
-		dirName, baseName = os.path.split(self.baseFilename)
-		fileNames = os.listdir(dirName)
-		result = []
-		prefix = baseName + "."
-		plen = len(prefix)
-		for fileName in fileNames:
-			if fileName[:plen] == prefix:
-				suffix = fileName[plen:]
-				if type(self).file_pattern.match(suffix):
-					result.append(os.path.join(dirName, fileName))
-		result.sort()
-		if len(result) < self.backupCount:
-			result = []
-		else:
-			result = result[:len(result) - self.backupCount]
-		return result
+		rotated = get_rotated_files(self.baseFilename, type(self).file_pattern)
+		if len(rotated) <= self.backupCount:
+			return []
+		return [path for paths in rotated[:len(rotated) - self.backupCount] for path in paths]
 
 	def cleanupFiles(self):
 		if self.backupCount > 0:
 			for path in self.getFilesToDelete():
 				os.remove(path)
 
+	def compressRotatedFiles(self):
+		if not self.compress:
+			return
+
+		for paths in get_rotated_files(self.baseFilename, type(self).file_pattern):
+			if len(paths) == 1 and not paths[0].endswith(COMPRESSED_SUFFIX):
+				compress_in_background(paths[0])
+
 	def doRollover(self):
-		self.do_rollover = False
+		type(self).do_rollover = False
 
 		if self.stream:
 			self.stream.close()
@@ -109,12 +450,18 @@ class SerialLogHandler(AsyncLogHandlerMixin, logging.handlers.RotatingFileHandle
 		if os.path.exists(self.baseFilename):
 			# figure out creation date/time to use for file suffix
 			t = time.localtime(os.stat(self.baseFilename).st_mtime)
-			dfn = self.baseFilename + "." + time.strftime(type(self).suffix_template, t)
-			if os.path.exists(dfn):
-				os.remove(dfn)
+			prefix = self.baseFilename + "." + time.strftime(type(self).suffix_template, t)
+
+			# size based roll overs might happen more than once per second
+			dfn = prefix
+			counter = 0
+			while os.path.exists(dfn) or os.path.exists(dfn + COMPRESSED_SUFFIX):
+				counter += 1
+				dfn = "{}-{}".format(prefix, counter)
 			os.rename(self.baseFilename, dfn)
 
 		self.cleanupFiles()
+		self.compressRotatedFiles()
 		if not self.delay:
 			self.stream = self._open()
 
@@ -46,7 +46,7 @@ def _validate_plugin(phase, plugin_info):
 
 def plugin_manager(init=False, plugin_folders=None, plugin_bases=None, plugin_entry_points=None, plugin_disabled_list=None,
                    plugin_blacklist=None, plugin_restart_needing_hooks=None, plugin_obsolete_hooks=None,
-                   plugin_validators=None):
+                   plugin_validators=None, plugin_discovery_cache=None, plugin_lazy_import=False):
 	"""
 	Factory method for initially constructing and consecutively retrieving the :class:`~octoprint.plugin.core.PluginManager`
 	singleton.
@@ -72,6 +72,10 @@ def plugin_manager(init=False, plugin_folders=None, plugin_bases=None, plugin_en
 	    plugin_obsolete_hooks (list): A list of hooks that have been declared obsolete. Plugins implementing them will
 	        not be enabled since they might depend on functionality that is no longer available.
 	    plugin_validators (list): A list of additional plugin validators through which to process each plugin.
+	    plugin_discovery_cache (str): Path of the file in which to persist plugin discovery results across restarts. If
+	        not provided, plugins will be fully rediscovered on every start.
+	    plugin_lazy_import (boolean): Whether to defer importing plugins that according to the discovery cache only
+	        provide hooks until one of their hooks is first invoked. Requires ``plugin_discovery_cache``.
 
 	Returns:
 	    PluginManager: A fully initialized :class:`~octoprint.plugin.core.PluginManager` instance to be used for plugin
@@ -112,7 +116,9 @@ def plugin_manager(init=False, plugin_folders=None, plugin_bases=None, plugin_en
 			                          plugin_blacklist=plugin_blacklist,
 			                          plugin_restart_needing_hooks=plugin_restart_needing_hooks,
 			                          plugin_obsolete_hooks=plugin_obsolete_hooks,
-			                          plugin_validators=plugin_validators)
+			                          plugin_validators=plugin_validators,
+			                          plugin_discovery_cache=plugin_discovery_cache,
+			                          plugin_lazy_import=plugin_lazy_import)
 		else:
 			raise ValueError("Plugin Manager not initialized yet")
 	return _instance
@@ -215,7 +221,7 @@ def call_plugin(types, method, args=None, kwargs=None, callback=None, error_call
 	if kwargs is None:
 		kwargs = dict()
 
-	plugins = plugin_manager().get_implementations(*types, sorting_context=sorting_context)
+	plugins = plugin_manager().get_cached_implementations(*types, sorting_context=sorting_context)
 	for plugin in plugins:
 		if initialized and not hasattr(plugin, "_identifier"):
 			continue
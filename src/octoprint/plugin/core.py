@@ -9,6 +9,9 @@ way and could be extracted into a separate Python module in the future.
 .. autoclass:: PluginInfo
    :members:
 
+.. autoclass:: PluginDiscoveryCache
+   :members:
+
 .. autoclass:: Plugin
    :members:
 
@@ -33,6 +36,9 @@ from collections import defaultdict, namedtuple, OrderedDict
 import logging
 import fnmatch
 import inspect
+import json
+import threading
+import time
 
 import pkg_resources
 import pkginfo
@@ -149,6 +155,7 @@ class PluginInfo(object):
 		self.loaded = False
 		self.managable = True
 		self.needs_restart = False
+		self.import_time = None
 
 		self._name = name
 		self._version = version
@@ -161,6 +168,38 @@ class PluginInfo(object):
 
 		self._cached_parsed_metadata = parsed_metadata
 
+		self._lazy_hooks = None
+
+	@property
+	def lazy(self):
+		"""
+		Whether the plugin's module has not been imported yet because its import got deferred until first use.
+
+		Returns:
+		    bool: True if the plugin's module import is still pending, False otherwise.
+		"""
+		return self._lazy_hooks is not None
+
+	def defer_import(self, hooks):
+		"""
+		Marks the plugin's module import as deferred. Until the module gets imported, :attr:`hooks` will return the
+		provided placeholder ``hooks``.
+
+		Arguments:
+		    hooks (dict): Placeholder hook definitions to use until the module is imported.
+		"""
+		self._lazy_hooks = hooks
+
+	def set_imported(self, instance):
+		"""
+		Sets the plugin module imported after a deferred import.
+
+		Arguments:
+		    instance (module): The imported plugin module.
+		"""
+		self.instance = instance
+		self._lazy_hooks = None
+
 	def validate(self, phase, additional_validators=None):
 		result = True
 
@@ -388,6 +427,8 @@ class PluginInfo(object):
 		Returns:
 		    dict: Hooks provided by the plugin.
 		"""
+		if self._lazy_hooks is not None:
+			return self._lazy_hooks
 		return self._get_instance_attribute(self.__class__.attr_hooks, default={})
 
 	@property
@@ -542,17 +583,195 @@ class PluginInfo(object):
 		return result
 
 
+class PluginDiscoveryCache(object):
+	"""
+	Persistent cache of the results of plugin discovery, so that unchanged plugins don't have to be rediscovered on
+	every start.
+
+	Stores
+
+	  * the plugin entry points found in the Python environment, including the package metadata of their distributions,
+	    valid as long as neither the modification times of the entries of the Python path nor those of the distributions'
+	    metadata change,
+	  * the metadata parsed from the plugins' source files, valid as long as the source file's modification time and
+	    size stay the same, and
+	  * the hooks, hook orders and implementation types last seen for each plugin, valid as long as the plugin's
+	    source file's modification time and size stay the same, and whether the plugin's import may be deferred.
+
+	Arguments:
+	    path (str): Path of the file in which to persist the cache.
+	"""
+
+	VERSION = 1
+
+	def __init__(self, path):
+		self._logger = logging.getLogger(__name__)
+		self._path = path
+		self._dirty = False
+		self._data = self._load()
+
+	def _empty(self):
+		return dict(version=self.VERSION, entry_points=None, parsed_metadata=dict(), plugins=dict())
+
+	def _load(self):
+		if not os.path.isfile(self._path):
+			return self._empty()
+
+		try:
+			with open(self._path, "rb") as f:
+				data = json.load(f)
+		except:
+			self._logger.exception("Error while reading plugin discovery cache from {}, ignoring it".format(self._path))
+			return self._empty()
+
+		if not isinstance(data, dict) or data.get("version") != self.VERSION:
+			return self._empty()
+		return data
+
+	def save(self):
+		"""Persists the cache if anything changed."""
+		if not self._dirty:
+			return
+
+		from octoprint.util import atomic_write
+		try:
+			with atomic_write(self._path, "wb") as f:
+				json.dump(self._data, f)
+			self._dirty = False
+		except:
+			self._logger.exception("Error while writing plugin discovery cache to {}".format(self._path))
+
+	def invalidate(self):
+		"""Drops all cached information, e.g. after plugins got installed or uninstalled."""
+		self._data = self._empty()
+		self._dirty = False
+		try:
+			os.remove(self._path)
+		except OSError:
+			pass
+
+	##~~ entry points
+
+	def get_entry_points(self, groups, fingerprint):
+		"""
+		Returns:
+		    list: The cached entry points for ``groups`` if the cache is still valid for the Python path ``fingerprint``,
+		        None otherwise.
+		"""
+		cached = self._data.get("entry_points")
+		if not cached or cached.get("groups") != list(groups) or cached.get("fingerprint") != fingerprint:
+			return None
+
+		for entry in cached["entries"]:
+			if entry.get("dist_path") and _mtime(entry["dist_path"]) != entry.get("dist_mtime"):
+				# distribution got updated in place (e.g. an editable install)
+				return None
+
+		return cached["entries"]
+
+	def set_entry_points(self, groups, fingerprint, entries):
+		self._data["entry_points"] = dict(groups=list(groups), fingerprint=fingerprint, entries=entries)
+		self._dirty = True
+
+	##~~ parsed metadata
+
+	def get_parsed_metadata(self, location):
+		source = _metadata_source(location)
+		if source is None:
+			return None
+
+		cached = self._data["parsed_metadata"].get(location)
+		if cached is None or cached.get("stat") != _stat_signature(source):
+			return None
+		return cached["metadata"]
+
+	def set_parsed_metadata(self, location, metadata):
+		source = _metadata_source(location)
+		if source is None:
+			return
+
+		entry = dict(stat=_stat_signature(source), metadata=metadata)
+		if self._data["parsed_metadata"].get(location) != entry:
+			self._data["parsed_metadata"][location] = entry
+			self._dirty = True
+
+	##~~ hooks and implementation types
+
+	def get_plugin(self, key, location=None):
+		"""
+		Arguments:
+		    key (str): Identifier of the plugin.
+		    location (str): If provided, the entry will only be returned if the plugin's source at ``location`` didn't
+		        change since it was recorded.
+
+		Returns:
+		    dict: The ``hooks``, ``hook_orders``, ``implementation_types`` and ``lazy`` flag last recorded for plugin
+		        ``key``, or None.
+		"""
+		entry = self._data["plugins"].get(key)
+		if entry is None:
+			return None
+
+		if location is not None:
+			source = _metadata_source(location)
+			if source is None or entry.get("stat") != _stat_signature(source):
+				return None
+
+		return entry
+
+	def set_plugin(self, key, hooks, implementation_types, location=None, hook_orders=None, lazy=False):
+		source = _metadata_source(location)
+		entry = dict(hooks=sorted(hooks),
+		             implementation_types=sorted(implementation_types),
+		             hook_orders=hook_orders if hook_orders is not None else dict(),
+		             lazy=lazy,
+		             stat=_stat_signature(source) if source else None)
+		if self._data["plugins"].get(key) != entry:
+			self._data["plugins"][key] = entry
+			self._dirty = True
+
+
+def _mtime(path):
+	try:
+		return os.stat(path).st_mtime
+	except OSError:
+		return None
+
+
+def _stat_signature(path):
+	try:
+		stat = os.stat(path)
+		return [stat.st_mtime, stat.st_size]
+	except OSError:
+		return None
+
+
+def _metadata_source(location):
+	if not location:
+		return None
+	if os.path.isdir(location):
+		return os.path.join(location, "__init__.py")
+	return location
+
+
 class PluginManager(object):
 	"""
 	The :class:`PluginManager` is the central component for finding, loading and accessing plugins provided to the
 	system.
 
 	It is able to discover plugins both through possible file system locations as well as customizable entry points.
+
+	If a ``plugin_discovery_cache`` path is provided, discovery results get persisted there and reused as long as
+	they are still valid, see :class:`PluginDiscoveryCache`.
+
+	If additionally ``plugin_lazy_import`` is set, the import of plugins that according to the discovery cache only
+	provide hooks gets deferred until one of their hooks is first invoked.
 	"""
 
 	def __init__(self, plugin_folders, plugin_bases, plugin_entry_points, logging_prefix=None,
 	             plugin_disabled_list=None, plugin_blacklist=None, plugin_restart_needing_hooks=None,
-	             plugin_obsolete_hooks=None, plugin_validators=None):
+	             plugin_obsolete_hooks=None, plugin_validators=None, plugin_discovery_cache=None,
+	             plugin_lazy_import=False):
 		self.logger = logging.getLogger(__name__)
 
 		if logging_prefix is None:
@@ -585,6 +804,12 @@ class PluginManager(object):
 
 		self._plugin_hooks = defaultdict(list)
 
+		# lookup tables for get_hooks & get_implementations, rebuilt on demand after plugin lifecycle changes
+		self._hook_tables = dict()
+		self._implementation_tables = dict()
+		self._lookup_table_generation = 0
+		self._lookup_table_mutex = threading.Lock()
+
 		self.implementation_injects = dict()
 		self.implementation_inject_factories = []
 		self.implementation_pre_inits = []
@@ -603,6 +828,13 @@ class PluginManager(object):
 
 		self.marked_plugins = defaultdict(list)
 
+		self._discovery_cache = None
+		if plugin_discovery_cache is not None:
+			self._discovery_cache = PluginDiscoveryCache(plugin_discovery_cache)
+		self._lazy_import = plugin_lazy_import and self._discovery_cache is not None
+		self._lazy_import_mutex = threading.RLock()
+		self._deferred_modules = dict()
+
 		self._python_install_dir = None
 		self._python_virtual_env = False
 		self._detect_python_environment()
@@ -731,20 +963,71 @@ class PluginManager(object):
 		added = OrderedDict()
 		found = []
 
-		# let's make sure we have a current working set ...
-		working_set = pkg_resources.WorkingSet()
+		if not isinstance(groups, (list, tuple)):
+			groups = [groups]
 
-		# ... including the user's site packages
+		for entry in self._discover_entry_points(groups):
+			try:
+				key = str(entry["key"])
+				group = entry["group"]
+				module_name = str(entry["module_name"])
+				package_name = entry["package_name"]
+				version = entry["version"]
+
+				found.append(key)
+				if key in existing or key in added or (ignore_uninstalled and key in self.marked_plugins["uninstalled"]):
+					# plugin is already defined or marked as uninstalled, ignore it
+					continue
+
+				kwargs = dict(module_name=module_name, version=version)
+				if entry["metadata"] is not None:
+					kwargs.update(entry["metadata"])
+
+				plugin = self._import_plugin_from_module(key, **kwargs)
+				if plugin:
+					plugin.origin = EntryPointOrigin("entry_point", group, module_name, package_name, version)
+					plugin.enabled = False
+
+					# plugin is manageable if its location is writable and OctoPrint
+					# is either not running from a virtual env or the plugin is
+					# installed in that virtual env - the virtual env's pip will not
+					# allow us to uninstall stuff that is installed outside
+					# of the virtual env, so this check is necessary
+					plugin.managable = os.access(plugin.location, os.W_OK) \
+					                   and (not self._python_virtual_env
+					                        or is_sub_path_of(plugin.location, self._python_prefix)
+					                        or is_editable_install(self._python_install_dir,
+					                                               package_name,
+					                                               module_name,
+					                                               plugin.location))
+
+					added[key] = plugin
+			except:
+				self.logger.exception("Error processing entry point {!r} for group {}".format(entry, entry.get("group")))
+
+		return added, found
+
+	def _discover_entry_points(self, groups):
 		import site
 		import sys
-		if site.ENABLE_USER_SITE:
-			if not site.USER_SITE in working_set.entries:
-				working_set.add_entry(site.USER_SITE)
-			if not site.USER_SITE in sys.path:
-				site.addsitedir(site.USER_SITE)
 
-		if not isinstance(groups, (list, tuple)):
-			groups = [groups]
+		user_site = site.USER_SITE if site.ENABLE_USER_SITE else None
+		if user_site is not None and not user_site in sys.path:
+			site.addsitedir(user_site)
+
+		fingerprint = self._python_path_fingerprint(user_site=user_site)
+		if self._discovery_cache is not None:
+			entries = self._discovery_cache.get_entry_points(groups, fingerprint)
+			if entries is not None:
+				self.logger.debug("Using cached plugin entry points")
+				return entries
+
+		# let's make sure we have a current working set ...
+		working_set = pkg_resources.WorkingSet()
+
+		# ... including the user's site packages
+		if user_site is not None and not user_site in working_set.entries:
+			working_set.add_entry(user_site)
 
 		def wrapped(gen):
 			# to protect against some issues in installed packages that make iteration over entry points
@@ -756,56 +1039,109 @@ class PluginManager(object):
 					self.logger.exception("Something went wrong while processing the entry points of a package in the "
 					                      "Python environment - broken entry_points.txt in some package?")
 
+		entries = []
 		for group in groups:
 			for entry_point in wrapped(working_set.iter_entry_points(group=group, name=None)):
 				try:
-					key = entry_point.name
-					module_name = entry_point.module_name
-					version = entry_point.dist.version
-
-					found.append(key)
-					if key in existing or key in added or (ignore_uninstalled and key in self.marked_plugins["uninstalled"]):
-						# plugin is already defined or marked as uninstalled, ignore it
-						continue
-
-					kwargs = dict(module_name=module_name, version=version)
-					package_name = entry_point.dist.project_name
+					metadata = None
 					try:
 						entry_point_metadata = EntryPointMetadata(entry_point)
 					except:
-						self.logger.exception("Something went wrong while retrieving metadata for module {}".format(module_name))
+						self.logger.exception("Something went wrong while retrieving metadata for module {}".format(entry_point.module_name))
 					else:
-						kwargs.update(dict(
-							name=entry_point_metadata.name,
-							summary=entry_point_metadata.summary,
-							author=entry_point_metadata.author,
-							url=entry_point_metadata.home_page,
-							license=entry_point_metadata.license
-						))
-
-					plugin = self._import_plugin_from_module(key, **kwargs)
-					if plugin:
-						plugin.origin = EntryPointOrigin("entry_point", group, module_name, package_name, version)
-						plugin.enabled = False
-
-						# plugin is manageable if its location is writable and OctoPrint
-						# is either not running from a virtual env or the plugin is
-						# installed in that virtual env - the virtual env's pip will not
-						# allow us to uninstall stuff that is installed outside
-						# of the virtual env, so this check is necessary
-						plugin.managable = os.access(plugin.location, os.W_OK) \
-						                   and (not self._python_virtual_env
-						                        or is_sub_path_of(plugin.location, self._python_prefix)
-						                        or is_editable_install(self._python_install_dir,
-						                                               package_name,
-						                                               module_name,
-						                                               plugin.location))
-
-						added[key] = plugin
+						metadata = dict(name=entry_point_metadata.name,
+						                summary=entry_point_metadata.summary,
+						                author=entry_point_metadata.author,
+						                url=entry_point_metadata.home_page,
+						                license=entry_point_metadata.license)
+
+					dist_path = _dist_metadata_path(entry_point.dist)
+					entries.append(dict(group=group,
+					                    key=entry_point.name,
+					                    module_name=entry_point.module_name,
+					                    package_name=entry_point.dist.project_name,
+					                    version=entry_point.dist.version,
+					                    metadata=metadata,
+					                    dist_path=dist_path,
+					                    dist_mtime=_mtime(dist_path) if dist_path else None))
 				except:
 					self.logger.exception("Error processing entry point {!r} for group {}".format(entry_point, group))
 
-		return added, found
+		if self._discovery_cache is not None:
+			self._discovery_cache.set_entry_points(groups, fingerprint, entries)
+
+		return entries
+
+	def _python_path_fingerprint(self, user_site=None):
+		import sys
+
+		paths = list(sys.path)
+		if user_site is not None and not user_site in paths:
+			paths.append(user_site)
+
+		# installing, upgrading or removing a distribution modifies the folder it lives in
+		return [[path, _mtime(path) if path else None] for path in paths]
+
+	def invalidate_discovery_cache(self):
+		"""
+		Invalidates the persistent plugin discovery cache, to be called when plugins get installed or uninstalled
+		by other means than adding or removing files to or from the plugin folders.
+		"""
+		if self._discovery_cache is not None:
+			self._discovery_cache.invalidate()
+
+	def _update_discovery_cache(self):
+		if self._discovery_cache is None:
+			return
+
+		for key, plugin in self.plugins.items():
+			if plugin.instance is None or not plugin.loaded:
+				# not imported (yet), nothing new to record
+				continue
+
+			implementation_types = []
+			if plugin.implementation is not None:
+				implementation_types = ["{}.{}".format(mixin.__module__, mixin.__name__)
+				                        for mixin in self.mixins_matching_bases(plugin.implementation.__class__,
+				                                                                *self.plugin_bases)]
+
+			hook_orders = dict()
+			lazy = plugin.implementation is None and self._only_lazy_control_attributes(plugin)
+			for hook, definition in plugin.hooks.items():
+				try:
+					_, order = self._get_callback_and_order(definition)
+				except ValueError:
+					lazy = False
+				else:
+					hook_orders[hook] = order
+
+			self._discovery_cache.set_plugin(key, plugin.hooks.keys(), implementation_types,
+			                                 location=plugin.location,
+			                                 hook_orders=hook_orders,
+			                                 lazy=lazy)
+
+		self._discovery_cache.save()
+
+	# control attributes a plugin module may define without needing to be imported at startup
+	_lazy_control_attributes = (PluginInfo.attr_name, PluginInfo.attr_version, PluginInfo.attr_description,
+	                            PluginInfo.attr_author, PluginInfo.attr_url, PluginInfo.attr_license,
+	                            PluginInfo.attr_hooks, PluginInfo.attr_check, PluginInfo.attr_init,
+	                            PluginInfo.attr_load, PluginInfo.attr_unload, PluginInfo.attr_enable,
+	                            PluginInfo.attr_disable)
+
+	def _only_lazy_control_attributes(self, plugin):
+		return all(attr in self._lazy_control_attributes
+		           for attr in dir(plugin.instance)
+		           if attr.startswith("__plugin_") and attr.endswith("__"))
+
+	def _can_defer_import(self, key, location):
+		if not self._lazy_import:
+			return None
+
+		entry = self._discovery_cache.get_plugin(key, location=location)
+		if entry is None or not entry.get("lazy"):
+			return None
+		return entry
 
 	def _import_plugin_from_module(self, key, folder=None, module_name=None, name=None, version=None, summary=None,
 	                               author=None, url=None, license=None, bundled=False):
@@ -821,11 +1157,18 @@ class PluginManager(object):
 			self.logger.warn("Could not locate plugin {key}".format(key=key))
 			return None
 
+		parsed_metadata = None
+		if self._discovery_cache is not None:
+			parsed_metadata = self._discovery_cache.get_parsed_metadata(module[1])
+
 		# Create a simple dummy entry first ...
 		plugin = PluginInfo(key, module[1], None, name=name, version=version, description=summary, author=author,
-		                    url=url, license=license)
+		                    url=url, license=license, parsed_metadata=parsed_metadata)
 		plugin.bundled = bundled
 
+		if self._discovery_cache is not None and parsed_metadata is None:
+			self._discovery_cache.set_parsed_metadata(module[1], plugin.parsed_metadata)
+
 		if self._is_plugin_disabled(key):
 			self.logger.info("Plugin {} is disabled.".format(plugin))
 			plugin.forced_disabled = True
@@ -837,14 +1180,39 @@ class PluginManager(object):
 		if not plugin.validate("before_import", additional_validators=self.plugin_validators):
 			return plugin
 
+		deferred = self._can_defer_import(key, module[1])
+		if deferred is not None:
+			# only provides hooks, postpone the import until one of them is first needed
+			if module[0] is not None:
+				module[0].close()
+
+			hooks = dict()
+			for hook in deferred["hooks"]:
+				handler = _DeferredHookHandler(self, plugin, hook)
+				order = deferred["hook_orders"].get(hook)
+				hooks[str(hook)] = (handler, order) if order is not None else handler
+			plugin.defer_import(hooks)
+			self._deferred_modules[key] = (folder, module_name)
+			return plugin
+
 		# ... then create and return the real one
 		return self._import_plugin(key, *module,
 		                           name=name, version=version, summary=summary, author=author, url=url,
 		                           license=license, bundled=bundled, parsed_metadata=plugin.parsed_metadata)
 
+	def _load_plugin_module(self, key, f, filename, description):
+		start = time.time()
+		try:
+			return imp.load_module(key, f, filename, description), time.time() - start
+		finally:
+			if f is not None:
+				f.close()
+
 	def _import_plugin(self, key, f, filename, description, name=None, version=None, summary=None, author=None, url=None, license=None, bundled=False, parsed_metadata=None):
 		try:
-			instance = imp.load_module(key, f, filename, description)
+			instance, import_time = self._load_plugin_module(key, f, filename, description)
+			self.logger.debug("Imported plugin {} in {:.1f}ms".format(key, import_time * 1000))
+
 			plugin = PluginInfo(key, filename, instance,
 			                    name=name,
 			                    version=version,
@@ -854,6 +1222,7 @@ class PluginManager(object):
 			                    license=license,
 			                    parsed_metadata=parsed_metadata)
 			plugin.bundled = bundled
+			plugin.import_time = import_time
 		except:
 			self.logger.exception("Error loading plugin {key}".format(key=key))
 			return None
@@ -937,6 +1306,9 @@ class PluginManager(object):
 								initialize_implementations=initialize_implementations,
 								force_reload=force_reload)
 
+		self._update_discovery_cache()
+		self._log_import_times(added)
+
 		if len(self.enabled_plugins) <= 0:
 			self.logger.info("No plugins found")
 		else:
@@ -946,6 +1318,91 @@ class PluginManager(object):
 				hooks=sum(map(lambda x: len(x), self.plugin_hooks.values()))
 			))
 
+	def _log_import_times(self, plugins, count=5):
+		imported = sorted([plugin for plugin in plugins.values() if plugin.import_time is not None],
+		                  key=lambda plugin: plugin.import_time,
+		                  reverse=True)
+		if imported:
+			self.logger.info("Importing {} plugin(s) took {:.0f}ms, slowest: {}".format(
+				len(imported),
+				sum(plugin.import_time for plugin in imported) * 1000,
+				", ".join("{} ({:.0f}ms)".format(plugin.key, plugin.import_time * 1000) for plugin in imported[:count])))
+
+		deferred = sorted(key for key, plugin in plugins.items() if plugin.lazy)
+		if deferred:
+			self.logger.info("Deferred import of {} plugin(s) until first use: {}".format(len(deferred),
+			                                                                            ", ".join(deferred)))
+
+	def import_deferred_plugin(self, plugin, reason=None):
+		"""
+		Imports the module of a plugin whose import was deferred, then loads and - if it's enabled - enables it,
+		replacing its placeholder hook handlers with the actual ones.
+
+		Arguments:
+		    plugin (PluginInfo): The plugin to import.
+		    reason (str): Why the import is needed, for logging.
+
+		Returns:
+		    bool: True if the plugin is available (imported now or already before), False if importing, loading or
+		        enabling it failed.
+		"""
+		with self._lazy_import_mutex:
+			if not plugin.lazy:
+				return plugin.instance is not None
+
+			name = plugin.key
+			deferred_hooks = plugin.hooks
+			folder, module_name = self._deferred_modules.pop(name, (None, None))
+
+			try:
+				if folder:
+					module = imp.find_module(name, [folder])
+				else:
+					module = imp.find_module(module_name)
+				instance, import_time = self._load_plugin_module(name, *module)
+			except:
+				self.logger.exception("Error importing deferred plugin {}".format(name))
+				instance = None
+			else:
+				self.logger.info("Imported deferred plugin {} in {:.1f}ms{}".format(name, import_time * 1000,
+				                                                                   " ({})".format(reason) if reason else ""))
+				plugin.import_time = import_time
+
+			plugin.set_imported(instance)
+
+			available = instance is not None
+			try:
+				if available and not plugin.check():
+					self.logger.warn("Plugin \"{}\" did not pass check".format(plugin))
+					available = False
+
+				if available:
+					available = plugin.validate("before_load", additional_validators=self.plugin_validators)
+				if available:
+					plugin.load()
+					plugin.validate("after_load", additional_validators=self.plugin_validators)
+
+				if available and plugin.enabled:
+					available = plugin.validate("before_enable", additional_validators=self.plugin_validators)
+					if available:
+						plugin.enable()
+			except:
+				self.logger.exception("There was an error loading deferred plugin {}".format(name))
+				available = False
+
+			# swap placeholder handlers for the actual ones
+			self._deactivate_hooks(name, deferred_hooks)
+			if available and plugin.enabled:
+				self._activate_hooks(name, plugin.hooks)
+
+			if not available and plugin.enabled:
+				plugin.enabled = False
+				if name in self.enabled_plugins:
+					del self.enabled_plugins[name]
+				self.disabled_plugins[name] = plugin
+
+			return available
+
 	def mark_plugin(self, name, **kwargs):
 		if not name in self.plugins:
 			self.logger.debug("Trying to mark an unknown plugin {name}".format(**locals()))
@@ -1101,15 +1558,7 @@ class PluginManager(object):
 		plugin.hotchangeable = self.is_restart_needing_plugin(plugin)
 
 		# evaluate registered hooks
-		for hook, definition in plugin.hooks.items():
-			try:
-				callback, order = self._get_callback_and_order(definition)
-			except ValueError as e:
-				self.logger.warn("There is something wrong with the hook definition {} for plugin {}: {}".format(definition, name, str(e)))
-				continue
-
-			self._plugin_hooks[hook].append((order, name, callback))
-			self._sort_hooks(hook)
+		self._activate_hooks(name, plugin.hooks)
 
 		# evaluate registered implementation
 		if plugin.implementation:
@@ -1118,21 +1567,10 @@ class PluginManager(object):
 				self.plugin_implementations_by_type[mixin].append((name, plugin.implementation))
 
 			self.plugin_implementations[name] = plugin.implementation
+			self._invalidate_lookup_tables()
 
 	def _deactivate_plugin(self, name, plugin):
-		for hook, definition in plugin.hooks.items():
-			try:
-				callback, order = self._get_callback_and_order(definition)
-			except ValueError as e:
-				self.logger.warn("There is something wrong with the hook definition {} for plugin {}: {}".format(definition, name, str(e)))
-				continue
-
-			try:
-				self._plugin_hooks[hook].remove((order, name, callback))
-				self._sort_hooks(hook)
-			except ValueError:
-				# that's ok, the plugin was just not registered for the hook
-				pass
+		self._deactivate_hooks(name, plugin.hooks)
 
 		if plugin.implementation is not None:
 			if name in self.plugin_implementations:
@@ -1145,6 +1583,33 @@ class PluginManager(object):
 				except ValueError:
 					# that's ok, the plugin was just not registered for the type
 					pass
+			self._invalidate_lookup_tables()
+
+	def _activate_hooks(self, name, hooks):
+		for hook, definition in hooks.items():
+			try:
+				callback, order = self._get_callback_and_order(definition)
+			except ValueError as e:
+				self.logger.warn("There is something wrong with the hook definition {} for plugin {}: {}".format(definition, name, str(e)))
+				continue
+
+			self._plugin_hooks[hook].append((order, name, callback))
+			self._sort_hooks(hook)
+
+	def _deactivate_hooks(self, name, hooks):
+		for hook, definition in hooks.items():
+			try:
+				callback, order = self._get_callback_and_order(definition)
+			except ValueError as e:
+				self.logger.warn("There is something wrong with the hook definition {} for plugin {}: {}".format(definition, name, str(e)))
+				continue
+
+			try:
+				self._plugin_hooks[hook].remove((order, name, callback))
+				self._sort_hooks(hook)
+			except ValueError:
+				# that's ok, the plugin was just not registered for the hook
+				pass
 
 	def is_restart_needing_plugin(self, plugin):
 		return plugin.needs_restart or self.has_restart_needing_implementation(plugin) or self.has_restart_needing_hooks(plugin)
@@ -1431,17 +1896,20 @@ class PluginManager(object):
 		Arguments:
 		    hook (str): The hook for which to retrieve the handlers.
 
+		The returned dict is shared between callers and must not be modified.
+
 		Returns:
 		    dict: A dict containing all registered handlers mapped by their plugin's identifier.
 		"""
 
-		if not hook in self.plugin_hooks:
-			return dict()
+		table = self._hook_tables.get(hook)
+		if table is not None:
+			return table
 
-		result = OrderedDict()
-		for h in self.plugin_hooks[hook]:
-			result[h[0]] = h[1]
-		return result
+		generation = self._lookup_table_generation
+		table = OrderedDict((name, callback) for _, name, callback in self._plugin_hooks.get(hook, []))
+		self._store_lookup_table(self._hook_tables, hook, table, generation)
+		return table
 
 	def get_implementations(self, *types, **kwargs):
 		"""
@@ -1453,20 +1921,44 @@ class PluginManager(object):
 		Returns:
 		    list: A list of all found implementations
 		"""
+		return list(self.get_cached_implementations(*types, **kwargs))
+
+	def get_cached_implementations(self, *types, **kwargs):
+		"""
+		Like :meth:`get_implementations`, but returns the implementations as a tuple straight from the plugin
+		manager's lookup tables, which only get rebuilt after plugins got loaded, unloaded, enabled or disabled.
+
+		Arguments:
+		    types (one or more type): The types a mixin implementation needs to implement in order to be returned.
+
+		Returns:
+		    tuple: All found implementations, sorted
+		"""
 
 		sorting_context = kwargs.get("sorting_context", None)
 
+		key = (types, sorting_context)
+		table = self._implementation_tables.get(key)
+		if table is not None:
+			return table
+
+		generation = self._lookup_table_generation
+		table = self._build_implementation_table(types, sorting_context)
+		self._store_lookup_table(self._implementation_tables, key, table, generation)
+		return table
+
+	def _build_implementation_table(self, types, sorting_context):
 		result = None
 
 		for t in types:
-			implementations = self.plugin_implementations_by_type[t]
+			implementations = self.plugin_implementations_by_type.get(t, [])
 			if result is None:
 				result = set(implementations)
 			else:
 				result = result.intersection(implementations)
 
 		if result is None:
-			return []
+			return ()
 
 		def sort_func(impl):
 			sorting_value = None
@@ -1485,7 +1977,7 @@ class PluginManager(object):
 
 			return sorting_value is None, sorting_value, impl[0]
 
-		return [impl[1] for impl in sorted(result, key=sort_func)]
+		return tuple(impl[1] for impl in sorted(result, key=sort_func))
 
 	def get_filtered_implementations(self, f, *types, **kwargs):
 		"""
@@ -1563,6 +2055,19 @@ class PluginManager(object):
 	def _sort_hooks(self, hook):
 		self._plugin_hooks[hook] = sorted(self._plugin_hooks[hook],
 		                                  key=lambda x: (x[0] is None, x[0], x[1], x[2]))
+		self._invalidate_lookup_tables()
+
+	def _invalidate_lookup_tables(self):
+		with self._lookup_table_mutex:
+			self._lookup_table_generation += 1
+			self._hook_tables = dict()
+			self._implementation_tables = dict()
+
+	def _store_lookup_table(self, tables, key, table, generation):
+		with self._lookup_table_mutex:
+			# don't store tables built from state that got changed in the meantime
+			if generation == self._lookup_table_generation:
+				tables[key] = table
 
 	def _get_callback_and_order(self, hook):
 		if callable(hook):
@@ -1587,6 +2092,32 @@ class PluginManager(object):
 			raise ValueError("Invalid hook definition, neither a callable nor a 2-tuple (callback, order): {!r}".format(hook))
 
 
+class _DeferredHookHandler(object):
+	"""
+	Placeholder handler registered for the hooks of a plugin whose import was deferred. Imports the plugin on first
+	invocation and then delegates to the actual handler.
+	"""
+
+	def __init__(self, plugin_manager, plugin, hook):
+		self._plugin_manager = plugin_manager
+		self._plugin = plugin
+		self._hook = hook
+
+	def __call__(self, *args, **kwargs):
+		if not self._plugin_manager.import_deferred_plugin(self._plugin, reason="hook {}".format(self._hook)):
+			return None
+
+		definition = self._plugin.get_hook(self._hook)
+		if definition is None:
+			return None
+
+		callback, _ = self._plugin_manager._get_callback_and_order(definition)
+		return callback(*args, **kwargs)
+
+	def __repr__(self):
+		return "<deferred handler for hook {} of plugin {}>".format(self._hook, self._plugin.key)
+
+
 def is_sub_path_of(path, parent):
 	"""
 	Tests if `path` is a sub path (or identical) to `path`.
@@ -1624,6 +2155,17 @@ def is_editable_install(install_dir, package, module, location):
 	return False
 
 
+def _dist_metadata_path(dist):
+	"""Path of the metadata of distribution ``dist``, modified whenever the distribution gets (re)installed."""
+	try:
+		path = getattr(dist, "egg_info", None)
+	except:
+		path = None
+	if not path:
+		path = dist.location
+	return path
+
+
 class EntryPointMetadata(pkginfo.Distribution):
 	def __init__(self, entry_point):
 		self.entry_point = entry_point
@@ -1711,6 +2253,10 @@ class SortablePlugin(Plugin):
 		after all implementations which did return a sorting key value that was
 		not None sorted by that.
 
+		The plugin manager caches the resulting order until plugins get loaded,
+		unloaded, enabled or disabled, so the returned value should not change
+		at runtime.
+
 		Arguments:
 		    context (str): The sorting context for which to provide the
 		        sorting key value.
@@ -5,24 +5,30 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 __copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
 import octoprint.plugin
-from octoprint.settings import settings
+from octoprint.settings import settings, valid_boolean_trues
 
 from octoprint.server import NO_CONTENT, admin_permission
 from octoprint.server.util.flask import redirect_to_tornado, restricted_access
 
-from flask import request, jsonify, url_for, make_response
+from flask import request, jsonify, url_for, make_response, Response
 from flask_babel import gettext
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest
 import yaml
 
 import os
+import re
+
+from .logs import tail, read_range, search, log_size
 
 try:
 	from os import scandir
 except ImportError:
 	from scandir import scandir
 
+MAX_TAIL_LINES = 10000
+MAX_SEARCH_RESULTS = 10000
+
 class LoggingPlugin(octoprint.plugin.AssetPlugin,
                     octoprint.plugin.SettingsPlugin,
                     octoprint.plugin.TemplatePlugin,
@@ -64,6 +70,85 @@ class LoggingPlugin(octoprint.plugin.AssetPlugin,
 
 		return NO_CONTENT
 
+	@octoprint.plugin.BlueprintPlugin.route("/tail/<path:filename>", methods=["GET"])
+	@restricted_access
+	@admin_permission.require(403)
+	def tail_log(self, filename):
+		path = self._get_log_path(filename)
+		if path is None:
+			return make_response("File not found: %s" % filename, 404)
+
+		try:
+			lines = int(request.values.get("lines", 100))
+		except ValueError:
+			return make_response("lines must be an integer", 400)
+
+		if not 0 < lines <= MAX_TAIL_LINES:
+			return make_response("lines must be between 1 and %d" % MAX_TAIL_LINES, 400)
+
+		return Response(b"".join(tail(path, lines)), mimetype="text/plain")
+
+	@octoprint.plugin.BlueprintPlugin.route("/range/<path:filename>", methods=["GET"])
+	@restricted_access
+	@admin_permission.require(403)
+	def read_log_range(self, filename):
+		path = self._get_log_path(filename)
+		if path is None:
+			return make_response("File not found: %s" % filename, 404)
+
+		size = log_size(path)
+		if request.range is None:
+			return Response(read_range(path, 0, size), mimetype="text/plain", headers={"Accept-Ranges": "bytes",
+			                                                                          "Content-Length": str(size)})
+
+		byte_range = request.range.range_for_length(size)
+		if byte_range is None:
+			return make_response("Requested range not satisfiable, only a single byte range is supported",
+			                     416,
+			                     {"Content-Range": "bytes */%d" % size})
+
+		start, stop = byte_range
+		return Response(read_range(path, start, stop),
+		                status=206,
+		                mimetype="text/plain",
+		                headers={"Accept-Ranges": "bytes",
+		                         "Content-Range": "bytes %d-%d/%d" % (start, stop - 1, size),
+		                         "Content-Length": str(stop - start)})
+
+	@octoprint.plugin.BlueprintPlugin.route("/search/<path:filename>", methods=["GET"])
+	@restricted_access
+	@admin_permission.require(403)
+	def search_log(self, filename):
+		path = self._get_log_path(filename)
+		if path is None:
+			return make_response("File not found: %s" % filename, 404)
+
+		pattern = None
+		if request.values.get("pattern"):
+			flags = re.IGNORECASE if request.values.get("ignorecase") in valid_boolean_trues else 0
+			try:
+				pattern = re.compile(request.values["pattern"].encode("utf-8"), flags)
+			except re.error as e:
+				return make_response("Invalid pattern: %s" % e, 400)
+
+		try:
+			since = float(request.values["since"]) if "since" in request.values else None
+			until = float(request.values["until"]) if "until" in request.values else None
+			limit = int(request.values.get("limit", 100))
+		except ValueError:
+			return make_response("since and until must be unix timestamps and limit an integer", 400)
+
+		if not 0 < limit <= MAX_SEARCH_RESULTS:
+			return make_response("limit must be between 1 and %d" % MAX_SEARCH_RESULTS, 400)
+
+		# look for one more match than requested to tell whether the results were truncated
+		matches = list(search(path, pattern, since=since, until=until, limit=limit + 1))
+		return jsonify(matches=[dict(line=match.line,
+		                             offset=match.offset,
+		                             text=match.text.decode("utf-8", "replace"))
+		                        for match in matches[:limit]],
+		               truncated=len(matches) > limit)
+
 	@octoprint.plugin.BlueprintPlugin.route("/setup", methods=["GET"])
 	@restricted_access
 	@admin_permission.require(403)
@@ -72,6 +157,13 @@ class LoggingPlugin(octoprint.plugin.AssetPlugin,
 		levels = self._get_logging_levels()
 		return jsonify(loggers=loggers, levels=levels)
 
+	@octoprint.plugin.BlueprintPlugin.route("/setup/handlers", methods=["GET"])
+	@restricted_access
+	@admin_permission.require(403)
+	def get_logging_handlers(self):
+		from octoprint.logging.handlers import get_queue_statistics
+		return jsonify(handlers=get_queue_statistics())
+
 	@octoprint.plugin.BlueprintPlugin.route("/setup/levels", methods=["GET"])
 	@restricted_access
 	@admin_permission.require(403)
@@ -107,10 +199,11 @@ class LoggingPlugin(octoprint.plugin.AssetPlugin,
 		files = []
 		basedir = settings().getBaseFolder("logs", check_writable=False)
 		for entry in scandir(basedir):
+			stat = entry.stat()
 			files.append({
 				"name": entry.name,
-				"date": int(entry.stat().st_mtime),
-				"size": entry.stat().st_size,
+				"date": int(stat.st_mtime),
+				"size": stat.st_size,
 				"refs": {
 					"resource": url_for(".download_log", filename=entry.name, _external=True),
 					"download": url_for("index", _external=True) + "downloads/logs/" + entry.name
@@ -119,6 +212,12 @@ class LoggingPlugin(octoprint.plugin.AssetPlugin,
 
 		return files
 
+	def _get_log_path(self, filename):
+		path = os.path.join(settings().getBaseFolder("logs", check_writable=False), secure_filename(filename))
+		if not os.path.isfile(path):
+			return None
+		return path
+
 	def _get_available_loggers(self):
 		return filter(lambda x: self._is_managed_logger(x), self._logger.manager.loggerDict.keys())
 
@@ -0,0 +1,217 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import collections
+import gzip
+import io
+import os
+import struct
+import time
+
+BLOCK_SIZE = 64 * 1024
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+"""Format of the timestamps at the start of log lines, as written by the default ``asctime`` formatter."""
+
+TIMESTAMP_LENGTH = 19
+
+COMPRESSED_SUFFIX = ".gz"
+
+Match = collections.namedtuple("Match", "line, offset, text")
+"""A matching line of a log file, with its line number and offset in the (uncompressed) log."""
+
+
+def is_compressed(path):
+	return path.endswith(COMPRESSED_SUFFIX)
+
+
+def open_log(path):
+	"""
+	Opens a log file for reading, transparently decompressing rotated logs compressed with gzip.
+
+	Arguments:
+	    path (str): Path of the log file.
+
+	Returns:
+	    file: The opened file, in binary mode.
+	"""
+	if is_compressed(path):
+		return gzip.open(path, "rb")
+	return io.open(path, "rb")
+
+
+def log_size(path):
+	"""
+	Returns the uncompressed size of a log file.
+
+	For compressed logs this is read from the gzip trailer instead of decompressing the file. The trailer only contains
+	the size modulo 2^32 of the last gzip member, which matches the log's size for the single member files written by
+	log rotation.
+	"""
+	if not is_compressed(path):
+		return os.stat(path).st_size
+
+	with io.open(path, "rb") as f:
+		f.seek(-4, os.SEEK_END)
+		return struct.unpack("<I", f.read(4))[0]
+
+
+def tail(path, count):
+	"""
+	Returns the last ``count`` lines of a log file.
+
+	Uncompressed logs are read backwards from their end, block by block, so only the requested lines are read.
+	Compressed logs are decompressed as a stream, keeping only the last ``count`` lines in memory.
+	"""
+	if count <= 0:
+		return []
+
+	if is_compressed(path):
+		with open_log(path) as f:
+			return list(collections.deque(f, maxlen=count))
+
+	with io.open(path, "rb") as f:
+		f.seek(0, os.SEEK_END)
+		position = f.tell()
+
+		data = b""
+		while position > 0 and data.count(b"\n", 0, len(data) - 1) < count:
+			read = min(BLOCK_SIZE, position)
+			position -= read
+			f.seek(position)
+			data = f.read(read) + data
+
+	lines = data.splitlines(True)
+	return lines[-count:]
+
+
+def read_range(path, start, stop):
+	"""
+	Yields the (uncompressed) bytes from ``start`` up to ``stop`` of a log file in blocks.
+
+	Uncompressed logs are seeked to ``start``, compressed logs are decompressed up to it without keeping the skipped
+	data around.
+	"""
+	with open_log(path) as f:
+		if is_compressed(path):
+			skip = start
+			while skip > 0:
+				skipped = len(f.read(min(BLOCK_SIZE, skip)))
+				if not skipped:
+					return
+				skip -= skipped
+		else:
+			f.seek(start)
+
+		remaining = stop - start
+		while remaining > 0:
+			data = f.read(min(BLOCK_SIZE, remaining))
+			if not data:
+				break
+			remaining -= len(data)
+			yield data
+
+
+def search(path, pattern, since=None, until=None, limit=None):
+	"""
+	Searches a log file for lines matching a regular expression.
+
+	The log is read as a stream, line by line. Lines are assumed to start with a timestamp (see
+	:data:`TIMESTAMP_FORMAT`). Lines without one, e.g. those of a traceback, are considered to have the timestamp of the
+	line before them. If ``since`` is given for an uncompressed log, the start of the time window is located by binary
+	search instead of reading the file from the beginning, and reading stops at the first line after ``until``.
+
+	Arguments:
+	    path (str): Path of the log file.
+	    pattern: Compiled regular expression to search for, or None to match all lines within the time window.
+	    since (float): Only return lines logged at or after this unix timestamp.
+	    until (float): Only return lines logged at or before this unix timestamp.
+	    limit (int): Maximum number of matches to return.
+
+	Returns:
+	    generator: Yields :class:`Match` instances in the order of the log. The line number is None if the start of
+	        the time window was located by binary search.
+	"""
+	since_key = _to_key(since) if since is not None else None
+	until_key = _to_key(until) if until is not None else None
+
+	with open_log(path) as f:
+		offset = 0
+		if since_key is not None and not is_compressed(path):
+			offset = _find_offset(f, since_key)
+			f.seek(offset)
+
+		# line numbers are unknown when skipping ahead without reading everything before
+		line_number = 0 if offset == 0 else None
+
+		current_key = None
+		found = 0
+		for line in f:
+			key = _line_key(line)
+			if key is not None:
+				current_key = key
+
+			position = offset
+			offset += len(line)
+			if line_number is not None:
+				line_number += 1
+
+			if since_key is not None and (current_key is None or current_key < since_key):
+				continue
+			if until_key is not None and current_key is not None and current_key > until_key:
+				break
+
+			if pattern is not None and not pattern.search(line):
+				continue
+
+			yield Match(line_number, position, line.rstrip(b"\r\n"))
+
+			found += 1
+			if limit is not None and found >= limit:
+				break
+
+
+def _to_key(timestamp):
+	return time.strftime(TIMESTAMP_FORMAT, time.localtime(timestamp)).encode("ascii")
+
+
+def _line_key(line):
+	key = line[:TIMESTAMP_LENGTH]
+	if len(key) == TIMESTAMP_LENGTH and key[4:5] == b"-" and key[10:11] == b" " and key[:4].isdigit() \
+			and key[11:13].isdigit():
+		return key
+	return None
+
+
+def _find_offset(f, key):
+	"""Returns the offset of a line start before the first line logged at or after ``key``."""
+	f.seek(0, os.SEEK_END)
+	low, high = 0, f.tell()
+
+	while high - low > BLOCK_SIZE:
+		middle = (low + high) // 2
+		f.seek(middle)
+		f.readline() # skip the partial line
+
+		line_key = None
+		while line_key is None and f.tell() < high:
+			line = f.readline()
+			if not line:
+				break
+			line_key = _line_key(line)
+
+		if line_key is not None and line_key < key:
+			low = middle
+		else:
+			high = middle
+
+	if low == 0:
+		return 0
+
+	# align to the start of the next line
+	f.seek(low)
+	f.readline()
+	return f.tell()
@@ -11,6 +11,8 @@
 
         this.baseUrl = this.base.getBlueprintUrl("logging");
         this.logsUrl = this.baseUrl + "logs";
+        this.tailUrl = this.baseUrl + "tail";
+        this.searchUrl = this.baseUrl + "search";
         this.setupUrl = this.baseUrl + "setup";
     };
 
@@ -32,6 +34,16 @@
         return this.base.download(fileUrl, opts);
     };
 
+    OctoPrintLoggingClient.prototype.tailLog = function(file, lines, opts) {
+        var params = $.extend({}, opts || {});
+        params.dataType = "text";
+        return this.base.getWithQuery(this.tailUrl + "/" + file, {lines: lines}, params);
+    };
+
+    OctoPrintLoggingClient.prototype.searchLog = function(file, query, opts) {
+        return this.base.getWithQuery(this.searchUrl + "/" + file, query, opts);
+    };
+
     OctoPrintLoggingClient.prototype.updateLevels = function(config, opts) {
         return this.base.putJson(this.setupUrl + "/levels", config, opts);
     };
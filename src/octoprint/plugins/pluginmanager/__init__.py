@@ -426,6 +426,9 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 			return jsonify(result)
 
 		installed = map(lambda x: x.strip(), result_line[len(success_string):].split(" "))
+
+		# the python environment changed, cached discovery results are stale now
+		self._plugin_manager.invalidate_discovery_cache()
 		all_plugins_after = self._plugin_manager.find_plugins(existing=dict(), ignore_uninstalled=False)
 
 		new_plugin = self._find_installed_plugin(installed, plugins=all_plugins_after)
@@ -519,6 +522,8 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 			self._logger.warn(u"Trying to uninstall plugin {plugin} but origin is unknown ({plugin.origin.type})".format(**locals()))
 			return make_response("Could not uninstall plugin, its origin is unknown")
 
+		self._plugin_manager.invalidate_discovery_cache()
+
 		needs_restart = self._plugin_manager.is_restart_needing_plugin(plugin)
 		needs_refresh = plugin.implementation and isinstance(plugin.implementation, octoprint.plugin.ReloadNeedingPlugin)
 		needs_reconnect = self._plugin_manager.has_any_of_hooks(plugin, self._reconnect_hooks) and self._printer.is_operational()
@@ -13,6 +13,7 @@ from octoprint.util.version import get_comparable_version
 import flask
 from flask_babel import gettext
 
+import functools
 import textwrap
 
 TERMINAL_SAFETY_WARNING = """
@@ -28,13 +29,11 @@ Learn more at https://faq.octoprint.org/warning-{warning_type}
 ANETA8_M115_TEST = lambda name, data: name and name.lower().startswith("anet_a8_")
 
 # Anycubic MEGA
-ANYCUBIC_AUTHOR1 = "| Author: (Jolly, xxxxxxxx.CO.)".lower()
-ANYCUBIC_AUTHOR2 = "| Author: (**Jolly, xxxxxxxx.CO.**)".lower()
-ANYCUBIC_RECEIVED_TEST = lambda line: line and (ANYCUBIC_AUTHOR1 in line.lower() or ANYCUBIC_AUTHOR2 in line.lower())
+ANYCUBIC_AUTHOR1 = "| Author: (Jolly, xxxxxxxx.CO.)"
+ANYCUBIC_AUTHOR2 = "| Author: (**Jolly, xxxxxxxx.CO.**)"
 
 # Creality CR-10s
-CR10S_AUTHOR = " | Author: (CR-10Slanguage)".lower()
-CR10S_RECEIVED_TEST = lambda line: line and CR10S_AUTHOR in line.lower()
+CR10S_AUTHOR = " | Author: (CR-10Slanguage)"
 
 # Malyan M200 aka Monoprice Select Mini
 MALYANM200_M115_TEST = lambda name, data: name and name.lower().startswith("malyan") and data.get("MODEL") == "M200"
@@ -45,9 +44,10 @@ REPETIER_BEFORE_092_M115_TEST = lambda name, data: name and name.lower().startsw
 # THERMAL_PROTECTION capability reported as disabled
 THERMAL_PROTECTION_CAP_TEST = lambda cap, enabled: cap == "THERMAL_PROTECTION" and not enabled
 
+# received lines are checked for the literal strings in "received", ignoring case
 SAFETY_CHECKS = {
 	"firmware-unsafe": dict(m115=(ANETA8_M115_TEST, MALYANM200_M115_TEST, REPETIER_BEFORE_092_M115_TEST),
-	                        received=(ANYCUBIC_RECEIVED_TEST, CR10S_RECEIVED_TEST),
+	                        received=(ANYCUBIC_AUTHOR1, ANYCUBIC_AUTHOR2, CR10S_AUTHOR),
 	                        cap=(THERMAL_PROTECTION_CAP_TEST,),
 	                        message=u"Your printer's firmware is known to lack mandatory safety features (e.g. " \
 	                                u"thermal runaway protection). This is a fire risk.")
@@ -106,12 +106,26 @@ class PrinterSafetyCheckPlugin(octoprint.plugin.AssetPlugin,
 			return flask.make_response("Insufficient rights", 403)
 		return flask.jsonify(self._warnings)
 
-	##~~ GCODE received hook handler
+	##~~ GCODE received patterns hook handler
 
-	def on_gcode_received(self, comm_instance, line, *args, **kwargs):
-		if self._scan_received:
-			self._run_checks("received", line)
-		return line
+	def get_received_patterns(self, comm_instance, *args, **kwargs):
+		patterns = []
+		for warning_type, check_data in SAFETY_CHECKS.items():
+			if not check_data.get("message"):
+				continue
+
+			for literal in check_data.get("received", ()):
+				patterns.append(dict(pattern=literal,
+				                     ignorecase=True,
+				                     callback=functools.partial(self._on_received_match, warning_type)))
+		return patterns
+
+	def _on_received_match(self, warning_type, comm_instance, line, match):
+		if not self._scan_received or warning_type in self._warnings:
+			return
+
+		self._register_warning(warning_type, SAFETY_CHECKS[warning_type]["message"])
+		self._ping_clients()
 
 	##~~ Firmware info hook handler
 
@@ -169,7 +183,7 @@ __plugin_disabling_discouraged__ = gettext("Without this plugin OctoPrint will n
 __plugin_license__ = "AGPLv3"
 __plugin_implementation__ = PrinterSafetyCheckPlugin()
 __plugin_hooks__ = {
-	"octoprint.comm.protocol.gcode.received": __plugin_implementation__.on_gcode_received,
+	"octoprint.comm.protocol.gcode.received.patterns": __plugin_implementation__.get_received_patterns,
 	"octoprint.comm.protocol.firmware.info": __plugin_implementation__.on_firmware_info_received,
 	"octoprint.comm.protocol.firmware.capabilities": __plugin_implementation__.on_firmware_cap_received
 }
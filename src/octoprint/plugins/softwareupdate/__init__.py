@@ -44,6 +44,8 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 
 	DATA_FORMAT_VERSION = "v3"
 
+	CONDITIONAL_CACHE_KEY = "__conditional"
+
 	# noinspection PyMissingConstructor
 	def __init__(self):
 		self._update_in_progress = False
@@ -193,6 +195,8 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 					self._logger.info("Version cache was created for another version of OctoPrint, not using it")
 					return
 
+				version_checks.conditional_cache.from_dict(data.pop(self.CONDITIONAL_CACHE_KEY, None))
+
 				self._version_cache = data
 				self._version_cache_dirty = False
 				self._version_cache_timestamp = timestamp
@@ -208,9 +212,15 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 		octoprint_version = get_versions()["version"]
 		self._version_cache["__version"] = octoprint_version
 
+		conditional_cache = version_checks.conditional_cache.to_dict()
+
+		data = dict(self._version_cache)
+		data[self.CONDITIONAL_CACHE_KEY] = conditional_cache
+
 		with atomic_write(self._version_cache_path, max_permissions=0o666) as file_obj:
-			yaml.safe_dump(self._version_cache, stream=file_obj, default_flow_style=False, indent="  ", allow_unicode=True)
+			yaml.safe_dump(data, stream=file_obj, default_flow_style=False, indent="  ", allow_unicode=True)
 
+		version_checks.conditional_cache.mark_saved(conditional_cache)
 		self._version_cache_dirty = False
 		self._version_cache_timestamp = time.time()
 		self._logger.info("Saved version cache to disk")
@@ -245,6 +255,7 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 			"check_providers": {},
 
 			"cache_ttl": 24 * 60,
+			"check_concurrency": 5,
 
 			"notify_users": True
 		}
@@ -615,7 +626,10 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 				online = self._connectivity_checker.check_immediately()
 				self._logger.debug("Looks like we are {}".format("online" if online else "offline"))
 
-				with futures.ThreadPoolExecutor(max_workers=5) as executor:
+				concurrency = max(1, self._settings.get_int(["check_concurrency"]))
+				version_checks.set_session_pool_size(concurrency)
+
+				with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
 					for target, check in checks.items():
 						if not target in check_targets:
 							continue
@@ -684,7 +698,7 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 						if target == "octoprint" and "released_version" in populated_check:
 							information[target]["released_version"] = populated_check["released_version"]
 
-				if self._version_cache_dirty:
+				if self._version_cache_dirty or version_checks.conditional_cache.dirty:
 					self._save_version_cache()
 
 				self._get_versions_data = information, update_available, update_possible
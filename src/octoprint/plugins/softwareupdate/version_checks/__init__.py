@@ -7,6 +7,180 @@ __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms
 
 from . import commandline, git_commit, github_commit, github_release, bitbucket_commit, python_checker, never_current, always_current
 
+import copy
+import threading
+
+import requests
+import requests.adapters
+
+REQUEST_TIMEOUT = (3.05, 30)
+""" Connect and read timeout for all HTTP requests issued by version checks. """
+
+
+class ConditionalRequestCache(object):
+	"""
+	Remembers ``ETag`` and ``Last-Modified`` validators per URL together with the payload extracted from the last full
+	response, so that unchanged resources can be revalidated via conditional requests instead of being downloaded and
+	parsed again.
+
+	Access is thread safe, checks run concurrently.
+	"""
+
+	def __init__(self):
+		self._mutex = threading.RLock()
+		self._entries = dict()
+		self._dirty = False
+
+	@property
+	def dirty(self):
+		return self._dirty
+
+	def get(self, url):
+		with self._mutex:
+			entry = self._entries.get(url)
+			return copy.deepcopy(entry) if entry is not None else None
+
+	def set(self, url, etag=None, last_modified=None, payload=None):
+		with self._mutex:
+			if etag is None and last_modified is None:
+				# nothing to revalidate with, so nothing worth remembering
+				if url in self._entries:
+					del self._entries[url]
+					self._dirty = True
+				return
+
+			self._entries[url] = dict(etag=etag, last_modified=last_modified, payload=copy.deepcopy(payload))
+			self._dirty = True
+
+	def remove(self, url):
+		with self._mutex:
+			if url in self._entries:
+				del self._entries[url]
+				self._dirty = True
+
+	def clear(self):
+		with self._mutex:
+			self._entries.clear()
+			self._dirty = True
+
+	def to_dict(self):
+		"""
+		Returns a copy of all entries for persisting them. The cache stays dirty until :meth:`mark_saved` gets called
+		once they have been written successfully.
+		"""
+		with self._mutex:
+			return copy.deepcopy(self._entries)
+
+	def mark_saved(self, data):
+		"""
+		Marks the cache as clean after ``data`` as returned by :meth:`to_dict` has been persisted, unless it got
+		modified in the meantime.
+		"""
+		with self._mutex:
+			if self._entries == data:
+				self._dirty = False
+
+	def from_dict(self, data):
+		if not isinstance(data, dict):
+			return
+
+		with self._mutex:
+			self._entries = dict((url, entry) for url, entry in data.items() if isinstance(entry, dict))
+			self._dirty = False
+
+
+conditional_cache = ConditionalRequestCache()
+""" Conditional request cache shared by all version checks, persisted with the plugin's version cache. """
+
+_session = None
+_session_mutex = threading.Lock()
+_session_pool_size = 5
+
+
+def set_session_pool_size(size):
+	"""
+	Sets the connection pool size of the shared session, should match the number of concurrently running checks. Takes
+	effect with the next request.
+	"""
+	global _session, _session_pool_size
+
+	with _session_mutex:
+		if size != _session_pool_size:
+			_session_pool_size = size
+			if _session is not None:
+				_session.close()
+				_session = None
+
+
+def get_session():
+	"""
+	Returns the ``requests.Session`` shared by all version checks, which keeps connections to the various hosts alive
+	between checks.
+	"""
+	global _session
+
+	with _session_mutex:
+		if _session is None:
+			session = requests.Session()
+			adapter = requests.adapters.HTTPAdapter(pool_connections=_session_pool_size,
+			                                        pool_maxsize=_session_pool_size)
+			session.mount("http://", adapter)
+			session.mount("https://", adapter)
+			_session = session
+		return _session
+
+
+def conditional_get(url, extract, headers=None):
+	"""
+	Fetches ``url`` through the shared session as a conditional request if validators for it are known.
+
+	``extract`` is called with the response of a successful (200) request and needs to return the payload to remember
+	for the URL. For a ``304 Not Modified`` response the remembered payload is returned instead, without calling
+	``extract``.
+
+	Arguments:
+	    url (str): The URL to fetch
+	    extract (callable): Extracts the payload from a ``200`` response
+	    headers (dict): Additional request headers
+
+	Returns:
+	    tuple: the response and the extracted or remembered payload, the latter being ``None`` for any response other
+	        than ``200`` or ``304``
+
+	Raises:
+	    NetworkError: a connection error occurred
+	"""
+
+	from ..exceptions import NetworkError
+
+	request_headers = dict(headers) if headers else dict()
+
+	cached = conditional_cache.get(url)
+	if cached is not None:
+		if cached.get("etag"):
+			request_headers["If-None-Match"] = cached["etag"]
+		if cached.get("last_modified"):
+			request_headers["If-Modified-Since"] = cached["last_modified"]
+
+	try:
+		r = get_session().get(url, headers=request_headers, timeout=REQUEST_TIMEOUT)
+	except requests.ConnectionError as exc:
+		raise NetworkError(cause=exc)
+
+	if r.status_code == requests.codes.not_modified and cached is not None:
+		return r, cached.get("payload")
+
+	if r.status_code != requests.codes.ok:
+		return r, None
+
+	payload = extract(r)
+	conditional_cache.set(url,
+	                      etag=r.headers.get("ETag"),
+	                      last_modified=r.headers.get("Last-Modified"),
+	                      payload=payload)
+	return r, payload
+
+
 def log_github_ratelimit(logger, r):
 	ratelimit = r.headers["X-RateLimit-Limit"] if "X-RateLimit-Limit" in r.headers else "?"
 	remaining = r.headers["X-RateLimit-Remaining"] if "X-RateLimit-Remaining" in r.headers else "?"
@@ -4,7 +4,6 @@ from __future__ import absolute_import, division, print_function
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
 __copyright__ = "Copyright (C) 2017 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
-import requests
 import logging
 import base64
 
@@ -14,7 +13,7 @@ logger = logging.getLogger("octoprint.plugins.softwareupdate.version_checks.bitb
 
 
 def _get_latest_commit(user, repo, branch, api_user=None, api_password=None):
-	from ..exceptions import NetworkError
+	from . import conditional_get
 
 	url = BRANCH_HEAD_URL.format(user=user, repo=repo, branch=branch)
 	headers = {}
@@ -22,19 +21,14 @@ def _get_latest_commit(user, repo, branch, api_user=None, api_password=None):
 		auth_value = base64.b64encode(b"{user}:{pw}".format(user=api_user, pw=api_password))
 		headers["authorization"] = "Basic {}".format(auth_value)
 
-	try:
-		r = requests.get(url, headers=headers, timeout=(3.05, 30))
-	except requests.ConnectionError as exc:
-		raise NetworkError(cause=exc)
+	def extract(r):
+		reference = r.json()
+		if not "hash" in reference:
+			return None
+		return reference["hash"]
 
-	if not r.status_code == requests.codes.ok:
-		return None
-
-	reference = r.json()
-	if not "hash" in reference:
-		return None
-
-	return reference["hash"]
+	_, commit = conditional_get(url, extract, headers=headers)
+	return commit
 
 
 def get_latest(target, check, online=True):
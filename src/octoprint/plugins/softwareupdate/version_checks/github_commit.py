@@ -5,7 +5,6 @@ __author__ = "Gina Häußge <osd@foosel.net>"
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
 __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
-import requests
 import logging
 
 BRANCH_HEAD_URL = "https://api.github.com/repos/{user}/{repo}/git/refs/heads/{branch}"
@@ -13,24 +12,18 @@ BRANCH_HEAD_URL = "https://api.github.com/repos/{user}/{repo}/git/refs/heads/{br
 logger = logging.getLogger("octoprint.plugins.softwareupdate.version_checks.github_commit")
 
 def _get_latest_commit(user, repo, branch):
-	from ..exceptions import NetworkError
+	from . import conditional_get, log_github_ratelimit
 
-	try:
-		r = requests.get(BRANCH_HEAD_URL.format(user=user, repo=repo, branch=branch), timeout=(3.05, 30))
-	except requests.ConnectionError as exc:
-		raise NetworkError(cause=exc)
+	def extract(r):
+		reference = r.json()
+		if not "object" in reference or not "sha" in reference["object"]:
+			return None
+		return reference["object"]["sha"]
 
-	from . import log_github_ratelimit
+	r, sha = conditional_get(BRANCH_HEAD_URL.format(user=user, repo=repo, branch=branch), extract)
 	log_github_ratelimit(logger, r)
 
-	if not r.status_code == requests.codes.ok:
-		return None
-
-	reference = r.json()
-	if not "object" in reference or not "sha" in reference["object"]:
-		return None
-
-	return reference["object"]["sha"]
+	return sha
 
 
 def get_latest(target, check, online=True):
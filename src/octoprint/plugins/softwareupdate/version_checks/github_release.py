@@ -5,7 +5,6 @@ __author__ = "Gina Häußge <osd@foosel.net>"
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
 __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
-import requests
 import logging
 
 RELEASE_URL = "https://api.github.com/repos/{user}/{repo}/releases"
@@ -92,32 +91,30 @@ def _filter_out_latest(releases,
 	return latest["name"], latest["tag_name"], latest.get("html_url", None)
 
 
+def _extract_releases(r):
+	"""
+	Sanitizes the releases contained in the response, only keeping those with all required fields and only those fields.
+	"""
+	required_fields = {"name", "tag_name", "html_url", "draft", "prerelease", "published_at", "target_commitish"}
+	return [dict((key, rel[key]) for key in required_fields)
+	        for rel in r.json()
+	        if set(rel.keys()) & required_fields == required_fields]
+
+
 def _get_latest_release(user, repo, compare_type,
                         include_prerelease=False,
                         commitish=None,
                         force_base=True):
-	from ..exceptions import NetworkError
+	from . import conditional_get, log_github_ratelimit
 
 	nothing = None, None, None
 
-	try:
-		r = requests.get(RELEASE_URL.format(user=user, repo=repo), timeout=(3.05, 30))
-	except requests.ConnectionError as exc:
-		raise NetworkError(cause=exc)
-
-	from . import log_github_ratelimit
+	r, releases = conditional_get(RELEASE_URL.format(user=user, repo=repo), _extract_releases)
 	log_github_ratelimit(logger, r)
 
-	if not r.status_code == requests.codes.ok:
+	if releases is None:
 		return nothing
 
-	releases = r.json()
-
-	# sanitize
-	required_fields = {"name", "tag_name", "html_url", "draft", "prerelease", "published_at", "target_commitish"}
-	releases = filter(lambda rel: set(rel.keys()) & required_fields == required_fields,
-	                  releases)
-
 	comparable_factory = _get_comparable_factory(compare_type,
 	                                             force_base=force_base)
 	sort_key = lambda release: comparable_factory(_get_sanitized_version(release["tag_name"]))
@@ -582,6 +582,18 @@ class PrinterInterface(object):
 
 
 class PrinterCallback(object):
+	def on_printer_z_change(self, new_z, old_z):
+		"""
+		Called directly from the communication layer as soon as a command changing the Z position has been sent to the
+		printer, before the ``ZChange`` event gets fired. Meant for latency sensitive consumers like timelapse triggers.
+		Implementations are called on the communication thread and hence must return quickly and never block.
+
+		Arguments:
+		    new_z (float): The new Z position.
+		    old_z (float): The previous Z position, None if unknown.
+		"""
+		pass
+
 	def on_printer_add_log(self, data):
 		"""
 		Called when the :class:`PrinterInterface` receives a new communication log entry from the communication layer.
@@ -42,8 +42,20 @@ class PrintTimeEstimator(object):
 				countdown = rolling_window
 
 		self._data = TimeEstimationHelper(rolling_window=rolling_window, countdown=countdown, threshold=threshold)
+		self._position_index = None
 
-	def estimate(self, progress, printTime, cleanedPrintTime, statisticalTotalPrintTime, statisticalTotalPrintTimeType):
+	def set_position_index(self, position_index):
+		"""
+		Sets the position index of the printed file, if available.
+
+		Args:
+		    position_index (octoprint.filemanager.toolpath.PositionIndex or None): Index to look up the estimated print
+		        time at a file position with.
+		"""
+		self._position_index = position_index
+
+	def estimate(self, progress, printTime, cleanedPrintTime, statisticalTotalPrintTime, statisticalTotalPrintTimeType,
+	             filepos=None):
 		"""
 		Tries to estimate the print time left for the print job
 
@@ -78,6 +90,11 @@ class PrintTimeEstimator(object):
 		     a configured amount of minutes or are further in the file than a configured percentage, we
 		     also use the dumb estimate for now.
 
+		If a position index from the GCODE analysis is available for the printed file, the progress used for all of the
+		above is not the progress in bytes but the fraction of the estimated print time the analysis calculated up to
+		the current file position. That takes care of files where the bytes per minute vary a lot, e.g. because of
+		fast infill and slow perimeters or a dense first part and sparse second part.
+
 		Yes, all this still produces horribly inaccurate results. But we have to do this live during the print and
 		hence can't produce to much computational overhead, we do not have any insight into the firmware implementation
 		with regards to planner setup and acceleration settings, we might not even have access to the printed file's
@@ -94,6 +111,7 @@ class PrintTimeEstimator(object):
 		        or estimated total print time from GCODE analysis.
 		    statisticalTotalPrintTimeType (str or None): Type of statistical print time, either "average" (total time
 		        of former prints) or "analysis"
+		    filepos (int or None): Current position in the printed file, in bytes
 
 		Returns:
 		    (2-tuple) estimated print time left or None if not proper estimate could be made at all, origin of estimation
@@ -102,6 +120,11 @@ class PrintTimeEstimator(object):
 		if progress is None or progress == 0 or printTime is None or cleanedPrintTime is None:
 			return None, None
 
+		if filepos is not None and self._position_index is not None:
+			time_progress = self._position_index.progress_at(filepos)
+			if time_progress:
+				progress = time_progress
+
 		dumbTotalPrintTime = printTime / progress
 		estimatedTotalPrintTime = self.estimate_total(progress, cleanedPrintTime)
 		totalPrintTime = estimatedTotalPrintTime
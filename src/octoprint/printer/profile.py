@@ -93,6 +93,12 @@ A printer profile is a ``dict`` of the following structure:
    * - ``axes.x.inverted``
      - ``bool``
      - Whether a positive value change moves the nozzle away from the print bed's origin (False, default) or towards it (True)
+   * - ``axes.x.acceleration``
+     - ``float``
+     - Maximum acceleration of the X axis in mm/s², used for print time estimation
+   * - ``axes.x.jerk``
+     - ``float``
+     - Maximum instantaneous speed change of the X axis in mm/s, used for print time estimation
    * - ``axes.y``
      - ``dict``
      - Information about the printer's Y axis
@@ -102,6 +108,12 @@ A printer profile is a ``dict`` of the following structure:
    * - ``axes.y.inverted``
      - ``bool``
      - Whether a positive value change moves the nozzle away from the print bed's origin (False, default) or towards it (True)
+   * - ``axes.y.acceleration``
+     - ``float``
+     - Maximum acceleration of the Y axis in mm/s², used for print time estimation
+   * - ``axes.y.jerk``
+     - ``float``
+     - Maximum instantaneous speed change of the Y axis in mm/s, used for print time estimation
    * - ``axes.z``
      - ``dict``
      - Information about the printer's Z axis
@@ -111,6 +123,12 @@ A printer profile is a ``dict`` of the following structure:
    * - ``axes.z.inverted``
      - ``bool``
      - Whether a positive value change moves the nozzle away from the print bed (False, default) or towards it (True)
+   * - ``axes.z.acceleration``
+     - ``float``
+     - Maximum acceleration of the Z axis in mm/s², used for print time estimation
+   * - ``axes.z.jerk``
+     - ``float``
+     - Maximum instantaneous speed change of the Z axis in mm/s, used for print time estimation
    * - ``axes.e``
      - ``dict``
      - Information about the printer's E axis
@@ -120,6 +138,12 @@ A printer profile is a ``dict`` of the following structure:
    * - ``axes.e.inverted``
      - ``bool``
      - Whether a positive value change extrudes (False, default) or retracts (True) filament
+   * - ``axes.e.acceleration``
+     - ``float``
+     - Maximum acceleration of the E axis in mm/s², used for print time estimation
+   * - ``axes.e.jerk``
+     - ``float``
+     - Maximum instantaneous speed change of the E axis in mm/s, used for print time estimation
 
 .. autoclass:: PrinterProfileManager
    :members:
@@ -148,6 +172,8 @@ import os
 import copy
 import re
 import logging
+import threading
+import time
 
 try:
 	from os import scandir
@@ -227,18 +253,29 @@ class PrinterProfileManager(object):
 			sharedNozzle = False
 		),
 		axes=dict(
-			x = dict(speed=6000, inverted=False),
-			y = dict(speed=6000, inverted=False),
-			z = dict(speed=200, inverted=False),
-			e = dict(speed=300, inverted=False)
+			x = dict(speed=6000, inverted=False, acceleration=1000, jerk=10),
+			y = dict(speed=6000, inverted=False, acceleration=1000, jerk=10),
+			z = dict(speed=200, inverted=False, acceleration=100, jerk=0.4),
+			e = dict(speed=300, inverted=False, acceleration=3000, jerk=5)
 		)
 	)
 
+	CACHE_SETTLE_TIME = 2.0
+	"""
+	Minimum age of a modification time for caching, so that changes within the file system's timestamp granularity
+	aren't missed.
+	"""
+
 	def __init__(self):
 		self._current = None
 		self._folder = settings().getBaseFolder("printerProfiles")
 		self._logger = logging.getLogger(__name__)
 
+		# path -> ((mtime, size), validated profile) and (folder mtime, identifier -> path)
+		self._profile_cache = dict()
+		self._identifier_cache = None
+		self._cache_mutex = threading.RLock()
+
 		self._migrate_old_default_profile()
 		self._verify_default_available()
 
@@ -309,7 +346,8 @@ class PrinterProfileManager(object):
 	def get(self, identifier):
 		try:
 			if self.exists(identifier):
-				return self._load_from_path(self._get_profile_path(identifier))
+				profile = self._load_cached(self._get_profile_path(identifier))
+				return copy.deepcopy(profile) if profile is not None else None
 			else:
 				return None
 		except InvalidProfileError:
@@ -401,7 +439,7 @@ class PrinterProfileManager(object):
 		results = dict()
 		for identifier, path in all_identifiers.items():
 			try:
-				profile = self._load_from_path(path)
+				profile = self._load_cached(path)
 			except InvalidProfileError:
 				self._logger.warn("Profile {} is invalid, skipping".format(identifier))
 				continue
@@ -413,6 +451,12 @@ class PrinterProfileManager(object):
 		return results
 
 	def _load_all_identifiers(self):
+		# adding, removing or renaming a profile changes the folder's mtime
+		mtime = os.stat(self._folder).st_mtime
+		with self._cache_mutex:
+			if self._identifier_cache is not None and self._identifier_cache[0] == mtime:
+				return dict(self._identifier_cache[1])
+
 		results = dict()
 		for entry in scandir(self._folder):
 			if is_hidden_path(entry.name) or not entry.name.endswith(".profile"):
@@ -423,7 +467,52 @@ class PrinterProfileManager(object):
 
 			identifier = entry.name[:-len(".profile")]
 			results[identifier] = entry.path
-		return results
+
+		if self._is_settled(mtime):
+			with self._cache_mutex:
+				self._identifier_cache = (mtime, results)
+		return dict(results)
+
+	def _load_cached(self, path):
+		"""
+		Loads the profile at ``path``, or returns it from the cache if the file hasn't changed since it was last
+		loaded. The returned profile is shared with the cache and must not be modified.
+		"""
+		stamp = self._get_stamp(path)
+		if stamp is None:
+			return None
+
+		with self._cache_mutex:
+			cached = self._profile_cache.get(path)
+		if cached is not None and cached[0] == stamp:
+			return cached[1]
+
+		profile = self._load_from_path(path)
+
+		# loading might have migrated and thus rewritten the file
+		stamp = self._get_stamp(path)
+		with self._cache_mutex:
+			if profile is not None and stamp is not None and self._is_settled(stamp[0]):
+				self._profile_cache[path] = (stamp, profile)
+			else:
+				self._profile_cache.pop(path, None)
+		return profile
+
+	def _invalidate_cache(self, path):
+		with self._cache_mutex:
+			self._profile_cache.pop(path, None)
+			self._identifier_cache = None
+
+	def _is_settled(self, mtime):
+		return time.time() - mtime >= self.CACHE_SETTLE_TIME
+
+	@staticmethod
+	def _get_stamp(path):
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+		return stat.st_mtime, stat.st_size
 
 	def _load_from_path(self, path):
 		if not os.path.exists(path) or not os.path.isfile(path):
@@ -465,6 +554,8 @@ class PrinterProfileManager(object):
 		except Exception as e:
 			self._logger.exception("Error while trying to save profile %s" % profile["id"])
 			raise SaveError("Cannot save profile %s: %s" % (profile["id"], str(e)))
+		finally:
+			self._invalidate_cache(path)
 
 	def _remove_from_path(self, path):
 		try:
@@ -472,6 +563,8 @@ class PrinterProfileManager(object):
 			return True
 		except:
 			return False
+		finally:
+			self._invalidate_cache(path)
 
 	def _get_profile_path(self, identifier):
 		return os.path.join(self._folder, "%s.profile" % identifier)
@@ -509,6 +602,16 @@ class PrinterProfileManager(object):
 			profile["extruder"]["offsets"] = [(0.0, 0.0)]
 			modified = True
 
+		if "axes" in profile and isinstance(profile["axes"], dict):
+			default_axes = self.__class__.default["axes"]
+			for axis, data in profile["axes"].items():
+				if not axis in default_axes or not isinstance(data, dict):
+					continue
+				for key in ("acceleration", "jerk"):
+					if not key in data:
+						data[key] = default_axes[axis][key]
+						modified = True
+
 		return modified
 
 	def _ensure_valid_profile(self, profile):
@@ -539,7 +642,8 @@ class PrinterProfileManager(object):
 				return False
 
 		# convert floats
-		for path in (("volume", "width"), ("volume", "depth"), ("volume", "height"), ("extruder", "nozzleDiameter")):
+		for path in (("volume", "width"), ("volume", "depth"), ("volume", "height"), ("extruder", "nozzleDiameter")) \
+				+ tuple(("axes", axis, key) for axis in "xyze" for key in ("acceleration", "jerk")):
 			try:
 				convert_value(profile, path, float)
 			except Exception as e:
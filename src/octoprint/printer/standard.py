@@ -10,6 +10,7 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
 import copy
+import inspect
 import logging
 import os
 import threading
@@ -22,6 +23,7 @@ from frozendict import frozendict
 from octoprint import util as util
 from octoprint.events import eventManager, Events
 from octoprint.filemanager import FileDestinations, NoSuchStorage, valid_file_type
+from octoprint.filemanager.toolpath import toolpath_storage
 from octoprint.plugin import plugin_manager, ProgressPlugin
 from octoprint.printer import PrinterInterface, PrinterCallback, UnknownScript, InvalidFileLocation, InvalidFileType
 from octoprint.printer.estimation import PrintTimeEstimator
@@ -89,7 +91,7 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 				estimator = hook()
 				if estimator is not None:
 					self._logger.info("Using print time estimator provided by {}".format(name))
-					self._estimator_factory = estimator
+					self._estimator_factory = _filepos_estimator_factory(estimator)
 			except:
 				self._logger.exception("Error while processing analysis queues from {}".format(name))
 
@@ -147,6 +149,28 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 					job_type = "local"
 
 		self._estimator = self._estimator_factory(job_type)
+		self._update_estimator_position_index()
+
+	def _update_estimator_position_index(self):
+		estimator = self._estimator
+		if estimator is None or not hasattr(estimator, "set_position_index"):
+			return
+
+		path = None
+		with self._selectedFileMutex:
+			if self._selectedFile is not None and not self._selectedFile["sd"]:
+				path = self._selectedFile["filename"]
+
+		position_index = None
+		if path is not None:
+			try:
+				position_index = toolpath_storage().get_position_index(FileDestinations.LOCAL,
+				                                                        path,
+				                                                        self._fileManager.path_on_disk(FileDestinations.LOCAL, path))
+			except:
+				self._logger.exception(u"Error while fetching position index for {}".format(path))
+
+		estimator.set_position_index(position_index)
 
 	#~~ handling of PrinterCallbacks
 
@@ -182,6 +206,13 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 			except:
 				self._logger.exception(u"Exception while adding printer message to callback {}".format(callback))
 
+	def _sendZChangeCallbacks(self, new_z, old_z):
+		for callback in self._callbacks:
+			try:
+				callback.on_printer_z_change(new_z, old_z)
+			except:
+				self._logger.exception(u"Exception while pushing z change to callback {}".format(callback))
+
 	def _sendCurrentDataCallbacks(self, data):
 		for callback in self._callbacks:
 			try:
@@ -198,6 +229,7 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 								 self._selectedFile["filesize"],
 								 self._selectedFile["sd"],
 								 self._selectedFile["user"])
+		self._update_estimator_position_index()
 
 	def _on_event_MetadataStatisticsUpdated(self, event, data):
 		with self._selectedFileMutex:
@@ -780,7 +812,8 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 				                                                        printTime,
 				                                                        cleanedPrintTime,
 				                                                        statisticalTotalPrintTime,
-				                                                        statisticalTotalPrintTimeType)
+				                                                        statisticalTotalPrintTimeType,
+				                                                        filepos=filepos)
 
 		return self._dict(completion=progress * 100 if progress is not None else None,
 		                  filepos=filepos,
@@ -1018,6 +1051,7 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 		if newZ != oldZ:
 			# we have to react to all z-changes, even those that might "go backward" due to a slicer's retraction or
 			# anti-backlash-routines. Event subscribes should individually take care to filter out "wrong" z-changes
+			self._sendZChangeCallbacks(newZ, oldZ)
 			eventManager().fire(Events.Z_CHANGE, {"new": newZ, "old": oldZ})
 
 		self._setCurrentZ(newZ)
@@ -1233,6 +1267,52 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 		return result
 
 
+def _filepos_estimator_factory(factory):
+	"""
+	Wraps an estimator factory provided through the ``octoprint.printer.estimation.factory`` hook.
+
+	Estimators from plugins written before file positions were passed to ``estimate`` don't accept the ``filepos``
+	keyword argument. Those get wrapped into a :class:`_LegacyEstimator` that drops it, so the printer can always pass
+	it along.
+	"""
+
+	def create(job_type):
+		estimator = factory(job_type)
+		if estimator is None or _accepts_filepos(estimator.estimate):
+			return estimator
+		return _LegacyEstimator(estimator)
+
+	return create
+
+
+def _accepts_filepos(estimate):
+	try:
+		args, _, keywords, _ = inspect.getargspec(estimate)
+	except TypeError:
+		# not a python function, e.g. a callable object or a builtin, so we can't tell
+		try:
+			args, _, keywords, _ = inspect.getargspec(estimate.__call__)
+		except (AttributeError, TypeError):
+			return False
+	return "filepos" in args or keywords is not None
+
+
+class _LegacyEstimator(object):
+	def __init__(self, estimator):
+		self._estimator = estimator
+
+	def estimate(self, progress, printTime, cleanedPrintTime, statisticalTotalPrintTime, statisticalTotalPrintTimeType,
+	             filepos=None):
+		return self._estimator.estimate(progress,
+		                                printTime,
+		                                cleanedPrintTime,
+		                                statisticalTotalPrintTime,
+		                                statisticalTotalPrintTimeType)
+
+	def __getattr__(self, item):
+		return getattr(self._estimator, item)
+
+
 class StateMonitor(object):
 	def __init__(self, interval=0.5, on_update=None, on_add_temperature=None, on_add_log=None, on_add_message=None, on_get_progress=None):
 		self._interval = interval
@@ -27,6 +27,11 @@ import atexit
 import signal
 import base64
 
+try:
+	from os import scandir
+except ImportError:
+	from scandir import scandir
+
 try:
 	import fcntl
 except ImportError:
@@ -283,7 +288,9 @@ class Server(object):
 				self._logger.exception("Error while processing analysis queues from {}".format(name))
 		analysisQueue = octoprint.filemanager.analysis.AnalysisQueue(analysis_queue_factories)
 
-		slicingManager = octoprint.slicing.SlicingManager(self._settings.getBaseFolder("slicingProfiles"), printerProfileManager)
+		slicingManager = octoprint.slicing.SlicingManager(self._settings.getBaseFolder("slicingProfiles"),
+		                                                  printerProfileManager,
+		                                                  cache_path=os.path.join(self._settings.getBaseFolder("data"), "slicing_cache"))
 
 		storage_managers = dict()
 		storage_managers[octoprint.filemanager.FileDestinations.LOCAL] = octoprint.filemanager.storage.LocalFileStorage(self._settings.getBaseFolder("uploads"))
@@ -473,7 +480,10 @@ class Server(object):
 		self._setup_assets()
 
 		# configure timelapse
+		octoprint.timelapse.enable_direct_z_change_trigger(printer)
 		octoprint.timelapse.configure_timelapse()
+		octoprint.timelapse.start_cleanup_timer(self._settings.getFloat(["webcam", "cleanTmpInterval"]))
+		octoprint.timelapse.render_queue()
 
 		# setup command triggers
 		events.CommandTrigger(printer)
@@ -494,12 +504,20 @@ class Server(object):
 		self._router = SockJSRouter(self._create_socket_connection, "/sockjs",
 		                            session_kls=util.sockjs.ThreadSafeSession)
 
+		upload_file_prefix = "octoprint-file-upload-"
 		upload_suffixes = dict(name=self._settings.get(["server", "uploads", "nameSuffix"]), path=self._settings.get(["server", "uploads", "pathSuffix"]))
+		upload_tmp_folder = self._prepare_upload_tmp_folder(upload_file_prefix)
 
 		def mime_type_guesser(path):
 			from octoprint.filemanager import get_mime_type
 			return get_mime_type(path)
 
+		def log_mime_type_guesser(path):
+			# rotated logs might be compressed
+			if path.endswith(".gz"):
+				return "application/gzip"
+			return "text/plain"
+
 		def download_name_generator(path):
 			metadata = fileManager.get_metadata("local", path)
 			if metadata and "display" in metadata:
@@ -542,13 +560,16 @@ class Server(object):
 			                                                                                no_hidden_files_validator,
 			                                                                                additional_mime_types)),
 			(r"/downloads/logs/([^/]*)", util.tornado.LargeResponseHandler, joined_dict(dict(path=self._settings.getBaseFolder("logs"),
-			                                                                                 mime_type_guesser=lambda *args, **kwargs: "text/plain"),
+			                                                                                 mime_type_guesser=log_mime_type_guesser),
 			                                                                            download_handler_kwargs,
 			                                                                            admin_validator)),
 			# camera snapshot
-			(r"/downloads/camera/current", util.tornado.UrlProxyHandler, joined_dict(dict(url=self._settings.get(["webcam", "snapshot"]),
-			                                                                              as_attachment=True),
-			                                                                         user_validator)),
+			(r"/downloads/camera/current", util.tornado.WebcamSnapshotHandler, joined_dict(dict(url=self._settings.get(["webcam", "snapshot"]),
+			                                                                                    as_attachment=True,
+			                                                                                    timeout=self._settings.getInt(["webcam", "snapshotTimeout"]),
+			                                                                                    validate_ssl=self._settings.getBoolean(["webcam", "snapshotSslValidation"]),
+			                                                                                    max_age=self._settings.getFloat(["webcam", "snapshotMaxAge"])),
+			                                                                               user_validator)),
 			# generated webassets
 			(r"/static/webassets/(.*)", util.tornado.LargeResponseHandler, dict(path=os.path.join(self._settings.getBaseFolder("generated"), "webassets"))),
 
@@ -590,8 +611,9 @@ class Server(object):
 		server_routes.append((r".*", util.tornado.UploadStorageFallbackHandler, dict(fallback=util.tornado.WsgiInputContainer(app.wsgi_app,
 		                                                                                                                      headers=headers,
 		                                                                                                                      removed_headers=removed_headers),
-		                                                                             file_prefix="octoprint-file-upload-",
+		                                                                             file_prefix=upload_file_prefix,
 		                                                                             file_suffix=".tmp",
+		                                                                             path=upload_tmp_folder,
 		                                                                             suffixes=upload_suffixes)))
 
 		transforms = [util.tornado.GlobalHeaderTransform.for_headers("OctoPrintGlobalHeaderTransform",
@@ -767,6 +789,23 @@ class Server(object):
 		return util.sockjs.PrinterStateConnection(printer, fileManager, analysisQueue, userManager,
 		                                          eventManager, pluginManager, session)
 
+	def _prepare_upload_tmp_folder(self, prefix):
+		# Uploads get streamed into a hidden folder inside the uploads folder. That way they end up on the same
+		# file system as their final destination and moving them there becomes a mere rename instead of a copy.
+		folder = os.path.join(self._settings.getBaseFolder("uploads"), ".tmp")
+		try:
+			if not os.path.isdir(folder):
+				os.makedirs(folder)
+
+			# clean up anything left over from an unclean shutdown
+			for entry in scandir(folder):
+				if entry.is_file() and entry.name.startswith(prefix):
+					octoprint.util.silent_remove(entry.path)
+		except:
+			self._logger.exception("Could not prepare temporary upload folder {}, falling back to system default".format(folder))
+			return None
+		return folder
+
 	def _check_for_root(self):
 		if "geteuid" in dir(os) and os.geteuid() == 0:
 			exit("You should not run OctoPrint as root!")
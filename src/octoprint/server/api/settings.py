@@ -19,6 +19,7 @@ from octoprint.server.api import api, NO_CONTENT
 from octoprint.server.util.flask import restricted_access, with_revalidation_checking
 
 import octoprint.plugin
+import octoprint.timelapse
 import octoprint.util
 
 #~~ settings
@@ -106,6 +107,7 @@ def getSettings():
 			"ffmpegPath": s.get(["webcam", "ffmpeg"]),
 			"bitrate": s.get(["webcam", "bitrate"]),
 			"ffmpegThreads": s.get(["webcam", "ffmpegThreads"]),
+			"renderPreset": s.get(["webcam", "renderPreset"]),
 			"watermark": s.getBoolean(["webcam", "watermark"]),
 			"flipH": s.getBoolean(["webcam", "flipH"]),
 			"flipV": s.getBoolean(["webcam", "flipV"]),
@@ -387,6 +389,7 @@ def _saveSettings(data):
 		if "ffmpegPath" in data["webcam"]: s.set(["webcam", "ffmpeg"], data["webcam"]["ffmpegPath"])
 		if "bitrate" in data["webcam"]: s.set(["webcam", "bitrate"], data["webcam"]["bitrate"])
 		if "ffmpegThreads" in data["webcam"]: s.setInt(["webcam", "ffmpegThreads"], data["webcam"]["ffmpegThreads"])
+		if "renderPreset" in data["webcam"] and data["webcam"]["renderPreset"] in octoprint.timelapse.ENCODER_PRESETS: s.set(["webcam", "renderPreset"], data["webcam"]["renderPreset"])
 		if "watermark" in data["webcam"]: s.setBoolean(["webcam", "watermark"], data["webcam"]["watermark"])
 		if "flipH" in data["webcam"]: s.setBoolean(["webcam", "flipH"], data["webcam"]["flipH"])
 		if "flipV" in data["webcam"]: s.setBoolean(["webcam", "flipV"], data["webcam"]["flipV"])
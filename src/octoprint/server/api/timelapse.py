@@ -16,7 +16,7 @@ import octoprint.timelapse
 import octoprint.util as util
 from octoprint.settings import settings, valid_boolean_trues
 
-from octoprint.server import admin_permission, printer
+from octoprint.server import admin_permission
 from octoprint.server.util.flask import redirect_to_tornado, restricted_access, get_json_command_from_request, with_revalidation_checking
 from octoprint.server.api import api
 
@@ -152,7 +152,8 @@ def deleteUnrenderedTimelapse(name):
 def processUnrenderedTimelapseCommand(name):
 	# valid file commands, dict mapping command name to mandatory parameters
 	valid_commands = {
-		"render": []
+		"render": [],
+		"cancel": []
 	}
 
 	command, data, response = get_json_command_from_request(request, valid_commands)
@@ -160,9 +161,12 @@ def processUnrenderedTimelapseCommand(name):
 		return response
 
 	if command == "render":
-		if printer.is_printing() or printer.is_paused():
-			return make_response("Printer is currently printing, cannot render timelapse", 409)
-		octoprint.timelapse.render_unrendered_timelapse(name)
+		# rendering waits for any running print to finish
+		if not octoprint.timelapse.render_unrendered_timelapse(name):
+			return make_response("Timelapse is already queued for rendering", 409)
+	elif command == "cancel":
+		if not octoprint.timelapse.cancel_render(name):
+			return make_response("Timelapse is neither queued for rendering nor rendering", 409)
 
 	return NO_CONTENT
 
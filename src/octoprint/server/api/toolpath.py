@@ -0,0 +1,110 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import hashlib
+import os
+
+from flask import request, jsonify, make_response
+
+from octoprint.filemanager.destinations import FileDestinations
+from octoprint.filemanager.toolpath import toolpath_storage, VERSION
+from octoprint.server import fileManager
+from octoprint.server.util.flask import with_revalidation_checking
+from octoprint.server.api import api
+
+
+#~~ toolpath handling
+
+def _create_lastmodified(origin, filename):
+	if origin != FileDestinations.LOCAL:
+		return None
+
+	try:
+		return os.stat(toolpath_storage().path_for(origin, filename) + ".json").st_mtime
+	except OSError:
+		return None
+
+
+def _create_etag(origin, filename, lm=None):
+	if lm is None:
+		lm = _create_lastmodified(origin, filename)
+
+	if lm is None:
+		return None
+
+	hash = hashlib.sha1()
+	hash.update(str(lm))
+	hash.update(repr(filename.encode("utf-8")))
+	for key in ("layer", "count", "position", "z"):
+		hash.update(str(request.values.get(key)))
+	hash.update(str(VERSION)) # the version of the toolpath format
+
+	return hash.hexdigest()
+
+
+@api.route("/toolpath/<string:origin>/<path:filename>", methods=["GET"])
+@with_revalidation_checking(etag_factory=lambda lm=None: _create_etag(request.view_args["origin"],
+                                                                      request.view_args["filename"],
+                                                                      lm=lm),
+                            lastmodified_factory=lambda: _create_lastmodified(request.view_args["origin"],
+                                                                              request.view_args["filename"]))
+def readToolpath(origin, filename):
+	if origin != FileDestinations.LOCAL:
+		return make_response("Toolpaths are only available for local files", 404)
+
+	if not fileManager.file_exists(origin, filename):
+		return make_response("File not found on '%s': %s" % (origin, filename), 404)
+
+	storage = toolpath_storage()
+	index = storage.get_index(origin, filename, fileManager.path_on_disk(origin, filename))
+	if index is None:
+		return make_response("No toolpath available for %s" % filename, 404)
+
+	if "position" in request.values or "z" in request.values:
+		return _lookupPosition(storage.get_position_index(origin, filename, fileManager.path_on_disk(origin, filename)))
+
+	if not "layer" in request.values:
+		return jsonify(index)
+
+	try:
+		layer = int(request.values["layer"])
+		count = int(request.values.get("count", 1))
+	except ValueError:
+		return make_response("layer and count must be integers", 400)
+
+	if layer < 0 or layer >= len(index["layers"]) or count < 1:
+		return make_response("Invalid layer range: %d, %d layers" % (layer, count), 400)
+
+	data = storage.read_layers(origin, filename, index, layer, count=count)
+	if data is None:
+		return make_response("No toolpath available for %s" % filename, 404)
+
+	response = make_response(data)
+	response.headers["Content-Type"] = "application/octet-stream"
+	return response
+
+
+def _lookupPosition(position_index):
+	if position_index is None:
+		return make_response("No toolpath available", 404)
+
+	try:
+		if "position" in request.values:
+			position = int(request.values["position"])
+		else:
+			position = position_index.position_for_z(float(request.values["z"]))
+	except ValueError:
+		return make_response("position must be an integer and z a number", 400)
+
+	if position is None or not 0 <= position <= position_index.size:
+		return make_response("Position out of range", 400)
+
+	checkpoint = position_index.checkpoint_at(position)
+	return jsonify(position=position,
+	               layer=position_index.layer_at(position),
+	               z=checkpoint.z if checkpoint else None,
+	               elapsed=position_index.elapsed_at(position),
+	               extrusion=checkpoint.extrusion if checkpoint else None)
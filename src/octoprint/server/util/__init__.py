@@ -6,13 +6,15 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
 import base64
+import functools
+import threading
 
 from octoprint.settings import settings
 import octoprint.timelapse
 import octoprint.server
 from octoprint.users import ApiUser
 
-from octoprint.util import deprecated
+from octoprint.util import deprecated, monotonic_time
 from octoprint.plugin import plugin_manager
 
 import flask as _flask
@@ -46,7 +48,7 @@ def enforceApiKeyRequestHandler():
 	if apikey is None:
 		return _flask.make_response("No API key provided", 403)
 
-	if apikey != octoprint.server.UI_API_KEY and not settings().getBoolean(["api", "enabled"]):
+	if apikey != octoprint.server.UI_API_KEY and not settings().snapshot().getBoolean(["api", "enabled"]):
 		# api disabled => 403
 		return _flask.make_response("API disabled", 403)
 
@@ -110,7 +112,7 @@ def corsRequestHandler():
 	"""
 	``before_request`` handler for blueprints which sets CORS headers for OPTIONS requests if enabled
 	"""
-	if _flask.request.method == 'OPTIONS' and settings().getBoolean(["api", "allowCrossOrigin"]):
+	if _flask.request.method == 'OPTIONS' and settings().snapshot().getBoolean(["api", "allowCrossOrigin"]):
 		# reply to OPTIONS request for CORS headers
 		return optionsAllowOrigin(_flask.request)
 
@@ -123,7 +125,7 @@ def corsResponseHandler(resp):
 	"""
 
 	# Allow crossdomain
-	allowCrossOrigin = settings().getBoolean(["api", "allowCrossOrigin"])
+	allowCrossOrigin = settings().snapshot().getBoolean(["api", "allowCrossOrigin"])
 	if _flask.request.method != 'OPTIONS' and 'Origin' in _flask.request.headers and allowCrossOrigin:
 		resp.headers['Access-Control-Allow-Origin'] = _flask.request.headers['Origin']
 
@@ -179,9 +181,100 @@ def optionsAllowOrigin(request):
 	return resp
 
 
+AUTH_TIME_ENVIRON_KEY = "octoprint.auth_time"
+"""Key in the WSGI environment under which the time spent on authenticating the request is recorded, in seconds."""
+
+
+def timed_auth(f):
+	"""
+	Decorator for authentication functions which adds the time spent in them to the current request's
+	:data:`AUTH_TIME_ENVIRON_KEY` environment entry, which gets included in the access log.
+	"""
+
+	@functools.wraps(f)
+	def decorated(*args, **kwargs):
+		start = monotonic_time()
+		try:
+			return f(*args, **kwargs)
+		finally:
+			if _flask.has_request_context():
+				environ = _flask.request.environ
+				environ[AUTH_TIME_ENVIRON_KEY] = environ.get(AUTH_TIME_ENVIRON_KEY, 0.0) + monotonic_time() - start
+	return decorated
+
+
+class KeyValidatorCache(object):
+	"""
+	Short lived cache for the results of ``octoprint.accesscontrol.keyvalidator`` hooks, so that automated clients
+	hammering the API don't run all hooks on every single request.
+
+	Keys a hook validated are remembered for ``accessControl.keyValidatorCacheTtl`` seconds, keys no hook
+	validated for ``accessControl.keyValidatorCacheNegativeTtl`` seconds. A TTL of 0 disables the respective cache.
+	Note that this means that a key revoked by the plugin providing the hook stays valid for up to the TTL.
+	"""
+
+	def __init__(self, max_size=1000):
+		self._max_size = max_size
+		self._mutex = threading.Lock()
+		self._entries = dict()
+
+	def get(self, apikey):
+		"""
+		Returns:
+		    tuple: ``(True, user)`` for a cached result, ``user`` being None for cached unknown keys, ``(False, None)``
+		        if nothing is cached for ``apikey``.
+		"""
+		with self._mutex:
+			entry = self._entries.get(apikey)
+			if entry is None:
+				return False, None
+
+			expires, user = entry
+			if expires <= monotonic_time():
+				del self._entries[apikey]
+				return False, None
+
+			return True, user
+
+	def set(self, apikey, user):
+		s = settings().snapshot()
+		if user is not None:
+			ttl = s.getFloat(["accessControl", "keyValidatorCacheTtl"])
+		else:
+			ttl = s.getFloat(["accessControl", "keyValidatorCacheNegativeTtl"])
+		if not ttl or ttl <= 0:
+			return
+
+		now = monotonic_time()
+		with self._mutex:
+			if len(self._entries) >= self._max_size:
+				self._prune(now)
+			self._entries[apikey] = (now + ttl, user)
+
+	def clear(self):
+		with self._mutex:
+			self._entries.clear()
+
+	def _prune(self, now):
+		for key, (expires, _) in list(self._entries.items()):
+			if expires <= now:
+				del self._entries[key]
+
+		if len(self._entries) >= self._max_size:
+			# still full of valid entries, drop the ones expiring first
+			by_expiry = sorted(self._entries.items(), key=lambda item: item[1][0])
+			for key, _ in by_expiry[:len(by_expiry) - self._max_size // 2]:
+				del self._entries[key]
+
+
+key_validator_cache = KeyValidatorCache()
+
+
+@timed_auth
 def get_user_for_apikey(apikey):
-	if settings().getBoolean(["api", "enabled"]) and apikey is not None:
-		if apikey == settings().get(["api", "key"]) or octoprint.server.appSessionManager.validate(apikey):
+	s = settings().snapshot()
+	if s.getBoolean(["api", "enabled"]) and apikey is not None:
+		if apikey == s.get(["api", "key"]) or octoprint.server.appSessionManager.validate(apikey):
 			# master key or an app session key was used
 			return ApiUser()
 
@@ -191,19 +284,29 @@ def get_user_for_apikey(apikey):
 				# user key was used
 				return user
 
+		cached, user = key_validator_cache.get(apikey)
+		if cached:
+			return user
+
+		user = None
 		apikey_hooks = plugin_manager().get_hooks("octoprint.accesscontrol.keyvalidator")
 		for name, hook in apikey_hooks.items():
 			try:
 				user = hook(apikey)
 				if user is not None:
-					return user
+					break
 			except:
 				logging.getLogger(__name__).exception("Error running api key validator for plugin {} and key {}".format(name, apikey))
+
+		key_validator_cache.set(apikey, user)
+		return user
 	return None
 
 
+@timed_auth
 def get_user_for_authorization_header(header):
-	if not settings().getBoolean(["accessControl", "trustBasicAuthentication"]):
+	s = settings().snapshot()
+	if not s.getBoolean(["accessControl", "trustBasicAuthentication"]):
 		return None
 
 	if header is None:
@@ -224,7 +327,7 @@ def get_user_for_authorization_header(header):
 		return None
 
 	user = octoprint.server.userManager.findUser(userid=name)
-	if settings().getBoolean(["accessControl", "checkBasicAuthenticationPassword"]) \
+	if s.getBoolean(["accessControl", "checkBasicAuthenticationPassword"]) \
 			and not octoprint.server.userManager.checkPassword(name, password):
 		# password check enabled and password don't match
 		return None
@@ -151,8 +151,8 @@ class PrinterStateConnection(octoprint.vendor.sockjs.tornado.SockJSConnection, o
 		# For now this is the easiest way though to at least inform the user that a timelapse is still ongoing.
 		#
 		# TODO remove when central job management becomes available and takes care of this for us
-		if octoprint.timelapse.current_render_job is not None:
-			self._emit("event", {"type": Events.MOVIE_RENDERING, "payload": octoprint.timelapse.current_render_job})
+		for render_job in list(octoprint.timelapse.current_render_jobs.values()):
+			self._emit("event", {"type": Events.MOVIE_RENDERING, "payload": render_job})
 
 	def on_close(self):
 		self._printer.unregister_callback(self)
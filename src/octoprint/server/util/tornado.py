@@ -137,6 +137,16 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 	BODY_METHODS = ("POST", "PATCH", "PUT")
 	""" The request methods that may contain a request body. """
 
+	BUFFER_SIZE = 128 * 1024
+	""" Initial size of the receive buffer, twice Tornado's default chunk size. """
+
+	# multipart parser states
+	_STATE_PREAMBLE = 0
+	_STATE_DELIMITER = 1
+	_STATE_HEADER = 2
+	_STATE_BODY = 3
+	_STATE_END = 4
+
 	def initialize(self, fallback, file_prefix="tmp", file_suffix="", path=None, suffixes=None):
 		if not suffixes:
 			suffixes = dict()
@@ -154,6 +164,13 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		# multipart boundary
 		self._multipart_boundary = None
 
+		# delimiter and part separator derived from the boundary
+		self._delimiter = None
+		self._separator = None
+
+		# current state of the multipart parser
+		self._multipart_state = UploadStorageFallbackHandler._STATE_PREAMBLE
+
 		# Parts, files and values will be stored here
 		self._parts = dict()
 		self._files = []
@@ -167,8 +184,11 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		# bytes left to read according to content_length of request body
 		self._bytes_left = 0
 
-		# buffer needed for identifying form data parts
-		self._buffer = b""
+		# preallocated buffer needed for identifying form data parts, only the first _buffer_len bytes are valid - for
+		# multipart requests consumed bytes get discarded after each processed chunk, so it never grows beyond one chunk
+		# plus one boundary
+		self._buffer = bytearray(UploadStorageFallbackHandler.BUFFER_SIZE)
+		self._buffer_len = 0
 
 		# buffer for new body
 		self._new_body = b""
@@ -211,6 +231,9 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 					#
 					# So no boundary? 400 Bad Request
 					raise tornado.web.HTTPError(400, log_message="No multipart boundary supplied")
+
+				self._delimiter = b"--" + self._multipart_boundary
+				self._separator = b"\r\n" + self._delimiter
 		else:
 			self._fallback(self.request, b"")
 			self._finished = True
@@ -224,54 +247,125 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		:param chunk: chunk of data received from Tornado
 		"""
 
-		data = self._buffer + chunk
+		required = self._buffer_len + len(chunk)
+		if required > len(self._buffer):
+			self._buffer.extend(bytearray(max(required, 2 * len(self._buffer)) - len(self._buffer)))
+
+		self._buffer[self._buffer_len:required] = chunk
+		self._buffer_len = required
+
 		if self.is_multipart():
-			self._process_multipart_data(data)
-		else:
-			self._buffer = data
+			self._process_multipart_data()
 
 	def is_multipart(self):
 		"""Checks whether this request is a ``multipart`` request"""
 		return self._content_type is not None and self._content_type.startswith("multipart")
 
-	def _process_multipart_data(self, data):
+	def _process_multipart_data(self):
 		"""
-		Processes the given data, parsing it for multipart definitions and calling the appropriate methods.
+		Processes the data currently in the buffer, parsing it for multipart definitions and calling the appropriate
+		methods.
 
-		:param data: the data to process as a string
+		Boundaries are searched for by offset directly in the buffer, part data is handed on as views into the buffer.
+		Only once all complete structures have been processed are the consumed bytes dropped from the buffer, leaving
+		at most an incomplete header or a potentially truncated boundary at its start for the next round.
 		"""
 
-		# check for boundary
-		delimiter = b"--%s" % self._multipart_boundary
-		delimiter_loc = data.find(delimiter)
-		delimiter_len = len(delimiter)
-		end_of_header = None
-		if delimiter_loc != -1:
-			# found the delimiter in the currently available data
-			delimiter_data_end = 0 if delimiter_loc == 0 else delimiter_loc - 2
-			data, self._buffer = data[0:delimiter_data_end], data[delimiter_loc:]
-			end_of_header = self._buffer.find("\r\n\r\n")
-		else:
-			# make sure any boundary (with single or double ==) contained at the end of chunk does not get
-			# truncated by this processing round => save it to the buffer for next round
-			endlen = len(self._multipart_boundary) + 4
-			data, self._buffer = data[0:-endlen], data[-endlen:]
-
-		# stream data to part handler
-		if data and self._current_part:
-				self._on_part_data(self._current_part, data)
-
-		if end_of_header >= 0:
-			self._on_part_header(self._buffer[delimiter_len+2:end_of_header])
-			self._buffer = self._buffer[end_of_header + 4:]
-
-		if delimiter_loc != -1 and self._buffer.strip() == delimiter + "--":
-			# we saw the last boundary and are at the end of our request
-			if self._current_part:
-				self._on_part_finish(self._current_part)
-				self._current_part = None
-			self._buffer = b""
-			self._on_request_body_finish()
+		buf = self._buffer
+		buf_len = self._buffer_len
+		pos = 0
+
+		while self._multipart_state != UploadStorageFallbackHandler._STATE_END:
+			if self._multipart_state == UploadStorageFallbackHandler._STATE_PREAMBLE:
+				# skip everything up to the first delimiter
+				delimiter_loc = buf.find(self._delimiter, pos, buf_len)
+				if delimiter_loc == -1:
+					pos = max(pos, buf_len - len(self._delimiter) + 1)
+					break
+				pos = delimiter_loc
+				self._multipart_state = UploadStorageFallbackHandler._STATE_DELIMITER
+
+			elif self._multipart_state == UploadStorageFallbackHandler._STATE_DELIMITER:
+				# we are positioned at a delimiter, find out if it's the closing one
+				after_delimiter = pos + len(self._delimiter)
+				if buf_len < after_delimiter + 2:
+					break
+
+				if buf.startswith(b"--", after_delimiter):
+					# we saw the last boundary and are at the end of our request
+					self._multipart_state = UploadStorageFallbackHandler._STATE_END
+					pos = buf_len
+					self._on_request_body_finish()
+					break
+
+				# skip any transport padding up to the end of the delimiter line
+				end_of_line = buf.find(b"\r\n", after_delimiter, buf_len)
+				if end_of_line == -1:
+					break
+				pos = end_of_line + 2
+				self._multipart_state = UploadStorageFallbackHandler._STATE_HEADER
+
+			elif self._multipart_state == UploadStorageFallbackHandler._STATE_HEADER:
+				if buf.startswith(b"\r\n", pos, buf_len):
+					# part without any headers
+					end_of_header = pos
+					header = b""
+				else:
+					end_of_header = buf.find(b"\r\n\r\n", pos, buf_len)
+					if end_of_header == -1:
+						break
+					header = bytes(buf[pos:end_of_header])
+					end_of_header += 2
+
+				self._on_part_header(header)
+				pos = end_of_header + 2
+				self._multipart_state = UploadStorageFallbackHandler._STATE_BODY
+
+			elif self._multipart_state == UploadStorageFallbackHandler._STATE_BODY:
+				# searching for the delimiter and checking for the preceding line break ourselves is about twice as
+				# fast as searching for the full separator, which contains bytes very common in GCODE
+				separator_loc = -1
+				search_start = pos + 2
+				while True:
+					delimiter_loc = buf.find(self._delimiter, search_start, buf_len)
+					if delimiter_loc == -1:
+						break
+					if buf[delimiter_loc - 2] == 13 and buf[delimiter_loc - 1] == 10: # \r\n
+						separator_loc = delimiter_loc - 2
+						break
+					search_start = delimiter_loc + 1
+
+				if separator_loc == -1:
+					# make sure any separator contained at the end of the buffer does not get truncated by this
+					# processing round => leave it in the buffer for the next round
+					data_end = max(pos, buf_len - len(self._separator) + 1)
+				else:
+					data_end = separator_loc
+
+				# stream data to part handler
+				if data_end > pos and self._current_part:
+					view = memoryview(buf)
+					try:
+						self._on_part_data(self._current_part, view[pos:data_end])
+					finally:
+						del view
+
+				if separator_loc == -1:
+					pos = data_end
+					break
+
+				if self._current_part:
+					self._on_part_finish(self._current_part)
+					self._current_part = None
+
+				pos = separator_loc + 2
+				self._multipart_state = UploadStorageFallbackHandler._STATE_DELIMITER
+
+		# move whatever is left to the front of the buffer
+		remaining = buf_len - pos
+		if remaining and pos:
+			buf[:remaining] = buf[pos:buf_len]
+		self._buffer_len = remaining
 
 	def _on_part_header(self, header):
 		"""
@@ -349,7 +443,7 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 
 		* ``name``: name of the part
 		* ``content_type``: content type of the part
-		* ``data``: bytes of the part (initialized to an empty string)
+		* ``data``: bytes of the part (initialized to an empty ``bytearray``)
 
 		:param name: name of the part
 		:param content_type: content type of the part
@@ -367,14 +461,15 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 						file=handle)
 
 		else:
-			return dict(name=tornado.escape.utf8(name), content_type=tornado.escape.utf8(content_type), data=b"")
+			return dict(name=tornado.escape.utf8(name), content_type=tornado.escape.utf8(content_type), data=bytearray())
 
 	def _on_part_data(self, part, data):
 		"""
 		Called when new bytes are received for the given ``part``, takes care of writing them to their storage.
 
 		:param part: part for which data was received
-		:param data: data chunk which was received
+		:param data: data chunk which was received, usually a ``memoryview`` into the receive buffer which is only
+		             valid for the duration of the call
 		"""
 		if "file" in part:
 			part["file"].write(data)
@@ -401,7 +496,9 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		logged parts, turning ``file`` parts into new ``data`` parts.
 		"""
 
-		self._new_body = b""
+		boundary = self._multipart_boundary
+
+		new_body = []
 		for name, part in self._parts.items():
 			if "filename" in part:
 				# add form fields for filename, path, size and content_type for all files contained in the request
@@ -419,20 +516,22 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 				fields = dict((self._suffixes[key], value) for (key, value) in parameters.items())
 				for n, p in fields.items():
 					key = name + "." + n
-					self._new_body += b"--%s\r\n" % self._multipart_boundary
-					self._new_body += b"Content-Disposition: form-data; name=\"%s\"\r\n" % key
-					self._new_body += b"Content-Type: text/plain; charset=utf-8\r\n"
-					self._new_body += b"\r\n"
-					self._new_body += b"%s\r\n" % p
+					new_body.append(b"--%s\r\n" % boundary)
+					new_body.append(b"Content-Disposition: form-data; name=\"%s\"\r\n" % key)
+					new_body.append(b"Content-Type: text/plain; charset=utf-8\r\n")
+					new_body.append(b"\r\n")
+					new_body.append(b"%s\r\n" % p)
 			elif "data" in part:
-				self._new_body += b"--%s\r\n" % self._multipart_boundary
-				value = part["data"]
-				self._new_body += b"Content-Disposition: form-data; name=\"%s\"\r\n" % name
+				new_body.append(b"--%s\r\n" % boundary)
+				new_body.append(b"Content-Disposition: form-data; name=\"%s\"\r\n" % name)
 				if "content_type" in part and part["content_type"] is not None:
-					self._new_body += b"Content-Type: %s\r\n" % part["content_type"]
-				self._new_body += b"\r\n"
-				self._new_body += value + b"\r\n"
-		self._new_body += b"--%s--\r\n" % self._multipart_boundary
+					new_body.append(b"Content-Type: %s\r\n" % part["content_type"])
+				new_body.append(b"\r\n")
+				new_body.append(bytes(part["data"]))
+				new_body.append(b"\r\n")
+		new_body.append(b"--%s--\r\n" % boundary)
+
+		self._new_body = b"".join(new_body)
 
 	def _handle_method(self, *args, **kwargs):
 		"""
@@ -443,16 +542,21 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		# determine which body to supply
 		body = b""
 		if self.is_multipart():
-			# make sure we really processed all data in the buffer
-			while len(self._buffer):
-				self._process_multipart_data(self._buffer)
+			if self._multipart_state != UploadStorageFallbackHandler._STATE_END:
+				# we never saw the closing delimiter, finish up with what we have
+				self._logger.warn("Multipart request body ended without closing boundary")
+				if self._current_part:
+					self._on_part_finish(self._current_part)
+					self._current_part = None
+				self._multipart_state = UploadStorageFallbackHandler._STATE_END
+				self._on_request_body_finish()
 
 			# use rewritten body
 			body = self._new_body
 
 		elif self.request.method in UploadStorageFallbackHandler.BODY_METHODS:
 			# directly use data from buffer
-			body = self._buffer
+			body = bytes(self._buffer[:self._buffer_len])
 
 		# rewrite content length
 		self.request.headers["Content-Length"] = len(body)
@@ -566,8 +670,8 @@ class WsgiInputContainer(object):
 			data["status"] = status
 			data["headers"] = response_headers
 			return response.append
-		app_response = self.wsgi_application(
-			WsgiInputContainer.environ(request, body), start_response)
+		environ = WsgiInputContainer.environ(request, body)
+		app_response = self.wsgi_application(environ, start_response)
 		try:
 			response.extend(app_response)
 			body = b"".join(response)
@@ -602,7 +706,7 @@ class WsgiInputContainer(object):
 			header_obj.add(key, value)
 		request.connection.write_headers(start_line, header_obj, chunk=body)
 		request.connection.finish()
-		self._log(status_code, request)
+		self._log(status_code, request, environ=environ)
 
 	@staticmethod
 	def environ(request, body=None):
@@ -661,7 +765,7 @@ class WsgiInputContainer(object):
 			environ["HTTP_" + key.replace("-", "_").upper()] = value
 		return environ
 
-	def _log(self, status_code, request):
+	def _log(self, status_code, request, environ=None):
 		access_log = logging.getLogger("tornado.access")
 
 		if status_code < 400:
@@ -673,7 +777,14 @@ class WsgiInputContainer(object):
 		request_time = 1000.0 * request.request_time()
 		summary = request.method + " " + request.uri + " (" + \
 		          request.remote_ip + ")"
-		log_method("%d %s %.2fms", status_code, summary, request_time)
+
+		# octoprint.server.util imports this module, so the constant is only available at runtime
+		from octoprint.server.util import AUTH_TIME_ENVIRON_KEY
+		auth_time = environ.get(AUTH_TIME_ENVIRON_KEY) if environ else None
+		if auth_time is not None:
+			log_method("%d %s %.2fms (auth %.2fms)", status_code, summary, request_time, 1000.0 * auth_time)
+		else:
+			log_method("%d %s %.2fms", status_code, summary, request_time)
 
 
 #~~ customized HTTP1Connection implementation
@@ -1022,11 +1133,18 @@ class UrlProxyHandler(RequestlessExceptionLoggingMixin, tornado.web.RequestHandl
 		if response.error and not isinstance(response.error, tornado.web.HTTPError):
 			raise tornado.web.HTTPError(500)
 
+		self.set_status(response.code)
+		self.set_proxied_headers(response.headers)
+
+		if response.body:
+			self.write(response.body)
+		self.finish()
+
+	def set_proxied_headers(self, headers):
 		filename = None
 
-		self.set_status(response.code)
 		for name in ("Date", "Cache-Control", "Server", "Content-Type", "Location", "Expires", "ETag"):
-			value = response.headers.get(name)
+			value = headers.get(name)
 			if value:
 				self.set_header(name, value)
 
@@ -1039,10 +1157,6 @@ class UrlProxyHandler(RequestlessExceptionLoggingMixin, tornado.web.RequestHandl
 			else:
 				self.set_header("Content-Disposition", "attachment")
 
-		if response.body:
-			self.write(response.body)
-		self.finish()
-
 	def get_filename(self, content_type):
 		if not self._basename:
 			return None
@@ -1058,6 +1172,62 @@ class UrlProxyHandler(RequestlessExceptionLoggingMixin, tornado.web.RequestHandl
 		return "%s%s" % (self._basename, extension)
 
 
+class WebcamSnapshotHandler(UrlProxyHandler):
+	"""
+	Variant of :class:`UrlProxyHandler` for webcam snapshots. Instead of issuing a new request to the webcam for every
+	request it receives, it fetches snapshots through the shared :class:`~octoprint.webcam.SnapshotService`, so
+	concurrent requests share one fetch and snapshots no older than ``max_age`` get reused.
+
+	Only supports ``GET`` requests. Takes the same arguments as :class:`UrlProxyHandler`, plus:
+
+	Arguments:
+	   timeout (float): Timeout for fetching the snapshot, in seconds. Defaults to 5.
+	   validate_ssl (bool): Whether to validate the webcam's SSL certificate. Defaults to ``True``.
+	   max_age (float): Maximum age of a cached snapshot to serve, in seconds. Defaults to 0, in which case only
+	       concurrent requests get coalesced.
+	"""
+
+	def initialize(self, url=None, as_attachment=False, basename=None, access_validation=None, timeout=5,
+	               validate_ssl=True, max_age=0):
+		UrlProxyHandler.initialize(self, url=url, as_attachment=as_attachment, basename=basename,
+		                           access_validation=access_validation)
+		self._timeout = timeout
+		self._validate_ssl = validate_ssl
+		self._max_age = max_age
+
+	@tornado.gen.coroutine
+	def get(self, *args, **kwargs):
+		import requests.exceptions
+		from octoprint.webcam import snapshot_service
+
+		if self._access_validation is not None:
+			self._access_validation(self.request)
+
+		if self._url is None:
+			raise tornado.web.HTTPError(404)
+
+		try:
+			snapshot = yield snapshot_service().fetch_async(self._url,
+			                                                timeout=self._timeout,
+			                                                verify=self._validate_ssl,
+			                                                max_age=self._max_age)
+		except requests.exceptions.HTTPError as e:
+			# pass through what the webcam responded with
+			self.set_status(e.response.status_code)
+			self.set_proxied_headers(e.response.headers)
+			if e.response.content:
+				self.write(e.response.content)
+			self.finish()
+			return
+		except requests.exceptions.RequestException:
+			raise tornado.web.HTTPError(500)
+
+		self.set_status(200)
+		self.set_proxied_headers(snapshot.headers)
+		self.write(snapshot.data)
+		self.finish()
+
+
 class StaticDataHandler(RequestlessExceptionLoggingMixin, tornado.web.RequestHandler):
 	def initialize(self, data="", content_type="text/plain"):
 		self.data = data
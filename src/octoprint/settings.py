@@ -15,6 +15,9 @@ of various types and the configuration file itself.
 .. autoclass:: Settings
    :members:
    :undoc-members:
+
+.. autoclass:: SettingsSnapshot
+   :members:
 """
 
 from __future__ import absolute_import, division, print_function
@@ -32,6 +35,8 @@ import re
 import uuid
 import copy
 import time
+import numbers
+import threading
 
 # noinspection PyCompatibility
 from builtins import bytes
@@ -43,6 +48,8 @@ try:
 except ImportError:
 	from chainmap import ChainMap
 
+from frozendict import frozendict
+
 from octoprint.util import atomic_write, is_hidden_path, dict_merge, CaseInsensitiveSet
 
 _APPNAME = "OctoPrint"
@@ -207,8 +214,13 @@ default_settings = {
 		"snapshot": None,
 		"snapshotTimeout": 5,
 		"snapshotSslValidation": True,
+		"snapshotMaxAge": 1.0,
 		"ffmpeg": None,
 		"ffmpegThreads": 1,
+		"renderPreset": "mpeg2",
+		"renderConcurrency": 1,
+		"renderProgressInterval": 1.0,
+		"postRollMode": "hardlink",
 		"bitrate": "5000k",
 		"watermark": True,
 		"flipH": False,
@@ -220,7 +232,8 @@ default_settings = {
 			"postRoll": 0,
 			"fps": 25,
 		},
-		"cleanTmpAfterDays": 7
+		"cleanTmpAfterDays": 7,
+		"cleanTmpInterval": 3600
 	},
 	"gcodeViewer": {
 		"enabled": True,
@@ -231,7 +244,9 @@ default_settings = {
 		"maxExtruders": 10,
 		"throttle_normalprio": 0.01,
 		"throttle_highprio": 0.0,
-		"throttle_lines": 100
+		"throttle_lines": 100,
+		"toolpath": True,
+		"kinematics": False
 	},
 	"feature": {
 		"temperatureGraph": True,
@@ -318,12 +333,23 @@ default_settings = {
 		"localNetworks": ["127.0.0.0/8"],
 		"autologinAs": None,
 		"trustBasicAuthentication": False,
-		"checkBasicAuthenticationPassword": True
+		"checkBasicAuthenticationPassword": True,
+		"keyValidatorCacheTtl": 10.0,
+		"keyValidatorCacheNegativeTtl": 2.0
 	},
 	"slicing": {
 		"enabled": True,
 		"defaultSlicer": "cura",
-		"defaultProfiles": None
+		"defaultProfiles": None,
+		"concurrency": 1,
+		"progress": {
+			"minDelta": 0.01,
+			"minInterval": 1.0
+		},
+		"cache": {
+			"enabled": False,
+			"maxSize": 100 * 1024 * 1024 # 100 MB
+		}
 	},
 	"events": {
 		"enabled": True,
@@ -341,7 +367,8 @@ default_settings = {
 		{ "name": "Suppress wait responses", "regex": "Recv: wait"}
 	],
 	"plugins": {
-		"_disabled": []
+		"_disabled": [],
+		"_lazyImport": False
 	},
 	"scripts": {
 		"gcode": {
@@ -538,6 +565,86 @@ class HierarchicalChainMap(ChainMap):
 			return cls._hierarchy_for_key(key, node)
 
 
+def _freeze(value):
+	if isinstance(value, (dict, frozendict)):
+		return frozendict((key, _freeze(v)) for key, v in value.items())
+	elif isinstance(value, (list, tuple)):
+		return tuple(_freeze(v) for v in value)
+	elif value is None or isinstance(value, (basestring, numbers.Number)):
+		return value
+	else:
+		return copy.deepcopy(value)
+
+
+class SettingsSnapshot(object):
+	"""
+	An immutable, flattened view of the effective settings at the time of its creation, as returned by
+	:meth:`Settings.snapshot`.
+
+	Every path of the settings tree maps directly to its value, so lookups are a single dictionary access without any
+	locking or copying. In return, values are frozen: dictionaries are returned as :class:`frozendict.frozendict`,
+	lists as tuples. Get preprocessors have already been applied.
+
+	A snapshot never changes, ask :meth:`Settings.snapshot` for a fresh one to see changed settings.
+	"""
+
+	def __init__(self, values):
+		self._values = values
+
+	def has(self, path):
+		return tuple(path) in self._values
+
+	def get(self, path, default=None):
+		return self._values.get(tuple(path), default)
+
+	def getInt(self, path, default=None, min=None, max=None):
+		value = self._values.get(tuple(path))
+		if value is None:
+			return default
+
+		try:
+			value = int(value)
+		except (TypeError, ValueError):
+			return default
+
+		if min is not None and value < min:
+			return min
+		elif max is not None and value > max:
+			return max
+		return value
+
+	def getFloat(self, path, default=None, min=None, max=None):
+		value = self._values.get(tuple(path))
+		if value is None:
+			return default
+
+		try:
+			value = float(value)
+		except (TypeError, ValueError):
+			return default
+
+		if min is not None and value < min:
+			return min
+		elif max is not None and value > max:
+			return max
+		return value
+
+	def getBoolean(self, path, default=None):
+		value = self._values.get(tuple(path))
+		if value is None:
+			return default
+		if isinstance(value, bool):
+			return value
+		if isinstance(value, (int, float)):
+			return value != 0
+		if isinstance(value, basestring):
+			return value.lower() in valid_boolean_trues
+		return True
+
+	def __len__(self):
+		return len(self._values)
+
+
 class Settings(object):
 	"""
 	The :class:`Settings` class allows managing all of OctoPrint's settings. It takes care of initializing the settings
@@ -588,6 +695,10 @@ class Settings(object):
 	========================================== ============================================================================
 
 	However, these would be invalid paths: ``["key"]``, ``["serial", "port", "value"]``, ``["server", "host", 3]``.
+
+	Code on hot paths (e.g. per received line or per request) should read its settings from a
+	:meth:`snapshot` instead, which avoids walking the settings hierarchy and copying the returned value on every
+	lookup.
 	"""
 
 	def __init__(self, configfile=None, basedir=None):
@@ -595,6 +706,10 @@ class Settings(object):
 
 		self._basedir = None
 
+		self._snapshot = None
+		self._snapshot_generation = 0
+		self._snapshot_mutex = threading.Lock()
+
 		self._map = HierarchicalChainMap(dict(), default_settings)
 
 		self._config = None
@@ -832,6 +947,7 @@ class Settings(object):
 	@_config.setter
 	def _config(self, value):
 		self._map.maps[0] = value
+		self._invalidate_snapshot()
 
 	@property
 	def _overlay_maps(self):
@@ -888,6 +1004,8 @@ class Settings(object):
 		if migrate:
 			self._migrate_config()
 
+		self._invalidate_snapshot()
+
 	def load_overlay(self, overlay, migrate=True):
 		config = None
 
@@ -920,6 +1038,7 @@ class Settings(object):
 			self._map.maps.insert(pos, overlay)
 		else:
 			self._map.maps.insert(1, overlay)
+		self._invalidate_snapshot()
 
 	def _migrate_config(self, config=None, persist=False):
 		if config is None:
@@ -1323,6 +1442,68 @@ class Settings(object):
 			self.load()
 			return True
 
+	##~~ snapshot
+
+	def snapshot(self):
+		"""
+		Returns a :class:`SettingsSnapshot` of the current effective settings.
+
+		The snapshot is only rebuilt after the settings changed (through :meth:`set`, :meth:`remove`, :meth:`load` or a
+		new overlay), so fetching it is cheap and code on hot paths can simply call ``settings().snapshot().get(path)``
+		instead of holding on to a snapshot.
+
+		Returns:
+		    SettingsSnapshot: The current snapshot.
+		"""
+		snapshot = self._snapshot
+		if snapshot is not None:
+			return snapshot
+
+		while True:
+			generation = self._snapshot_generation
+			try:
+				snapshot = SettingsSnapshot(self._flatten_effective())
+			except RuntimeError:
+				# settings got modified while we were iterating over them, try again
+				continue
+
+			with self._snapshot_mutex:
+				if generation == self._snapshot_generation:
+					# nothing changed in the meantime, so this one may be reused
+					self._snapshot = snapshot
+			return snapshot
+
+	def _invalidate_snapshot(self):
+		with self._snapshot_mutex:
+			self._snapshot_generation += 1
+			self._snapshot = None
+
+	def _flatten_effective(self):
+		effective = self._map.deep_dict()
+
+		def apply_preprocessors(node, preprocessors):
+			for key, preprocessor in preprocessors.items():
+				if not key in node:
+					continue
+				if isinstance(preprocessor, dict):
+					if isinstance(node[key], dict):
+						apply_preprocessors(node[key], preprocessor)
+				elif callable(preprocessor):
+					node[key] = preprocessor(copy.deepcopy(node[key]))
+		apply_preprocessors(effective, self._get_preprocessors)
+
+		values = dict()
+
+		def flatten(node, prefix):
+			for key, value in node.items():
+				path = prefix + (key,)
+				values[path] = value
+				if isinstance(value, frozendict):
+					flatten(value, path)
+		flatten(_freeze(effective), ())
+
+		return values
+
 	##~~ Internal getter
 
 	def _get_by_path(self, path, config):
@@ -1525,6 +1706,7 @@ class Settings(object):
 						del self._config["folder"]
 					self._dirty = True
 					self._dirty_time = time.time()
+					self._invalidate_snapshot()
 					self.save()
 				except KeyError:
 					pass
@@ -1574,6 +1756,7 @@ class Settings(object):
 			chain.del_by_path(path)
 			self._dirty = True
 			self._dirty_time = time.time()
+			self._invalidate_snapshot()
 		except KeyError:
 			if error_on_path:
 				raise NoSuchSettingsPath()
@@ -1633,6 +1816,7 @@ class Settings(object):
 				chain.del_by_path(path)
 				self._dirty = True
 				self._dirty_time = time.time()
+				self._invalidate_snapshot()
 			except KeyError:
 				if error_on_path:
 					raise NoSuchSettingsPath()
@@ -1644,6 +1828,7 @@ class Settings(object):
 				chain.set_by_path(path, value)
 			self._dirty = True
 			self._dirty_time = time.time()
+			self._invalidate_snapshot()
 
 	def setInt(self, path, value, **kwargs):
 		if value is None:
@@ -1707,6 +1892,7 @@ class Settings(object):
 				del self._config["folder"]
 			self._dirty = True
 			self._dirty_time = time.time()
+			self._invalidate_snapshot()
 		elif (path != currentPath and path != defaultPath) or force:
 			if validate:
 				_validate_folder(path, check_writable=True, deep_check_writable=True)
@@ -1716,6 +1902,7 @@ class Settings(object):
 			self._config["folder"][type] = path
 			self._dirty = True
 			self._dirty_time = time.time()
+			self._invalidate_snapshot()
 
 	def saveScript(self, script_type, name, script):
 		script_folder = self.getBaseFolder("scripts")
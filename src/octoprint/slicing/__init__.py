@@ -10,6 +10,8 @@ In this module the slicing support of OctoPrint is encapsulated.
 
 .. autoclass:: SlicingManager
    :members:
+
+See :mod:`octoprint.slicing.scheduler` for how slicing jobs get queued, coalesced and cached.
 """
 
 from __future__ import absolute_import, division, print_function
@@ -32,8 +34,10 @@ import octoprint.util
 from octoprint.settings import settings
 
 import logging
+import threading
 
 from .exceptions import *
+from .scheduler import SlicingJob, SlicingJobScheduler, SlicingCache, ProgressThrottle, cache_key, file_hash, file_identity
 
 
 class SlicingProfile(object):
@@ -86,13 +90,25 @@ class TemporaryProfile(object):
 		self.overrides = overrides
 
 	def __enter__(self):
+		self.temp_path = self.create()
+		return self.temp_path
+
+	def create(self):
+		"""
+		Creates the temporary profile and returns its path, without deleting it later. The caller is responsible for
+		deleting it.
+		"""
+		import os
 		import tempfile
 		temp_profile = tempfile.NamedTemporaryFile(prefix="slicing-profile-temp-", suffix=".profile", delete=False)
 		temp_profile.close()
 
-		self.temp_path = temp_profile.name
-		self.save_profile(self.temp_path, self.profile, overrides=self.overrides)
-		return self.temp_path
+		try:
+			self.save_profile(temp_profile.name, self.profile, overrides=self.overrides)
+		except:
+			os.remove(temp_profile.name)
+			raise
+		return temp_profile.name
 
 	def __exit__(self, type, value, traceback):
 		import os
@@ -106,13 +122,18 @@ class SlicingManager(object):
 	"""
 	The :class:`SlicingManager` is responsible for managing available slicers and slicing profiles.
 
+	Slicing jobs are run through a :class:`~octoprint.slicing.scheduler.SlicingJobScheduler` which limits the number of
+	concurrent slicer runs to the configured ``slicing.concurrency`` and coalesces identical jobs. If ``cache_path`` is
+	provided and ``slicing.cache.enabled`` is set, slicing results are additionally cached there.
+
 	Arguments:
 	    profile_path (str): Absolute path to the base folder where all slicing profiles are stored.
 	    printer_profile_manager (~octoprint.printer.profile.PrinterProfileManager): :class:`~octoprint.printer.profile.PrinterProfileManager`
 	       instance to use for accessing available printer profiles, most importantly the currently selected one.
+	    cache_path (str): Absolute path to the folder in which to cache slicing results, None disables caching.
 	"""
 
-	def __init__(self, profile_path, printer_profile_manager):
+	def __init__(self, profile_path, printer_profile_manager, cache_path=None):
 		self._logger = logging.getLogger(__name__)
 
 		self._profile_path = profile_path
@@ -121,6 +142,19 @@ class SlicingManager(object):
 		self._slicers = dict()
 		self._slicer_names = dict()
 
+		self._scheduler = SlicingJobScheduler(self._do_slice,
+		                                      self._cancel_slice,
+		                                      concurrency=lambda: settings().getInt(["slicing", "concurrency"]),
+		                                      on_done=self._on_slicing_done)
+
+		self._cache = None
+		if cache_path is not None:
+			self._cache = SlicingCache(cache_path, lambda: settings().getInt(["slicing", "cache", "maxSize"]))
+
+		# jobs looking up their result in the cache, by destination path, not yet known to the scheduler
+		self._cache_lookups = dict()
+		self._cache_lookups_mutex = threading.Lock()
+
 	def initialize(self):
 		"""
 		Initializes the slicing manager by loading and initializing all available
@@ -207,7 +241,8 @@ class SlicingManager(object):
 
 	def slice(self, slicer_name, source_path, dest_path, profile_name, callback,
 	          callback_args=None, callback_kwargs=None, overrides=None,
-	          on_progress=None, on_progress_args=None, on_progress_kwargs=None, printer_profile_id=None, position=None):
+	          on_progress=None, on_progress_args=None, on_progress_kwargs=None, printer_profile_id=None, position=None,
+	          priority=None):
 		"""
 		Slices ``source_path`` to ``dest_path`` using slicer ``slicer_name`` and slicing profile ``profile_name``.
 		Since slicing happens asynchronously, ``callback`` will be called when slicing has finished (either successfully
@@ -240,6 +275,15 @@ class SlicingManager(object):
 		If the ``source_path`` is to be a sliced at a different position than the print bed center, this ``position`` can
 		be supplied as a dictionary defining the ``x`` and ``y`` coordinate in print bed coordinates of the model's center.
 
+		Slicing jobs get queued and processed by ``priority``, at most ``slicing.concurrency`` of them at a time. A job
+		identical to one that is already queued or running (same model, effective slicing profile, printer profile and
+		position) will not be sliced again but receive a copy of that job's result. If the slicing cache is enabled,
+		a cached result will be used instead of slicing at all.
+
+		Progress reports of the slicer get rate limited according to ``slicing.progress.minDelta`` and
+		``slicing.progress.minInterval`` before being forwarded to ``on_progress``, see
+		:class:`~octoprint.slicing.scheduler.ProgressThrottle`.
+
 		Arguments:
 		    slicer_name (str): The identifier of the slicer to use for slicing.
 		    source_path (str): The absolute path to the source file to slice.
@@ -261,6 +305,8 @@ class SlicingManager(object):
 		    position (dict): Dictionary containing the ``x`` and ``y`` coordinate in the print bed's coordinate system
 		        of the sliced model's center. If not provided the model will be positioned at the print bed's center.
 		        Example: ``dict(x=10,y=20)``.
+		    priority (int): Priority of the job, lower values get processed first. Defaults to
+		        :attr:`~octoprint.slicing.scheduler.SlicingJobScheduler.PRIORITY_NORMAL`.
 
 		Raises:
 		    ~octoprint.slicing.exceptions.UnknownSlicer: The slicer specified via ``slicer_name`` is unknown.
@@ -283,8 +329,6 @@ class SlicingManager(object):
 			callback(*callback_args, **callback_kwargs)
 			raise exc
 
-		slicer = self.get_slicer(slicer_name)
-
 		printer_profile = None
 		if printer_profile_id is not None:
 			printer_profile = self._printer_profile_manager.get(printer_profile_id)
@@ -292,39 +336,120 @@ class SlicingManager(object):
 		if printer_profile is None:
 			printer_profile = self._printer_profile_manager.get_current_or_default()
 
-		def slicer_worker(slicer, model_path, machinecode_path, profile_name, overrides, printer_profile, position, callback, callback_args, callback_kwargs):
-			try:
-				slicer_name = slicer.get_slicer_properties()["type"]
-				with self._temporary_profile(slicer_name, name=profile_name, overrides=overrides) as profile_path:
-					ok, result = slicer.do_slice(
-						model_path,
-						printer_profile,
-						machinecode_path=machinecode_path,
-						profile_path=profile_path,
-						position=position,
-						on_progress=on_progress,
-						on_progress_args=on_progress_args,
-						on_progress_kwargs=on_progress_kwargs
-					)
-
-				if not ok:
-					callback_kwargs.update(dict(_error=result))
-				elif result is not None and isinstance(result, dict) and "analysis" in result:
-					callback_kwargs.update(dict(_analysis=result["analysis"]))
-			except SlicingCancelled:
-				callback_kwargs.update(dict(_cancelled=True))
-			finally:
-				callback(*callback_args, **callback_kwargs)
-
-		import threading
-		slicer_worker_thread = threading.Thread(target=slicer_worker,
-		                                        args=(slicer, source_path, dest_path, profile_name, overrides, printer_profile, position, callback, callback_args, callback_kwargs))
-		slicer_worker_thread.daemon = True
-		slicer_worker_thread.start()
+		profile_path = None
+		job = None
+		try:
+			# the effective profile gets created right away so that identical jobs can be detected, the job deletes it
+			# once it's finished
+			profile_path = self._temporary_profile(slicer_name, name=profile_name, overrides=overrides).create()
+
+			job = SlicingJob(slicer_name, source_path, dest_path, profile_path, printer_profile, position,
+			                 callback, callback_args=callback_args, callback_kwargs=callback_kwargs,
+			                 on_progress=on_progress, on_progress_args=on_progress_args,
+			                 on_progress_kwargs=on_progress_kwargs,
+			                 priority=priority)
+
+			if self._cache is not None and settings().getBoolean(["slicing", "cache", "enabled"]):
+				# hashing the model might take a while, so don't do that on the caller's thread
+				with self._cache_lookups_mutex:
+					self._cache_lookups[dest_path] = job
+				thread = threading.Thread(target=self._slice_cached, args=(job,))
+				thread.daemon = True
+				thread.start()
+			else:
+				job.key = self._job_key(job, file_identity)
+				self._scheduler.submit(job)
+		except Exception as exc:
+			self._logger.exception("Error while preparing slicing job for {} -> {}".format(source_path, dest_path))
+
+			if job is not None:
+				with self._cache_lookups_mutex:
+					if self._cache_lookups.get(dest_path) is job:
+						del self._cache_lookups[dest_path]
+			if profile_path is not None:
+				try:
+					os.remove(profile_path)
+				except OSError:
+					pass
+
+			# the caller relies on the callback for cleaning up, just like for a failed slicing run
+			callback_kwargs.update(dict(_error="Could not prepare slicing job: {}".format(exc), _exc=exc))
+			callback(*callback_args, **callback_kwargs)
+
+	def _slice_cached(self, job):
+		hit = False
+		analysis = None
+		try:
+			job.key = self._job_key(job, file_hash)
+			if job.key is not None:
+				job.cacheable = True
+				hit, analysis = self._cache.get(job.key, job.dest_path)
+		except:
+			self._logger.exception("Error while looking up slicing result for {} in cache".format(job))
+
+		with self._cache_lookups_mutex:
+			if self._cache_lookups.get(job.dest_path) is not job:
+				# cancelled while we were looking it up
+				return
+
+			if hit:
+				del self._cache_lookups[job.dest_path]
+			else:
+				# the lookup ends once the scheduler knows about the job, so a cancel can't slip in between
+				try:
+					self._scheduler.submit(job)
+				finally:
+					del self._cache_lookups[job.dest_path]
+
+		if hit:
+			self._logger.info("Using cached slicing result for {}".format(job))
+			job.finish(**(dict(_analysis=analysis) if analysis is not None else dict()))
+
+	def _job_key(self, job, model_identity):
+		try:
+			return cache_key(job.slicer_name,
+			                 model_identity(job.source_path),
+			                 file_hash(job.profile_path),
+			                 job.printer_profile,
+			                 job.position)
+		except (IOError, OSError):
+			# we can't identify this job, so it won't get coalesced with anything either
+			return None
+
+	def _do_slice(self, job, on_progress):
+		slicer = self.get_slicer(job.slicer_name)
+
+		if on_progress is not None:
+			# slicers may report progress far more often than anyone can make use of
+			on_progress = ProgressThrottle(on_progress,
+			                               min_delta=settings().getFloat(["slicing", "progress", "minDelta"]),
+			                               min_interval=settings().getFloat(["slicing", "progress", "minInterval"]))
+
+		return slicer.do_slice(job.source_path,
+		                       job.printer_profile,
+		                       machinecode_path=job.dest_path,
+		                       profile_path=job.profile_path,
+		                       position=job.position,
+		                       on_progress=on_progress,
+		                       on_progress_args=None,
+		                       on_progress_kwargs=None)
+
+	def _cancel_slice(self, job):
+		self.get_slicer(job.slicer_name, require_configured=False).cancel_slicing(job.dest_path)
+
+	def _on_slicing_done(self, job, ok, result):
+		if not job.cacheable or self._cache is None or not settings().getBoolean(["slicing", "cache", "enabled"]):
+			return
+
+		analysis = None
+		if isinstance(result, dict):
+			analysis = result.get("analysis")
+		self._cache.put(job.key, job.dest_path, analysis=analysis)
 
 	def cancel_slicing(self, slicer_name, source_path, dest_path):
 		"""
-		Cancels the slicing job on slicer ``slicer_name`` from ``source_path`` to ``dest_path``.
+		Cancels the slicing job on slicer ``slicer_name`` from ``source_path`` to ``dest_path``, regardless of whether
+		it's still queued or already running.
 
 		Arguments:
 		    slicer_name (str): Identifier of the slicer on which to cancel the job.
@@ -336,7 +461,17 @@ class SlicingManager(object):
 		"""
 
 		slicer = self.get_slicer(slicer_name)
-		slicer.cancel_slicing(dest_path)
+
+		with self._cache_lookups_mutex:
+			job = self._cache_lookups.pop(dest_path, None)
+		if job is not None:
+			self._logger.info("Cancelled slicing job {} while looking it up in the cache".format(job))
+			job.cancelled = True
+			job.finish(_cancelled=True)
+			return
+
+		if not self._scheduler.cancel(dest_path):
+			slicer.cancel_slicing(dest_path)
 
 	def load_profile(self, slicer, name, require_configured=True):
 		"""
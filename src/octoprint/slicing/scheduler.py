@@ -0,0 +1,544 @@
+# coding=utf-8
+"""
+Scheduling of slicing jobs.
+
+.. autoclass:: SlicingJob
+   :members:
+
+.. autoclass:: SlicingJobScheduler
+   :members:
+
+.. autoclass:: SlicingCache
+   :members:
+
+.. autoclass:: ProgressThrottle
+   :members:
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+
+import heapq
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import threading
+
+try:
+	from os import scandir
+except ImportError:
+	from scandir import scandir
+
+from octoprint.util import monotonic_time
+
+from .exceptions import SlicingCancelled
+
+
+class SlicingJob(object):
+	"""
+	A single slicing request as submitted to the :class:`SlicingJobScheduler`.
+
+	Arguments:
+	    slicer_name (str): Identifier of the slicer to use.
+	    source_path (str): Absolute path to the model to slice.
+	    dest_path (str): Absolute path to slice to.
+	    profile_path (str): Absolute path to the temporary effective slicing profile to use, will be deleted once the
+	        job is done.
+	    printer_profile (dict): The printer profile to slice for.
+	    position (dict): The position of the model's center on the print bed, may be None.
+	    callback (callable): Callback to call once the job is done, see :meth:`~octoprint.slicing.SlicingManager.slice`.
+	    callback_args (tuple): Arguments of the callback.
+	    callback_kwargs (dict): Keyword arguments of the callback.
+	    on_progress (callable): Callback to call on slicing progress.
+	    on_progress_args (tuple): Arguments of the progress callback.
+	    on_progress_kwargs (dict): Keyword arguments of the progress callback.
+	    priority (int): Priority of the job, lower values get processed first.
+	    key (str): Identity of the job's input (model, effective profile, printer profile and position), jobs with the
+	        same ``key`` will be coalesced. None disables coalescing.
+	"""
+
+	def __init__(self, slicer_name, source_path, dest_path, profile_path, printer_profile, position,
+	             callback, callback_args=None, callback_kwargs=None,
+	             on_progress=None, on_progress_args=None, on_progress_kwargs=None,
+	             priority=None, key=None):
+		self.slicer_name = slicer_name
+		self.source_path = source_path
+		self.dest_path = dest_path
+		self.profile_path = profile_path
+		self.printer_profile = printer_profile
+		self.position = position
+
+		self.callback = callback
+		self.callback_args = callback_args if callback_args is not None else ()
+		self.callback_kwargs = callback_kwargs if callback_kwargs is not None else dict()
+
+		self.on_progress = on_progress
+		self.on_progress_args = on_progress_args
+		self.on_progress_kwargs = on_progress_kwargs
+
+		self.priority = priority if priority is not None else SlicingJobScheduler.PRIORITY_NORMAL
+		self.key = key
+		self.cacheable = False
+
+		self.cancelled = False
+
+		self._finished = False
+		self._finished_mutex = threading.Lock()
+
+	def report_progress(self, progress):
+		if self.on_progress is None or self.cancelled:
+			return
+
+		args = self.on_progress_args if self.on_progress_args else ()
+		kwargs = dict(self.on_progress_kwargs) if self.on_progress_kwargs else dict()
+		kwargs["_progress"] = progress
+		self.on_progress(*args, **kwargs)
+
+	def finish(self, **result):
+		"""
+		Calls the job's callback with the provided ``result`` (``_analysis``, ``_error`` or ``_cancelled``) added to its
+		keyword arguments. Only the first call has any effect.
+		"""
+		with self._finished_mutex:
+			if self._finished:
+				return
+			self._finished = True
+
+		_remove_file(self.profile_path)
+
+		kwargs = self.callback_kwargs
+		kwargs.update(result)
+		self.callback(*self.callback_args, **kwargs)
+
+	def __str__(self):
+		return "{} -> {} ({})".format(self.source_path, self.dest_path, self.slicer_name)
+
+
+class _JobGroup(object):
+	"""Coalesced jobs sharing one slicer run, the first job is the one the slicer actually slices to."""
+
+	QUEUED = "queued"
+	RUNNING = "running"
+	DONE = "done"
+
+	def __init__(self, job, sequence):
+		self.jobs = [job]
+		self.key = job.key
+		self.priority = job.priority
+		self.sequence = sequence
+		self.state = _JobGroup.QUEUED
+
+	@property
+	def primary(self):
+		return self.jobs[0]
+
+
+class SlicingJobScheduler(object):
+	"""
+	Runs :class:`SlicingJob` instances with at most ``concurrency`` slicer runs at the same time, queueing everything
+	beyond that by priority, first in first out within the same priority.
+
+	Jobs with the same :attr:`SlicingJob.key` as a job that is already queued or running get attached to it instead
+	of being sliced again. Once the slicer is done, its output is copied to the destinations of all attached jobs.
+
+	Arguments:
+	    do_slice (callable): Called with a :class:`SlicingJob` and a progress callback to actually slice the job,
+	        returning the slicer's ``(ok, result)`` tuple or raising :class:`~octoprint.slicing.exceptions.SlicingCancelled`.
+	    cancel_slice (callable): Called with a running :class:`SlicingJob` to cancel it.
+	    concurrency (int or callable): Maximum number of concurrent slicer runs, or a callable returning it.
+	    on_done (callable): Optional callable called with the primary :class:`SlicingJob` and the slicer's ``(ok, result)``
+	        after a successful slicer run, before the output gets distributed.
+	"""
+
+	PRIORITY_HIGH = 50
+	PRIORITY_NORMAL = 100
+	PRIORITY_LOW = 150
+
+	def __init__(self, do_slice, cancel_slice, concurrency=1, on_done=None):
+		self._logger = logging.getLogger(__name__)
+
+		self._do_slice = do_slice
+		self._cancel_slice = cancel_slice
+		self._concurrency = concurrency
+		self._on_done = on_done
+
+		self._mutex = threading.RLock()
+		self._queue = []
+		self._sequence = itertools.count()
+		self._groups = dict()
+		self._running = set()
+
+	@property
+	def concurrency(self):
+		concurrency = self._concurrency() if callable(self._concurrency) else self._concurrency
+		try:
+			return max(1, int(concurrency))
+		except (TypeError, ValueError):
+			return 1
+
+	@property
+	def queued(self):
+		"""Number of queued (not yet running) slicer runs."""
+		with self._mutex:
+			return len([entry for entry in self._queue if self._is_valid_entry(entry)])
+
+	@property
+	def running(self):
+		"""Number of currently running slicer runs."""
+		with self._mutex:
+			return len(self._running)
+
+	def submit(self, job):
+		"""
+		Submits ``job`` for slicing.
+
+		Returns:
+		    bool: True if the job was coalesced with an already queued or running one, False if it was queued on its
+		        own.
+		"""
+		with self._mutex:
+			group = self._groups.get(job.key) if job.key is not None else None
+			if group is not None and group.state != _JobGroup.DONE:
+				group.jobs.append(job)
+				self._logger.info("Attached slicing job {} to identical job {}".format(job, group.primary))
+
+				if group.state == _JobGroup.QUEUED and job.priority < group.priority:
+					group.priority = job.priority
+					heapq.heappush(self._queue, (group.priority, group.sequence, group))
+				return True
+
+			group = _JobGroup(job, next(self._sequence))
+			if job.key is not None:
+				self._groups[job.key] = group
+			heapq.heappush(self._queue, (group.priority, group.sequence, group))
+			self._logger.debug("Queued slicing job {} with priority {}".format(job, job.priority))
+
+			self._dispatch()
+			return False
+
+	def cancel(self, dest_path):
+		"""
+		Cancels the job slicing to ``dest_path``.
+
+		Queued jobs and jobs attached to another job are removed right away and their callback gets called with
+		``_cancelled=True``. A running job is cancelled in the slicer, unless other jobs are still attached to it, in
+		which case it keeps running for those and the cancelled job's callback gets called once it's done.
+
+		Returns:
+		    bool: True if a job slicing to ``dest_path`` was found, False otherwise.
+		"""
+		finish = None
+
+		with self._mutex:
+			for group in list(self._running) + [entry[2] for entry in self._queue]:
+				job = self._find_job(group, dest_path)
+				if job is not None:
+					break
+			else:
+				return False
+
+			job.cancelled = True
+
+			if group.state == _JobGroup.QUEUED or job is not group.primary:
+				group.jobs.remove(job)
+				finish = job
+
+				if not group.jobs:
+					group.state = _JobGroup.DONE
+					self._forget(group)
+					self._logger.info("Cancelled queued slicing job {}".format(job))
+
+			elif all(member.cancelled for member in group.jobs):
+				# nobody is interested in the result anymore
+				self._logger.info("Cancelling running slicing job {}".format(job))
+				self._cancel_slice(group.primary)
+
+		if finish is not None:
+			finish.finish(_cancelled=True)
+		return True
+
+	def _find_job(self, group, dest_path):
+		if group.state == _JobGroup.DONE:
+			return None
+		for job in group.jobs:
+			if job.dest_path == dest_path and not job.cancelled:
+				return job
+		return None
+
+	def _is_valid_entry(self, entry):
+		priority, _, group = entry
+		return group.state == _JobGroup.QUEUED and priority == group.priority
+
+	def _forget(self, group):
+		if group.key is not None and self._groups.get(group.key) is group:
+			del self._groups[group.key]
+
+	def _dispatch(self):
+		with self._mutex:
+			while self._queue and len(self._running) < self.concurrency:
+				entry = heapq.heappop(self._queue)
+				if not self._is_valid_entry(entry):
+					continue
+
+				group = entry[2]
+				group.state = _JobGroup.RUNNING
+				self._running.add(group)
+
+				thread = threading.Thread(target=self._work, args=(group,))
+				thread.daemon = True
+				thread.start()
+
+	def _work(self, group):
+		primary = group.primary
+		on_progress = None
+		if any(job.on_progress is not None for job in group.jobs):
+			def on_progress(_progress=None):
+				for job in list(group.jobs):
+					try:
+						job.report_progress(_progress)
+					except:
+						self._logger.exception("Error while reporting slicing progress for {}".format(job))
+
+		result = dict()
+		success = False
+		try:
+			ok, slicer_result = self._do_slice(primary, on_progress)
+
+			if not ok:
+				result = dict(_error=slicer_result)
+			else:
+				success = True
+				if slicer_result is not None and isinstance(slicer_result, dict) and "analysis" in slicer_result:
+					result = dict(_analysis=slicer_result["analysis"])
+				if self._on_done is not None:
+					try:
+						self._on_done(primary, ok, slicer_result)
+					except:
+						self._logger.exception("Error while post processing slicing job {}".format(primary))
+		except SlicingCancelled:
+			result = dict(_cancelled=True)
+		except Exception as exc:
+			self._logger.exception("Error while slicing {}".format(primary))
+			result = dict(_error=str(exc))
+		finally:
+			with self._mutex:
+				group.state = _JobGroup.DONE
+				self._forget(group)
+				self._running.discard(group)
+				jobs = list(group.jobs)
+
+			try:
+				for job in jobs[1:]:
+					job_result = result
+					if success:
+						try:
+							shutil.copyfile(primary.dest_path, job.dest_path)
+						except:
+							self._logger.exception("Could not copy slicing result of {} to {}".format(primary, job.dest_path))
+							job_result = dict(_error="Could not copy slicing result")
+					self._finish(job, job_result)
+
+				self._finish(primary, dict(_cancelled=True) if primary.cancelled else result)
+			finally:
+				self._dispatch()
+
+	def _finish(self, job, result):
+		try:
+			job.finish(**result)
+		except:
+			self._logger.exception("Error while calling callback of slicing job {}".format(job))
+
+
+class SlicingCache(object):
+	"""
+	A size limited cache of sliced machine code and its analysis, keyed by the hash of everything that goes into the
+	slicing result, see :func:`cache_key`. Least recently used entries get evicted first.
+
+	Arguments:
+	    folder (str): Folder in which to store the cache entries.
+	    max_size (int or callable): Maximum size of the cache in bytes, or a callable returning it.
+	"""
+
+	MACHINECODE_SUFFIX = ".gco"
+	ANALYSIS_SUFFIX = ".yaml"
+
+	def __init__(self, folder, max_size):
+		self._logger = logging.getLogger(__name__)
+		self._folder = folder
+		self._max_size = max_size
+		self._mutex = threading.RLock()
+
+	def get(self, key, dest_path):
+		"""
+		Copies the cached machine code for ``key`` to ``dest_path``.
+
+		Returns:
+		    tuple: ``(True, analysis)`` if there was a cache entry for ``key``, ``(False, None)`` otherwise.
+		"""
+		machinecode_path, analysis_path = self._paths(key)
+
+		with self._mutex:
+			if not os.path.isfile(machinecode_path):
+				return False, None
+
+			try:
+				analysis = None
+				if os.path.isfile(analysis_path):
+					import yaml
+					with open(analysis_path, "rb") as f:
+						analysis = yaml.safe_load(f)
+
+				shutil.copyfile(machinecode_path, dest_path)
+
+				# mark as recently used
+				os.utime(machinecode_path, None)
+			except:
+				self._logger.exception("Error while reading slicing cache entry {}".format(key))
+				return False, None
+
+		return True, analysis
+
+	def put(self, key, machinecode_path, analysis=None):
+		"""Adds a copy of the machine code at ``machinecode_path`` plus its ``analysis`` to the cache under ``key``."""
+		import yaml
+		from octoprint.util import atomic_write
+
+		cache_machinecode_path, cache_analysis_path = self._paths(key)
+
+		with self._mutex:
+			try:
+				if not os.path.isdir(self._folder):
+					os.makedirs(self._folder)
+
+				if analysis is not None:
+					with atomic_write(cache_analysis_path, "wb") as f:
+						yaml.safe_dump(analysis, f, default_flow_style=False, indent="  ", allow_unicode=True)
+
+				with atomic_write(cache_machinecode_path, "wb") as dest:
+					with open(machinecode_path, "rb") as source:
+						shutil.copyfileobj(source, dest)
+			except:
+				self._logger.exception("Error while adding slicing result to cache as {}".format(key))
+				return
+
+			self._evict()
+
+	def clear(self):
+		with self._mutex:
+			if os.path.isdir(self._folder):
+				shutil.rmtree(self._folder, ignore_errors=True)
+
+	def _paths(self, key):
+		base = os.path.join(self._folder, key)
+		return base + self.MACHINECODE_SUFFIX, base + self.ANALYSIS_SUFFIX
+
+	def _evict(self):
+		max_size = self._max_size() if callable(self._max_size) else self._max_size
+
+		entries = []
+		total = 0
+		for entry in scandir(self._folder):
+			if not entry.name.endswith(self.MACHINECODE_SUFFIX) or not entry.is_file():
+				continue
+			stat = entry.stat()
+			entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(self.MACHINECODE_SUFFIX)]))
+			total += stat.st_size
+
+		for _, size, key in sorted(entries):
+			if total <= max_size:
+				break
+
+			for path in self._paths(key):
+				try:
+					os.remove(path)
+				except OSError:
+					pass
+			total -= size
+			self._logger.debug("Evicted {} from slicing cache".format(key))
+
+
+class ProgressThrottle(object):
+	"""
+	Wraps a slicing progress callback and only forwards a progress report if it moved by at least ``min_delta``
+	since the last forwarded one, or if at least ``min_interval`` seconds have passed since then. The first report
+	and the final one (progress 1.0) are always forwarded, repeated identical reports never are.
+
+	Instances are called like the wrapped callback, with the progress as ``_progress`` keyword argument.
+
+	Arguments:
+	    callback (callable): The progress callback to forward to.
+	    min_delta (float): Minimum change in progress (0.0 to 1.0) that gets forwarded right away.
+	    min_interval (float): Seconds after which any change in progress gets forwarded.
+	"""
+
+	def __init__(self, callback, min_delta=0.01, min_interval=1.0):
+		self._callback = callback
+		self._min_delta = min_delta if min_delta is not None else 0.0
+		self._min_interval = min_interval if min_interval is not None else 0.0
+
+		self._last_progress = None
+		self._last_time = None
+
+	def __call__(self, *args, **kwargs):
+		progress = kwargs.get("_progress")
+		if progress is None:
+			return
+
+		if self._last_progress is not None:
+			if progress == self._last_progress:
+				return
+
+			if progress < 1.0 \
+					and abs(progress - self._last_progress) < self._min_delta \
+					and monotonic_time() - self._last_time < self._min_interval:
+				return
+
+		self._last_progress = progress
+		self._last_time = monotonic_time()
+		self._callback(*args, **kwargs)
+
+
+def cache_key(slicer_name, model_hash, profile_hash, printer_profile, position):
+	"""
+	Creates the key identifying a slicing result, from the slicer, the hash of the model, the hash of the effective
+	slicing profile, the printer profile and the position of the model.
+	"""
+	import json
+
+	hash = hashlib.sha1()
+	for part in (slicer_name, model_hash, profile_hash):
+		hash.update(part.encode("utf-8") if not isinstance(part, bytes) else part)
+		hash.update(b"\0")
+	hash.update(json.dumps(printer_profile, sort_keys=True, default=repr).encode("utf-8"))
+	hash.update(b"\0")
+	hash.update(json.dumps(position, sort_keys=True, default=repr).encode("utf-8"))
+	return hash.hexdigest()
+
+
+def file_hash(path):
+	"""Returns the hex digest of the SHA1 hash of the file at ``path``."""
+	hash = hashlib.sha1()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(64 * 1024), b""):
+			hash.update(chunk)
+	return hash.hexdigest()
+
+
+def file_identity(path):
+	"""Returns a cheap identity of the file at ``path``, based on path, size and modification date."""
+	stat = os.stat(path)
+	return "{}:{}:{}".format(os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+
+def _remove_file(path):
+	if path is None:
+		return
+	try:
+		os.remove(path)
+	except OSError:
+		pass
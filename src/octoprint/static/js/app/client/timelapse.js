@@ -94,6 +94,10 @@
         return this.base.issueCommand(unrenderedTimelapseUrl(name), "render");
     };
 
+    OctoPrintTimelapseClient.prototype.cancelRenderUnrendered = function(name, opts) {
+        return this.base.issueCommand(unrenderedTimelapseUrl(name), "cancel");
+    };
+
     OctoPrintTimelapseClient.prototype.getConfig = function (opts) {
         var deferred = $.Deferred();
         this.get(false, opts)
@@ -365,6 +365,11 @@ $(function() {
                 .done(self.requestData);
         };
 
+        self.cancelRenderUnrendered = function(name) {
+            OctoPrint.timelapse.cancelRenderUnrendered(name)
+                .done(self.requestData);
+        };
+
         self.save = function() {
             var payload = {
                 "type": self.timelapseType(),
@@ -480,6 +485,21 @@ $(function() {
         self.onEventMovieFailed = function(payload) {
             var title, html;
 
+            if (payload.reason === "cancelled") {
+                self.requestData();
+                return;
+            }
+
+            if (payload.reason === "paused") {
+                self.requestData();
+                self.displayTimelapsePopup({
+                    title: gettext("Rendering timelapse paused"),
+                    text: _.sprintf(gettext("Rendering of timelapse %(movie_prefix)s was paused for the print job and will restart once the printer is idle again."), payload),
+                    hide: false
+                });
+                return;
+            }
+
             if (payload.reason === "no_frames") {
                 title = gettext("Cannot render timelapse");
                 html = "<p>" + _.sprintf(gettext("Rendering of timelapse %(movie_prefix)s is not possible since no frames were captured. Is the snapshot URL configured correctly?"), payload) + "</p>";
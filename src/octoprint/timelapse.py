@@ -11,20 +11,23 @@ import fnmatch
 import datetime
 import sys
 import shutil
+import collections
+import contextlib
+import multiprocessing
 try:
 	import queue
 except ImportError:
 	import Queue as queue
-import requests
 
 import octoprint.util as util
 
 from octoprint.settings import settings
 from octoprint.events import eventManager, Events
+from octoprint.printer import PrinterCallback
 from octoprint.util import monotonic_time
+from octoprint.webcam import snapshot_service
 
 import sarge
-import collections
 
 import re
 
@@ -37,12 +40,39 @@ except ImportError:
 # currently configured timelapse
 current = None
 
-# currently active render job, if any
+# currently active render jobs, by prefix
+current_render_jobs = collections.OrderedDict()
+
+# most recently started active render job, if any
 current_render_job = None
 
 # filename formats
 _capture_format = "{prefix}-%d.jpg"
-_output_format = "{prefix}.mpg"
+_output_format = "{prefix}.{extension}"
+
+# encoder presets to render timelapses with, ``{bitrate}`` in the options gets replaced with the configured bitrate
+ENCODER_PRESETS = {
+	# MPEG-2 in a VOB container, plays back everywhere but produces huge files
+	"mpeg2": dict(extension="mpg",
+	              vcodec="mpeg2video",
+	              options=["-r", "25", "-y", "-b", "{bitrate}", "-f", "vob"]),
+
+	# H.264 in an MP4 container, fast to encode and a fraction of the size
+	"h264": dict(extension="mp4",
+	             vcodec="libx264",
+	             options=["-preset", "veryfast", "-crf", "23", "-y", "-movflags", "+faststart", "-f", "mp4"]),
+
+	# H.264 in an MP4 container, takes longer to encode for even smaller files
+	"h264_small": dict(extension="mp4",
+	                   vcodec="libx264",
+	                   options=["-preset", "medium", "-crf", "28", "-y", "-movflags", "+faststart", "-f", "mp4"])
+}
+DEFAULT_ENCODER_PRESET = "mpeg2"
+
+# post roll modes: copy the last frame, hardlink it or let ffmpeg repeat it while rendering
+POST_ROLL_MODE_COPY = "copy"
+POST_ROLL_MODE_HARDLINK = "hardlink"
+POST_ROLL_MODE_RENDER = "render"
 
 # old capture format, needed to delete old left-overs from
 # versions <1.2.9
@@ -97,40 +127,162 @@ def get_finished_timelapses():
 	return files
 
 
-def get_unrendered_timelapses():
-	global _job_lock
-	global current
+class UnrenderedTimelapseIndex(object):
+	"""
+	Index of the unrendered timelapses in the ``timelapse_tmp`` folder, tracking frame count, total size and oldest
+	modification time per prefix.
+
+	Built with a full scan of the folder on first use, then kept up to date incrementally through :meth:`adding_frame`
+	and :meth:`removing_matching`. If the folder gets modified by anything else, which is detected through its
+	modification time, the index gets rebuilt with a full scan on next access.
+	"""
+
+	def __init__(self):
+		self._mutex = threading.RLock()
+		self._basedir = None
+		self._basedir_mtime = None
+		self._jobs = None
 
-	delete_old_unrendered_timelapses()
+	def jobs(self):
+		"""
+		Returns:
+		    dict: Copies of the index entries, mapped by prefix, with the keys ``count``, ``bytes`` and ``timestamp``.
+		"""
+		basedir = settings().getBaseFolder("timelapse_tmp", check_writable=False)
 
-	basedir = settings().getBaseFolder("timelapse_tmp", check_writable=False)
-	jobs = collections.defaultdict(lambda: dict(count=0, size=None, bytes=0, date=None, timestamp=None))
+		with self._mutex:
+			if self._jobs is None or basedir != self._basedir or self._basedir_mtime is None \
+					or self._basedir_mtime != self._mtime(basedir):
+				self._scan(basedir)
+			return dict((prefix, dict(job)) for prefix, job in self._jobs.items())
 
-	for entry in scandir(basedir):
-		if not fnmatch.fnmatch(entry.name, "*.jpg"):
-			continue
+	@contextlib.contextmanager
+	def adding_frame(self, path):
+		"""
+		Context manager to wrap writing the frame at ``path`` in, adds the frame to the index once it's written.
 
-		prefix = _extract_prefix(entry.name)
+		The index stays locked while the frame gets written, so a concurrent :meth:`jobs` can't rescan the folder and
+		count the frame before it gets added.
+		"""
+		with self._mutex:
+			mtime = self._mtime(os.path.dirname(path))
+			yield
+			self._add_frame(path, mtime)
+
+	@contextlib.contextmanager
+	def removing_matching(self, pattern):
+		"""
+		Context manager to wrap deleting the frames matching the glob ``pattern`` in, removes all prefixes whose frames
+		match it from the index once they are deleted.
+		"""
+		with self._mutex:
+			mtime = self._mtime(self._basedir) if self._basedir is not None else None
+			yield
+			self._remove_matching(pattern, mtime)
+
+	def _add_frame(self, path, mtime):
+		prefix = _extract_prefix(os.path.basename(path))
 		if prefix is None:
-			continue
+			return
 
-		jobs[prefix]["count"] += 1
-		jobs[prefix]["bytes"] += entry.stat().st_size
-		if jobs[prefix]["timestamp"] is None or entry.stat().st_mtime < jobs[prefix]["timestamp"]:
-			jobs[prefix]["timestamp"] = entry.stat().st_mtime
+		if self._jobs is None or os.path.dirname(path) != self._basedir:
+			return
 
-	with _job_lock:
-		global current_render_job
+		if not self._unchanged_since(mtime):
+			return
+
+		try:
+			stat = os.stat(path)
+		except OSError:
+			self._jobs = None
+			return
+
+		job = self._jobs.get(prefix)
+		if job is None:
+			job = self._jobs[prefix] = dict(count=0, bytes=0, timestamp=None)
+		job["count"] += 1
+		job["bytes"] += stat.st_size
+		if job["timestamp"] is None or stat.st_mtime < job["timestamp"]:
+			job["timestamp"] = stat.st_mtime
 
+		self._basedir_mtime = self._mtime(self._basedir)
+
+	def _remove_matching(self, pattern, mtime):
+		if self._jobs is None:
+			return
+
+		if not self._unchanged_since(mtime):
+			return
+
+		for prefix in list(self._jobs.keys()):
+			if fnmatch.fnmatch(_capture_format.format(prefix=prefix) % 0, pattern):
+				del self._jobs[prefix]
+
+		self._basedir_mtime = self._mtime(self._basedir)
+
+	def _unchanged_since(self, mtime):
+		"""
+		Checks whether the folder's modification time from before our own change still matches the one the index was
+		last updated at. If not, something else changed the folder as well and the index gets rebuilt on next access.
+		"""
+		if mtime is None or mtime != self._basedir_mtime:
+			self._jobs = None
+			return False
+		return True
+
+	def _scan(self, basedir):
+		jobs = dict()
+
+		for entry in scandir(basedir):
+			if not fnmatch.fnmatch(entry.name, "*.jpg"):
+				continue
+
+			prefix = _extract_prefix(entry.name)
+			if prefix is None:
+				continue
+
+			stat = entry.stat()
+			job = jobs.get(prefix)
+			if job is None:
+				job = jobs[prefix] = dict(count=0, bytes=0, timestamp=None)
+			job["count"] += 1
+			job["bytes"] += stat.st_size
+			if job["timestamp"] is None or stat.st_mtime < job["timestamp"]:
+				job["timestamp"] = stat.st_mtime
+
+		self._basedir = basedir
+		self._jobs = jobs
+		self._basedir_mtime = self._mtime(basedir)
+
+	@staticmethod
+	def _mtime(path):
+		try:
+			return os.stat(path).st_mtime
+		except OSError:
+			return None
+
+
+_unrendered_index = UnrenderedTimelapseIndex()
+
+
+def get_unrendered_timelapses():
+	global _job_lock
+	global current
+
+	jobs = _unrendered_index.jobs()
+
+	with _job_lock:
 		def finalize_fields(prefix, job):
 			currently_recording = current is not None and current.prefix == prefix
-			currently_rendering = current_render_job is not None and current_render_job["prefix"] == prefix
+			currently_rendering = prefix in current_render_jobs
+			currently_queued = _render_queue is not None and _render_queue.is_queued(prefix)
 
 			job["size"] = util.get_formatted_size(job["bytes"])
 			job["date"] = util.get_formatted_datetime(datetime.datetime.fromtimestamp(job["timestamp"]))
 			job["recording"] = currently_recording
 			job["rendering"] = currently_rendering
-			job["processing"] = currently_recording or currently_rendering
+			job["queued"] = currently_queued
+			job["processing"] = currently_recording or currently_rendering or currently_queued
 			del job["timestamp"]
 
 			return job
@@ -144,7 +296,7 @@ def delete_unrendered_timelapse(name):
 	pattern = "{}*.jpg".format(util.glob_escape(name))
 
 	basedir = settings().getBaseFolder("timelapse_tmp")
-	with _cleanup_lock:
+	with _cleanup_lock, _unrendered_index.removing_matching(pattern):
 		for entry in scandir(basedir):
 			try:
 				if fnmatch.fnmatch(entry.name, pattern):
@@ -154,13 +306,31 @@ def delete_unrendered_timelapse(name):
 					logging.getLogger(__name__).exception("Error while processing file {} during cleanup".format(entry.name))
 
 
-def render_unrendered_timelapse(name, gcode=None, postfix=None, fps=None):
+def render_unrendered_timelapse(name, gcode=None, postfix=None, fps=None, post_roll_frames=0):
+	"""
+	Queues the unrendered timelapse ``name`` for rendering on the :func:`render_queue`.
+
+	Returns:
+	    bool: True if the timelapse was queued, False if it is already queued or rendering.
+	"""
 	capture_dir = settings().getBaseFolder("timelapse_tmp")
 	output_dir = settings().getBaseFolder("timelapse")
 
 	if fps is None:
 		fps = settings().getInt(["webcam", "timelapse", "fps"])
-	threads = settings().get(["webcam", "ffmpegThreads"])
+
+	encoder_preset = settings().get(["webcam", "renderPreset"])
+	if encoder_preset not in ENCODER_PRESETS:
+		logging.getLogger(__name__).warn("Unknown encoder preset {!r} configured, "
+		                                 "falling back to {}".format(encoder_preset, DEFAULT_ENCODER_PRESET))
+		encoder_preset = DEFAULT_ENCODER_PRESET
+
+	queue = render_queue()
+
+	threads = settings().getInt(["webcam", "ffmpegThreads"])
+	if not threads or threads < 1:
+		# auto detect, parallel renders share the available cores
+		threads = max(1, _cpu_count() // queue.concurrency)
 
 	job = TimelapseRenderJob(capture_dir, output_dir, name,
 	                         postfix=postfix,
@@ -168,11 +338,64 @@ def render_unrendered_timelapse(name, gcode=None, postfix=None, fps=None):
 	                         output_format=_output_format,
 	                         fps=fps,
 	                         threads=threads,
+	                         post_roll_frames=post_roll_frames,
+	                         encoder_preset=encoder_preset,
+	                         progress_interval=settings().getFloat(["webcam", "renderProgressInterval"]),
 	                         on_start=_create_render_start_handler(name, gcode=gcode),
+	                         on_progress=_create_render_progress_handler(name, gcode=gcode),
 	                         on_success=_create_render_success_handler(name, gcode=gcode),
 	                         on_fail=_create_render_fail_handler(name, gcode=gcode),
 	                         on_always=_create_render_always_handler(name, gcode=gcode))
-	job.process()
+	return queue.enqueue(job)
+
+
+def cancel_render(name):
+	"""
+	Cancels rendering of the timelapse ``name``, no matter if it is still queued or already rendering.
+
+	Returns:
+	    bool: True if a render job was cancelled, False if there was none for ``name``.
+	"""
+	if _render_queue is None:
+		return False
+	return _render_queue.cancel(name)
+
+
+_render_queue = None
+_render_queue_mutex = threading.Lock()
+
+
+def render_queue():
+	"""
+	Returns the :class:`TimelapseRenderQueue` that renders all timelapses, creating it with the configured concurrency
+	on first use. The queue gets paused while a print is running.
+
+	Returns:
+	    TimelapseRenderQueue: The render queue.
+	"""
+	global _render_queue
+	with _render_queue_mutex:
+		if _render_queue is None:
+			_render_queue = TimelapseRenderQueue(concurrency=settings().getInt(["webcam", "renderConcurrency"]))
+			for event in (Events.PRINT_STARTED, Events.PRINT_DONE, Events.PRINT_FAILED, Events.PRINT_CANCELLED,
+			              Events.DISCONNECTED):
+				eventManager().subscribe(event, _on_print_event)
+		return _render_queue
+
+
+def _on_print_event(event, payload):
+	# do not render while printing, those cpu cycles are needed elsewhere
+	if event == Events.PRINT_STARTED:
+		_render_queue.pause()
+	else:
+		_render_queue.resume()
+
+
+def _cpu_count():
+	try:
+		return multiprocessing.cpu_count()
+	except NotImplementedError:
+		return 1
 
 
 def delete_old_unrendered_timelapses():
@@ -210,6 +433,29 @@ def delete_old_unrendered_timelapses():
 			logging.getLogger(__name__).info("Deleted old unrendered timelapse {}".format(prefix))
 
 
+_cleanup_timer = None
+
+
+def start_cleanup_timer(interval):
+	"""
+	Starts a background task that deletes old unrendered timelapses every ``interval`` seconds, starting right away.
+	"""
+	global _cleanup_timer
+
+	if _cleanup_timer is not None:
+		return
+
+	def cleanup():
+		try:
+			delete_old_unrendered_timelapses()
+		except:
+			logging.getLogger(__name__).exception("Error while cleaning up old unrendered timelapses")
+
+	_cleanup_timer = util.RepeatedTimer(interval, cleanup, run_first=True)
+	_cleanup_timer.daemon = True
+	_cleanup_timer.start()
+
+
 def _create_render_start_handler(name, gcode=None):
 	def f(movie):
 		global _job_lock
@@ -222,10 +468,22 @@ def _create_render_start_handler(name, gcode=None):
 			               movie_prefix=name)
 			current_render_job = dict(prefix=name)
 			current_render_job.update(payload)
+			current_render_jobs[name] = current_render_job
 		eventManager().fire(Events.MOVIE_RENDERING, payload)
 	return f
 
 
+def _create_render_progress_handler(name, gcode=None):
+	def f(movie, progress):
+		payload = dict(gcode=gcode if gcode is not None else "unknown",
+		               movie=movie,
+		               movie_basename=os.path.basename(movie),
+		               movie_prefix=name,
+		               progress=progress)
+		eventManager().fire(Events.MOVIE_PROGRESS, payload)
+	return f
+
+
 def _create_render_success_handler(name, gcode=None):
 	def f(movie):
 		delete_unrendered_timelapse(name)
@@ -256,7 +514,11 @@ def _create_render_always_handler(name, gcode=None):
 		global current_render_job
 		global _job_lock
 		with _job_lock:
-			current_render_job = None
+			current_render_jobs.pop(name, None)
+			if current_render_jobs:
+				current_render_job = list(current_render_jobs.values())[-1]
+			else:
+				current_render_job = None
 	return f
 
 
@@ -345,6 +607,68 @@ def configure_timelapse(config=None, persist=False):
 		settings().save()
 
 
+class _DirectZChangeTrigger(PrinterCallback):
+	def __init__(self, printer):
+		self._printer = printer
+
+	def on_printer_z_change(self, new_z, old_z):
+		timelapse = current
+		if isinstance(timelapse, ZTimelapse):
+			timelapse.on_z_change(new_z, old_z, triggered=monotonic_time(), printing=self._printer.is_printing())
+
+
+_direct_z_change_trigger = None
+
+
+def enable_direct_z_change_trigger(printer):
+	"""
+	Triggers z-change timelapses directly from the position tracking of ``printer`` instead of through the ``ZChange``
+	event, which has to wait its turn in the event queue behind all other events and their handlers.
+
+	Needs to be called before the timelapse gets configured.
+
+	Arguments:
+	    printer (PrinterInterface): The printer to register with.
+	"""
+	global _direct_z_change_trigger
+	if _direct_z_change_trigger is not None:
+		return
+	_direct_z_change_trigger = _DirectZChangeTrigger(printer)
+	printer.register_callback(_direct_z_change_trigger)
+
+
+class CaptureLatency(object):
+	"""
+	Statistics of the latency between a capture being triggered and the snapshot having been received from the
+	webcam, in seconds.
+	"""
+
+	def __init__(self):
+		self._mutex = threading.Lock()
+		self.reset()
+
+	def reset(self):
+		with self._mutex:
+			self._count = 0
+			self._total = 0.0
+			self._max = 0.0
+			self._last = None
+
+	def add(self, latency):
+		with self._mutex:
+			self._count += 1
+			self._total += latency
+			self._max = max(self._max, latency)
+			self._last = latency
+
+	def as_dict(self):
+		with self._mutex:
+			return dict(count=self._count,
+			            last=self._last,
+			            average=self._total / self._count if self._count else None,
+			            max=self._max if self._count else None)
+
+
 class Timelapse(object):
 	QUEUE_ENTRY_TYPE_CAPTURE = "capture"
 	QUEUE_ENTRY_TYPE_CALLBACK = "callback"
@@ -358,10 +682,13 @@ class Timelapse(object):
 
 		self._capture_errors = 0
 		self._capture_success = 0
+		self._capture_latency = CaptureLatency()
 
 		self._post_roll = post_roll
 		self._post_roll_start = None
 		self._on_post_roll_done = None
+		self._post_roll_mode = settings().get(["webcam", "postRollMode"])
+		self._render_post_roll_frames = 0
 
 		self._capture_dir = settings().getBaseFolder("timelapse_tmp")
 		self._movie_dir = settings().getBaseFolder("timelapse")
@@ -384,7 +711,8 @@ class Timelapse(object):
 		eventManager().subscribe(Events.PRINT_FAILED, self.on_print_done)
 		eventManager().subscribe(Events.PRINT_DONE, self.on_print_done)
 		eventManager().subscribe(Events.PRINT_RESUMED, self.on_print_resumed)
-		for (event, callback) in self.event_subscriptions():
+		self._event_subscriptions = self.event_subscriptions()
+		for (event, callback) in self._event_subscriptions:
 			eventManager().subscribe(event, callback)
 
 	@property
@@ -399,6 +727,14 @@ class Timelapse(object):
 	def fps(self):
 		return self._fps
 
+	@property
+	def capture_latency(self):
+		"""
+		Statistics of the latency between triggering a capture and receiving the snapshot for the current or last
+		timelapse, as a dict with keys ``count``, ``last``, ``average`` and ``max``, in seconds.
+		"""
+		return self._capture_latency.as_dict()
+
 	def unload(self):
 		if self._in_timelapse:
 			self.stop_timelapse(do_create_movie=False)
@@ -408,7 +744,7 @@ class Timelapse(object):
 		eventManager().unsubscribe(Events.PRINT_FAILED, self.on_print_done)
 		eventManager().unsubscribe(Events.PRINT_DONE, self.on_print_done)
 		eventManager().unsubscribe(Events.PRINT_RESUMED, self.on_print_resumed)
-		for (event, callback) in self.event_subscriptions():
+		for (event, callback) in self._event_subscriptions:
 			eventManager().unsubscribe(event, callback)
 
 	def on_print_started(self, event, payload):
@@ -458,6 +794,8 @@ class Timelapse(object):
 		self._image_number = 0
 		self._capture_errors = 0
 		self._capture_success = 0
+		self._capture_latency.reset()
+		self._render_post_roll_frames = 0
 		self._in_timelapse = True
 		self._gcode_file = os.path.basename(gcodeFile)
 		self._file_prefix = "{}_{}".format(os.path.splitext(self._gcode_file)[0], time.strftime("%Y%m%d%H%M%S"))
@@ -467,6 +805,14 @@ class Timelapse(object):
 
 		self._in_timelapse = False
 
+		latency = self._capture_latency.as_dict()
+		if latency["count"]:
+			self._logger.info("Trigger to capture latency of timelapse {}: {:.0f}ms on average, {:.0f}ms at most "
+			                  "over {} captures".format(self._file_prefix,
+			                                            latency["average"] * 1000,
+			                                            latency["max"] * 1000,
+			                                            latency["count"]))
+
 		def reset_image_number():
 			self._image_number = None
 
@@ -474,7 +820,8 @@ class Timelapse(object):
 			render_unrendered_timelapse(self._file_prefix,
 			                            gcode=self._gcode_file,
 			                            postfix=None if success else "-fail",
-			                            fps=self._fps)
+			                            fps=self._fps,
+			                            post_roll_frames=self._render_post_roll_frames)
 
 		def reset_and_create():
 			reset_image_number()
@@ -540,7 +887,17 @@ class Timelapse(object):
 			if self._on_post_roll_done is not None:
 				self._on_post_roll_done()
 
-	def capture_image(self):
+	def capture_image(self, triggered=None):
+		"""
+		Queues capturing a new frame.
+
+		Arguments:
+		    triggered (float): Monotonic time at which the capture was triggered, defaults to now. Used to track the
+		        trigger to capture latency.
+		"""
+		if triggered is None:
+			triggered = monotonic_time()
+
 		if self._capture_dir is None:
 			self._logger.warn("Cannot capture image, capture directory is unset")
 			return
@@ -556,7 +913,8 @@ class Timelapse(object):
 		self._logger.debug("Capturing image to {}".format(filename))
 		entry = dict(type=self.__class__.QUEUE_ENTRY_TYPE_CAPTURE,
 		             filename=filename,
-		             onerror=self._on_capture_error)
+		             onerror=self._on_capture_error,
+		             triggered=triggered)
 		self._capture_queue.put(entry)
 		return filename
 
@@ -572,28 +930,29 @@ class Timelapse(object):
 			if entry["type"] == self.__class__.QUEUE_ENTRY_TYPE_CAPTURE and "filename" in entry:
 				filename = entry["filename"]
 				onerror = entry.pop("onerror", None)
-				self._perform_capture(filename, onerror=onerror)
+				self._perform_capture(filename, onerror=onerror, triggered=entry.get("triggered"))
 
 			elif entry["type"] == self.__class__.QUEUE_ENTRY_TYPE_CALLBACK and "callback" in entry:
 				args = entry.pop("args", [])
 				kwargs = entry.pop("kwargs", dict())
 				entry["callback"](*args, **kwargs)
 
-	def _perform_capture(self, filename, onerror=None):
+	def _perform_capture(self, filename, onerror=None, triggered=None):
 		eventManager().fire(Events.CAPTURE_START, dict(file=filename))
+		latency = None
 		try:
 			self._logger.debug("Going to capture {} from {}".format(filename, self._snapshot_url))
-			r = requests.get(self._snapshot_url,
-			                 stream=True,
-			                 timeout=self._snapshot_timeout,
-			                 verify=self._snapshot_validate_ssl)
-			r.raise_for_status()
-
-			with open (filename, "wb") as f:
-				for chunk in r.iter_content(chunk_size=1024):
-					if chunk:
-						f.write(chunk)
-						f.flush()
+			snapshot = snapshot_service().fetch(self._snapshot_url,
+			                                    timeout=self._snapshot_timeout,
+			                                    verify=self._snapshot_validate_ssl)
+
+			if triggered is not None:
+				latency = snapshot.timestamp - triggered
+				self._capture_latency.add(latency)
+
+			with _unrendered_index.adding_frame(filename):
+				with open(filename, "wb") as f:
+					f.write(snapshot.data)
 
 			self._logger.debug("Image {} captured from {}".format(filename, self._snapshot_url))
 		except Exception as e:
@@ -606,7 +965,7 @@ class Timelapse(object):
 			self._capture_errors += 1
 			return False
 		else:
-			eventManager().fire(Events.CAPTURE_DONE, dict(file=filename))
+			eventManager().fire(Events.CAPTURE_DONE, dict(file=filename, latency=latency))
 			self._capture_success += 1
 			return True
 
@@ -616,12 +975,30 @@ class Timelapse(object):
 			                        _capture_format.format(prefix=self._file_prefix) % self._image_number)
 			self._image_number += 1
 
-		if self._perform_capture(filename):
-			for _ in range(self._post_roll * self._fps):
-				newFile = os.path.join(self._capture_dir,
-				                       _capture_format.format(prefix=self._file_prefix) % self._image_number)
-				self._image_number += 1
-				shutil.copyfile(filename, newFile)
+		if not self._perform_capture(filename):
+			return
+
+		frames = self._post_roll * self._fps
+		if self._post_roll_mode == POST_ROLL_MODE_RENDER:
+			# no files at all, the render job repeats the last frame
+			self._render_post_roll_frames = frames
+			return
+
+		link = self._post_roll_mode == POST_ROLL_MODE_HARDLINK and hasattr(os, "link")
+		for _ in range(frames):
+			newFile = os.path.join(self._capture_dir,
+			                       _capture_format.format(prefix=self._file_prefix) % self._image_number)
+			self._image_number += 1
+
+			with _unrendered_index.adding_frame(newFile):
+				if link:
+					try:
+						os.link(filename, newFile)
+					except OSError:
+						self._logger.info("Could not hardlink post roll frames in {}, copying them instead".format(self._capture_dir))
+						link = False
+				if not link:
+					shutil.copyfile(filename, newFile)
 
 	def clean_capture_dir(self):
 		if not os.path.isdir(self._capture_dir):
@@ -632,6 +1009,8 @@ class Timelapse(object):
 
 
 class ZTimelapse(Timelapse):
+	MAX_PENDING_Z_CHANGES = 100
+
 	def __init__(self, retraction_zhop=0, min_delay=5.0, post_roll=0, fps=25):
 		Timelapse.__init__(self, post_roll=post_roll, fps=fps)
 
@@ -641,6 +1020,12 @@ class ZTimelapse(Timelapse):
 		self._retraction_zhop = retraction_zhop
 		self._min_delay = min_delay
 		self._last_snapshot = None
+
+		# z changes of a running print that were triggered directly before the queued PrintStarted event started
+		# the timelapse
+		self._z_change_mutex = threading.RLock()
+		self._pending_z_changes = []
+
 		self._logger.debug("ZTimelapse initialized")
 
 	@property
@@ -652,6 +1037,9 @@ class ZTimelapse(Timelapse):
 		return self._min_delay
 
 	def event_subscriptions(self):
+		if _direct_z_change_trigger is not None:
+			# triggered directly by the printer
+			return []
 		return [
 			(Events.Z_CHANGE, self._on_z_change)
 		]
@@ -670,22 +1058,61 @@ class ZTimelapse(Timelapse):
 		self._copying_postroll()
 		Timelapse.process_post_roll(self)
 
-	def _on_z_change(self, event, payload):
-		# check if height difference equals z-hop, if so don't take a picture
-		if self._retraction_zhop != 0 and payload["old"] is not None and payload["new"] is not None:
-			diff = round(abs(payload["new"] - payload["old"]), 3)
-			zhop = round(self._retraction_zhop, 3)
-			if diff == zhop:
+	def start_timelapse(self, gcodeFile):
+		with self._z_change_mutex:
+			Timelapse.start_timelapse(self, gcodeFile)
+
+			# catch up on the z changes the print already made while the PrintStarted event was still queued
+			pending, self._pending_z_changes = self._pending_z_changes, []
+			for new_z, old_z, triggered in pending:
+				self.on_z_change(new_z, old_z, triggered=triggered)
+
+	def stop_timelapse(self, do_create_movie=True, success=True):
+		with self._z_change_mutex:
+			self._pending_z_changes = []
+		Timelapse.stop_timelapse(self, do_create_movie=do_create_movie, success=success)
+
+	def on_z_change(self, new_z, old_z, triggered=None, printing=False):
+		"""
+		Triggers a capture for a change of the Z position from ``old_z`` to ``new_z``, unless it's a retraction z-hop
+		or the last capture was less than the minimum delay ago.
+
+		Called from the communication thread if triggered directly, so all work beyond the checks is handed off to
+		the capture queue. Since that's ahead of the queued ``PrintStarted`` event, z changes of a running print that
+		arrive before the timelapse got started are kept and replayed once it is.
+
+		Arguments:
+		    new_z (float): The new Z position.
+		    old_z (float): The previous Z position, may be None.
+		    triggered (float): Monotonic time at which the Z change was detected, defaults to now.
+		    printing (bool): Whether the printer is printing, only needed if triggered directly.
+		"""
+		if triggered is None:
+			triggered = monotonic_time()
+
+		with self._z_change_mutex:
+			if not self._in_timelapse:
+				if printing and len(self._pending_z_changes) < self.MAX_PENDING_Z_CHANGES:
+					self._pending_z_changes.append((new_z, old_z, triggered))
 				return
 
-		# check if last picture has been less than min_delay ago, if so don't take a picture (anti vase mode...)
-		now = monotonic_time()
-		if self._min_delay and self._last_snapshot and self._last_snapshot + self._min_delay > now:
-			self._logger.debug("Rate limited z-change, not taking a snapshot")
-			return
+			# check if height difference equals z-hop, if so don't take a picture
+			if self._retraction_zhop != 0 and old_z is not None and new_z is not None:
+				diff = round(abs(new_z - old_z), 3)
+				zhop = round(self._retraction_zhop, 3)
+				if diff == zhop:
+					return
 
-		self.capture_image()
-		self._last_snapshot = now
+			# check if last picture has been less than min_delay ago, if so don't take a picture (anti vase mode...)
+			if self._min_delay and self._last_snapshot and self._last_snapshot + self._min_delay > triggered:
+				self._logger.debug("Rate limited z-change, not taking a snapshot")
+				return
+
+			self.capture_image(triggered=triggered)
+			self._last_snapshot = triggered
+
+	def _on_z_change(self, event, payload):
+		self.on_z_change(payload["new"], payload["old"])
 
 
 class TimedTimelapse(Timelapse):
@@ -737,13 +1164,142 @@ class TimedTimelapse(Timelapse):
 		self._timer = None
 
 
-class TimelapseRenderJob(object):
+class TimelapseRenderQueue(object):
+	"""
+	Renders queued :class:`TimelapseRenderJob` instances, up to ``concurrency`` of them in parallel.
+
+	Just like the analysis queue the render queue gets paused while a print is running. Pausing aborts all running
+	render jobs and puts them back at the front of the queue, to start over once the queue gets resumed.
+
+	Arguments:
+	    concurrency (int): Number of timelapses to render in parallel.
+	"""
+
+	def __init__(self, concurrency=1):
+		self._logger = logging.getLogger(__name__)
+
+		self._concurrency = max(1, concurrency or 1)
+		self._condition = threading.Condition()
+		self._queue = collections.deque()
+		self._running = collections.OrderedDict()
+		self._active = True
+
+		for i in range(self._concurrency):
+			worker = threading.Thread(target=self._work, name="TimelapseRenderQueue_{}".format(i))
+			worker.daemon = True
+			worker.start()
+
+	@property
+	def concurrency(self):
+		return self._concurrency
+
+	def enqueue(self, job):
+		"""
+		Enqueues ``job`` for rendering.
+
+		Arguments:
+		    job (TimelapseRenderJob): The job to render.
+
+		Returns:
+		    bool: True if the job was queued, False if a job for the same timelapse is already queued or rendering.
+		"""
+		with self._condition:
+			if job.prefix in self._running or self._find_queued(job.prefix) is not None:
+				self._logger.info("Timelapse {} is already queued for rendering".format(job.prefix))
+				return False
+
+			self._logger.debug("Adding timelapse {} to render queue".format(job.prefix))
+			self._queue.append(job)
+			self._condition.notify()
+			return True
+
+	def cancel(self, prefix):
+		"""
+		Cancels rendering of the timelapse ``prefix``, removing it from the queue or aborting the running render job.
+
+		Returns:
+		    bool: True if a job was cancelled, False if no job for ``prefix`` is queued or rendering.
+		"""
+		with self._condition:
+			job = self._find_queued(prefix)
+			if job is not None:
+				self._queue.remove(job)
+			else:
+				job = self._running.get(prefix)
+
+		if job is None:
+			return False
+
+		self._logger.info("Cancelling rendering of timelapse {}".format(prefix))
+		job.cancel()
+		return True
+
+	def is_queued(self, prefix):
+		with self._condition:
+			return self._find_queued(prefix) is not None
+
+	def is_rendering(self, prefix):
+		with self._condition:
+			return prefix in self._running
 
-	render_job_lock = threading.RLock()
+	def pause(self):
+		"""
+		Pauses processing of the queue, e.g. when a print is active.
+		"""
+		with self._condition:
+			if not self._active:
+				return
+			self._logger.debug("Pausing render queue")
+			self._active = False
+			running = list(self._running.values())
+
+		for job in running:
+			self._logger.info("Aborting rendering of timelapse {}, will restart when render queue is resumed".format(job.prefix))
+			job.cancel(reenqueue=True)
+
+	def resume(self):
+		"""
+		Resumes processing of the queue, e.g. when a print has finished.
+		"""
+		with self._condition:
+			if self._active:
+				return
+			self._logger.debug("Resuming render queue")
+			self._active = True
+			self._condition.notify_all()
+
+	def _find_queued(self, prefix):
+		for job in self._queue:
+			if job.prefix == prefix:
+				return job
+		return None
+
+	def _work(self):
+		while True:
+			with self._condition:
+				while not self._active or not self._queue:
+					self._condition.wait()
+				job = self._queue.popleft()
+				job._reset()
+				self._running[job.prefix] = job
+
+			try:
+				job.render()
+			except:
+				self._logger.exception("Error while rendering timelapse {}".format(job.prefix))
+			finally:
+				with self._condition:
+					self._running.pop(job.prefix, None)
+					if job.reenqueue:
+						self._queue.appendleft(job)
+
+
+class TimelapseRenderJob(object):
 
 	def __init__(self, capture_dir, output_dir, prefix, postfix=None, capture_glob="{prefix}-*.jpg",
-	             capture_format="{prefix}-%d.jpg", output_format="{prefix}{postfix}.mpg", fps=25, threads=1,
-	             on_start=None, on_success=None, on_fail=None, on_always=None):
+	             capture_format="{prefix}-%d.jpg", output_format="{prefix}{postfix}.{extension}", fps=25, threads=1,
+	             post_roll_frames=0, encoder_preset=DEFAULT_ENCODER_PRESET, progress_interval=1.0, on_start=None,
+	             on_progress=None, on_success=None, on_fail=None, on_always=None):
 		self._capture_dir = capture_dir
 		self._output_dir = output_dir
 		self._prefix = prefix
@@ -753,25 +1309,82 @@ class TimelapseRenderJob(object):
 		self._output_format = output_format
 		self._fps = fps
 		self._threads = threads
+		self._post_roll_frames = post_roll_frames
+		self._encoder_preset = encoder_preset
+		self._progress_interval = progress_interval
 		self._on_start = on_start
+		self._on_progress = on_progress
 		self._on_success = on_success
 		self._on_fail = on_fail
 		self._on_always = on_always
 
+		self._mutex = threading.Lock()
+		self._started = False
+		self._cancelled = False
+		self._reenqueue = False
+		self._command = None
+
+		self._last_progress = None
+		self._last_progress_time = None
+
 		self._thread = None
 		self._logger = logging.getLogger(__name__)
 
+	@property
+	def prefix(self):
+		return self._prefix
+
+	@property
+	def output(self):
+		"""Absolute path of the movie file to render to."""
+		preset = ENCODER_PRESETS.get(self._encoder_preset, ENCODER_PRESETS[DEFAULT_ENCODER_PRESET])
+		return os.path.join(self._output_dir,
+		                    self._output_format.format(prefix=self._prefix,
+		                                               postfix=self._postfix if self._postfix is not None else "",
+		                                               extension=preset["extension"]))
+
+	@property
+	def reenqueue(self):
+		"""Whether the job got aborted and needs to be rendered again."""
+		with self._mutex:
+			return self._cancelled and self._reenqueue
+
 	def process(self):
-		"""Processes the job."""
+		"""Processes the job in a separate thread, bypassing the render queue."""
 
-		self._thread = threading.Thread(target=self._render,
+		self._thread = threading.Thread(target=self.render,
 		                                name="TimelapseRenderJob_{prefix}_{postfix}".format(prefix=self._prefix,
 		                                                                                    postfix=self._postfix))
 		self._thread.daemon = True
 		self._thread.start()
 
-	def _render(self):
-		"""Rendering runnable."""
+	def cancel(self, reenqueue=False):
+		"""
+		Cancels the job. A running ffmpeg process gets terminated and the partially rendered movie removed.
+
+		Arguments:
+		    reenqueue (bool): Whether the job is only aborted to be rendered again later (True) or cancelled for good
+		        (False). A running render is reported as failure with reason ``paused`` in the former case and with
+		        reason ``cancelled`` in the latter, a job that wasn't rendering yet only if cancelled for good.
+		"""
+		with self._mutex:
+			self._cancelled = True
+			self._reenqueue = reenqueue
+			command = self._command
+			started = self._started
+
+		if command is not None:
+			self._terminate(command)
+		elif not started and not reenqueue:
+			self._notify_callback("fail", self.output, returncode=0, stdout="", stderr="", reason="cancelled")
+
+	def render(self):
+		"""Renders the movie, blocking until ffmpeg is done or the job got cancelled."""
+
+		with self._mutex:
+			if self._cancelled:
+				return
+			self._started = True
 
 		ffmpeg = settings().get(["webcam", "ffmpeg"])
 		bitrate = settings().get(["webcam", "bitrate"])
@@ -782,9 +1395,7 @@ class TimelapseRenderJob(object):
 		input = os.path.join(self._capture_dir,
 		                     self._capture_format.format(prefix=self._prefix,
 		                                                 postfix=self._postfix if self._postfix is not None else ""))
-		output = os.path.join(self._output_dir,
-		                      self._output_format.format(prefix=self._prefix,
-		                                                 postfix=self._postfix if self._postfix is not None else ""))
+		output = self.output
 
 		for i in range(4):
 			if os.path.exists(input % i):
@@ -808,30 +1419,154 @@ class TimelapseRenderJob(object):
 
 		# prepare ffmpeg command
 		command_str = self._create_ffmpeg_command_string(ffmpeg, self._fps, bitrate, self._threads, input, output,
-		                                                 hflip=hflip, vflip=vflip, rotate=rotate, watermark=watermark)
+		                                                 hflip=hflip, vflip=vflip, rotate=rotate, watermark=watermark,
+		                                                 post_roll_frames=self._post_roll_frames,
+		                                                 encoder_preset=self._encoder_preset, progress=True)
 		self._logger.debug("Executing command: {}".format(command_str))
 
-		with self.render_job_lock:
-			try:
-				self._notify_callback("start", output)
-				p = sarge.run(command_str, stdout=sarge.Capture(), stderr=sarge.Capture())
-				if p.returncode == 0:
-					self._notify_callback("success", output)
-				else:
-					returncode = p.returncode
-					stdout_text = p.stdout.text
-					stderr_text = p.stderr.text
-					self._logger.warn("Could not render movie, got return code %r: %s" % (returncode, stderr_text))
-					self._notify_callback("fail", output, returncode=returncode, stdout=stdout_text, stderr=stderr_text, reason="returncode")
-			except:
-				self._logger.exception("Could not render movie due to unknown error")
-				self._notify_callback("fail", output, reason="unknown")
-			finally:
-				self._notify_callback("always", output)
+		duration = (self._count_frames() + self._post_roll_frames) / float(self._fps)
+
+		try:
+			self._notify_callback("start", output)
+			returncode, stdout_text, stderr_text = self._run(command_str, output, duration)
+
+			with self._mutex:
+				cancelled = self._cancelled
+				reenqueue = self._reenqueue
+
+			if cancelled:
+				self._remove_partial(output)
+				# rendering was already announced, so it has to be ended, even if it's going to start over later
+				self._notify_callback("fail", output, returncode=returncode, stdout=stdout_text, stderr=stderr_text,
+				                      reason="paused" if reenqueue else "cancelled")
+			elif returncode == 0:
+				self._notify_callback("success", output)
+			else:
+				self._logger.warn("Could not render movie, got return code %r: %s" % (returncode, stderr_text))
+				self._notify_callback("fail", output, returncode=returncode, stdout=stdout_text, stderr=stderr_text, reason="returncode")
+		except:
+			self._logger.exception("Could not render movie due to unknown error")
+			self._notify_callback("fail", output, reason="unknown")
+		finally:
+			with self._mutex:
+				self._command = None
+			self._notify_callback("always", output)
+
+	def _run(self, command_str, output, duration):
+		p = sarge.run(command_str, async=True, stdout=sarge.Capture(), stderr=sarge.Capture())
+		while len(p.commands) == 0:
+			# somewhat ugly... we can't use wait_events because
+			# the events might not be all set if an exception
+			# by sarge is triggered within the async process
+			# thread
+			time.sleep(0.01)
+
+		# by now we should have a command, let's wait for its
+		# process to have been prepared
+		p.commands[0].process_ready.wait()
+
+		if not p.commands[0].process:
+			# the process might have been set to None in case of any exception
+			raise RuntimeError(u"Error while trying to run command {}".format(command_str))
+
+		with self._mutex:
+			self._command = p.commands[0]
+			cancelled = self._cancelled
+		if cancelled:
+			# cancelled while we were starting up
+			self._terminate(p.commands[0])
+
+		stdout = []
+		try:
+			while p.returncode is None:
+				stdout += self._process_progress(p.stdout.readlines(timeout=0.5), output, duration)
+				p.commands[0].poll()
+		finally:
+			p.close()
+		stdout += self._process_progress(p.stdout.readlines(), output, duration)
+
+		return p.returncode, "".join(stdout), p.stderr.text
+
+	def _process_progress(self, lines, output, duration):
+		lines = [util.to_unicode(line, errors="replace") for line in lines]
+		for line in lines:
+			progress = self._parse_progress(line, duration)
+			if progress is None:
+				continue
+
+			# throttle reported progress, ffmpeg reports it twice per second
+			now = monotonic_time()
+			if progress == self._last_progress \
+					or (self._last_progress_time is not None and now - self._last_progress_time < self._progress_interval):
+				continue
+			self._last_progress = progress
+			self._last_progress_time = now
+			self._notify_callback("progress", output, progress)
+		return lines
+
+	def _count_frames(self):
+		pattern = self._capture_glob.format(prefix=util.glob_escape(self._prefix))
+		try:
+			return sum(1 for entry in scandir(self._capture_dir) if fnmatch.fnmatch(entry.name, pattern))
+		except OSError:
+			return 0
+
+	def _terminate(self, command):
+		try:
+			command.terminate()
+		except:
+			self._logger.exception("Error while terminating ffmpeg for timelapse {}".format(self._prefix))
+
+	def _remove_partial(self, output):
+		try:
+			if os.path.exists(output):
+				os.remove(output)
+		except:
+			self._logger.exception("Error while removing partially rendered movie {}".format(output))
+
+	def _reset(self):
+		with self._mutex:
+			self._started = False
+			self._cancelled = False
+			self._reenqueue = False
+			self._command = None
+			self._last_progress = None
+			self._last_progress_time = None
+
+	@classmethod
+	def _parse_progress(cls, line, duration):
+		"""
+		Parses a line of ffmpeg's ``-progress`` output.
+
+		Arguments:
+		    line (str): The output line.
+		    duration (float): Expected duration of the movie, in seconds.
+
+		Returns:
+		    (int or None): The render progress in percent if ``line`` reports the current position, None otherwise.
+		"""
+
+		### See unit tests in test/timelapse/test_timelapse_renderjob.py
+
+		key, _, value = line.strip().partition("=")
+		if key == "progress" and value == "end":
+			return 100
+
+		# despite the name out_time_ms is in microseconds as well, newer ffmpeg versions also report out_time_us
+		if key not in ("out_time_us", "out_time_ms") or duration <= 0:
+			return None
+
+		try:
+			position = int(value) / 1000000.0
+		except ValueError:
+			# N/A at the beginning of the render
+			return None
+		return max(0, min(100, int(position * 100 / duration)))
 
 	@classmethod
 	def _create_ffmpeg_command_string(cls, ffmpeg, fps, bitrate, threads, input, output, hflip=False, vflip=False,
-	                                  rotate=False, watermark=None, pixfmt="yuv420p"):
+	                                  rotate=False, watermark=None, pixfmt="yuv420p", post_roll_frames=0,
+	                                  encoder_preset=DEFAULT_ENCODER_PRESET, progress=False):
 		"""
 		Create ffmpeg command string based on input parameters.
 
@@ -847,6 +1582,9 @@ class TimelapseRenderJob(object):
 		    rotate (bool): Perform 90° CCW rotation on input material.
 		    watermark (str): Path to watermark to apply to lower left corner.
 		    pixfmt (str): Pixel format to use for output. Default of yuv420p should usually fit the bill.
+		    post_roll_frames (int): Number of times to repeat the last frame at the end of the movie.
+		    encoder_preset (str): Name of the entry in :data:`ENCODER_PRESETS` to encode the movie with.
+		    progress (bool): Whether to make ffmpeg report its progress on stdout.
 
 		Returns:
 		    (str): Prepared command string to render `input` to `output` using ffmpeg.
@@ -856,15 +1594,19 @@ class TimelapseRenderJob(object):
 
 		logger = logging.getLogger(__name__)
 
-		command = [
-			ffmpeg, '-framerate', str(fps), '-loglevel', 'error', '-i', '"{}"'.format(input), '-vcodec', 'mpeg2video',
-			'-threads', str(threads), '-r', "25", '-y', '-b', str(bitrate),
-			'-f', 'vob']
+		preset = ENCODER_PRESETS.get(encoder_preset, ENCODER_PRESETS[DEFAULT_ENCODER_PRESET])
+
+		command = [ffmpeg, '-framerate', str(fps), '-loglevel', 'error']
+		if progress:
+			command.extend(['-progress', 'pipe:1'])
+		command.extend(['-i', '"{}"'.format(input), '-vcodec', preset["vcodec"], '-threads', str(threads)])
+		command.extend([option.format(bitrate=bitrate) for option in preset["options"]])
 
 		filter_string = cls._create_filter_string(hflip=hflip,
 		                                          vflip=vflip,
 		                                          rotate=rotate,
-		                                          watermark=watermark)
+		                                          watermark=watermark,
+		                                          post_roll_frames=post_roll_frames)
 
 		if filter_string is not None:
 			logger.debug("Applying videofilter chain: {}".format(filter_string))
@@ -877,7 +1619,8 @@ class TimelapseRenderJob(object):
 		return " ".join(command)
 
 	@classmethod
-	def _create_filter_string(cls, hflip=False, vflip=False, rotate=False, watermark=None, pixfmt="yuv420p"):
+	def _create_filter_string(cls, hflip=False, vflip=False, rotate=False, watermark=None, pixfmt="yuv420p",
+	                          post_roll_frames=0):
 		"""
 		Creates an ffmpeg filter string based on input parameters.
 
@@ -887,6 +1630,8 @@ class TimelapseRenderJob(object):
 		    rotate (bool): Perform 90° CCW rotation on input material.
 		    watermark (str): Path to watermark to apply to lower left corner.
 		    pixfmt (str): Pixel format to use, defaults to "yuv420p" which should usually fit the bill
+		    post_roll_frames (int): Number of times to repeat the last frame at the end of the movie, requires
+		        ffmpeg 4.2 or newer.
 
 		Returns:
 		    (str or None): filter string or None if no filters are required
@@ -905,6 +1650,10 @@ class TimelapseRenderJob(object):
 		if rotate:
 			filters.append('transpose=2')
 
+		# extend the last frame for the post roll
+		if post_roll_frames > 0:
+			filters.append('tpad=stop_mode=clone:stop={}'.format(post_roll_frames))
+
 		# add watermark if configured
 		watermark_filter = None
 		if watermark is not None:
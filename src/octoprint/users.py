@@ -9,7 +9,10 @@ from flask_login import UserMixin
 from flask_principal import Identity
 from werkzeug.local import LocalProxy
 import hashlib
+import io
+import json
 import os
+import threading
 import yaml
 import uuid
 
@@ -20,11 +23,13 @@ from builtins import range, bytes
 
 from octoprint.settings import settings
 
-from octoprint.util import atomic_write, to_str, deprecated
+from octoprint.util import atomic_write, to_str, deprecated, silent_remove
 
 class UserManager(object):
 	valid_roles = ["user", "admin"]
 
+	_salt_cache = None
+
 	def __init__(self):
 		self._logger = logging.getLogger(__name__)
 		self._session_users_by_session = dict()
@@ -107,17 +112,30 @@ class UserManager(object):
 	@staticmethod
 	def createPasswordHash(password, salt=None):
 		if not salt:
-			salt = settings().get(["accessControl", "salt"])
-			if salt is None:
-				import string
-				from random import choice
-				chars = string.ascii_lowercase + string.ascii_uppercase + string.digits
-				salt = "".join(choice(chars) for _ in range(32))
-				settings().set(["accessControl", "salt"], salt)
-				settings().save()
+			salt = UserManager._get_salt()
 
 		return hashlib.sha512(to_str(password, encoding="utf-8", errors="replace") + to_str(salt)).hexdigest()
 
+	@staticmethod
+	def _get_salt():
+		# the salt never changes once it has been created, so there's no need to look it up on every login
+		s = settings()
+		cached = UserManager._salt_cache
+		if cached is not None and cached[0] is s:
+			return cached[1]
+
+		salt = s.get(["accessControl", "salt"])
+		if salt is None:
+			import string
+			from random import choice
+			chars = string.ascii_lowercase + string.ascii_uppercase + string.digits
+			salt = "".join(choice(chars) for _ in range(32))
+			s.set(["accessControl", "salt"], salt)
+			s.save()
+
+		UserManager._salt_cache = (s, salt)
+		return salt
+
 	def checkPassword(self, username, password):
 		user = self.findUser(username)
 		if not user:
@@ -193,6 +211,17 @@ class UserManager(object):
 ##~~ FilebasedUserManager, takes available users from users.yaml file
 
 class FilebasedUserManager(UserManager):
+	"""
+	Stores users in ``users.yaml``.
+
+	Changes to single users are not written by rewriting the whole file, instead the user's new record gets appended
+	to a journal next to it (``users.yaml.journal``). On load the journal gets replayed on top of ``users.yaml``.
+	Once the journal contains :attr:`JOURNAL_COMPACTION_THRESHOLD` records, and whenever users are loaded, it gets
+	compacted into ``users.yaml`` again.
+	"""
+
+	JOURNAL_COMPACTION_THRESHOLD = 100
+
 	def __init__(self):
 		UserManager.__init__(self)
 
@@ -200,51 +229,136 @@ class FilebasedUserManager(UserManager):
 		if userfile is None:
 			userfile = os.path.join(settings().getBaseFolder("base"), "users.yaml")
 		self._userfile = userfile
+		self._journalfile = userfile + ".journal"
+		self._journal_records = 0
+		self._compaction_pending = False
 		self._users = {}
+		self._users_by_apikey = {}
 		self._dirty = False
+		self._mutex = threading.RLock()
 
 		self._customized = None
 		self._load()
 
 	def _load(self):
-		if os.path.exists(self._userfile) and os.path.isfile(self._userfile):
-			self._customized = True
-			with open(self._userfile, "r") as f:
-				data = yaml.safe_load(f)
-				for name in data.keys():
-					attributes = data[name]
-					apikey = None
-					if "apikey" in attributes:
-						apikey = attributes["apikey"]
-					settings = dict()
-					if "settings" in attributes:
-						settings = attributes["settings"]
-					self._users[name] = User(name, attributes["password"], attributes["active"], attributes["roles"], apikey=apikey, settings=settings)
-					for sessionid in self._sessionids_by_userid.get(name, set()):
-						if sessionid in self._session_users_by_session:
-							self._session_users_by_session[sessionid].update_user(self._users[name])
-		else:
-			self._customized = False
+		with self._mutex:
+			if os.path.exists(self._userfile) and os.path.isfile(self._userfile):
+				self._customized = True
+				with open(self._userfile, "r") as f:
+					data = yaml.safe_load(f)
+					for name in data.keys():
+						self._set_user_from_record(name, data[name])
+			else:
+				self._customized = False
+
+			replayed = self._replay_journal()
+			if replayed:
+				self._customized = True
+
+			self._index_apikeys()
+
+			if replayed:
+				# fold the journal back into the user file - the journal stays valid if that fails, so don't let
+				# that stop us from starting up, we'll simply try again on the next change
+				self._journal_records = replayed
+				try:
+					self._save(force=True)
+				except:
+					self._logger.exception("Could not compact user journal {} into {}, will retry on the next "
+					                       "change".format(self._journalfile, self._userfile))
+					self._compaction_pending = True
+
+	def _set_user_from_record(self, name, attributes):
+		apikey = None
+		if "apikey" in attributes:
+			apikey = attributes["apikey"]
+		settings = dict()
+		if "settings" in attributes and attributes["settings"] is not None:
+			settings = attributes["settings"]
+		self._users[name] = User(name, attributes["password"], attributes["active"], attributes["roles"], apikey=apikey, settings=settings)
+		self._update_session_users(name)
+
+	def _update_session_users(self, name):
+		for sessionid in self._sessionids_by_userid.get(name, set()):
+			if sessionid in self._session_users_by_session:
+				self._session_users_by_session[sessionid].update_user(self._users[name])
+
+	def _user_record(self, user):
+		return {
+			"password": user._passwordHash,
+			"active": user._active,
+			"roles": user._roles,
+			"apikey": user._apikey,
+			"settings": user._settings
+		}
+
+	def _replay_journal(self):
+		if not os.path.isfile(self._journalfile):
+			return 0
+
+		replayed = 0
+		with io.open(self._journalfile, "rt", encoding="utf-8") as f:
+			for line in f:
+				try:
+					entry = json.loads(line)
+					name = entry["name"]
+					record = entry["user"]
+				except (ValueError, KeyError, TypeError):
+					# most likely an incomplete last line due to a crash while writing, skip it
+					self._logger.warn("Skipping invalid record in user journal {}".format(self._journalfile))
+					continue
+
+				if record is None:
+					self._users.pop(name, None)
+				else:
+					self._set_user_from_record(name, record)
+				replayed += 1
+		return replayed
+
+	def _index_apikeys(self):
+		# API keys are looked up on every API request, so we don't want to scan all users for them
+		self._users_by_apikey = dict((user._apikey, user) for user in self._users.values() if user._apikey)
 
 	def _save(self, force=False):
+		"""Writes all users to the user file, emptying the journal."""
 		if not self._dirty and not force:
 			return
 
-		data = {}
-		for name in self._users.keys():
-			user = self._users[name]
-			data[name] = {
-				"password": user._passwordHash,
-				"active": user._active,
-				"roles": user._roles,
-				"apikey": user._apikey,
-				"settings": user._settings
-			}
-
-		with atomic_write(self._userfile, "wb", permissions=0o600, max_permissions=0o666) as f:
-			yaml.safe_dump(data, f, default_flow_style=False, indent="    ", allow_unicode=True)
-			self._dirty = False
-		self._load()
+		with self._mutex:
+			data = {}
+			for name in self._users.keys():
+				data[name] = self._user_record(self._users[name])
+
+			with atomic_write(self._userfile, "wb", permissions=0o600, max_permissions=0o666) as f:
+				yaml.safe_dump(data, f, default_flow_style=False, indent="    ", allow_unicode=True)
+				self._dirty = False
+
+			silent_remove(self._journalfile)
+			self._journal_records = 0
+			self._compaction_pending = False
+			self._customized = True
+			self._index_apikeys()
+
+	def _save_user(self, username):
+		"""Persists the current state of user ``username``, or its removal if it doesn't exist anymore."""
+		with self._mutex:
+			self._index_apikeys()
+
+			if not os.path.exists(self._userfile) or self._compaction_pending \
+					or self._journal_records + 1 >= self.JOURNAL_COMPACTION_THRESHOLD:
+				self._save(force=True)
+				return
+
+			user = self._users.get(username)
+			line = json.dumps(dict(name=username, user=self._user_record(user) if user is not None else None))
+
+			fd = os.open(self._journalfile, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+			try:
+				os.write(fd, line.encode("utf-8") + b"\n")
+				os.fsync(fd)
+			finally:
+				os.close(fd)
+			self._journal_records += 1
 
 	def addUser(self, username, password, active=False, roles=None, apikey=None, overwrite=False):
 		if not roles:
@@ -254,8 +368,8 @@ class FilebasedUserManager(UserManager):
 			raise UserAlreadyExists(username)
 
 		self._users[username] = User(username, UserManager.createPasswordHash(password), active, roles, apikey=apikey)
-		self._dirty = True
-		self._save()
+		self._update_session_users(username)
+		self._save_user(username)
 
 	def changeUserActivation(self, username, active):
 		if not username in self._users.keys():
@@ -263,8 +377,7 @@ class FilebasedUserManager(UserManager):
 
 		if self._users[username]._active != active:
 			self._users[username]._active = active
-			self._dirty = True
-			self._save()
+			self._save_user(username)
 
 	def changeUserRoles(self, username, roles):
 		if not username in self._users.keys():
@@ -283,22 +396,26 @@ class FilebasedUserManager(UserManager):
 			raise UnknownUser(username)
 
 		user = self._users[username]
+		changed = False
 		for role in roles:
 			if not role in user._roles:
 				user._roles.append(role)
-				self._dirty = True
-		self._save()
+				changed = True
+		if changed:
+			self._save_user(username)
 
 	def removeRolesFromUser(self, username, roles):
 		if not username in self._users.keys():
 			raise UnknownUser(username)
 
 		user = self._users[username]
+		changed = False
 		for role in roles:
 			if role in user._roles:
 				user._roles.remove(role)
-				self._dirty = True
-		self._save()
+				changed = True
+		if changed:
+			self._save_user(username)
 
 	def changeUserPassword(self, username, password):
 		if not username in self._users.keys():
@@ -308,8 +425,7 @@ class FilebasedUserManager(UserManager):
 		user = self._users[username]
 		if user._passwordHash != passwordHash:
 			user._passwordHash = passwordHash
-			self._dirty = True
-			self._save()
+			self._save_user(username)
 
 	def changeUserSetting(self, username, key, value):
 		if not username in self._users.keys():
@@ -319,19 +435,21 @@ class FilebasedUserManager(UserManager):
 		old_value = user.get_setting(key)
 		if not old_value or old_value != value:
 			user.set_setting(key, value)
-			self._dirty = self._dirty or old_value != value
-			self._save()
+			if old_value != value:
+				self._save_user(username)
 
 	def changeUserSettings(self, username, new_settings):
 		if not username in self._users:
 			raise UnknownUser(username)
 
 		user = self._users[username]
+		changed = False
 		for key, value in new_settings.items():
 			old_value = user.get_setting(key)
 			user.set_setting(key, value)
-			self._dirty = self._dirty or old_value != value
-		self._save()
+			changed = changed or old_value != value
+		if changed:
+			self._save_user(username)
 
 	def getAllUserSettings(self, username):
 		if not username in self._users.keys():
@@ -353,8 +471,7 @@ class FilebasedUserManager(UserManager):
 
 		user = self._users[username]
 		user._apikey = ''.join('%02X' % z for z in bytes(uuid.uuid4().bytes))
-		self._dirty = True
-		self._save()
+		self._save_user(username)
 		return user._apikey
 
 	def deleteApikey(self, username):
@@ -363,8 +480,7 @@ class FilebasedUserManager(UserManager):
 
 		user = self._users[username]
 		user._apikey = None
-		self._dirty = True
-		self._save()
+		self._save_user(username)
 
 	def removeUser(self, username):
 		UserManager.removeUser(self, username)
@@ -373,8 +489,7 @@ class FilebasedUserManager(UserManager):
 			raise UnknownUser(username)
 
 		del self._users[username]
-		self._dirty = True
-		self._save()
+		self._save_user(username)
 
 	def findUser(self, userid=None, apikey=None, session=None):
 		user = UserManager.findUser(self, userid=userid, session=session)
@@ -388,10 +503,7 @@ class FilebasedUserManager(UserManager):
 			return self._users[userid]
 
 		elif apikey is not None:
-			for user in self._users.values():
-				if apikey == user._apikey:
-					return user
-			return None
+			return self._users_by_apikey.get(apikey)
 
 		else:
 			return None
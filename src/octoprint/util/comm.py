@@ -495,6 +495,7 @@ class MachineCom(object):
 			sent=self._pluginManager.get_hooks("octoprint.comm.protocol.gcode.sent")
 		)
 		self._received_message_hooks = self._pluginManager.get_hooks("octoprint.comm.protocol.gcode.received")
+		self._received_patterns = self._get_received_patterns(self._pluginManager.get_hooks("octoprint.comm.protocol.gcode.received.patterns"))
 		self._error_message_hooks = self._pluginManager.get_hooks("octoprint.comm.protocol.gcode.error")
 		self._atcommand_hooks = dict(
 			queuing=self._pluginManager.get_hooks("octoprint.comm.protocol.atcommand.queuing"),
@@ -2635,8 +2636,35 @@ class MachineCom(object):
 				if ret is None:
 					return ""
 
+		if ret and self._received_patterns:
+			self._received_patterns.match(self, ret)
+
 		return ret
 
+	def _get_received_patterns(self, hooks):
+		patterns = ReceivedLinePatterns()
+		for name, hook in hooks.items():
+			try:
+				subscriptions = hook(self)
+			except:
+				self._logger.exception("Error while retrieving received line patterns from hook {name}:".format(**locals()))
+				continue
+
+			if not subscriptions:
+				continue
+
+			for subscription in subscriptions:
+				try:
+					patterns.add(subscription["pattern"],
+					             subscription["callback"],
+					             regex=subscription.get("regex", False),
+					             ignorecase=subscription.get("ignorecase", False),
+					             name=name)
+				except (KeyError, TypeError, AttributeError, ValueError) as e:
+					self._logger.warn("Ignoring invalid received line pattern from hook {}: {}".format(name, e))
+
+		return patterns
+
 	def _get_next_from_job(self):
 		if self._currentFile is None:
 			return None, None, None
@@ -4429,7 +4457,7 @@ def gcode_and_subcode_for_cmd(cmd):
 		gcode = values["codeGM"]
 	elif "codeT" in values and values["codeT"]:
 		gcode = values["codeT"]
-	elif settings().getBoolean(["serial", "supportFAsCommand"]) and "codeF" in values and values["codeF"]:
+	elif settings().snapshot().getBoolean(["serial", "supportFAsCommand"]) and "codeF" in values and values["codeF"]:
 		gcode = values["codeF"]
 	else:
 		# this should never happen
@@ -4597,6 +4625,102 @@ def _normalize_command_handler_result(command, command_type, gcode, subcode, tag
 	return result
 
 
+class ReceivedLinePatterns(object):
+	"""
+	Matches received lines against patterns, calling the subscribed callback of each matching pattern.
+
+	Patterns are compiled into one combined regular expression per set of flags, so a line matching none of them -
+	the vast majority of lines - costs a single search per set of flags, no matter the number of patterns. Only if the
+	combined expression finds a match are the individual patterns checked, so that every subscriber whose pattern
+	matches gets called. Regular expressions containing groups can't be combined safely and are checked on their own.
+
+	Callbacks are called with the comm instance, the received line and the match object of their pattern.
+	"""
+
+	def __init__(self):
+		self._logger = logging.getLogger(__name__)
+		self._subscriptions = []
+		self._matchers = None
+
+	def __len__(self):
+		return len(self._subscriptions)
+
+	def add(self, pattern, callback, regex=False, ignorecase=False, name=None):
+		"""
+		Subscribes ``callback`` to received lines matching ``pattern``.
+
+		Arguments:
+		    pattern (str): The pattern to look for anywhere in the line.
+		    callback (callable): The callback to call for matching lines.
+		    regex (bool): Whether ``pattern`` is a regular expression (True) or a literal string (False).
+		    ignorecase (bool): Whether to match case insensitively.
+		    name (str): Name of the subscriber, used for logging.
+
+		Raises:
+		    ValueError: If ``callback`` is not callable or ``pattern`` is not a valid regular expression.
+		"""
+		if not callable(callback):
+			raise ValueError("callback must be callable")
+
+		if not regex:
+			pattern = re.escape(pattern)
+		flags = re.IGNORECASE if ignorecase else 0
+
+		try:
+			compiled = re.compile(pattern, flags)
+		except re.error as e:
+			raise ValueError("Invalid pattern {!r}: {}".format(pattern, e))
+
+		self._subscriptions.append((compiled, callback, name))
+		self._matchers = None
+
+	def match(self, comm_instance, line):
+		"""
+		Calls the callbacks of all patterns matching ``line``.
+
+		Returns:
+		    int: The number of matching patterns.
+		"""
+		if self._matchers is None:
+			self._matchers = self._compile()
+
+		matched = 0
+		for combined, subscriptions in self._matchers:
+			if combined is not None and not combined.search(line):
+				continue
+
+			for compiled, callback, name in subscriptions:
+				match = compiled.search(line)
+				if not match:
+					continue
+
+				matched += 1
+				try:
+					callback(comm_instance, line, match)
+				except:
+					self._logger.exception("Error while calling received line callback of {}:".format(name))
+
+		return matched
+
+	def _compile(self):
+		by_flags = dict()
+		individual = []
+		for subscription in self._subscriptions:
+			compiled = subscription[0]
+			if compiled.groups:
+				individual.append((None, [subscription]))
+			else:
+				by_flags.setdefault(compiled.flags, []).append(subscription)
+
+		matchers = []
+		for flags, subscriptions in by_flags.items():
+			combined = re.compile("|".join(map(lambda subscription: "(?:{pattern})".format(pattern=subscription[0].pattern),
+			                                   subscriptions)),
+			                      flags)
+			matchers.append((combined, subscriptions))
+		return matchers + individual
+
+
 class QueueMarker(object):
 
 	def __init__(self, callback):
@@ -206,19 +206,19 @@ class gcode(object):
 		            maxY=self._minMax.max.y,
 		            maxZ=self._minMax.max.z)
 
-	def load(self, filename, throttle=None, speedx=6000, speedy=6000, offsets=None, max_extruders=10, g90_extruder=False):
+	def load(self, filename, throttle=None, speedx=6000, speedy=6000, offsets=None, max_extruders=10, g90_extruder=False, toolpath=None, kinematics=None):
 		if os.path.isfile(filename):
 			self.filename = filename
 			self._fileSize = os.stat(filename).st_size
 
 			with codecs.open(filename, encoding="utf-8", errors="replace") as f:
-				self._load(f, throttle=throttle, speedx=speedx, speedy=speedy, offsets=offsets, max_extruders=max_extruders, g90_extruder=g90_extruder)
+				self._load(f, throttle=throttle, speedx=speedx, speedy=speedy, offsets=offsets, max_extruders=max_extruders, g90_extruder=g90_extruder, toolpath=toolpath, kinematics=kinematics)
 
 	def abort(self, reenqueue=True):
 		self._abort = True
 		self._reenqueue = reenqueue
 
-	def _load(self, gcodeFile, throttle=None, speedx=6000, speedy=6000, offsets=None, max_extruders=10, g90_extruder=False):
+	def _load(self, gcodeFile, throttle=None, speedx=6000, speedy=6000, offsets=None, max_extruders=10, g90_extruder=False, toolpath=None, kinematics=None):
 		lineNo = 0
 		readBytes = 0
 		pos = Vector3D(0.0, 0.0, 0.0)
@@ -247,6 +247,7 @@ class gcode(object):
 			if self._abort:
 				raise AnalysisAborted(reenqueue=self._reenqueue)
 			lineNo += 1
+			lineStart = readBytes
 			readBytes += len(line.encode("utf-8"))
 
 			if isinstance(gcodeFile, (file, codecs.StreamReaderWriter)):
@@ -353,14 +354,21 @@ class gcode(object):
 					else:
 						e = 0.0
 
-					# move time in x, y, z, will be 0 if no movement happened
-					moveTimeXYZ = abs((oldPos - pos).length / feedrate)
+					if toolpath is not None:
+						toolpath.move(oldPos, pos, e, currentExtruder, lineStart, elapsed=totalMoveTimeMinute * 60)
 
-					# time needed for extruding, will be 0 if no extrusion happened
-					extrudeTime = abs(e / feedrate)
+					if kinematics is not None:
+						# time gets calculated by the kinematic model once it has seen the moves that follow
+						kinematics.add(pos.x - oldPos.x, pos.y - oldPos.y, pos.z - oldPos.z, e, feedrate)
+					else:
+						# move time in x, y, z, will be 0 if no movement happened
+						moveTimeXYZ = abs((oldPos - pos).length / feedrate)
+
+						# time needed for extruding, will be 0 if no extrusion happened
+						extrudeTime = abs(e / feedrate)
 
-					# time to add is maximum of both
-					totalMoveTimeMinute += max(moveTimeXYZ, extrudeTime)
+						# time to add is maximum of both
+						totalMoveTimeMinute += max(moveTimeXYZ, extrudeTime)
 
 				elif G == 4:	#Delay
 					S = getCodeFloat(line, 'S')
@@ -464,6 +472,8 @@ class gcode(object):
 
 			if throttle is not None:
 				throttle(lineNo, readBytes)
+		if kinematics is not None:
+			totalMoveTimeMinute += kinematics.finish() / 60.0
 		if self._progress_callback is not None:
 			self._progress_callback(100.0)
 
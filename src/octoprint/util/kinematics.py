@@ -0,0 +1,338 @@
+# coding=utf-8
+"""
+This module contains a kinematic print time model for the GCODE analysis.
+
+Instead of assuming every move is done at its full feedrate, the model plans the moves like a firmware with a classic
+jerk based planner would: Every move gets a trapezoidal velocity profile, accelerating from its entry speed to its
+cruise speed and decelerating to its exit speed, with the speed at the junction of two moves limited by the jerk
+settings of the axes and by how fast the neighbouring moves can accelerate or decelerate.
+
+Moves are collected into column arrays and planned in chunks, so memory stays bounded no matter the file size.
+Planning is vectorized with `NumPy <http://www.numpy.org/>`_. The pure Python implementation of the same planner is
+only a reference, it slows the whole analysis down by about a third compared to the simple feedrate based estimate,
+so the GCODE analysis only uses the model if NumPy is installed, see :func:`available`.
+
+.. autofunction:: available
+
+.. autoclass:: KinematicModel
+   :members:
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import array
+import collections
+import math
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+AXES = ("x", "y", "z", "e")
+
+DEFAULT_SPEED = dict(x=6000.0, y=6000.0, z=200.0, e=300.0)
+"""Default maximum feedrate per axis, in mm/min."""
+
+DEFAULT_ACCELERATION = dict(x=1000.0, y=1000.0, z=100.0, e=3000.0)
+"""Default maximum acceleration per axis, in mm/s²."""
+
+DEFAULT_JERK = dict(x=10.0, y=10.0, z=0.4, e=5.0)
+"""Default maximum instantaneous speed change per axis, in mm/s."""
+
+CHUNK_SIZE = 16384
+
+
+def available():
+	"""
+	Returns:
+	    bool: Whether the kinematic model is fast enough to be used by the GCODE analysis, which is only the case if
+	        NumPy is installed.
+	"""
+	return numpy is not None
+
+
+class KinematicModel(object):
+	"""
+	Estimates the time needed for a sequence of moves based on trapezoidal velocity profiles.
+
+	Arguments:
+	    speed (dict): Maximum feedrate per axis ``x``, ``y``, ``z`` and ``e``, in mm/min, like the axes speeds of a
+	        printer profile. Missing axes default to :data:`DEFAULT_SPEED`.
+	    acceleration (dict): Maximum acceleration per axis, in mm/s². Missing axes default to
+	        :data:`DEFAULT_ACCELERATION`.
+	    jerk (dict): Maximum instantaneous speed change per axis, in mm/s. Missing axes default to
+	        :data:`DEFAULT_JERK`.
+	    chunk_size (int): Number of moves to plan at once.
+	    vectorized (bool): Whether to plan with NumPy. Defaults to True if NumPy is available. Planning without it is
+	        considerably slower.
+	"""
+
+	def __init__(self, speed=None, acceleration=None, jerk=None, chunk_size=CHUNK_SIZE, vectorized=None):
+		def limits(values, defaults, factor=1.0):
+			values = values or dict()
+			return [float(values.get(axis) or defaults[axis]) * factor for axis in AXES]
+
+		self._speed = limits(speed, DEFAULT_SPEED, factor=1 / 60)
+		self._acceleration = limits(acceleration, DEFAULT_ACCELERATION)
+		self._jerk = limits(jerk, DEFAULT_JERK)
+
+		self._chunk_size = max(2, chunk_size)
+		self._vectorized = numpy is not None if vectorized is None else vectorized and numpy is not None
+
+		# dx, dy, dz, de in mm and feedrate in mm/s of the moves not yet planned
+		self._columns = [array.array("d") for _ in range(len(AXES) + 1)]
+
+		# the first unplanned move might already have been entered by its predecessor
+		self._entry = None
+		self._direction = (0.0,) * len(AXES)
+
+		self._moves = 0
+		self._planned = 0
+		self._elapsed = 0.0
+		self._markers = collections.deque()
+
+	@property
+	def vectorized(self):
+		return self._vectorized
+
+	@property
+	def elapsed(self):
+		"""
+		Returns:
+		    float: Time needed for all planned moves, in seconds. Only includes all moves after :meth:`finish`.
+		"""
+		return self._elapsed
+
+	def add(self, dx, dy, dz, de, feedrate):
+		"""
+		Adds a move.
+
+		Arguments:
+		    dx (float): Distance to move along X, in mm.
+		    dy (float): Distance to move along Y, in mm.
+		    dz (float): Distance to move along Z, in mm.
+		    de (float): Filament to extrude, in mm, negative for retractions.
+		    feedrate (float): Requested feedrate, in mm/min.
+		"""
+		if not dx and not dy and not dz and not de:
+			return
+
+		columns = self._columns
+		columns[0].append(dx)
+		columns[1].append(dy)
+		columns[2].append(dz)
+		columns[3].append(de)
+		columns[4].append(feedrate / 60)
+		self._moves += 1
+
+		if len(columns[0]) >= self._chunk_size:
+			self._plan(final=False)
+
+	def mark(self, offset=0.0):
+		"""
+		Creates a marker for the time needed for all moves added so far, which gets resolved once those moves are
+		planned.
+
+		Arguments:
+		    offset (float): Time to add to the marker's value, e.g. for dwells, in seconds.
+
+		Returns:
+		    Marker: The marker. Convert it with ``float()`` to get its value.
+		"""
+		marker = Marker(self._moves, offset)
+		if self._moves <= self._planned:
+			marker.resolve(self._elapsed)
+		else:
+			self._markers.append(marker)
+		return marker
+
+	def finish(self):
+		"""
+		Plans all remaining moves, decelerating to a stop at the end of the last one.
+
+		Returns:
+		    float: Time needed for all moves, in seconds.
+		"""
+		self._plan(final=True)
+		return self._elapsed
+
+	def _plan(self, final):
+		count = len(self._columns[0])
+		if not count or (not final and count < 2):
+			return
+
+		# elapsed[i] is the time needed for the first i moves of the chunk
+		if self._vectorized:
+			elapsed, exit_speed, direction = self._plan_vectorized(final)
+		else:
+			elapsed, exit_speed, direction = self._plan_python(final)
+
+		# without the full picture of what comes next, the last move stays for the next chunk
+		planned = count if final else count - 1
+
+		markers = self._markers
+		while markers and markers[0].index <= self._planned + planned:
+			marker = markers.popleft()
+			marker.resolve(self._elapsed + float(elapsed[marker.index - self._planned]))
+
+		self._elapsed += float(elapsed[planned])
+		self._planned += planned
+		self._entry = exit_speed
+		self._direction = direction
+
+		self._columns = [array.array("d", column[planned:]) for column in self._columns]
+
+	def _plan_vectorized(self, final):
+		dx, dy, dz, de, feedrate = [numpy.frombuffer(column, dtype=numpy.float64) for column in self._columns]
+		count = len(dx)
+
+		deltas = numpy.stack((dx, dy, dz, de), axis=1)
+		length = numpy.sqrt(dx * dx + dy * dy + dz * dz)
+
+		# extrusion only moves move along E alone
+		length = numpy.where(length > 0, length, numpy.abs(de))
+		direction = deltas / length[:, None]
+		magnitude = numpy.abs(direction)
+
+		with numpy.errstate(divide="ignore"):
+			speed = numpy.minimum(feedrate, numpy.min(numpy.array(self._speed) / magnitude, axis=1))
+			acceleration = numpy.min(numpy.array(self._acceleration) / magnitude, axis=1)
+
+			# junctions between the moves, with a standstill before the first and after the last move
+			directions = numpy.vstack((numpy.array(self._direction)[None, :], direction,
+			                           numpy.zeros((1, len(AXES)))))
+			change = numpy.abs(numpy.diff(directions, axis=0))
+			jerk_speed = numpy.min(numpy.array(self._jerk) / change, axis=1)
+
+		neighbour_speed = numpy.minimum(numpy.concatenate(((numpy.inf,), speed)),
+		                                numpy.concatenate((speed, (numpy.inf,))))
+		caps = numpy.minimum(jerk_speed, neighbour_speed) ** 2
+		if self._entry is not None:
+			caps[0] = self._entry ** 2
+		if not final:
+			caps[-1] = speed[-1] ** 2
+
+		# the speed at each junction must be reachable from its predecessor and allow reaching its successor,
+		# w[j] = min(caps[j], w[j - 1] + b[j]) is a min-plus scan and can be solved in closed form through the
+		# cumulative sum of b
+		reach = 2 * acceleration * length
+		squared = self._scan_vectorized(caps, reach)
+		squared = self._scan_vectorized(squared[::-1], reach[::-1])[::-1]
+
+		times = self._times_vectorized(numpy.sqrt(squared[:-1]), numpy.sqrt(squared[1:]), speed, acceleration,
+		                               length)
+		elapsed = numpy.concatenate(((0.0,), numpy.cumsum(times)))
+		if not final:
+			return elapsed, math.sqrt(squared[count - 1]), tuple(direction[count - 2])
+		return elapsed, None, tuple(direction[count - 1])
+
+	@staticmethod
+	def _scan_vectorized(caps, reach):
+		reached = numpy.concatenate(((0.0,), numpy.cumsum(reach)))
+		return numpy.minimum.accumulate(caps - reached) + reached
+
+	@staticmethod
+	def _times_vectorized(entry, exit, speed, acceleration, length):
+		peak = numpy.sqrt(numpy.maximum((acceleration * length + (entry * entry + exit * exit) / 2), 0))
+		cruise = numpy.minimum(peak, speed)
+
+		accelerating = (cruise * cruise - entry * entry) / (2 * acceleration)
+		decelerating = (cruise * cruise - exit * exit) / (2 * acceleration)
+		cruising = numpy.maximum(length - accelerating - decelerating, 0)
+
+		return (cruise - entry) / acceleration + (cruise - exit) / acceleration + cruising / cruise
+
+	def _plan_python(self, final):
+		moves = list(zip(*self._columns))
+		count = len(moves)
+
+		speeds = []
+		accelerations = []
+		lengths = []
+		directions = [self._direction]
+		for dx, dy, dz, de, feedrate in moves:
+			length = math.sqrt(dx * dx + dy * dy + dz * dz) or abs(de)
+			direction = (dx / length, dy / length, dz / length, de / length)
+
+			speed = feedrate
+			acceleration = float("inf")
+			for component, max_speed, max_acceleration in zip(direction, self._speed, self._acceleration):
+				if component:
+					speed = min(speed, max_speed / abs(component))
+					acceleration = min(acceleration, max_acceleration / abs(component))
+
+			speeds.append(speed)
+			accelerations.append(acceleration)
+			lengths.append(length)
+			directions.append(direction)
+		directions.append((0.0,) * len(AXES))
+
+		caps = []
+		for junction in range(count + 1):
+			cap = float("inf")
+			for before, after, jerk in zip(directions[junction], directions[junction + 1], self._jerk):
+				change = abs(after - before)
+				if change:
+					cap = min(cap, jerk / change)
+			if junction > 0:
+				cap = min(cap, speeds[junction - 1])
+			if junction < count:
+				cap = min(cap, speeds[junction])
+			caps.append(cap * cap)
+		if self._entry is not None:
+			caps[0] = self._entry ** 2
+		if not final:
+			caps[-1] = speeds[-1] ** 2
+
+		squared = caps
+		for junction in range(1, count + 1):
+			squared[junction] = min(squared[junction],
+			                        squared[junction - 1] + 2 * accelerations[junction - 1] * lengths[junction - 1])
+		for junction in range(count - 1, -1, -1):
+			squared[junction] = min(squared[junction],
+			                        squared[junction + 1] + 2 * accelerations[junction] * lengths[junction])
+
+		elapsed = [0.0]
+		for move in range(count if final else count - 1):
+			entry = math.sqrt(squared[move])
+			exit = math.sqrt(squared[move + 1])
+			acceleration = accelerations[move]
+			length = lengths[move]
+
+			peak = math.sqrt(max(acceleration * length + (entry * entry + exit * exit) / 2, 0))
+			cruise = min(peak, speeds[move])
+
+			accelerating = (cruise * cruise - entry * entry) / (2 * acceleration)
+			decelerating = (cruise * cruise - exit * exit) / (2 * acceleration)
+			cruising = max(length - accelerating - decelerating, 0)
+
+			elapsed.append(elapsed[-1]
+			               + (cruise - entry) / acceleration + (cruise - exit) / acceleration + cruising / cruise)
+
+		if not final:
+			return elapsed, math.sqrt(squared[count - 1]), directions[count - 1]
+		return elapsed, None, directions[count]
+
+
+class Marker(object):
+	"""
+	The time needed for all moves added to a :class:`KinematicModel` up to a certain point, available through
+	``float()`` once those moves have been planned.
+	"""
+
+	def __init__(self, index, offset):
+		self.index = index
+		self._offset = offset
+		self._value = None
+
+	def resolve(self, elapsed):
+		self._value = elapsed + self._offset
+
+	def __float__(self):
+		if self._value is None:
+			raise ValueError("Marker has not been resolved yet")
+		return self._value
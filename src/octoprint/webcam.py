@@ -0,0 +1,144 @@
+# coding=utf-8
+"""
+This module contains the snapshot service shared by everything in OctoPrint that fetches still images from the
+configured webcam, e.g. the snapshot proxy route and the timelapse capture.
+
+.. autoclass:: SnapshotService
+   :members:
+
+.. autoclass:: Snapshot
+   :members:
+
+.. autofunction:: snapshot_service
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import logging
+import threading
+from collections import namedtuple
+
+import requests
+import requests.adapters
+import requests.structures
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from octoprint.util import monotonic_time
+
+
+Snapshot = namedtuple("Snapshot", "data, content_type, headers, timestamp")
+"""
+A snapshot fetched from the webcam.
+
+Attributes:
+    data (bytes): The image data.
+    content_type (str): The content type reported by the webcam.
+    headers (dict): The response headers reported by the webcam, case insensitive.
+    timestamp (float): Monotonic time at which the snapshot was received.
+"""
+
+
+class SnapshotService(object):
+	"""
+	Fetches webcam snapshots through a pooled HTTP session.
+
+	Concurrent requests for the same URL share a single in-flight fetch, and a snapshot that is at most ``max_age``
+	seconds old gets served from the cache instead of being fetched again. This keeps several clients polling the
+	snapshot URL plus a running timelapse from overloading the webcam server.
+
+	Arguments:
+	    workers (int): Maximum number of snapshots to fetch in parallel (for different URLs).
+	"""
+
+	def __init__(self, workers=4):
+		self._logger = logging.getLogger(__name__)
+
+		self._session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+		self._session.mount("http://", adapter)
+		self._session.mount("https://", adapter)
+
+		self._executor = ThreadPoolExecutor(max_workers=workers)
+
+		self._mutex = threading.Lock()
+		self._in_flight = dict()
+		self._cache = dict()
+
+	def fetch(self, url, timeout=5, verify=True, max_age=0):
+		"""
+		Fetches a snapshot from ``url``, blocking until it is available.
+
+		Arguments:
+		    url (str): URL of the snapshot.
+		    timeout (float): Timeout for the request to the webcam, in seconds.
+		    verify (bool): Whether to validate SSL certificates.
+		    max_age (float): Maximum age of a cached snapshot to return instead of fetching a new one, in seconds. If
+		        set to 0, only an already running fetch will be shared.
+
+		Returns:
+		    Snapshot: The snapshot.
+
+		Raises:
+		    requests.exceptions.RequestException: The snapshot could not be fetched.
+		"""
+		return self.fetch_async(url, timeout=timeout, verify=verify, max_age=max_age).result()
+
+	def fetch_async(self, url, timeout=5, verify=True, max_age=0):
+		"""
+		Like :meth:`fetch`, but returns a :class:`~concurrent.futures.Future` resolving to the :class:`Snapshot`
+		instead of blocking.
+		"""
+		with self._mutex:
+			cached = self._cache.get(url)
+			if cached is not None and max_age > 0 and monotonic_time() - cached.timestamp <= max_age:
+				future = Future()
+				future.set_result(cached)
+				return future
+
+			future = self._in_flight.get(url)
+			if future is None:
+				future = self._executor.submit(self._fetch, url, timeout, verify)
+				self._in_flight[url] = future
+			return future
+
+	def clear(self):
+		"""Drops all cached snapshots."""
+		with self._mutex:
+			self._cache.clear()
+
+	def _fetch(self, url, timeout, verify):
+		snapshot = None
+		try:
+			self._logger.debug("Fetching snapshot from {}".format(url))
+			r = self._session.get(url, timeout=timeout, verify=verify)
+			r.raise_for_status()
+			snapshot = Snapshot(data=r.content,
+			                    content_type=r.headers.get("Content-Type"),
+			                    headers=requests.structures.CaseInsensitiveDict(r.headers),
+			                    timestamp=monotonic_time())
+			return snapshot
+		finally:
+			# update state before the future resolves, so callers coming after a waiter never see it in flight
+			with self._mutex:
+				self._in_flight.pop(url, None)
+				if snapshot is not None:
+					self._cache[url] = snapshot
+
+
+_instance = None
+_instance_mutex = threading.Lock()
+
+
+def snapshot_service():
+	"""
+	Returns:
+	    SnapshotService: The shared :class:`SnapshotService` instance.
+	"""
+	global _instance
+	with _instance_mutex:
+		if _instance is None:
+			_instance = SnapshotService()
+		return _instance
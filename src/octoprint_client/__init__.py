@@ -5,8 +5,16 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 __copyright__ = "Copyright (C) 2015 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
 
-import requests
+import collections
+import io
+import json
+import os
+import random
+import threading
 import time
+import uuid
+
+import requests
 
 
 def build_base_url(https=False, httpuser=None, httppass=None, host=None, port=None, prefix=None):
@@ -19,6 +27,51 @@ def build_base_url(https=False, httpuser=None, httppass=None, host=None, port=No
 	return "{}://{}{}{}{}".format(protocol, httpauth, host, port, prefix)
 
 
+def build_socket_url(baseurl):
+	"""
+	Creates the websocket URL of the SockJS socket of the server at ``baseurl``, with a random server and session id.
+	"""
+	# creates websocket URL for SockJS according to
+	# - http://sockjs.github.io/sockjs-protocol/sockjs-protocol-0.3.3.html#section-37
+	# - http://sockjs.github.io/sockjs-protocol/sockjs-protocol-0.3.3.html#section-50
+	return "{}://{}/sockjs/{:0>3d}/{}/websocket".format(
+		"wss" if baseurl.startswith("https:") else "ws",
+		baseurl[baseurl.find("//") + 2:], # host + port + prefix, but no protocol
+		random.randrange(0, stop=999),    # server_id
+		uuid.uuid4()                      # session_id
+	)
+
+
+def parse_socket_frame(frame):
+	"""
+	Parses a SockJS frame received from the server's socket.
+
+	Arguments:
+	    frame (str): The frame.
+
+	Returns:
+	    tuple: The frame type, ``o`` for open, ``h`` for heartbeat, ``a`` or ``m`` for messages and ``c`` for close,
+	        and a list of ``(message type, payload)`` tuples of the messages contained in the frame.
+	"""
+	frame_type = frame[0] if frame else None
+	if frame_type not in ("a", "m") or not frame[1:]:
+		return frame_type, []
+
+	data = json.loads(frame[1:])
+	if frame_type == "m":
+		data = [data,]
+
+	messages = []
+	for d in data:
+		messages += d.items()
+	return frame_type, messages
+
+
+def create_socket_frame(message):
+	"""Creates a SockJS frame for sending ``message`` to the server."""
+	return json.dumps([json.dumps(message)])
+
+
 class SocketTimeout(BaseException):
 	pass
 
@@ -209,32 +262,232 @@ class SocketClient(object):
 		# a reconnect, that's a failure
 		return False
 
-class Client(object):
+def create_session(retries=3, backoff_factor=0.5, pool_maxsize=10):
+	"""
+	Creates a :class:`requests.Session` that keeps connections alive in a pool and retries failed requests.
+
+	Connection errors are retried for all requests. Read errors and ``502``, ``503`` and ``504`` responses are only
+	retried for idempotent methods, so e.g. a ``POST`` is never sent twice.
+
+	Arguments:
+	    retries (int): Number of retries per request, 0 to disable retrying.
+	    backoff_factor (float): Factor for the exponential backoff between retries, in seconds.
+	    pool_maxsize (int): Maximum number of connections to keep alive per host.
+
+	Returns:
+	    requests.Session: The session.
+	"""
+	from requests.adapters import HTTPAdapter
+	from requests.packages.urllib3.util.retry import Retry
+
+	retry = Retry(total=retries,
+	              backoff_factor=backoff_factor,
+	              status_forcelist=(502, 503, 504),
+	              raise_on_status=False)
+	adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
+
+	session = requests.Session()
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+	return session
+
+
+class MultipartStream(object):
+	"""
+	A ``multipart/form-data`` request body that is read from its files on demand instead of being built in memory.
+
+	The length of the body is known up front, so it is sent with a ``Content-Length`` header instead of chunked.
+
+	Arguments:
+	    fields (dict): Form fields to send, mapping names to values.
+	    files (dict): Files to send, mapping names to tuples of file name, file object and optionally content type. The
+	        file objects are read from their current position on.
+	    boundary (str): Boundary to use, a random one will be generated if not provided.
+	"""
+
+	CHUNK_SIZE = 64 * 1024
+
+	def __init__(self, fields=None, files=None, boundary=None):
+		if boundary is None:
+			boundary = uuid.uuid4().hex
+		self.boundary = boundary
 
-	def __init__(self, baseurl, apikey):
+		# (file object, start position, length) for all parts of the body, including headers and separators
+		self._parts = []
+
+		for name, value in (fields or dict()).items():
+			self._add_bytes(self._part_header(name) + self._to_bytes(value) + b"\r\n")
+
+		for name, spec in (files or dict()).items():
+			file_name, fp = spec[:2]
+			content_type = spec[2] if len(spec) > 2 else None
+
+			self._add_bytes(self._part_header(name, file_name=file_name, content_type=content_type))
+			self._parts.append((fp, fp.tell(), requests.utils.super_len(fp)))
+			self._add_bytes(b"\r\n")
+
+		self._add_bytes(self._to_bytes("--{}--\r\n".format(self.boundary)))
+
+		self._length = sum(part[2] for part in self._parts)
+		self.seek(0)
+
+	@property
+	def content_type(self):
+		return "multipart/form-data; boundary={}".format(self.boundary)
+
+	def __len__(self):
+		return self._length
+
+	def __iter__(self):
+		while True:
+			chunk = self.read(self.CHUNK_SIZE)
+			if not chunk:
+				break
+			yield chunk
+
+	def tell(self):
+		return self._position
+
+	def seek(self, offset, whence=os.SEEK_SET):
+		if whence == os.SEEK_CUR:
+			offset += self._position
+		elif whence == os.SEEK_END:
+			offset += self._length
+		offset = max(0, min(offset, self._length))
+
+		self._position = offset
+		self._current = 0
+		while self._current < len(self._parts) and offset >= self._parts[self._current][2]:
+			offset -= self._parts[self._current][2]
+			self._current += 1
+		self._offset = offset
+
+		if self._current < len(self._parts):
+			fp, start, _ = self._parts[self._current]
+			fp.seek(start + offset)
+
+		return self._position
+
+	def read(self, size=-1):
+		chunks = []
+		while self._current < len(self._parts) and size != 0:
+			fp, start, length = self._parts[self._current]
+
+			remaining = length - self._offset
+			data = fp.read(remaining if size < 0 else min(size, remaining))
+			if not data:
+				raise IOError("File changed while reading it, expected {} more bytes".format(remaining))
+
+			chunks.append(data)
+			self._offset += len(data)
+			self._position += len(data)
+			if size > 0:
+				size -= len(data)
+
+			if self._offset >= length:
+				self._current += 1
+				self._offset = 0
+				if self._current < len(self._parts):
+					fp, start, _ = self._parts[self._current]
+					fp.seek(start)
+
+		return b"".join(chunks)
+
+	def _add_bytes(self, data):
+		self._parts.append((io.BytesIO(data), 0, len(data)))
+
+	def _part_header(self, name, file_name=None, content_type=None):
+		def quote(value):
+			if isinstance(value, bytes):
+				value = value.decode("utf-8")
+			return value.replace("\\", "\\\\").replace("\"", "\\\"")
+
+		disposition = u"form-data; name=\"{}\"".format(quote(name))
+		if file_name is not None:
+			disposition += u"; filename=\"{}\"".format(quote(file_name))
+
+		lines = [u"--{}".format(self.boundary), u"Content-Disposition: {}".format(disposition)]
+		if content_type:
+			lines.append(u"Content-Type: {}".format(content_type))
+		return self._to_bytes(u"\r\n".join(lines) + u"\r\n\r\n")
+
+	@staticmethod
+	def _to_bytes(value):
+		if isinstance(value, bytes):
+			return value
+		if not isinstance(value, basestring):
+			value = unicode(value)
+		return value.encode("utf-8")
+
+
+class Client(object):
+	"""
+	Client for OctoPrint's REST API.
+
+	All requests are sent through one session, so connections to the server are kept alive and reused, and failed
+	requests are retried as described in :func:`create_session`. The client is safe to use from multiple threads.
+
+	Arguments:
+	    baseurl (str): Base URL of the server, e.g. as created by :func:`build_base_url`.
+	    apikey (str): API key to authenticate with.
+	    retries (int): Number of retries per request.
+	    backoff_factor (float): Factor for the exponential backoff between retries, in seconds.
+	    pool_maxsize (int): Maximum number of connections to keep alive.
+	    session (requests.Session): Session to use instead of creating one.
+	"""
+
+	def __init__(self, baseurl, apikey, retries=3, backoff_factor=0.5, pool_maxsize=10, session=None):
 		self.baseurl = baseurl
 		self.apikey = apikey
 
-	def prepare_request(self, method=None, path=None, params=None):
+		self._session_kwargs = dict(retries=retries, backoff_factor=backoff_factor, pool_maxsize=pool_maxsize)
+		self._session = session
+		self._session_mutex = threading.Lock()
+
+	@property
+	def session(self):
+		with self._session_mutex:
+			if self._session is None:
+				self._session = create_session(**self._session_kwargs)
+			return self._session
+
+	def close(self):
+		"""Closes all pooled connections."""
+		with self._session_mutex:
+			if self._session is not None:
+				self._session.close()
+				self._session = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+	def prepare_request(self, method=None, path=None, params=None, headers=None):
 		url = None
 		if self.baseurl:
 			while path.startswith("/"):
 				path = path[1:]
 			url = self.baseurl + "/" + path
-		return requests.Request(method=method, url=url, params=params, headers={"X-Api-Key": self.apikey}).prepare()
 
-	def request(self, method, path, data=None, files=None, encoding=None, params=None, timeout=None):
+		request_headers = {"X-Api-Key": self.apikey}
+		if headers:
+			request_headers.update(headers)
+
+		return requests.Request(method=method, url=url, params=params, headers=request_headers).prepare()
+
+	def request(self, method, path, data=None, files=None, encoding=None, params=None, timeout=None, headers=None):
 		if timeout is None:
 			timeout = 30
 
-		s = requests.Session()
-		request = self.prepare_request(method, path, params=params)
+		request = self.prepare_request(method, path, params=params, headers=headers)
 		if data or files:
 			if encoding == "json":
 				request.prepare_body(None, None, json=data)
 			else:
 				request.prepare_body(data, files=files)
-		response = s.send(request, timeout=timeout)
+		response = self.session.send(request, timeout=timeout)
 		return response
 
 	def get(self, path, params=None, timeout=None):
@@ -253,8 +506,6 @@ class Client(object):
 		return self.post_json(path, data, params=data, timeout=timeout)
 
 	def upload(self, path, file_path, additional=None, file_name=None, content_type=None, params=None, timeout=None):
-		import os
-
 		if not os.path.isfile(file_path):
 			raise ValueError("{} cannot be uploaded since it is not a file".format(file_path))
 
@@ -262,12 +513,10 @@ class Client(object):
 			file_name = os.path.basename(file_path)
 
 		with open(file_path, "rb") as fp:
-			if content_type:
-				files = dict(file=(file_name, fp, content_type))
-			else:
-				files = dict(file=(file_name, fp))
-
-			response = self.request("POST", path, data=additional, files=files, params=params, timeout=timeout)
+			# stream the file instead of building the whole request body in memory
+			body = MultipartStream(fields=additional, files=dict(file=(file_name, fp, content_type)))
+			response = self.request("POST", path, data=body, params=params, timeout=timeout,
+			                        headers={"Content-Type": body.content_type})
 
 		return response
 
@@ -281,18 +530,7 @@ class Client(object):
 		return self.request("PUT", path, data=data, encoding=encoding, params=params, timeout=timeout)
 
 	def create_socket(self, **kwargs):
-		import uuid
-		import random
-		import json
-
-		# creates websocket URL for SockJS according to
-		# - http://sockjs.github.io/sockjs-protocol/sockjs-protocol-0.3.3.html#section-37
-		# - http://sockjs.github.io/sockjs-protocol/sockjs-protocol-0.3.3.html#section-50
-		url = "ws://{}/sockjs/{:0>3d}/{}/websocket".format(
-			self.baseurl[self.baseurl.find("//") + 2:], # host + port + prefix, but no protocol
-			random.randrange(0, stop=999),              # server_id
-			uuid.uuid4()                                # session_id
-		)
+		url = build_socket_url(self.baseurl)
 		use_ssl = self.baseurl.startswith("https:")
 
 		on_open_cb = kwargs.get("on_open", None)
@@ -303,35 +541,19 @@ class Client(object):
 		daemon = kwargs.get("daemon", True)
 
 		def on_message(ws, message):
-			message_type = message[0]
+			frame_type, messages = parse_socket_frame(message)
 
-			if message_type == "h":
+			if frame_type == "h":
 				# "heartbeat" message
 				if callable(on_heartbeat_cb):
 					on_heartbeat_cb(ws)
-					return
-			elif message_type == "o":
-				# "open" message
-				return
-			elif message_type == "c":
-				# "close" message
 				return
 
 			if not callable(on_message_cb):
 				return
 
-			message_body = message[1:]
-			if not message_body:
-				return
-
-			data = json.loads(message_body)
-
-			if message_type == "m":
-				data = [data,]
-
-			for d in data:
-				for internal_type, internal_message in d.items():
-					on_message_cb(ws, internal_type, internal_message)
+			for internal_type, internal_message in messages:
+				on_message_cb(ws, internal_type, internal_message)
 
 		def on_open(ws):
 			if callable(on_open_cb):
@@ -355,3 +577,124 @@ class Client(object):
 		socket.connect()
 
 		return socket
+
+
+FleetResult = collections.namedtuple("FleetResult", "baseurl, response, error")
+"""Result of a call on one server of a :class:`FleetClient`, with either a ``response`` or an ``error``."""
+
+
+class FleetResults(list):
+	"""List of :class:`FleetResult` in the order of the fleet's clients."""
+
+	@property
+	def failed(self):
+		"""Results that raised an error or got an error response."""
+		return [result for result in self
+		        if result.error is not None or getattr(result.response, "status_code", 0) >= 400]
+
+
+class FleetClient(object):
+	"""
+	Performs the same calls against a fleet of servers concurrently.
+
+	Offers the request methods of :class:`Client`, but every call is run against all servers through a thread pool and
+	returns :class:`FleetResults` instead of a single response. Errors raised for a server don't affect the others,
+	they are returned as part of that server's result.
+
+	Arguments:
+	    clients (list): The :class:`Client` instances to use, one per server.
+	    max_workers (int): Maximum number of concurrent requests, defaults to the number of clients but at most 16.
+	"""
+
+	def __init__(self, clients, max_workers=None):
+		self.clients = list(clients)
+
+		if max_workers is None:
+			max_workers = min(len(self.clients), 16)
+		self._max_workers = max(1, max_workers)
+
+		self._executor = None
+		self._executor_mutex = threading.Lock()
+
+	@classmethod
+	def from_targets(cls, targets, max_workers=None, **kwargs):
+		"""
+		Creates a fleet client from base URLs and API keys.
+
+		Arguments:
+		    targets (list): Tuples of base URL and API key, one per server.
+		    max_workers (int): Maximum number of concurrent requests.
+		    kwargs: Additional arguments for each :class:`Client`.
+
+		Returns:
+		    FleetClient: The fleet client.
+		"""
+		return cls([Client(baseurl, apikey, **kwargs) for baseurl, apikey in targets], max_workers=max_workers)
+
+	def call(self, method, *args, **kwargs):
+		"""
+		Calls a method of :class:`Client` on all servers concurrently and waits for all of them to finish.
+
+		Arguments:
+		    method (str): Name of the method to call, e.g. ``get``.
+		    args: Positional arguments for the method.
+		    kwargs: Keyword arguments for the method.
+
+		Returns:
+		    FleetResults: One result per server.
+		"""
+		def run(client):
+			try:
+				return FleetResult(client.baseurl, getattr(client, method)(*args, **kwargs), None)
+			except Exception as e:
+				return FleetResult(client.baseurl, None, e)
+
+		return FleetResults(self._get_executor().map(run, self.clients))
+
+	def close(self):
+		"""Shuts down the thread pool and closes all pooled connections."""
+		with self._executor_mutex:
+			if self._executor is not None:
+				self._executor.shutdown(wait=True)
+				self._executor = None
+
+		for client in self.clients:
+			client.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+	def _get_executor(self):
+		with self._executor_mutex:
+			if self._executor is None:
+				from concurrent.futures import ThreadPoolExecutor
+				self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+			return self._executor
+
+	def get(self, path, params=None, timeout=None):
+		return self.call("get", path, params=params, timeout=timeout)
+
+	def post(self, path, data, encoding=None, params=None, timeout=None):
+		return self.call("post", path, data, encoding=encoding, params=params, timeout=timeout)
+
+	def post_json(self, path, data, params=None, timeout=None):
+		return self.call("post_json", path, data, params=params, timeout=timeout)
+
+	def post_command(self, path, command, additional=None, timeout=None):
+		return self.call("post_command", path, command, additional=additional, timeout=timeout)
+
+	def upload(self, path, file_path, additional=None, file_name=None, content_type=None, params=None, timeout=None):
+		return self.call("upload", path, file_path, additional=additional, file_name=file_name,
+		                 content_type=content_type, params=params, timeout=timeout)
+
+	def delete(self, path, params=None, timeout=None):
+		return self.call("delete", path, params=params, timeout=timeout)
+
+	def patch(self, path, data, encoding=None, params=None, timeout=None):
+		return self.call("patch", path, data, encoding=encoding, params=params, timeout=timeout)
+
+	def put(self, path, data, encoding=None, params=None, timeout=None):
+		return self.call("put", path, data, encoding=encoding, params=params, timeout=timeout)
@@ -0,0 +1,357 @@
+# coding=utf-8
+"""
+Socket clients that follow many OctoPrint instances on one Tornado IOLoop.
+
+Unlike :class:`~octoprint_client.SocketClient`, which needs a thread per socket and runs its callbacks on that thread,
+all connections of a :class:`SocketMultiplexer` share one IOLoop. Every connection buffers received messages in a
+bounded queue. If the callbacks can't keep up, reading from that connection pauses, and the server is asked to send
+fewer updates by raising its throttle factor. The throttle factor is lowered again once the queue has drained. Lost
+connections are re-established with jittered exponential backoff, and the throttle factor and any persistent messages
+are sent again after each reconnect.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import datetime
+import logging
+import random
+import threading
+import time
+
+from tornado import gen, locks, queues
+from tornado.ioloop import IOLoop
+from tornado.websocket import websocket_connect
+
+from octoprint_client import build_socket_url, parse_socket_frame, create_socket_frame
+
+HIGH_WATERMARK = 0.75
+"""Fraction of the queue size from which on the throttle factor gets raised."""
+
+LOW_WATERMARK = 0.25
+"""Fraction of the queue size up to which the throttle factor gets lowered again."""
+
+THROTTLE_RAISE_INTERVAL = 1.0
+"""Minimum time between two raises of the throttle factor, in seconds."""
+
+THROTTLE_LOWER_INTERVAL = 10.0
+"""Minimum time after a change of the throttle factor before it gets lowered, in seconds."""
+
+POLL_INTERVAL = datetime.timedelta(seconds=1)
+
+
+class AsyncSocketClient(object):
+	"""
+	Socket client running on a Tornado IOLoop.
+
+	Callbacks are called with the client as first argument, ``on_message`` additionally with the message type and
+	payload. They are called one after the other in the order the frames were received. A callback may return a
+	future, which is waited for before the next callback is called. Callbacks run on the IOLoop and block all of its
+	connections while they run, unless an ``executor`` is provided to run them on.
+
+	All methods besides :meth:`start` and :meth:`stop` must be called on the IOLoop.
+
+	Arguments:
+	    baseurl (str): Base URL of the server.
+	    on_message (callable): Called for every received message.
+	    on_open (callable): Called when a connection has been established.
+	    on_close (callable): Called when a connection has been lost.
+	    on_heartbeat (callable): Called for every heartbeat.
+	    queue_size (int): Maximum number of received but not yet dispatched messages.
+	    max_throttle (int): Maximum throttle factor to ask the server for.
+	    backoff (float): Initial maximum delay before reconnecting, in seconds. Doubles with every failed attempt.
+	    max_backoff (float): Upper limit for the maximum delay before reconnecting, in seconds.
+	    connect_timeout (float): Timeout for establishing a connection, in seconds.
+	    io_loop (tornado.ioloop.IOLoop): The IOLoop to run on, defaults to the current one.
+	    executor (concurrent.futures.Executor): Executor to run the callbacks on.
+	"""
+
+	def __init__(self, baseurl, on_message=None, on_open=None, on_close=None, on_heartbeat=None, queue_size=100,
+	             max_throttle=10, backoff=1.0, max_backoff=60.0, connect_timeout=10.0, io_loop=None, executor=None):
+		self.baseurl = baseurl
+		self.io_loop = io_loop if io_loop is not None else IOLoop.current()
+
+		self._logger = logging.getLogger(__name__)
+
+		self._callbacks = dict(message=on_message, open=on_open, close=on_close, heartbeat=on_heartbeat)
+		self._executor = executor
+
+		self._queue = queues.Queue(maxsize=max(1, queue_size))
+		self._max_throttle = max(1, max_throttle)
+		self._throttle = 1
+		self._throttle_changed = 0
+
+		self._backoff = backoff
+		self._max_backoff = max_backoff
+		self._connect_timeout = connect_timeout
+
+		self._persistent = []
+		self._connection = None
+		self._started = False
+		self._stopped = locks.Event()
+
+	@property
+	def connected(self):
+		"""Whether the client is currently connected."""
+		return self._connection is not None
+
+	@property
+	def throttle(self):
+		"""The throttle factor currently requested from the server."""
+		return self._throttle
+
+	@property
+	def backlog(self):
+		"""Number of received messages not yet dispatched to the callbacks."""
+		return self._queue.qsize()
+
+	def start(self):
+		"""Starts connecting and dispatching. Can be called from any thread."""
+		self.io_loop.add_callback(self._start)
+
+	def stop(self):
+		"""Disconnects and stops reconnecting. Can be called from any thread."""
+		self.io_loop.add_callback(self._stop)
+
+	def send(self, message, persistent=False):
+		"""
+		Sends a message to the server.
+
+		Arguments:
+		    message (dict): The message.
+		    persistent (bool): Whether to send the message again after every reconnect.
+		"""
+		if persistent:
+			self._persistent.append(message)
+		self._write(message)
+
+	def _start(self):
+		if self._started:
+			return
+		self._started = True
+		self.io_loop.spawn_callback(self._run)
+		self.io_loop.spawn_callback(self._dispatch)
+
+	def _stop(self):
+		self._stopped.set()
+		if self._connection is not None:
+			self._connection.close()
+
+	@gen.coroutine
+	def _run(self):
+		attempt = 0
+		while not self._stopped.is_set():
+			try:
+				connection = yield websocket_connect(build_socket_url(self.baseurl),
+				                                     io_loop=self.io_loop,
+				                                     connect_timeout=self._connect_timeout)
+			except Exception as e:
+				self._logger.debug("Could not connect to {}: {}".format(self.baseurl, e))
+			else:
+				attempt = 0
+				self._connection = connection
+				if self._stopped.is_set():
+					connection.close()
+
+				yield self._read(connection)
+
+				self._connection = None
+				yield self._enqueue(("close", ()))
+
+			if self._stopped.is_set():
+				break
+
+			delay = self._backoff_delay(attempt)
+			attempt += 1
+			self._logger.debug("Reconnecting to {} in {:.1f}s".format(self.baseurl, delay))
+			try:
+				yield self._stopped.wait(timeout=datetime.timedelta(seconds=delay))
+			except gen.TimeoutError:
+				pass
+
+	def _backoff_delay(self, attempt):
+		# "full jitter", so that a fleet of clients losing its connections at once doesn't reconnect in lockstep
+		return random.uniform(0, min(self._max_backoff, self._backoff * 2 ** attempt))
+
+	@gen.coroutine
+	def _read(self, connection):
+		while True:
+			frame = yield connection.read_message()
+			if frame is None:
+				break
+
+			try:
+				frame_type, messages = parse_socket_frame(frame)
+			except ValueError:
+				self._logger.warn("Got invalid frame from {}, ignoring: {!r}".format(self.baseurl, frame))
+				continue
+
+			if frame_type == "o":
+				self._resubscribe()
+				yield self._enqueue(("open", ()))
+			elif frame_type == "h":
+				yield self._enqueue(("heartbeat", ()))
+
+			for message in messages:
+				yield self._enqueue(("message", message))
+
+	@gen.coroutine
+	def _enqueue(self, item):
+		# while the queue is full, this blocks reading from the socket, so the backlog stays in the socket's buffers
+		while not self._stopped.is_set():
+			try:
+				yield self._queue.put(item, timeout=POLL_INTERVAL)
+			except gen.TimeoutError:
+				continue
+			else:
+				break
+
+		self._adjust_throttle()
+
+	@gen.coroutine
+	def _dispatch(self):
+		while not self._stopped.is_set():
+			try:
+				kind, args = yield self._queue.get(timeout=POLL_INTERVAL)
+			except gen.TimeoutError:
+				continue
+
+			try:
+				yield self._call(self._callbacks[kind], *args)
+			except Exception:
+				self._logger.exception("Error while calling the {} callback for {}".format(kind, self.baseurl))
+			finally:
+				self._queue.task_done()
+
+			self._adjust_throttle()
+
+	@gen.coroutine
+	def _call(self, callback, *args):
+		if not callable(callback):
+			return
+
+		if self._executor is not None:
+			yield self._executor.submit(callback, self, *args)
+		else:
+			result = callback(self, *args)
+			if gen.is_future(result):
+				yield result
+
+	def _adjust_throttle(self):
+		backlog = self._queue.qsize()
+		maxsize = self._queue.maxsize
+		since_change = time.time() - self._throttle_changed
+
+		if backlog >= maxsize * HIGH_WATERMARK and self._throttle < self._max_throttle \
+				and since_change >= THROTTLE_RAISE_INTERVAL:
+			self._set_throttle(min(self._throttle * 2, self._max_throttle))
+
+		elif backlog <= maxsize * LOW_WATERMARK and self._throttle > 1 \
+				and since_change >= THROTTLE_LOWER_INTERVAL:
+			self._set_throttle(max(self._throttle // 2, 1))
+
+	def _set_throttle(self, throttle):
+		self._logger.debug("Changing throttle factor for {} from {} to {}".format(self.baseurl, self._throttle,
+		                                                                          throttle))
+		self._throttle = throttle
+		self._throttle_changed = time.time()
+		self._write(dict(throttle=throttle))
+
+	def _resubscribe(self):
+		if self._throttle > 1:
+			self._write(dict(throttle=self._throttle))
+		for message in self._persistent:
+			self._write(message)
+
+	def _write(self, message):
+		if self._connection is None:
+			return
+
+		try:
+			self._connection.write_message(create_socket_frame(message))
+		except Exception as e:
+			# the connection is gone, persistent state gets sent again after reconnecting
+			self._logger.debug("Could not send message to {}: {}".format(self.baseurl, e))
+
+
+class SocketMultiplexer(object):
+	"""
+	Follows the sockets of many servers on one IOLoop.
+
+	Arguments:
+	    io_loop (tornado.ioloop.IOLoop): The IOLoop to use. If not provided, the multiplexer creates its own, which
+	        :meth:`run` and :meth:`run_in_thread` run and :meth:`stop` stops.
+	    executor (concurrent.futures.Executor): Executor to run the clients' callbacks on.
+	    kwargs: Default arguments for all :class:`AsyncSocketClient` instances.
+	"""
+
+	def __init__(self, io_loop=None, executor=None, **kwargs):
+		self._owns_loop = io_loop is None
+		self.io_loop = io_loop if io_loop is not None else IOLoop(make_current=False)
+
+		self.clients = []
+		self._executor = executor
+		self._defaults = kwargs
+
+		self._started = False
+		self._thread = None
+
+	def add(self, baseurl, **kwargs):
+		"""
+		Adds a server to follow. The client is started right away if the multiplexer is already running.
+
+		Arguments:
+		    baseurl (str): Base URL of the server.
+		    kwargs: Arguments for its :class:`AsyncSocketClient`, overriding the defaults.
+
+		Returns:
+		    AsyncSocketClient: The client for the server.
+		"""
+		options = dict(self._defaults)
+		options.update(kwargs)
+
+		client = AsyncSocketClient(baseurl, io_loop=self.io_loop, executor=self._executor, **options)
+		self.clients.append(client)
+		if self._started:
+			client.start()
+		return client
+
+	def remove(self, client):
+		"""Stops following the server of ``client``."""
+		self.clients.remove(client)
+		client.stop()
+
+	def start(self):
+		"""Starts all clients, without running the IOLoop."""
+		self._started = True
+		for client in self.clients:
+			client.start()
+
+	def run(self):
+		"""Starts all clients and runs the IOLoop until :meth:`stop` is called."""
+		self.start()
+		self.io_loop.start()
+
+	def run_in_thread(self, daemon=True):
+		"""
+		Starts all clients and runs the IOLoop on a new thread.
+
+		Returns:
+		    threading.Thread: The thread.
+		"""
+		self._thread = threading.Thread(target=self.run)
+		self._thread.daemon = daemon
+		self._thread.start()
+		return self._thread
+
+	def stop(self):
+		"""Stops all clients, as well as the IOLoop if the multiplexer created it."""
+		for client in self.clients:
+			client.stop()
+
+		if self._owns_loop:
+			self.io_loop.add_callback(self.io_loop.stop)
+			if self._thread is not None and self._thread is not threading.current_thread():
+				self._thread.join()
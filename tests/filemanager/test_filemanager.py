@@ -567,3 +567,55 @@ class FileManagerTest(unittest.TestCase):
 
 		# assert that time.time was only called once
 		self.assertEqual(mocked_time.call_count, 1)
+
+	def test_slice_profile_error(self):
+		import os
+		import shutil
+		import tempfile
+		import octoprint.slicing
+
+		profile_path = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, profile_path)
+
+		# a real slicing manager, with a slicer that fails to write the temporary profile
+		slicer = mock.MagicMock()
+		slicer.get_slicer_properties.return_value = dict(type="some_slicer", name="Some Slicer")
+		slicer.is_slicer_configured.return_value = True
+		slicer.save_slicer_profile.side_effect = IOError("disk full")
+
+		settings_patcher = mock.patch("octoprint.slicing.settings")
+		settings_patcher.start().return_value.get.return_value = None
+		self.addCleanup(settings_patcher.stop)
+
+		slicing_manager = octoprint.slicing.SlicingManager(profile_path, self.printer_profile_manager)
+		slicing_manager._slicers = dict(some_slicer=slicer)
+		self.file_manager._slicing_manager = slicing_manager
+
+		self.local_storage.path_on_disk.side_effect = lambda path: "prefix/" + path
+
+		temp_paths = []
+		original_named_temporary_file = tempfile.NamedTemporaryFile
+		def named_temporary_file(*args, **kwargs):
+			f = original_named_temporary_file(*args, **kwargs)
+			temp_paths.append(f.name)
+			return f
+
+		callback = mock.MagicMock()
+		with mock.patch("tempfile.NamedTemporaryFile", side_effect=named_temporary_file):
+			self.file_manager.slice("some_slicer", octoprint.filemanager.FileDestinations.LOCAL, "source.file",
+			                        octoprint.filemanager.FileDestinations.LOCAL, "dest.file", callback=callback)
+
+		# the slicing failure was reported...
+		self.fire_event.assert_called_with(octoprint.filemanager.Events.SLICING_FAILED,
+		                                   dict(stl="source.file",
+		                                        stl_location=octoprint.filemanager.FileDestinations.LOCAL,
+		                                        gcode="dest.file",
+		                                        gcode_location=octoprint.filemanager.FileDestinations.LOCAL,
+		                                        reason="Could not prepare slicing job: disk full"))
+		self.assertFalse(callback.called)
+
+		# ... and nothing leaked
+		self.assertEqual(dict(), self.file_manager._slicing_jobs)
+		self.assertEqual(2, len(temp_paths))
+		for path in temp_paths:
+			self.assertFalse(os.path.exists(path))
@@ -0,0 +1,265 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import mock
+from ddt import ddt, data, unpack
+
+from octoprint.filemanager.toolpath import ToolpathStorage, PositionIndex, RECORD_SIZE
+from octoprint.util.gcodeInterpreter import gcode
+
+GCODE = u"""G28
+G1 Z5 F3000
+G1 X10 Y10
+G1 Z0.3
+G1 X20 Y10 E1
+G1 X20 Y20 E2
+G1 Z1.3
+G1 X15 Y15
+G1 Z0.3
+G1 Z0.5
+G1 X10 Y20
+G1 X10 Y10 E3
+T1
+G1 Z0.51 X20 Y10 E4
+G1 Z0.8
+M84
+"""
+
+
+class ToolpathTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+		self.source = os.path.join(self.basedir, "test.gcode")
+		with io.open(self.source, "wt", encoding="utf-8") as f:
+			f.write(GCODE)
+
+		self.storage = ToolpathStorage(os.path.join(self.basedir, "toolpaths"))
+
+	def _record(self, path="folder/test.gcode", **kwargs):
+		recorder = self.storage.recorder("local", path, self.source, **kwargs)
+		interpreter = gcode()
+		interpreter.load(self.source, toolpath=recorder)
+		return recorder.finish(elapsed=interpreter.totalMoveTimeMinute * 60)
+
+	def _offset(self, line):
+		return GCODE.index(line + "\n")
+
+	def test_index(self):
+		index = self._record()
+
+		self.assertEqual(index, self.storage.get_index("local", "folder/test.gcode", self.source))
+
+		# the z-hop and the z change of 0.01 stay in their layers, the final z move doesn't start a layer as nothing
+		# gets printed after it
+		layers = index["layers"]
+		self.assertEqual([0.3, 0.5], [layer["z"] for layer in layers])
+
+		# the first layer starts at the beginning of the file, the second one with the move to its height
+		self.assertEqual(0, layers[0]["start"])
+		self.assertEqual(self._offset("G1 Z0.5"), layers[0]["end"])
+		self.assertEqual(self._offset("G1 Z0.5"), layers[1]["start"])
+		self.assertEqual(len(GCODE), layers[1]["end"])
+
+		self.assertEqual((0, 5, 8), (layers[0]["offset"], layers[0]["count"], layers[0]["moves"]))
+		self.assertEqual((5, 4, 4), (layers[1]["offset"], layers[1]["count"], layers[1]["moves"]))
+
+	def test_read_layers(self):
+		index = self._record()
+
+		data = self.storage.read_layers("local", "folder/test.gcode", index, 1)
+		self.assertEqual(4 * RECORD_SIZE, len(data))
+
+		records = [struct.unpack("<4f", data[i:i + RECORD_SIZE]) for i in range(0, len(data), RECORD_SIZE)]
+		self.assertEqual([(15.0, 15.0, 0.0, 0.0),
+		                  (10.0, 20.0, 0.0, 0.0),
+		                  (10.0, 10.0, 1.0, 0.0),
+		                  (20.0, 10.0, 4.0, 1.0)], records)
+
+		self.assertEqual(9 * RECORD_SIZE, len(self.storage.read_layers("local", "folder/test.gcode", index, 0, count=5)))
+
+	def test_read_layers_removed(self):
+		index = self._record()
+
+		# removed concurrently after the index was read
+		os.remove(self.storage.path_for("local", "folder/test.gcode") + ".bin")
+
+		self.assertIsNone(self.storage.read_layers("local", "folder/test.gcode", index, 1))
+
+	def test_checkpoints(self):
+		index = self._record()
+		checkpoints = index["checkpoints"]
+		layers = index["layers"]
+
+		# start of file, start of the first layer's travel, start of the second layer, end of file
+		self.assertEqual([0, self._offset("G1 Z5 F3000"), layers[1]["start"], len(GCODE)],
+		                 [checkpoint[0] for checkpoint in checkpoints])
+
+		self.assertEqual([0.3, [2.0, 0.0]], checkpoints[2][1:2] + checkpoints[2][3:])
+		self.assertEqual([0.8, [3.0, 4.0]], checkpoints[3][1:2] + checkpoints[3][3:])
+
+		elapsed = [checkpoint[2] for checkpoint in checkpoints]
+		self.assertEqual(sorted(elapsed), elapsed)
+		self.assertAlmostEqual(elapsed[-1], PositionIndex(index).total_time)
+
+	def test_checkpoint_interval(self):
+		index = self._record(checkpoint_interval=20)
+		positions = [checkpoint[0] for checkpoint in index["checkpoints"]]
+
+		self.assertEqual(sorted(set(positions)), positions)
+		self.assertTrue(all(b - a <= 20 + len("G1 Z0.51 X20 Y10 E4\n") for a, b in zip(positions, positions[1:])))
+		self.assertIn(index["layers"][1]["start"], positions)
+
+	def test_stale(self):
+		self._record()
+
+		with io.open(self.source, "at", encoding="utf-8") as f:
+			f.write(u"G1 X0 Y0\n")
+
+		self.assertIsNone(self.storage.get_index("local", "folder/test.gcode", self.source))
+
+	def test_missing(self):
+		self.assertIsNone(self.storage.get_index("local", "folder/test.gcode", self.source))
+
+	def test_abort(self):
+		recorder = self.storage.recorder("local", "test.gcode", self.source)
+		recorder.abort()
+
+		self.assertEqual([], os.listdir(os.path.join(self.basedir, "toolpaths", "local")))
+
+	def test_rerecord(self):
+		self._record()
+		index = self._record()
+
+		self.assertEqual(index, self.storage.get_index("local", "folder/test.gcode", self.source))
+
+	def test_failed_finish(self):
+		self._record()
+
+		recorder = self.storage.recorder("local", "folder/test.gcode", self.source)
+		with mock.patch("octoprint.filemanager.toolpath.atomic_write", side_effect=IOError("disk full")):
+			self.assertRaises(IOError, recorder.finish)
+		recorder.abort()
+
+		# no mix of the old and the new toolpath is left behind
+		self.assertIsNone(self.storage.get_index("local", "folder/test.gcode", self.source))
+		self.assertEqual([], os.listdir(os.path.join(self.basedir, "toolpaths", "local", "folder")))
+
+	def test_failed_finish_keeps_analysis(self):
+		from click.testing import CliRunner
+		from octoprint.cli.analysis import gcode_command
+
+		toolpath = os.path.join(self.basedir, "toolpaths", "test.gcode")
+		with mock.patch("octoprint.filemanager.toolpath.ToolpathRecorder.finish", side_effect=IOError("disk full")):
+			result = CliRunner().invoke(gcode_command, ["--toolpath", toolpath, self.source])
+
+		self.assertEqual(0, result.exit_code)
+		self.assertIn("RESULTS:", result.output)
+		self.assertFalse(os.path.exists(toolpath + ".bin.tmp"))
+
+	def test_move(self):
+		index = self._record("test.gcode")
+
+		self.storage.move("local", "test.gcode", "folder/moved.gcode")
+
+		self.assertIsNone(self.storage.get_index("local", "test.gcode", self.source))
+		self.assertEqual(index, self.storage.get_index("local", "folder/moved.gcode", self.source))
+
+	def test_copy(self):
+		index = self._record("test.gcode")
+
+		self.storage.copy("local", "test.gcode", "copy.gcode")
+
+		self.assertEqual(index, self.storage.get_index("local", "test.gcode", self.source))
+		self.assertEqual(index, self.storage.get_index("local", "copy.gcode", self.source))
+
+	def test_folders(self):
+		index = self._record()
+
+		self.storage.copy_folder("local", "folder", "copy")
+		self.storage.move_folder("local", "folder", "moved")
+
+		self.assertIsNone(self.storage.get_index("local", "folder/test.gcode", self.source))
+		self.assertEqual(index, self.storage.get_index("local", "copy/test.gcode", self.source))
+		self.assertEqual(index, self.storage.get_index("local", "moved/test.gcode", self.source))
+
+		self.storage.remove_folder("local", "moved")
+		self.storage.remove("local", "copy/test.gcode")
+
+		self.assertIsNone(self.storage.get_index("local", "moved/test.gcode", self.source))
+		self.assertIsNone(self.storage.get_index("local", "copy/test.gcode", self.source))
+
+
+INDEX = dict(source=dict(size=300, mtime=0),
+             layers=[dict(z=0.2, start=10),
+                     dict(z=0.4, start=100),
+                     dict(z=0.6, start=200)],
+             checkpoints=[[0, 0.0, 0.0, [0.0]],
+                          [10, 0.0, 1.0, [0.0]],
+                          [100, 0.2, 11.0, [5.0]],
+                          [200, 0.4, 31.0, [9.0]],
+                          [300, 0.6, 41.0, [12.0]]])
+
+
+@ddt
+class PositionIndexTest(unittest.TestCase):
+
+	def setUp(self):
+		self.index = PositionIndex(INDEX)
+
+	@data((0, 10), (2, 200), (3, None), (-1, None))
+	@unpack
+	def test_position_for_layer(self, layer, expected):
+		self.assertEqual(expected, self.index.position_for_layer(layer))
+
+	@data((0.0, 10), (0.4, 100), (0.35, 100), (0.6, 200), (0.7, None))
+	@unpack
+	def test_position_for_z(self, z, expected):
+		self.assertEqual(expected, self.index.position_for_z(z))
+
+	def test_position_for_z_not_ascending(self):
+		index = PositionIndex(dict(INDEX, layers=[dict(z=0.2, start=10),
+		                                          dict(z=0.4, start=100),
+		                                          dict(z=0.2, start=200)]))
+		self.assertEqual(100, index.position_for_z(0.3))
+		self.assertEqual(10, index.position_for_z(0.2))
+
+	@data((5, None), (10, 0), (150, 1), (300, 2))
+	@unpack
+	def test_layer_at(self, position, expected):
+		self.assertEqual(expected, self.index.layer_at(position))
+
+	@data((0, 0.0), (10, 1.0), (55, 6.0), (150, 21.0), (300, 41.0), (400, 41.0))
+	@unpack
+	def test_elapsed_at(self, position, expected):
+		self.assertAlmostEqual(expected, self.index.elapsed_at(position))
+
+	def test_checkpoint_at(self):
+		checkpoint = self.index.checkpoint_at(150)
+
+		self.assertEqual(100, checkpoint.position)
+		self.assertEqual(0.2, checkpoint.z)
+		self.assertEqual([5.0], checkpoint.extrusion)
+
+	def test_progress_at(self):
+		self.assertAlmostEqual(31.0 / 41.0, self.index.progress_at(200))
+
+	def test_no_checkpoints(self):
+		index = PositionIndex(dict(INDEX, checkpoints=[]))
+
+		self.assertIsNone(index.total_time)
+		self.assertIsNone(index.elapsed_at(100))
+		self.assertIsNone(index.progress_at(100))
+		self.assertEqual(100, index.position_for_layer(1))
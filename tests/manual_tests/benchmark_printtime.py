@@ -0,0 +1,99 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+"""
+Compares the speed and accuracy of the simple and the kinematic print time estimate of the GCODE analysis.
+
+Run from the repository root:
+
+    python tests/manual_tests/benchmark_printtime.py [<gcode file> ...] [--uploads <uploads folder>]
+
+Without any GCODE files, the bundled test file is analysed. If an uploads folder is provided, every file in it with a
+successful print in its history is analysed too, and both estimates are compared against the recorded print time.
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+
+from octoprint.util.gcodeInterpreter import gcode
+from octoprint.util.kinematics import KinematicModel, numpy
+
+BUNDLED = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "filemanager", "_files", "bp_case.gcode")
+
+
+def analyse(path, model=None):
+	interpreter = gcode()
+	start = time.time()
+	interpreter.load(path, kinematics=model)
+	return interpreter.totalMoveTimeMinute * 60, time.time() - start
+
+
+def count_lines(path):
+	with io.open(path, "rb") as f:
+		return sum(1 for _ in f)
+
+
+def recorded_prints(uploads):
+	for root, dirs, files in os.walk(uploads):
+		if not ".metadata.json" in files:
+			continue
+
+		with io.open(os.path.join(root, ".metadata.json"), "rt", encoding="utf-8") as f:
+			metadata = json.load(f)
+
+		for name, entry in metadata.items():
+			path = os.path.join(root, name)
+			if not os.path.isfile(path):
+				continue
+
+			durations = [print_entry["printTime"] for print_entry in entry.get("history", [])
+			             if print_entry.get("success") and print_entry.get("printTime")]
+			if durations:
+				yield path, sum(durations) / len(durations)
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("files", nargs="*")
+	parser.add_argument("--uploads")
+	args = parser.parse_args()
+
+	files = [(path, None) for path in args.files]
+	if args.uploads:
+		files += list(recorded_prints(args.uploads))
+	if not files:
+		files = [(BUNDLED, None)]
+
+	modes = [("simple", lambda: None), ("python", lambda: KinematicModel(vectorized=False))]
+	if numpy is not None:
+		modes.append(("numpy", lambda: KinematicModel(vectorized=True)))
+
+	errors = dict((name, []) for name, _ in modes)
+
+	print("{:<30} {:<8} {:>12} {:>12} {:>10}".format("file", "mode", "lines/s", "estimate", "error"))
+	for path, recorded in files:
+		lines = count_lines(path)
+		for name, factory in modes:
+			estimate, duration = analyse(path, factory())
+
+			error = ""
+			if recorded:
+				errors[name].append(abs(estimate - recorded) / recorded)
+				error = "{:.1%}".format(errors[name][-1])
+
+			print("{:<30} {:<8} {:>12.0f} {:>11.0f}s {:>10}".format(os.path.basename(path)[-30:], name,
+			                                                        lines / duration if duration else 0,
+			                                                        estimate, error))
+
+	if any(errors.values()):
+		print()
+		print("mean absolute error against {} recorded prints:".format(len(errors["simple"])))
+		for name, _ in modes:
+			print("    {:<8} {:.1%}".format(name, sum(errors[name]) / len(errors[name])))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,48 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+"""
+Compares lookups per second of regular settings reads against reads from a settings snapshot.
+
+Run from the repository root:
+
+    python tests/manual_tests/benchmark_settings.py
+"""
+
+import shutil
+import tempfile
+import timeit
+
+import octoprint.settings
+
+LOOKUPS = 100000
+
+PATHS = [
+	("bool", ["serial", "supportFAsCommand"], "getBoolean"),
+	("nested float", ["serial", "timeout", "communication"], "getFloat"),
+	("list", ["serial", "longRunningCommands"], "get"),
+	("dict", ["serial", "capabilities"], "get"),
+]
+
+
+def lookups_per_second(func):
+	seconds = min(timeit.repeat(func, number=LOOKUPS, repeat=3))
+	return LOOKUPS / seconds
+
+
+def main():
+	basedir = tempfile.mkdtemp()
+	try:
+		settings = octoprint.settings.Settings(basedir=basedir)
+
+		print("{:<15} {:>15} {:>15} {:>10}".format("value", "get/s", "snapshot/s", "speedup"))
+		for name, path, method in PATHS:
+			regular = lookups_per_second(lambda: getattr(settings, method)(path))
+			snapshot = lookups_per_second(lambda: getattr(settings.snapshot(), method)(path))
+			print("{:<15} {:>15.0f} {:>15.0f} {:>9.1f}x".format(name, regular, snapshot, snapshot / regular))
+	finally:
+		shutil.rmtree(basedir)
+
+
+if __name__ == "__main__":
+	main()
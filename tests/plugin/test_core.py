@@ -197,6 +197,47 @@ class PluginTestCase(unittest.TestCase):
 		implementations = self.plugin_manager.get_implementations(octoprint.plugin.StartupPlugin, sorting_context="sorting_test")
 		self.assertListEqual(["startup_plugin", "mixed_plugin"], map(lambda x: x._identifier, implementations))
 
+	def test_cached_implementations(self):
+		implementations = self.plugin_manager.get_cached_implementations(octoprint.plugin.StartupPlugin)
+		self.assertIsInstance(implementations, tuple)
+		self.assertIs(implementations, self.plugin_manager.get_cached_implementations(octoprint.plugin.StartupPlugin))
+
+		# sorting context is part of the key
+		sorted_implementations = self.plugin_manager.get_cached_implementations(octoprint.plugin.StartupPlugin,
+		                                                                        sorting_context="sorting_test")
+		self.assertListEqual(["startup_plugin", "mixed_plugin"], map(lambda x: x._identifier, sorted_implementations))
+
+		with mock.patch.object(self.plugin_manager, "_build_implementation_table") as build:
+			self.plugin_manager.get_implementations(octoprint.plugin.StartupPlugin)
+			self.plugin_manager.get_implementations(octoprint.plugin.StartupPlugin, sorting_context="sorting_test")
+		build.assert_not_called()
+
+	def test_cached_implementations_invalidated(self):
+		self.assertListEqual(["mixed_plugin", "startup_plugin"],
+		                     map(lambda x: x._identifier,
+		                         self.plugin_manager.get_cached_implementations(octoprint.plugin.StartupPlugin)))
+
+		self.plugin_manager.disable_plugin("startup_plugin")
+		self.assertListEqual(["mixed_plugin"],
+		                     map(lambda x: x._identifier,
+		                         self.plugin_manager.get_cached_implementations(octoprint.plugin.StartupPlugin)))
+
+		self.plugin_manager.enable_plugin("startup_plugin")
+		self.assertListEqual(["mixed_plugin", "startup_plugin"],
+		                     map(lambda x: x._identifier,
+		                         self.plugin_manager.get_cached_implementations(octoprint.plugin.StartupPlugin)))
+
+	def test_cached_hooks_invalidated(self):
+		hooks = self.plugin_manager.get_hooks("octoprint.core.startup")
+		self.assertIs(hooks, self.plugin_manager.get_hooks("octoprint.core.startup"))
+		self.assertEqual(["hook_plugin"], hooks.keys())
+
+		self.plugin_manager.disable_plugin("hook_plugin")
+		self.assertEqual([], self.plugin_manager.get_hooks("octoprint.core.startup").keys())
+
+		self.plugin_manager.enable_plugin("hook_plugin")
+		self.assertEqual(["hook_plugin"], self.plugin_manager.get_hooks("octoprint.core.startup").keys())
+
 	def test_client_registration(self):
 		def test_client(*args, **kwargs):
 			pass
@@ -331,3 +372,144 @@ class PluginTestCase(unittest.TestCase):
 		actual = octoprint.plugin.core.PluginManager.mixins_matching_bases(Foo, *bases_to_check)
 		self.assertSetEqual(actual, set(expected))
 
+
+
+class PluginDiscoveryCacheTestCase(unittest.TestCase):
+
+	def setUp(self):
+		import os
+		import tempfile
+
+		self.plugin_folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), "_plugins")
+		self.basedir = tempfile.mkdtemp()
+		self.cache_path = os.path.join(self.basedir, "plugin_discovery_cache.json")
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.basedir)
+
+	def _plugin_manager(self, plugin_entry_points=None, lazy_import=False):
+		plugin_manager = octoprint.plugin.core.PluginManager([self.plugin_folder],
+		                                                     [octoprint.plugin.OctoPrintPlugin],
+		                                                     plugin_entry_points,
+		                                                     plugin_disabled_list=[],
+		                                                     logging_prefix="logging_prefix.",
+		                                                     plugin_discovery_cache=self.cache_path,
+		                                                     plugin_lazy_import=lazy_import)
+		plugin_manager.reload_plugins(startup=True, initialize_implementations=False)
+		return plugin_manager
+
+	def test_cache_persisted(self):
+		import os
+
+		self._plugin_manager()
+		self.assertTrue(os.path.isfile(self.cache_path))
+
+		cache = octoprint.plugin.core.PluginDiscoveryCache(self.cache_path)
+
+		hook_plugin = cache.get_plugin("hook_plugin")
+		self.assertEqual(["octoprint.core.startup", "some.ordered.callback"], hook_plugin["hooks"])
+		self.assertEqual([], hook_plugin["implementation_types"])
+		self.assertTrue(hook_plugin["lazy"])
+
+		self.assertEqual({"some.ordered.callback": 10}, cache.get_plugin("one_ordered_hook_plugin")["hook_orders"])
+
+		startup_plugin = cache.get_plugin("startup_plugin")
+		self.assertEqual([], startup_plugin["hooks"])
+		self.assertEqual(["octoprint.plugin.types.StartupPlugin"], startup_plugin["implementation_types"])
+		self.assertFalse(startup_plugin["lazy"])
+
+	def test_parsed_metadata_reused(self):
+		first = self._plugin_manager()
+
+		with mock.patch.object(octoprint.plugin.core.PluginInfo, "_parse_metadata") as parse_metadata:
+			second = self._plugin_manager()
+
+		parse_metadata.assert_not_called()
+		self.assertEqual(first.plugins["mixed_plugin"].name, second.plugins["mixed_plugin"].name)
+		self.assertEqual(7, len(second.enabled_plugins))
+
+	def test_parsed_metadata_invalidated_on_change(self):
+		import os
+
+		self._plugin_manager()
+
+		cache = octoprint.plugin.core.PluginDiscoveryCache(self.cache_path)
+		location = os.path.join(self.plugin_folder, "hook_plugin.py")
+		self.assertIsNotNone(cache.get_parsed_metadata(location))
+
+		with mock.patch("octoprint.plugin.core._stat_signature", return_value=[0, 0]):
+			self.assertIsNone(cache.get_parsed_metadata(location))
+
+	def test_entry_points_cached(self):
+		self._plugin_manager(plugin_entry_points=["octoprint.plugin.test_discovery_cache"])
+
+		with mock.patch("pkg_resources.WorkingSet") as working_set:
+			self._plugin_manager(plugin_entry_points=["octoprint.plugin.test_discovery_cache"])
+		working_set.assert_not_called()
+
+	def test_entry_points_invalidated_on_path_change(self):
+		self._plugin_manager(plugin_entry_points=["octoprint.plugin.test_discovery_cache"])
+
+		with mock.patch("octoprint.plugin.core.PluginManager._python_path_fingerprint", return_value=[]):
+			with mock.patch("pkg_resources.WorkingSet") as working_set:
+				self._plugin_manager(plugin_entry_points=["octoprint.plugin.test_discovery_cache"])
+		working_set.assert_called_once_with()
+
+	def test_invalidate(self):
+		import os
+
+		plugin_manager = self._plugin_manager()
+		plugin_manager.invalidate_discovery_cache()
+
+		self.assertFalse(os.path.exists(self.cache_path))
+		self.assertIsNone(octoprint.plugin.core.PluginDiscoveryCache(self.cache_path).get_plugin("hook_plugin"))
+
+	def test_import_times_recorded(self):
+		plugin_manager = self._plugin_manager()
+
+		self.assertIsNotNone(plugin_manager.plugins["hook_plugin"].import_time)
+		self.assertIsNotNone(plugin_manager.plugins["startup_plugin"].import_time)
+
+	def test_lazy_import(self):
+		eager = self._plugin_manager(lazy_import=True)
+		self.assertFalse(eager.plugins["hook_plugin"].lazy)
+
+		plugin_manager = self._plugin_manager(lazy_import=True)
+		plugin = plugin_manager.plugins["hook_plugin"]
+
+		# only hooks, so the import got deferred ...
+		self.assertTrue(plugin.lazy)
+		self.assertIsNone(plugin.instance)
+		self.assertTrue(plugin.enabled)
+		self.assertEqual(eager.get_hooks("some.ordered.callback").keys(),
+		                 plugin_manager.get_hooks("some.ordered.callback").keys())
+
+		# ... while plugins with implementations were imported right away
+		self.assertFalse(plugin_manager.plugins["startup_plugin"].lazy)
+		self.assertIsNotNone(plugin_manager.plugins["startup_plugin"].instance)
+
+		# the first hook invocation triggers the import
+		self.assertEqual("success", plugin_manager.get_hooks("octoprint.core.startup")["hook_plugin"]())
+		self.assertFalse(plugin.lazy)
+		self.assertIsNotNone(plugin.instance)
+		self.assertIsNotNone(plugin.import_time)
+
+		# and the placeholders got replaced by the actual handlers
+		self.assertEqual(plugin.instance.hook_startup, plugin_manager.get_hooks("octoprint.core.startup")["hook_plugin"])
+		self.assertEqual(eager.get_hooks("some.ordered.callback").keys(),
+		                 plugin_manager.get_hooks("some.ordered.callback").keys())
+
+	def test_lazy_import_needs_unchanged_source(self):
+		self._plugin_manager(lazy_import=True)
+
+		with mock.patch("octoprint.plugin.core._stat_signature", return_value=[0, 0]):
+			plugin_manager = self._plugin_manager(lazy_import=True)
+
+		self.assertFalse(plugin_manager.plugins["hook_plugin"].lazy)
+
+	def test_lazy_import_disabled(self):
+		self._plugin_manager()
+		plugin_manager = self._plugin_manager()
+
+		self.assertFalse(plugin_manager.plugins["hook_plugin"].lazy)
@@ -0,0 +1,110 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import time
+import unittest
+
+import ddt
+
+from octoprint.plugins.logging import logs
+
+START = time.mktime((2018, 5, 1, 12, 0, 0, 0, 0, -1))
+
+
+def log_line(index):
+	timestamp = time.strftime(logs.TIMESTAMP_FORMAT, time.localtime(START + index))
+	return "{},{:03d} - octoprint.test - INFO - Line {}\n".format(timestamp, index % 1000, index).encode("ascii")
+
+
+def traceback_lines(index):
+	return b"Traceback (most recent call last):\n  File \"test.py\", line " + str(index).encode("ascii") + b"\n"
+
+
+@ddt.ddt
+class LogsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+		# one line per second, with a traceback after every 1000th line
+		self.lines = []
+		for index in range(10000):
+			self.lines.append(log_line(index))
+			if index % 1000 == 500:
+				self.lines += traceback_lines(index).splitlines(True)
+		self.content = b"".join(self.lines)
+
+		self.plain = os.path.join(self.basedir, "octoprint.log")
+		with open(self.plain, "wb") as f:
+			f.write(self.content)
+
+		self.compressed = os.path.join(self.basedir, "octoprint.log.1.gz")
+		with gzip.open(self.compressed, "wb") as f:
+			f.write(self.content)
+
+	def _path(self, compressed):
+		return self.compressed if compressed else self.plain
+
+	@ddt.data(False, True)
+	def test_log_size(self, compressed):
+		self.assertEqual(len(self.content), logs.log_size(self._path(compressed)))
+
+	@ddt.data(*[(compressed, count) for compressed in (False, True) for count in (1, 5, 5000, 20000)])
+	@ddt.unpack
+	def test_tail(self, compressed, count):
+		self.assertEqual(self.lines[-count:], logs.tail(self._path(compressed), count))
+
+	def test_tail_without_trailing_newline(self):
+		with open(self.plain, "ab") as f:
+			f.write(b"incomplete")
+
+		self.assertEqual([self.lines[-1], b"incomplete"], logs.tail(self.plain, 2))
+
+	@ddt.data(*[(compressed, start, stop)
+	            for compressed in (False, True)
+	            for start, stop in ((0, 100), (1000, 300000), (5, 6), (400000, 10 ** 9))])
+	@ddt.unpack
+	def test_read_range(self, compressed, start, stop):
+		self.assertEqual(self.content[start:stop], b"".join(logs.read_range(self._path(compressed), start, stop)))
+
+	@ddt.data(False, True)
+	def test_search_pattern(self, compressed):
+		matches = list(logs.search(self._path(compressed), re.compile(b"Line 42\\d\\b")))
+
+		self.assertEqual([b"Line {}".format(index) for index in range(420, 430)],
+		                 [match.text[-len("Line 420"):] for match in matches])
+
+		first = matches[0]
+		self.assertEqual(self.content[first.offset:].split(b"\n")[0], first.text)
+		self.assertEqual(self.lines.index(log_line(420)) + 1, first.line)
+
+	@ddt.data(False, True)
+	def test_search_time_window(self, compressed):
+		matches = list(logs.search(self._path(compressed), None, since=START + 7500, until=START + 7600))
+
+		# tracebacks belong to the line before them
+		expected = []
+		for index in range(7500, 7601):
+			expected.append(log_line(index).rstrip(b"\n"))
+			if index == 7500:
+				expected += traceback_lines(index).splitlines()
+
+		self.assertEqual(expected, [match.text for match in matches])
+		self.assertEqual(self.content.index(log_line(7500)), matches[0].offset)
+
+	@ddt.data(False, True)
+	def test_search_limit(self, compressed):
+		matches = list(logs.search(self._path(compressed), re.compile(b"Traceback"), since=START + 2000, limit=3))
+
+		self.assertEqual(3, len(matches))
+		self.assertEqual(self.content.index(traceback_lines(2500)), matches[0].offset)
+		self.assertEqual(self.content.index(traceback_lines(4500)), matches[2].offset)
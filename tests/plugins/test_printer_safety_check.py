@@ -0,0 +1,53 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+
+import ddt
+import mock
+
+from octoprint.util.comm import ReceivedLinePatterns
+
+
+@ddt.ddt
+class PrinterSafetyCheckReceivedTest(unittest.TestCase):
+
+	def setUp(self):
+		from octoprint.plugins.printer_safety_check import PrinterSafetyCheckPlugin
+
+		self.plugin = PrinterSafetyCheckPlugin()
+		self.plugin._identifier = "printer_safety_check"
+		self.plugin._printer = mock.Mock()
+		self.plugin._plugin_manager = mock.Mock()
+
+		self.patterns = ReceivedLinePatterns()
+		for subscription in self.plugin.get_received_patterns(None):
+			self.patterns.add(subscription["pattern"],
+			                  subscription["callback"],
+			                  regex=subscription.get("regex", False),
+			                  ignorecase=subscription.get("ignorecase", False))
+
+	@ddt.data("echo: | Author: (Jolly, xxxxxxxx.CO.)\n",
+	          "echo:| AUTHOR: (**JOLLY, XXXXXXXX.CO.**)\n",
+	          "echo: | Author: (CR-10Slanguage)\n")
+	def test_unsafe_firmware(self, line):
+		self.patterns.match(None, "start\n")
+		self.patterns.match(None, line)
+		self.patterns.match(None, line)
+
+		self.assertEqual(["firmware-unsafe"], list(self.plugin._warnings.keys()))
+		self.plugin._plugin_manager.send_plugin_message.assert_called_once_with("printer_safety_check",
+		                                                                        dict(type="update"))
+
+	def test_safe_firmware(self):
+		self.patterns.match(None, "echo: | Author: (none, default config)\n")
+		self.assertEqual(dict(), self.plugin._warnings)
+
+	def test_after_firmware_info(self):
+		self.plugin.on_firmware_info_received(None, "Marlin 1.1.8", dict())
+		self.patterns.match(None, "echo: | Author: (CR-10Slanguage)\n")
+
+		self.assertEqual(dict(), self.plugin._warnings)
@@ -0,0 +1,169 @@
+# coding=utf-8
+"""
+Unit tests for the version checks of bundled plugin "Software Update".
+"""
+
+from __future__ import absolute_import
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import json
+import threading
+import unittest
+
+import mock
+
+try:
+	from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+	from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from octoprint.plugins.softwareupdate import version_checks
+from octoprint.plugins.softwareupdate.version_checks import github_release, github_commit
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		server = self.server
+		server.requests.append(dict((key.lower(), value) for key, value in self.headers.items()))
+
+		etag, body = server.resources.get(self.path, (None, None))
+		if body is None:
+			self.send_response(404)
+			self.end_headers()
+			return
+
+		if etag is not None and self.headers.get("If-None-Match") == etag:
+			self.send_response(304)
+			self.send_header("ETag", etag)
+			self.end_headers()
+			return
+
+		data = json.dumps(body).encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		if etag is not None:
+			self.send_header("ETag", etag)
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, *args, **kwargs):
+		pass
+
+
+class ConditionalVersionCheckTest(unittest.TestCase):
+
+	def setUp(self):
+		self.server = HTTPServer(("127.0.0.1", 0), _StandInHandler)
+		self.server.resources = dict()
+		self.server.requests = []
+
+		self.thread = threading.Thread(target=self.server.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+
+		self.base_url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+		version_checks.conditional_cache.clear()
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		version_checks.conditional_cache.clear()
+
+	def _release(self, version):
+		return dict(name=version, tag_name=version, html_url="some_url", published_at="2018-01-01T12:00:00Z",
+		            prerelease=False, draft=False, target_commitish="master", body="lots of text we don't need")
+
+	def test_github_release_revalidated(self):
+		self.server.resources["/repos/foosel/OctoPrint/releases"] = ("\"v1\"", [self._release("1.3.8"),
+		                                                                        self._release("1.3.9")])
+
+		with mock.patch.object(github_release, "RELEASE_URL", self.base_url + "/repos/{user}/{repo}/releases"):
+			first = github_release._get_latest_release("foosel", "OctoPrint", "python")
+			second = github_release._get_latest_release("foosel", "OctoPrint", "python")
+
+		self.assertEqual(("1.3.9", "1.3.9", "some_url"), first)
+		self.assertEqual(first, second)
+
+		self.assertEqual(2, len(self.server.requests))
+		self.assertNotIn("if-none-match", self.server.requests[0])
+		self.assertEqual("\"v1\"", self.server.requests[1]["if-none-match"])
+
+		# only the fields we need got remembered
+		entry = version_checks.conditional_cache.get(self.base_url + "/repos/foosel/OctoPrint/releases")
+		self.assertEqual("\"v1\"", entry["etag"])
+		self.assertNotIn("body", entry["payload"][0])
+
+	def test_github_release_changed(self):
+		url = "/repos/foosel/OctoPrint/releases"
+		self.server.resources[url] = ("\"v1\"", [self._release("1.3.8")])
+
+		with mock.patch.object(github_release, "RELEASE_URL", self.base_url + "/repos/{user}/{repo}/releases"):
+			first = github_release._get_latest_release("foosel", "OctoPrint", "python")
+			self.server.resources[url] = ("\"v2\"", [self._release("1.3.8"), self._release("1.3.9")])
+			second = github_release._get_latest_release("foosel", "OctoPrint", "python")
+
+		self.assertEqual("1.3.8", first[1])
+		self.assertEqual("1.3.9", second[1])
+		self.assertEqual("\"v2\"", version_checks.conditional_cache.get(self.base_url + url)["etag"])
+
+	def test_github_commit_without_etag(self):
+		url = "/repos/foosel/OctoPrint/git/refs/heads/master"
+		self.server.resources[url] = (None, dict(object=dict(sha="abcdef")))
+
+		with mock.patch.object(github_commit, "BRANCH_HEAD_URL", self.base_url + "/repos/{user}/{repo}/git/refs/heads/{branch}"):
+			self.assertEqual("abcdef", github_commit._get_latest_commit("foosel", "OctoPrint", "master"))
+			self.assertEqual("abcdef", github_commit._get_latest_commit("foosel", "OctoPrint", "master"))
+
+		self.assertIsNone(version_checks.conditional_cache.get(self.base_url + url))
+		self.assertFalse(any("if-none-match" in request for request in self.server.requests))
+
+	def test_not_found(self):
+		with mock.patch.object(github_release, "RELEASE_URL", self.base_url + "/repos/{user}/{repo}/releases"):
+			self.assertEqual((None, None, None), github_release._get_latest_release("foosel", "OctoPrint", "python"))
+
+	def test_cache_roundtrip(self):
+		cache = version_checks.ConditionalRequestCache()
+		cache.set("http://example.com", etag="\"v1\"", payload=["a", "b"])
+		self.assertTrue(cache.dirty)
+
+		data = cache.to_dict()
+		self.assertTrue(cache.dirty)
+		cache.mark_saved(data)
+		self.assertFalse(cache.dirty)
+
+		other = version_checks.ConditionalRequestCache()
+		other.from_dict(data)
+		self.assertEqual(dict(etag="\"v1\"", last_modified=None, payload=["a", "b"]), other.get("http://example.com"))
+
+	def test_cache_modified_while_saving(self):
+		cache = version_checks.ConditionalRequestCache()
+		cache.set("http://example.com", etag="\"v1\"")
+
+		data = cache.to_dict()
+		cache.set("http://example.com", etag="\"v2\"")
+		cache.mark_saved(data)
+
+		self.assertTrue(cache.dirty)
+
+	def test_cache_stays_dirty_if_saving_fails(self):
+		from octoprint.plugins.softwareupdate import SoftwareUpdatePlugin
+
+		cache = version_checks.ConditionalRequestCache()
+		cache.set("http://example.com", etag="\"v1\"")
+
+		plugin = SoftwareUpdatePlugin()
+		plugin._logger = mock.MagicMock()
+		plugin._version_cache_path = "versioncache.yaml"
+
+		with mock.patch.object(version_checks, "conditional_cache", cache):
+			with mock.patch("octoprint.util.atomic_write", side_effect=IOError("disk full")):
+				self.assertRaises(IOError, plugin._save_version_cache)
+			self.assertTrue(cache.dirty)
+
+			with mock.patch("octoprint.util.atomic_write"):
+				plugin._save_version_cache()
+			self.assertFalse(cache.dirty)
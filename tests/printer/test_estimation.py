@@ -1,6 +1,6 @@
 # coding=utf-8
 from __future__ import absolute_import, division, print_function
-from octoprint.printer.estimation import TimeEstimationHelper
+from octoprint.printer.estimation import TimeEstimationHelper, PrintTimeEstimator
 
 __author__ = "Gina Häußge <osd@foosel.net>"
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
@@ -8,6 +8,7 @@ __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms
 
 
 import unittest
+import mock
 from ddt import ddt, data, unpack
 
 import octoprint.printer
@@ -73,3 +74,81 @@ class EstimationTestCase(unittest.TestCase):
 
 		self.assertEqual(self.estimation_helper.is_stable(), expected)
 
+
+
+class PrintTimeEstimatorTestCase(unittest.TestCase):
+
+	def setUp(self):
+		values = {
+			"statsWeighingUntil": 0.5,
+			"validityRange": 0.15,
+			"forceDumbFromPercent": 0.3,
+			"forceDumbAfterMin": 30
+		}
+		settings = mock.patch("octoprint.printer.estimation.settings").start()
+		settings.return_value.getFloat.side_effect = lambda path: values[path[-1]]
+		self.addCleanup(mock.patch.stopall)
+
+		self.estimator = PrintTimeEstimator("stream")
+
+	def test_linear(self):
+		self.assertEqual((60.0, "linear"), self.estimator.estimate(0.5, 60.0, 60.0, None, None, filepos=500))
+
+	def test_position_index(self):
+		position_index = mock.MagicMock()
+		position_index.progress_at.return_value = 0.75
+		self.estimator.set_position_index(position_index)
+
+		# the first half of the file takes three quarters of the print time
+		self.assertEqual((20.0, "linear"), self.estimator.estimate(0.5, 60.0, 60.0, None, None, filepos=500))
+		position_index.progress_at.assert_called_once_with(500)
+
+
+@ddt
+class EstimatorFactoryTestCase(unittest.TestCase):
+
+	class LegacyEstimator(object):
+		def __init__(self, job_type):
+			self.calls = []
+
+		def estimate(self, progress, printTime, cleanedPrintTime, statisticalTotalPrintTime,
+		             statisticalTotalPrintTimeType):
+			self.calls.append((progress, printTime, cleanedPrintTime, statisticalTotalPrintTime,
+			                   statisticalTotalPrintTimeType))
+			return 10.0, "estimate"
+
+		def set_position_index(self, position_index):
+			pass
+
+	class FileposEstimator(object):
+		def __init__(self, job_type):
+			pass
+
+		def estimate(self, progress, printTime, cleanedPrintTime, statisticalTotalPrintTime,
+		             statisticalTotalPrintTimeType, filepos=None):
+			return filepos, "estimate"
+
+	class KwargsEstimator(object):
+		def __init__(self, job_type):
+			pass
+
+		def estimate(self, *args, **kwargs):
+			return kwargs.get("filepos"), "estimate"
+
+	@data(FileposEstimator, KwargsEstimator)
+	def test_filepos(self, estimator_class):
+		from octoprint.printer.standard import _filepos_estimator_factory
+
+		estimator = _filepos_estimator_factory(estimator_class)("local")
+
+		self.assertIsInstance(estimator, estimator_class)
+		self.assertEqual((500, "estimate"), estimator.estimate(0.5, 60.0, 60.0, None, None, filepos=500))
+
+	def test_legacy(self):
+		from octoprint.printer.standard import _filepos_estimator_factory
+
+		estimator = _filepos_estimator_factory(self.LegacyEstimator)("local")
+
+		self.assertEqual((10.0, "estimate"), estimator.estimate(0.5, 60.0, 60.0, None, None, filepos=500))
+		self.assertEqual([(0.5, 60.0, 60.0, None, None)], estimator.calls)
+		self.assertTrue(hasattr(estimator, "set_position_index"))
@@ -0,0 +1,131 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import yaml
+
+from octoprint.printer.profile import PrinterProfileManager
+
+
+class PrinterProfileManagerCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+		settings_patcher = mock.patch("octoprint.printer.profile.settings")
+		settings = settings_patcher.start()
+		self.addCleanup(settings_patcher.stop)
+
+		settings.return_value.getBaseFolder.return_value = self.basedir
+		settings.return_value.get.side_effect = lambda path: "_default" if path == ["printerProfiles", "default"] else None
+
+		self.manager = PrinterProfileManager()
+		self.manager.save(dict(id="other", name="Other"))
+		self._settle()
+
+	def _settle(self):
+		# pretend all files have been written a while ago
+		settled = time.time() - 60
+		for name in os.listdir(self.basedir):
+			os.utime(os.path.join(self.basedir, name), (settled, settled))
+		os.utime(self.basedir, (settled, settled))
+
+	def _write(self, identifier, **overrides):
+		profile = self.manager.get("_default")
+		profile.update(overrides)
+		profile["id"] = identifier
+		with open(os.path.join(self.basedir, identifier + ".profile"), "wb") as f:
+			yaml.safe_dump(profile, f)
+
+	def test_loaded_once(self):
+		with mock.patch("yaml.safe_load", wraps=yaml.safe_load) as safe_load:
+			self.assertEqual({"_default", "other"}, set(self.manager.get_all().keys()))
+			self.assertEqual(2, safe_load.call_count)
+
+			self.manager.get_all()
+			self.manager.get("other")
+			self.assertEqual(2, self.manager.profile_count)
+			self.assertEqual(2, safe_load.call_count)
+
+	def test_copies(self):
+		self.manager.get("other")["name"] = "Changed"
+		self.manager.get_all()["other"]["volume"]["width"] = 1
+
+		profile = self.manager.get("other")
+		self.assertEqual("Other", profile["name"])
+		self.assertEqual(200.0, profile["volume"]["width"])
+
+	def test_external_change(self):
+		self.manager.get_all()
+
+		self._write("other", name="Changed externally")
+		modified = time.time() - 30
+		os.utime(os.path.join(self.basedir, "other.profile"), (modified, modified))
+
+		self.assertEqual("Changed externally", self.manager.get("other")["name"])
+		self.assertEqual("Changed externally", self.manager.get_all()["other"]["name"])
+
+	def test_external_add(self):
+		self.assertEqual(2, self.manager.profile_count)
+
+		self._write("added", name="Added")
+		self._settle()
+
+		self.assertEqual(3, self.manager.profile_count)
+		self.assertEqual("Added", self.manager.get_all()["added"]["name"])
+
+	def test_recently_modified(self):
+		self._write("other", name="Changed externally")
+
+		# a modification time this recent might not change again on the next write, so it doesn't get cached
+		with mock.patch("yaml.safe_load", wraps=yaml.safe_load) as safe_load:
+			self.assertEqual("Changed externally", self.manager.get("other")["name"])
+			self.manager.get("other")
+			self.assertEqual(2, safe_load.call_count)
+
+	def test_save_and_remove(self):
+		self.manager.get_all()
+
+		profile = self.manager.get("other")
+		profile["name"] = "Saved"
+		self.manager.save(profile, allow_overwrite=True)
+		self.assertEqual("Saved", self.manager.get("other")["name"])
+
+		self.assertTrue(self.manager.remove("other"))
+		self.assertIsNone(self.manager.get("other"))
+		self.assertEqual(["_default"], list(self.manager.get_all().keys()))
+		self.assertEqual(1, self.manager.profile_count)
+
+	def test_legacy_profile(self):
+		# profiles saved before acceleration and jerk were added
+		self._write("legacy", name="Legacy")
+		path = os.path.join(self.basedir, "legacy.profile")
+		with open(path, "rb") as f:
+			profile = yaml.safe_load(f)
+		for axis in profile["axes"].values():
+			del axis["acceleration"]
+			del axis["jerk"]
+		profile["axes"]["x"]["jerk"] = 20
+		with open(path, "wb") as f:
+			yaml.safe_dump(profile, f)
+		self._settle()
+
+		loaded = self.manager.get("legacy")
+		self.assertEqual("Legacy", loaded["name"])
+		self.assertEqual(1000.0, loaded["axes"]["x"]["acceleration"])
+		self.assertEqual(20.0, loaded["axes"]["x"]["jerk"])
+		self.assertEqual(0.4, loaded["axes"]["z"]["jerk"])
+
+		# the migrated profile got saved
+		with open(path, "rb") as f:
+			self.assertEqual(3000, yaml.safe_load(f)["axes"]["e"]["acceleration"])
@@ -0,0 +1,124 @@
+# coding=utf-8
+"""
+Unit tests for the API key handling in octoprint.server.util
+"""
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+
+import flask
+import mock
+
+import octoprint.server.util
+
+
+class GetUserForApikeyTest(unittest.TestCase):
+
+	def setUp(self):
+		self.now = 100.0
+		self.ttls = dict(keyValidatorCacheTtl=10.0, keyValidatorCacheNegativeTtl=2.0)
+
+		def snapshot_get(path):
+			return dict(enabled=True, key="masterkey").get(path[-1]) if path[0] == "api" else None
+
+		def snapshot_get_float(path):
+			return self.ttls.get(path[-1])
+
+		settings_patcher = mock.patch("octoprint.server.util.settings")
+		settings = settings_patcher.start()
+		self.addCleanup(settings_patcher.stop)
+		snapshot = settings.return_value.snapshot.return_value
+		snapshot.getBoolean.return_value = True
+		snapshot.get.side_effect = snapshot_get
+		snapshot.getFloat.side_effect = snapshot_get_float
+
+		time_patcher = mock.patch("octoprint.server.util.monotonic_time", side_effect=lambda: self.now)
+		time_patcher.start()
+		self.addCleanup(time_patcher.stop)
+
+		app_session_manager_patcher = mock.patch("octoprint.server.appSessionManager")
+		app_session_manager = app_session_manager_patcher.start()
+		self.addCleanup(app_session_manager_patcher.stop)
+		app_session_manager.validate.return_value = False
+
+		user_manager_patcher = mock.patch("octoprint.server.userManager")
+		user_manager = user_manager_patcher.start()
+		self.addCleanup(user_manager_patcher.stop)
+		user_manager.enabled = True
+		user_manager.findUser.return_value = None
+
+		self.hook_user = mock.MagicMock()
+		self.hook = mock.MagicMock(side_effect=lambda apikey: self.hook_user if apikey == "hookkey" else None)
+
+		plugin_manager_patcher = mock.patch("octoprint.server.util.plugin_manager")
+		plugin_manager = plugin_manager_patcher.start()
+		self.addCleanup(plugin_manager_patcher.stop)
+		plugin_manager.return_value.get_hooks.return_value = dict(test=self.hook)
+
+		octoprint.server.util.key_validator_cache.clear()
+
+	def test_master_key(self):
+		user = octoprint.server.util.get_user_for_apikey("masterkey")
+
+		self.assertIsInstance(user, octoprint.server.util.ApiUser)
+		self.assertEqual(0, self.hook.call_count)
+
+	def test_hook_result_cached(self):
+		self.assertEqual(self.hook_user, octoprint.server.util.get_user_for_apikey("hookkey"))
+		self.assertEqual(self.hook_user, octoprint.server.util.get_user_for_apikey("hookkey"))
+		self.assertEqual(1, self.hook.call_count)
+
+		# expired
+		self.now += 10.0
+		self.assertEqual(self.hook_user, octoprint.server.util.get_user_for_apikey("hookkey"))
+		self.assertEqual(2, self.hook.call_count)
+
+	def test_negative_result_cached(self):
+		self.assertIsNone(octoprint.server.util.get_user_for_apikey("unknown"))
+		self.assertIsNone(octoprint.server.util.get_user_for_apikey("unknown"))
+		self.assertEqual(1, self.hook.call_count)
+
+		self.now += 2.0
+		self.assertIsNone(octoprint.server.util.get_user_for_apikey("unknown"))
+		self.assertEqual(2, self.hook.call_count)
+
+	def test_cache_disabled(self):
+		self.ttls = dict(keyValidatorCacheTtl=0, keyValidatorCacheNegativeTtl=0)
+
+		for _ in range(3):
+			octoprint.server.util.get_user_for_apikey("hookkey")
+			octoprint.server.util.get_user_for_apikey("unknown")
+
+		self.assertEqual(6, self.hook.call_count)
+
+	def test_auth_time_recorded(self):
+		app = flask.Flask(__name__)
+
+		def slow_hook(apikey):
+			self.now += 0.25
+			return None
+		self.hook.side_effect = slow_hook
+
+		with app.test_request_context("/api/version"):
+			octoprint.server.util.get_user_for_apikey("masterkey")
+			self.now += 1.0
+			octoprint.server.util.get_user_for_apikey("unknown")
+
+			self.assertEqual(0.25, flask.request.environ[octoprint.server.util.AUTH_TIME_ENVIRON_KEY])
+
+
+class KeyValidatorCacheTest(unittest.TestCase):
+
+	def test_prune(self):
+		with mock.patch("octoprint.server.util.settings") as settings:
+			settings.return_value.snapshot.return_value.getFloat.return_value = 10.0
+
+			cache = octoprint.server.util.KeyValidatorCache(max_size=10)
+			for i in range(25):
+				cache.set("key{}".format(i), "user{}".format(i))
+
+			self.assertTrue(len(cache._entries) <= 10)
+			self.assertEqual((True, "user24"), cache.get("key24"))
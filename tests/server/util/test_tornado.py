@@ -93,3 +93,156 @@ class ExtendedHeaderValueTest(unittest.TestCase):
 		actual = _extended_header_value(value)
 
 		self.assertEqual(expected, actual)
+
+##~~ UploadStorageFallbackHandler
+
+import os
+import shutil
+import tempfile
+
+import tornado.httputil
+import tornado.testing
+import tornado.web
+
+BOUNDARY = b"----WebKitFormBoundarypYiSUx63abAmhT5C"
+
+def _multipart_body(*parts):
+	body = b""
+	for name, filename, content in parts:
+		body += b"--" + BOUNDARY + b"\r\n"
+		if filename:
+			body += b"Content-Disposition: form-data; name=\"" + name + b"\"; filename=\"" + filename + b"\"\r\n"
+			body += b"Content-Type: application/octet-stream\r\n"
+		else:
+			body += b"Content-Disposition: form-data; name=\"" + name + b"\"\r\n"
+		body += b"\r\n" + content + b"\r\n"
+	body += b"--" + BOUNDARY + b"--\r\n"
+	return body
+
+@ddt
+class UploadStorageFallbackHandlerTest(tornado.testing.AsyncHTTPTestCase):
+
+	def setUp(self):
+		self.upload_folder = tempfile.mkdtemp()
+		self.chunk_size = 65536
+		self.received = []
+		tornado.testing.AsyncHTTPTestCase.setUp(self)
+
+	def tearDown(self):
+		tornado.testing.AsyncHTTPTestCase.tearDown(self)
+		shutil.rmtree(self.upload_folder)
+
+	def get_app(self):
+		from octoprint.server.util.tornado import UploadStorageFallbackHandler
+
+		test = self
+
+		def fallback(request, body):
+			import cgi
+			import io
+
+			environ = {"REQUEST_METHOD": "POST",
+			           "CONTENT_TYPE": request.headers["Content-Type"],
+			           "CONTENT_LENGTH": str(len(body))}
+			form = cgi.FieldStorage(fp=io.BytesIO(body), environ=environ)
+
+			fields = dict((key, form.getfirst(key)) for key in form.keys())
+			files = dict()
+			for key, value in fields.items():
+				if key.endswith(".path"):
+					with open(value, "rb") as f:
+						files[key[:-len(".path")]] = f.read()
+			test.received.append((fields, files))
+
+			request.connection.write_headers(tornado.httputil.ResponseStartLine("HTTP/1.1", 204, "No Content"),
+			                                 tornado.httputil.HTTPHeaders())
+			request.connection.finish()
+
+		class ChunkingHandler(UploadStorageFallbackHandler):
+			def data_received(self, chunk):
+				# simulate arbitrary chunk borders
+				for offset in range(0, len(chunk), test.chunk_size):
+					UploadStorageFallbackHandler.data_received(self, chunk[offset:offset + test.chunk_size])
+
+		return tornado.web.Application([
+			(r".*", ChunkingHandler, dict(fallback=fallback,
+			                              file_prefix="test-upload-",
+			                              path=self.upload_folder))
+		])
+
+	def _post(self, body):
+		return self.fetch("/api/files/local",
+		                  method="POST",
+		                  headers={"Content-Type": b"multipart/form-data; boundary=" + BOUNDARY},
+		                  body=body)
+
+	@data(1, 2, 7, 38, 41, 42, 43, 100, 65536)
+	def test_multipart(self, chunk_size):
+		self.chunk_size = chunk_size
+		content = b"G28\r\nG1 X10 Y10\r\n--not-a-boundary\r\n\r\n" + b"M117 \r\n--" + BOUNDARY[:-1] + b"\r\nG0"
+
+		response = self._post(_multipart_body((b"file", b"test.gcode", content),
+		                                      (b"select", None, b"true"),
+		                                      (b"print", None, b"")))
+
+		self.assertEqual(204, response.code)
+		self.assertEqual(1, len(self.received))
+
+		fields, files = self.received[0]
+		self.assertEqual("true", fields["select"])
+		self.assertEqual("", fields["print"])
+		self.assertEqual("test.gcode", fields["file.name"])
+		self.assertEqual("application/octet-stream", fields["file.content_type"])
+		self.assertEqual(str(len(content)), fields["file.size"])
+		self.assertEqual(content, files["file"])
+
+		# upload got stored in the configured folder and cleaned up again afterwards
+		self.assertTrue(fields["file.path"].startswith(os.path.join(self.upload_folder, "test-upload-")))
+		self.assertEqual([], os.listdir(self.upload_folder))
+
+	def test_multipart_preamble_and_epilogue(self):
+		body = b"This is the preamble\r\n" + _multipart_body((b"file", b"test.gcode", b"G28")) + b"This is the epilogue"
+
+		response = self._post(body)
+
+		self.assertEqual(204, response.code)
+		fields, files = self.received[0]
+		self.assertEqual(b"G28", files["file"])
+
+	def test_multipart_large_file(self):
+		self.chunk_size = 4096
+		content = os.urandom(1024 * 1024)
+
+		response = self._post(_multipart_body((b"file", b"test.bin", content)))
+
+		self.assertEqual(204, response.code)
+		fields, files = self.received[0]
+		self.assertEqual(content, files["file"])
+
+
+##~~ WsgiInputContainer
+
+class WsgiInputContainerLogTest(unittest.TestCase):
+
+	def _log(self, environ):
+		from octoprint.server.util.tornado import WsgiInputContainer
+
+		request = mock.MagicMock()
+		request.method = "GET"
+		request.uri = "/api/version"
+		request.remote_ip = "127.0.0.1"
+		request.request_time.return_value = 0.1
+
+		with mock.patch("logging.getLogger") as get_logger:
+			WsgiInputContainer(mock.MagicMock())._log(200, request, environ=environ)
+		return get_logger.return_value.info
+
+	def test_auth_time(self):
+		import octoprint.server.util
+
+		log = self._log({octoprint.server.util.AUTH_TIME_ENVIRON_KEY: 0.025})
+		log.assert_called_once_with("%d %s %.2fms (auth %.2fms)", 200, "GET /api/version (127.0.0.1)", 100.0, 25.0)
+
+	def test_no_auth_time(self):
+		log = self._log(dict())
+		log.assert_called_once_with("%d %s %.2fms", 200, "GET /api/version (127.0.0.1)", 100.0)
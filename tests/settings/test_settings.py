@@ -17,6 +17,7 @@ import tempfile
 import yaml
 import hashlib
 import ddt
+import mock
 import time
 
 import octoprint.settings
@@ -464,6 +465,90 @@ class TestSettings(unittest.TestCase):
 			last_modified = os.stat(configfile).st_mtime
 			self.assertEqual(settings.last_modified, last_modified)
 
+	##~~ test snapshot
+
+	def test_snapshot(self):
+		with self.mocked_config():
+			settings = octoprint.settings.Settings()
+			snapshot = settings.snapshot()
+
+			self.assertEqual("test", snapshot.get(["api", "key"]))
+			self.assertEqual(8080, snapshot.getInt(["server", "port"]))
+			self.assertEqual(5.0, snapshot.getFloat(["serial", "timeout", "connection"]))
+			self.assertTrue(snapshot.getBoolean(["devel", "virtualPrinter", "enabled"]))
+			self.assertEqual(("/dev/portA", "/dev/portB"), snapshot.get(["serial", "additionalPorts"]))
+			self.assertEqual(settings.get(["serial", "timeout"], merged=True), dict(snapshot.get(["serial", "timeout"])))
+			self.assertTrue(snapshot.has(["api", "key"]))
+			self.assertFalse(snapshot.has(["api", "lock"]))
+			self.assertIsNone(snapshot.get(["api", "lock"]))
+
+	def test_snapshot_frozen(self):
+		with self.mocked_config():
+			settings = octoprint.settings.Settings()
+			timeout = settings.snapshot().get(["serial", "timeout"])
+
+			with self.assertRaises(TypeError):
+				timeout["detection"] = 2.0
+			with self.assertRaises(TypeError):
+				settings.snapshot().get(["serial", "additionalPorts"])[0] = "/dev/portC"
+
+	def test_snapshot_reused(self):
+		with self.mocked_config():
+			settings = octoprint.settings.Settings()
+			self.assertIs(settings.snapshot(), settings.snapshot())
+
+	@ddt.data(
+		lambda settings: settings.set(["server", "port"], 1234),
+		lambda settings: settings.setInt(["server", "port"], "1234"),
+		lambda settings: settings.remove(["server", "port"]),
+		lambda settings: settings.add_overlay(dict(server=dict(port=1234))),
+		lambda settings: settings.load(),
+	)
+	def test_snapshot_invalidation(self, change):
+		with self.mocked_config():
+			settings = octoprint.settings.Settings()
+			settings._config["server"]["port"] = 4321
+			before = settings.snapshot()
+
+			change(settings)
+
+			after = settings.snapshot()
+			self.assertIsNot(before, after)
+			self.assertEqual(settings.get(["server", "port"]), after.get(["server", "port"]))
+
+	def test_snapshot_invalidation_folder_fallback(self):
+		with self.mocked_config() as paths:
+			basedir, _ = paths
+
+			invalid_folder = os.path.join(basedir, "not_a_folder")
+			with open(invalid_folder, "w") as f:
+				f.write("test")
+
+			settings = octoprint.settings.Settings()
+			settings._config["folder"] = dict(uploads=invalid_folder)
+			settings._invalidate_snapshot()
+			before = settings.snapshot()
+			self.assertEqual(invalid_folder, before.get(["folder", "uploads"]))
+
+			with mock.patch.object(settings, "save"):
+				settings.getBaseFolder("uploads")
+
+			after = settings.snapshot()
+			self.assertIsNot(before, after)
+			self.assertIsNone(after.get(["folder", "uploads"]))
+
+	def test_snapshot_get_preprocessor(self):
+		with self.mocked_config():
+			settings = octoprint.settings.Settings()
+			settings.set(["controls"], [dict(name="Test", children=[None, dict(regex="T:(.*)", template="{0}")])], force=True)
+
+			controls = settings.snapshot().get(["controls"])
+			expected = settings.get(["controls"])[0]["children"][0]
+
+			self.assertEqual(1, len(controls[0]["children"]))
+			self.assertEqual(expected, dict(controls[0]["children"][0]))
+			self.assertIn("template_key", controls[0]["children"][0])
+
 	##~~ test preprocessors
 
 	def test_get_preprocessor(self):
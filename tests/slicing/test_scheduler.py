@@ -0,0 +1,289 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from octoprint.slicing.exceptions import SlicingCancelled
+from octoprint.slicing.scheduler import SlicingJob, SlicingJobScheduler, SlicingCache, ProgressThrottle, cache_key
+
+
+class BlockingSlicer(object):
+	"""Slicer stand-in whose runs block until released, writing the source path into the destination."""
+
+	def __init__(self):
+		self.started = []
+		self.cancelled = []
+		self._releases = dict()
+		self._mutex = threading.Lock()
+		self._started_event = threading.Condition(self._mutex)
+
+	def do_slice(self, job, on_progress):
+		release = threading.Event()
+		with self._mutex:
+			self._releases[job.dest_path] = release
+			self.started.append(job.source_path)
+			self._started_event.notify_all()
+
+		if on_progress is not None:
+			on_progress(_progress=0.5)
+
+		release.wait(5)
+		if job.dest_path in self.cancelled:
+			raise SlicingCancelled()
+
+		with open(job.dest_path, "wb") as f:
+			f.write(job.source_path.encode("utf-8"))
+		return True, dict(analysis=dict(source=job.source_path))
+
+	def cancel_slice(self, job):
+		self.cancelled.append(job.dest_path)
+		self.release(job.dest_path)
+
+	def wait_started(self, count):
+		with self._mutex:
+			while len(self.started) < count:
+				self._started_event.wait(5)
+		return list(self.started)
+
+	def release(self, dest_path):
+		with self._mutex:
+			release = self._releases.get(dest_path)
+		if release is not None:
+			release.set()
+
+
+class SlicingJobSchedulerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.slicer = BlockingSlicer()
+		self.done = dict()
+		self.done_mutex = threading.Condition()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _job(self, source, dest, priority=None, key=None, on_progress=None):
+		def callback(**kwargs):
+			with self.done_mutex:
+				self.done[dest] = kwargs
+				self.done_mutex.notify_all()
+
+		return SlicingJob("mock", source, os.path.join(self.folder, dest), None, dict(), None, callback,
+		                  callback_kwargs=dict(), on_progress=on_progress, priority=priority, key=key)
+
+	def _wait_done(self, *dests):
+		with self.done_mutex:
+			while not all(dest in self.done for dest in dests):
+				self.done_mutex.wait(5)
+
+	def test_concurrency_limit(self):
+		scheduler = SlicingJobScheduler(self.slicer.do_slice, self.slicer.cancel_slice, concurrency=2)
+
+		for i in range(3):
+			scheduler.submit(self._job("model{}".format(i), "dest{}".format(i)))
+
+		self.assertEqual(["model0", "model1"], self.slicer.wait_started(2))
+		self.assertEqual(2, scheduler.running)
+		self.assertEqual(1, scheduler.queued)
+
+		self.slicer.release(os.path.join(self.folder, "dest0"))
+		self.assertEqual(["model0", "model1", "model2"], self.slicer.wait_started(3))
+
+		self.slicer.release(os.path.join(self.folder, "dest1"))
+		self.slicer.release(os.path.join(self.folder, "dest2"))
+		self._wait_done("dest0", "dest1", "dest2")
+
+		self.assertEqual(dict(source="model2"), self.done["dest2"]["_analysis"])
+
+	def test_priority_order(self):
+		scheduler = SlicingJobScheduler(self.slicer.do_slice, self.slicer.cancel_slice, concurrency=1)
+
+		scheduler.submit(self._job("blocker", "blocker"))
+		self.slicer.wait_started(1)
+
+		scheduler.submit(self._job("low", "low", priority=SlicingJobScheduler.PRIORITY_LOW))
+		scheduler.submit(self._job("normal1", "normal1"))
+		scheduler.submit(self._job("normal2", "normal2"))
+		scheduler.submit(self._job("high", "high", priority=SlicingJobScheduler.PRIORITY_HIGH))
+
+		expected = ["blocker", "high", "normal1", "normal2", "low"]
+		for count, dest in enumerate(expected, start=1):
+			self.slicer.wait_started(count)
+			self.slicer.release(os.path.join(self.folder, dest))
+		self._wait_done(*expected)
+
+		self.assertEqual(expected, self.slicer.started)
+
+	def test_cancel_queued(self):
+		scheduler = SlicingJobScheduler(self.slicer.do_slice, self.slicer.cancel_slice, concurrency=1)
+
+		scheduler.submit(self._job("blocker", "blocker"))
+		scheduler.submit(self._job("queued", "queued"))
+		self.slicer.wait_started(1)
+
+		self.assertTrue(scheduler.cancel(os.path.join(self.folder, "queued")))
+		self.assertEqual(dict(_cancelled=True), self.done["queued"])
+		self.assertEqual(0, scheduler.queued)
+
+		self.assertFalse(scheduler.cancel(os.path.join(self.folder, "unknown")))
+
+		self.slicer.release(os.path.join(self.folder, "blocker"))
+		self._wait_done("blocker")
+		self.assertEqual(["blocker"], self.slicer.started)
+
+	def test_cancel_running(self):
+		scheduler = SlicingJobScheduler(self.slicer.do_slice, self.slicer.cancel_slice, concurrency=1)
+
+		scheduler.submit(self._job("model", "dest"))
+		self.slicer.wait_started(1)
+
+		self.assertTrue(scheduler.cancel(os.path.join(self.folder, "dest")))
+		self._wait_done("dest")
+
+		self.assertEqual([os.path.join(self.folder, "dest")], self.slicer.cancelled)
+		self.assertEqual(dict(_cancelled=True), self.done["dest"])
+
+	def test_coalescing(self):
+		on_done = mock.MagicMock()
+		scheduler = SlicingJobScheduler(self.slicer.do_slice, self.slicer.cancel_slice, concurrency=2, on_done=on_done)
+		progress = mock.MagicMock()
+
+		self.assertFalse(scheduler.submit(self._job("model", "first", key="same")))
+		self.slicer.wait_started(1)
+		self.assertTrue(scheduler.submit(self._job("model", "second", key="same", on_progress=progress)))
+
+		self.slicer.release(os.path.join(self.folder, "first"))
+		self._wait_done("first", "second")
+
+		# sliced only once, but both destinations got the result
+		self.assertEqual(["model"], self.slicer.started)
+		for dest in ("first", "second"):
+			with open(os.path.join(self.folder, dest), "rb") as f:
+				self.assertEqual(b"model", f.read())
+			self.assertEqual(dict(source="model"), self.done[dest]["_analysis"])
+		self.assertEqual(1, on_done.call_count)
+
+		# a later identical job gets sliced again
+		self.assertFalse(scheduler.submit(self._job("model", "third", key="same")))
+		self.slicer.wait_started(2)
+		self.slicer.release(os.path.join(self.folder, "third"))
+		self._wait_done("third")
+
+	def test_cancel_primary_with_attached_job(self):
+		scheduler = SlicingJobScheduler(self.slicer.do_slice, self.slicer.cancel_slice, concurrency=1)
+
+		scheduler.submit(self._job("model", "first", key="same"))
+		self.slicer.wait_started(1)
+		scheduler.submit(self._job("model", "second", key="same"))
+
+		# the attached job still wants the result, so the slicer keeps running
+		self.assertTrue(scheduler.cancel(os.path.join(self.folder, "first")))
+		self.assertEqual([], self.slicer.cancelled)
+
+		self.slicer.release(os.path.join(self.folder, "first"))
+		self._wait_done("first", "second")
+
+		self.assertEqual(dict(_cancelled=True), self.done["first"])
+		self.assertEqual(dict(source="model"), self.done["second"]["_analysis"])
+
+
+class SlicingCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.cache_folder = os.path.join(self.folder, "cache")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _file(self, name, content):
+		path = os.path.join(self.folder, name)
+		with open(path, "wb") as f:
+			f.write(content)
+		return path
+
+	def test_put_get(self):
+		cache = SlicingCache(self.cache_folder, 1024)
+		source = self._file("source.gco", b"G1 X10")
+
+		self.assertEqual((False, None), cache.get("key", os.path.join(self.folder, "dest.gco")))
+
+		cache.put("key", source, analysis=dict(estimatedPrintTime=10))
+		hit, analysis = cache.get("key", os.path.join(self.folder, "dest.gco"))
+
+		self.assertTrue(hit)
+		self.assertEqual(dict(estimatedPrintTime=10), analysis)
+		with open(os.path.join(self.folder, "dest.gco"), "rb") as f:
+			self.assertEqual(b"G1 X10", f.read())
+
+	def test_eviction(self):
+		cache = SlicingCache(self.cache_folder, 15)
+
+		cache.put("old", self._file("old.gco", b"0123456789"))
+		os.utime(os.path.join(self.cache_folder, "old.gco"), (0, 0))
+		cache.put("new", self._file("new.gco", b"0123456789"))
+
+		self.assertFalse(cache.get("old", os.path.join(self.folder, "dest.gco"))[0])
+		self.assertTrue(cache.get("new", os.path.join(self.folder, "dest.gco"))[0])
+
+	def test_cache_key(self):
+		key = cache_key("mock", "model", "profile", dict(a=1, b=2), dict(x=1, y=2))
+
+		self.assertEqual(key, cache_key("mock", "model", "profile", dict(b=2, a=1), dict(y=2, x=1)))
+		self.assertNotEqual(key, cache_key("mock", "model", "profile", dict(a=1, b=2), dict(x=2, y=2)))
+		self.assertNotEqual(key, cache_key("mock", "other", "profile", dict(a=1, b=2), dict(x=1, y=2)))
+
+
+class ProgressThrottleTest(unittest.TestCase):
+
+	def setUp(self):
+		self.now = 0.0
+		patcher = mock.patch("octoprint.slicing.scheduler.monotonic_time", side_effect=lambda: self.now)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.callback = mock.MagicMock()
+		self.throttle = ProgressThrottle(self.callback, min_delta=0.1, min_interval=1.0)
+
+	def _forwarded(self):
+		return [c[1]["_progress"] for c in self.callback.call_args_list]
+
+	def test_delta(self):
+		for progress in (0.0, 0.05, 0.09, 0.1, 0.15, 0.25, 0.3):
+			self.throttle(_progress=progress)
+
+		self.assertEqual([0.0, 0.1, 0.25], self._forwarded())
+
+	def test_interval(self):
+		self.throttle(_progress=0.0)
+		self.now = 0.5
+		self.throttle(_progress=0.01)
+		self.now = 1.0
+		self.throttle(_progress=0.02)
+		self.now = 1.5
+		self.throttle(_progress=0.02)
+
+		self.assertEqual([0.0, 0.02], self._forwarded())
+
+	def test_final_always_forwarded(self):
+		self.throttle(_progress=0.95)
+		self.throttle(_progress=1.0)
+		self.throttle(_progress=1.0)
+
+		self.assertEqual([0.95, 1.0], self._forwarded())
+
+	def test_arguments_passed_through(self):
+		self.throttle("slicer", _progress=0.5, foo="bar")
+		self.throttle("slicer")
+
+		self.callback.assert_called_once_with("slicer", _progress=0.5, foo="bar")
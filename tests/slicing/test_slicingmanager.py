@@ -143,7 +143,7 @@ class TestSlicingManager(unittest.TestCase):
 		# assert that temporary profile was created properly
 		self.slicer_plugin.save_slicer_profile.assert_called_once_with("tmp.file", default_profile, overrides=overrides)
 		# assert that slicing thread was created properly
-		mocked_thread.assert_called_once_with(target=mock.ANY, args=(self.slicer_plugin, source_path, dest_path, profile_name, overrides, printer_profile, position, callback, callback_args, callback_kwargs))
+		mocked_thread.assert_called_once_with(target=mock.ANY, args=(mock.ANY,))
 		self.assertTrue(mock_thread.mock.daemon)
 		self.assertEqual(mock_thread.mock.start.call_count, 1)
 
@@ -155,3 +155,143 @@ class TestSlicingManager(unittest.TestCase):
 
 		# assert that callback was called property
 		callback.assert_called_once_with(*callback_args, **callback_kwargs)
+
+	@mock.patch("threading.Thread")
+	def test_slice_cached(self, mocked_thread):
+		import os
+		import shutil
+		import tempfile
+
+		cache_path = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, cache_path)
+
+		slicing_manager = octoprint.slicing.SlicingManager(self.profile_path, self.printer_profile_manager, cache_path=cache_path)
+		slicing_manager.initialize()
+
+		# mock settings
+		self.settings.get.return_value = dict()
+		self.settings.getBoolean.return_value = True
+		self.settings.getInt.side_effect = lambda path: 1 if path == ["slicing", "concurrency"] else 1024 * 1024
+
+		default_profile = octoprint.slicing.SlicingProfile("mock", "default", dict(layer_height=0.2))
+		self.slicer_plugin.get_slicer_default_profile.return_value = default_profile
+
+		# run threads synchronously
+		def thread(target=None, args=None):
+			result = mock.MagicMock()
+			result.start.side_effect = lambda: target(*args)
+			return result
+		mocked_thread.side_effect = thread
+
+		# mock slicing
+		def do_slice(model_path, printer_profile, machinecode_path=None, **kwargs):
+			with open(machinecode_path, "wb") as f:
+				f.write(b"G1 X10")
+			return True, dict(analysis=dict(estimatedPrintTime=10))
+		self.slicer_plugin.do_slice.side_effect = do_slice
+
+		self.printer_profile_manager.get_current_or_default.return_value = dict(_id="mock_printer")
+
+		source_path = os.path.join(cache_path, "source.stl")
+		with open(source_path, "wb") as f:
+			f.write(b"solid")
+
+		##~~ call tested method twice
+		callback = mock.MagicMock()
+		for dest in ("first.gco", "second.gco"):
+			slicing_manager.slice("mock", source_path, os.path.join(self.profile_path, dest), None, callback)
+
+		# assert that slicer was called only once, and the second result was taken from the cache
+		self.assertEqual(1, self.slicer_plugin.do_slice.call_count)
+		self.assertEqual(2, callback.call_count)
+		callback.assert_called_with(_analysis=dict(estimatedPrintTime=10))
+		with open(os.path.join(self.profile_path, "second.gco"), "rb") as f:
+			self.assertEqual(b"G1 X10", f.read())
+
+	def test_slice_progress_throttled(self):
+		self.settings.getFloat.side_effect = lambda path: 0.1 if path == ["slicing", "progress", "minDelta"] else 60.0
+
+		def do_slice(model_path, printer_profile, on_progress=None, **kwargs):
+			for i in range(1001):
+				on_progress(_progress=i / 1000)
+			return True, None
+		self.slicer_plugin.do_slice.side_effect = do_slice
+
+		job = octoprint.slicing.SlicingJob("mock", "source.stl", "dest.gco", "profile.ini", dict(), None, mock.MagicMock())
+		on_progress = mock.MagicMock()
+
+		self.slicing_manager._do_slice(job, on_progress)
+
+		forwarded = [c[1]["_progress"] for c in on_progress.call_args_list]
+		self.assertTrue(len(forwarded) <= 11)
+		self.assertEqual(0.0, forwarded[0])
+		self.assertEqual(1.0, forwarded[-1])
+		for previous, current in zip(forwarded[:-2], forwarded[1:-1]):
+			self.assertTrue(current - previous >= 0.1)
+
+	def _prepare_slicing(self):
+		self.settings.get.return_value = dict()
+		self.settings.getBoolean.return_value = True
+		self.settings.getInt.side_effect = lambda path: 1 if path == ["slicing", "concurrency"] else 1024 * 1024
+
+		default_profile = octoprint.slicing.SlicingProfile("mock", "default", dict(layer_height=0.2))
+		self.slicer_plugin.get_slicer_default_profile.return_value = default_profile
+		self.printer_profile_manager.get_current_or_default.return_value = dict(_id="mock_printer")
+
+	def test_slice_submit_failed(self):
+		import os
+
+		self._prepare_slicing()
+		self.settings.getBoolean.return_value = False
+
+		callback = mock.MagicMock()
+		exc = RuntimeError("failed")
+		with mock.patch.object(self.slicing_manager._scheduler, "submit", side_effect=exc):
+			self.slicing_manager.slice("mock", "source.stl", "dest.gco", None, callback, callback_args=("one",))
+
+		callback.assert_called_once_with("one", _error="Could not prepare slicing job: failed", _exc=exc)
+
+		# the temporary profile doesn't leak
+		profile_path = self.slicer_plugin.save_slicer_profile.call_args[0][0]
+		self.assertFalse(os.path.exists(profile_path))
+
+	@mock.patch("threading.Thread")
+	def test_cancel_during_cache_lookup(self, mocked_thread):
+		import os
+		import shutil
+		import tempfile
+
+		cache_path = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, cache_path)
+
+		slicing_manager = octoprint.slicing.SlicingManager(self.profile_path, self.printer_profile_manager, cache_path=cache_path)
+		slicing_manager.initialize()
+		self._prepare_slicing()
+
+		# don't start the cache lookup yet
+		lookups = []
+		def thread(target=None, args=None):
+			lookups.append((target, args))
+			return mock.MagicMock()
+		mocked_thread.side_effect = thread
+
+		source_path = os.path.join(cache_path, "source.stl")
+		with open(source_path, "wb") as f:
+			f.write(b"solid")
+		dest_path = os.path.join(self.profile_path, "dest.gco")
+
+		callback = mock.MagicMock()
+		slicing_manager.slice("mock", source_path, dest_path, None, callback)
+		slicing_manager.cancel_slicing("mock", source_path, dest_path)
+
+		callback.assert_called_once_with(_cancelled=True)
+		self.assertFalse(os.path.exists(self.slicer_plugin.save_slicer_profile.call_args[0][0]))
+
+		# the lookup finishing afterwards doesn't submit the job anymore
+		target, args = lookups[0]
+		target(*args)
+
+		self.assertEqual(0, self.slicer_plugin.do_slice.call_count)
+		self.assertEqual(0, slicing_manager._scheduler.queued + slicing_manager._scheduler.running)
+		self.assertEqual(1, callback.call_count)
+		self.slicer_plugin.cancel_slicing.assert_not_called()
@@ -0,0 +1,225 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import cgi
+import io
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+import ddt
+
+import octoprint_client
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		self._respond()
+
+	def do_POST(self):
+		self._respond()
+
+	def _respond(self):
+		server = self.server
+		with server.mutex:
+			server.connections.add(self.client_address)
+			server.requests.append((self.command, self.path, dict(self.headers.items())))
+			status = server.statuses.pop(0) if server.statuses else 200
+
+		if self.command == "POST":
+			length = int(self.headers["Content-Length"])
+			with server.mutex:
+				server.bodies.append(self.rfile.read(length))
+
+		body = "{} {}".format(self.command, self.path)
+		self.send_response(status)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+class RecordingServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+	def __init__(self):
+		HTTPServer.__init__(self, ("127.0.0.1", 0), RecordingHandler)
+		self.mutex = threading.Lock()
+		self.connections = set()
+		self.requests = []
+		self.bodies = []
+		self.statuses = []
+
+	@property
+	def baseurl(self):
+		return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+def unused_baseurl():
+	sock = socket.socket()
+	sock.bind(("127.0.0.1", 0))
+	port = sock.getsockname()[1]
+	sock.close()
+	return "http://127.0.0.1:{}".format(port)
+
+
+class ServerTestCase(unittest.TestCase):
+
+	def _start_server(self):
+		server = RecordingServer()
+		thread = threading.Thread(target=server.serve_forever)
+		thread.daemon = True
+		thread.start()
+
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		return server
+
+
+class ClientTest(ServerTestCase):
+
+	def setUp(self):
+		self.server = self._start_server()
+		self.client = octoprint_client.Client(self.server.baseurl, "apikey", backoff_factor=0)
+		self.addCleanup(self.client.close)
+
+	def test_keep_alive(self):
+		for _ in range(3):
+			response = self.client.get("/api/version")
+			self.assertEqual(200, response.status_code)
+
+		self.assertEqual(3, len(self.server.requests))
+		self.assertEqual(1, len(self.server.connections))
+		self.assertEqual("apikey", self.server.requests[0][2]["x-api-key"])
+
+	def test_retry_idempotent(self):
+		self.server.statuses = [503, 503]
+
+		response = self.client.get("/api/version")
+
+		self.assertEqual(200, response.status_code)
+		self.assertEqual(3, len(self.server.requests))
+
+	def test_no_retry_post(self):
+		self.server.statuses = [503]
+
+		response = self.client.post_json("/api/job", dict(command="start"))
+
+		self.assertEqual(503, response.status_code)
+		self.assertEqual(1, len(self.server.requests))
+
+	def test_upload(self):
+		basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, basedir)
+
+		path = os.path.join(basedir, "test.gcode")
+		content = os.urandom(300 * 1024)
+		with open(path, "wb") as f:
+			f.write(content)
+
+		response = self.client.upload("/api/files/local", path, additional=dict(select="true"),
+		                              file_name=u"tëst.gcode", content_type="application/octet-stream")
+		self.assertEqual(200, response.status_code)
+
+		headers = self.server.requests[0][2]
+		self.assertNotIn("transfer-encoding", headers)
+
+		form = cgi.FieldStorage(fp=io.BytesIO(self.server.bodies[0]),
+		                        environ=dict(REQUEST_METHOD="POST",
+		                                     CONTENT_TYPE=headers["content-type"],
+		                                     CONTENT_LENGTH=headers["content-length"]))
+		self.assertEqual("true", form.getfirst("select"))
+		self.assertEqual(content, form["file"].value)
+		self.assertEqual(u"tëst.gcode".encode("utf-8"), form["file"].filename)
+
+
+@ddt.ddt
+class MultipartStreamTest(unittest.TestCase):
+
+	def setUp(self):
+		self.fp = io.BytesIO(b"prefix" + b"0123456789" * 100)
+		self.fp.seek(len("prefix"))
+		self.stream = octoprint_client.MultipartStream(fields=dict(path=u"földer"),
+		                                               files=dict(file=("test.gcode", self.fp)),
+		                                               boundary="boundary")
+
+	def test_body(self):
+		expected = (b"--boundary\r\n"
+		            b"Content-Disposition: form-data; name=\"path\"\r\n\r\n"
+		            + u"földer".encode("utf-8") + b"\r\n"
+		            b"--boundary\r\n"
+		            b"Content-Disposition: form-data; name=\"file\"; filename=\"test.gcode\"\r\n\r\n"
+		            + b"0123456789" * 100 + b"\r\n"
+		            b"--boundary--\r\n")
+
+		self.assertEqual(len(expected), len(self.stream))
+		self.assertEqual(expected, self.stream.read())
+		self.assertEqual(b"", self.stream.read())
+		self.assertEqual("multipart/form-data; boundary=boundary", self.stream.content_type)
+
+	@ddt.data(1, 7, 100, 4096)
+	def test_chunks(self, size):
+		expected = self.stream.read()
+		self.stream.seek(0)
+
+		chunks = []
+		while True:
+			chunk = self.stream.read(size)
+			if not chunk:
+				break
+			self.assertLessEqual(len(chunk), size)
+			chunks.append(chunk)
+
+		self.assertEqual(expected, b"".join(chunks))
+
+	@ddt.data(0, 10, 100, 500, 1000)
+	def test_seek(self, offset):
+		expected = self.stream.read()
+
+		self.assertEqual(offset, self.stream.seek(offset))
+		self.assertEqual(offset, self.stream.tell())
+		self.assertEqual(expected[offset:], self.stream.read())
+
+	def test_iter(self):
+		expected = self.stream.read()
+		self.stream.seek(0)
+
+		self.assertEqual(expected, b"".join(self.stream))
+
+
+class FleetClientTest(ServerTestCase):
+
+	def test_call(self):
+		servers = [self._start_server() for _ in range(3)]
+		servers[1].statuses = [404]
+
+		unreachable = unused_baseurl()
+		targets = [(server.baseurl, "key{}".format(i)) for i, server in enumerate(servers)] + [(unreachable, "key")]
+
+		with octoprint_client.FleetClient.from_targets(targets, retries=0) as fleet:
+			results = fleet.get("/api/version")
+
+		# results keep the order of the targets
+		self.assertEqual([target[0] for target in targets], [result.baseurl for result in results])
+
+		for i, server in enumerate(servers):
+			self.assertEqual("key{}".format(i), server.requests[0][2]["x-api-key"])
+		self.assertEqual([200, 404, 200], [result.response.status_code for result in results[:3]])
+
+		self.assertIsNone(results[3].response)
+		self.assertIsNotNone(results[3].error)
+
+		self.assertEqual([results[1], results[3]], results.failed)
@@ -0,0 +1,236 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import datetime
+import json
+
+import ddt
+import mock
+
+from tornado import gen, locks
+from tornado.httpserver import HTTPServer
+from tornado.testing import AsyncTestCase, bind_unused_port, gen_test
+from tornado.web import Application
+from tornado.websocket import WebSocketHandler
+
+from octoprint_client.async_socket import AsyncSocketClient, SocketMultiplexer
+
+
+class FakeSocketHandler(WebSocketHandler):
+	"""Speaks just enough of SockJS to stand in for OctoPrint's socket."""
+
+	def initialize(self, server):
+		self.server = server
+
+	def open(self, *args):
+		self.received = []
+		self.server.handlers.append(self)
+		self.write_message("o")
+		self.server.connected.set()
+
+	def on_message(self, message):
+		for payload in json.loads(message):
+			self.received.append(json.loads(payload))
+		self.server.received.set()
+
+	def send(self, *messages):
+		self.write_message("a" + json.dumps(list(messages)))
+
+
+class FakeServer(object):
+
+	def __init__(self, io_loop):
+		self.handlers = []
+		self.connected = locks.Event()
+		self.received = locks.Event()
+
+		sock, port = bind_unused_port()
+		self.baseurl = "http://127.0.0.1:{}".format(port)
+
+		application = Application([(r"/sockjs/\d+/[^/]+/websocket", FakeSocketHandler, dict(server=self))])
+		self.http_server = HTTPServer(application, io_loop=io_loop)
+		self.http_server.add_sockets([sock])
+
+	@property
+	def handler(self):
+		return self.handlers[-1]
+
+	@gen.coroutine
+	def wait_connected(self, count=1):
+		while len(self.handlers) < count:
+			self.connected.clear()
+			yield self.connected.wait(timeout=datetime.timedelta(seconds=5))
+
+	@gen.coroutine
+	def wait_received(self, message, handler=None):
+		while message not in (handler or self.handler).received:
+			self.received.clear()
+			yield self.received.wait(timeout=datetime.timedelta(seconds=5))
+
+
+class Recorder(object):
+
+	def __init__(self, block=False):
+		self.messages = []
+		self.opened = 0
+		self.closed = 0
+
+		self.unblocked = locks.Event()
+		if not block:
+			self.unblocked.set()
+
+		self.changed = locks.Event()
+
+	def on_open(self, client):
+		self.opened += 1
+		self.changed.set()
+
+	def on_close(self, client):
+		self.closed += 1
+		self.changed.set()
+
+	@gen.coroutine
+	def on_message(self, client, message_type, payload):
+		yield self.unblocked.wait()
+		self.messages.append((message_type, payload))
+		self.changed.set()
+
+	@gen.coroutine
+	def wait_for(self, condition):
+		while not condition():
+			self.changed.clear()
+			yield self.changed.wait(timeout=datetime.timedelta(seconds=5))
+
+
+@ddt.ddt
+class AsyncSocketClientTest(AsyncTestCase):
+
+	def setUp(self):
+		AsyncTestCase.setUp(self)
+		self.server = FakeServer(self.io_loop)
+
+	def _client(self, recorder, **kwargs):
+		client = AsyncSocketClient(self.server.baseurl,
+		                           on_message=recorder.on_message,
+		                           on_open=recorder.on_open,
+		                           on_close=recorder.on_close,
+		                           io_loop=self.io_loop,
+		                           **kwargs)
+		client.start()
+		self.addCleanup(client.stop)
+		return client
+
+	@gen_test
+	def test_messages(self):
+		recorder = Recorder()
+		client = self._client(recorder)
+
+		yield self.server.wait_connected()
+		self.server.handler.send(dict(event=dict(type="Connected")), dict(current=1))
+		self.server.handler.send(dict(current=2))
+
+		yield recorder.wait_for(lambda: len(recorder.messages) == 3)
+		self.assertEqual([("event", dict(type="Connected")), ("current", 1), ("current", 2)], recorder.messages)
+		self.assertEqual(1, recorder.opened)
+		self.assertTrue(client.connected)
+
+	@gen_test
+	def test_backpressure(self):
+		recorder = Recorder(block=True)
+		client = self._client(recorder, queue_size=4)
+
+		yield self.server.wait_connected()
+		for i in range(20):
+			self.server.handler.send(dict(current=i))
+
+		# the callback can't keep up, so the client asks the server to send less
+		yield self.server.wait_received(dict(throttle=2))
+		self.assertEqual(2, client.throttle)
+		self.assertLessEqual(client.backlog, 4)
+
+		# nothing is lost once the callback catches up
+		recorder.unblocked.set()
+		yield recorder.wait_for(lambda: len(recorder.messages) == 20)
+		self.assertEqual([("current", i) for i in range(20)], recorder.messages)
+
+	@gen_test
+	def test_throttle_lowered(self):
+		recorder = Recorder(block=True)
+		client = self._client(recorder, queue_size=4)
+
+		yield self.server.wait_connected()
+		for i in range(4):
+			self.server.handler.send(dict(current=i))
+		yield self.server.wait_received(dict(throttle=2))
+
+		with mock.patch("octoprint_client.async_socket.THROTTLE_LOWER_INTERVAL", 0):
+			recorder.unblocked.set()
+			yield self.server.wait_received(dict(throttle=1))
+
+		self.assertEqual(1, client.throttle)
+
+	@gen_test
+	def test_reconnect(self):
+		recorder = Recorder()
+		client = self._client(recorder, backoff=0.01)
+
+		yield self.server.wait_connected()
+		client._set_throttle(4)
+		client.send(dict(subscribe="plugin"), persistent=True)
+		client.send(dict(once=True))
+
+		self.server.handler.close()
+		yield self.server.wait_connected(count=2)
+		yield recorder.wait_for(lambda: recorder.opened == 2)
+		self.assertEqual(1, recorder.closed)
+
+		# throttle factor and persistent messages get sent again after reconnecting
+		yield self.server.wait_received(dict(subscribe="plugin"))
+		self.assertEqual([dict(throttle=4), dict(subscribe="plugin")], self.server.handler.received)
+
+	@gen_test
+	def test_stop(self):
+		recorder = Recorder()
+		client = self._client(recorder, backoff=0.01)
+
+		yield self.server.wait_connected()
+		client.stop()
+
+		# no reconnect happens
+		yield gen.sleep(0.2)
+		self.assertEqual(1, len(self.server.handlers))
+		self.assertFalse(client.connected)
+
+	@ddt.data((0, 1.0), (3, 8.0), (10, 60.0))
+	@ddt.unpack
+	def test_backoff_delay(self, attempt, expected):
+		client = AsyncSocketClient("http://127.0.0.1:5000", backoff=1.0, max_backoff=60.0, io_loop=self.io_loop)
+
+		with mock.patch("random.uniform") as uniform:
+			uniform.return_value = 0.5
+			self.assertEqual(0.5, client._backoff_delay(attempt))
+			uniform.assert_called_once_with(0, expected)
+
+
+class SocketMultiplexerTest(AsyncTestCase):
+
+	@gen_test
+	def test_multiplex(self):
+		servers = [FakeServer(self.io_loop) for _ in range(3)]
+
+		recorder = Recorder()
+		multiplexer = SocketMultiplexer(io_loop=self.io_loop, on_message=recorder.on_message)
+		for server in servers:
+			multiplexer.add(server.baseurl)
+		multiplexer.start()
+		self.addCleanup(multiplexer.stop)
+
+		for i, server in enumerate(servers):
+			yield server.wait_connected()
+			server.handler.send(dict(current=i))
+
+		yield recorder.wait_for(lambda: len(recorder.messages) == 3)
+		self.assertEqual([0, 1, 2], sorted(payload for _, payload in recorder.messages))
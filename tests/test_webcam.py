@@ -0,0 +1,75 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import threading
+import unittest
+
+import mock
+import requests
+
+from octoprint.webcam import SnapshotService
+
+URL = "http://webcam/?action=snapshot"
+
+
+class SnapshotServiceTest(unittest.TestCase):
+
+	def setUp(self):
+		self.now = 100.0
+		mock.patch("octoprint.webcam.monotonic_time", side_effect=lambda: self.now).start()
+		self.addCleanup(mock.patch.stopall)
+
+		self.service = SnapshotService()
+		self.release = threading.Event()
+		self.release.set()
+		self.count = 0
+
+		def get(url, **kwargs):
+			self.release.wait(5)
+			self.count += 1
+
+			response = mock.MagicMock()
+			response.content = "image{}".format(self.count).encode("ascii")
+			response.headers = {"Content-Type": "image/jpeg"}
+			return response
+
+		self.get = mock.patch.object(self.service._session, "get", side_effect=get).start()
+
+	def test_fetch(self):
+		snapshot = self.service.fetch(URL, timeout=3, verify=False)
+
+		self.assertEqual(b"image1", snapshot.data)
+		self.assertEqual("image/jpeg", snapshot.content_type)
+		self.assertEqual("image/jpeg", snapshot.headers["content-type"])
+		self.get.assert_called_once_with(URL, timeout=3, verify=False)
+
+	def test_concurrent_fetches_coalesced(self):
+		self.release.clear()
+
+		futures = [self.service.fetch_async(URL) for _ in range(3)]
+		self.release.set()
+
+		self.assertEqual([b"image1"] * 3, [future.result(5).data for future in futures])
+		self.assertEqual(1, self.get.call_count)
+
+	def test_max_age(self):
+		self.assertEqual(b"image1", self.service.fetch(URL, max_age=1.0).data)
+
+		self.now += 0.5
+		self.assertEqual(b"image1", self.service.fetch(URL, max_age=1.0).data)
+
+		# a caller that doesn't accept cached snapshots always gets a new one
+		self.assertEqual(b"image2", self.service.fetch(URL).data)
+
+		self.now += 1.5
+		self.assertEqual(b"image3", self.service.fetch(URL, max_age=1.0).data)
+
+	def test_error_not_cached(self):
+		self.get.side_effect = requests.exceptions.ConnectionError()
+
+		self.assertRaises(requests.exceptions.ConnectionError, self.service.fetch, URL, max_age=1.0)
+		self.assertRaises(requests.exceptions.ConnectionError, self.service.fetch, URL, max_age=1.0)
+		self.assertEqual(2, self.get.call_count)
@@ -7,6 +7,7 @@ __copyright__ = "Copyright (C) 2016 The OctoPrint Project - Released under terms
 import unittest
 import mock
 
+import fnmatch
 import os
 import time
 
@@ -180,3 +181,101 @@ class TimelapseTest(unittest.TestCase):
 			raise ValueError("files must be either dict or list/tuple")
 
 		return result
+
+
+class UnrenderedTimelapseIndexTest(unittest.TestCase):
+
+	def setUp(self):
+		import tempfile
+		self.basedir = tempfile.mkdtemp()
+
+		self.settings_patcher = mock.patch("octoprint.timelapse.settings")
+		settings_getter = self.settings_patcher.start()
+		settings_getter.return_value.getBaseFolder.return_value = self.basedir
+
+		self.index = octoprint.timelapse.UnrenderedTimelapseIndex()
+
+	def tearDown(self):
+		import shutil
+		self.settings_patcher.stop()
+		shutil.rmtree(self.basedir)
+
+	def _frame(self, name, size=1):
+		path = os.path.join(self.basedir, name)
+		with open(path, "wb") as f:
+			f.write(b"x" * size)
+		return path
+
+	def _add_frame(self, name, size=1):
+		with self.index.adding_frame(os.path.join(self.basedir, name)):
+			self._frame(name, size=size)
+
+	def _remove_matching(self, pattern):
+		with self.index.removing_matching(pattern):
+			for name in os.listdir(self.basedir):
+				if fnmatch.fnmatch(name, pattern):
+					os.remove(os.path.join(self.basedir, name))
+
+	def test_incremental_updates(self):
+		self._frame("one-0.jpg", size=1)
+		self.assertEqual(dict(one=1), dict((k, v["count"]) for k, v in self.index.jobs().items()))
+
+		with mock.patch("octoprint.timelapse.scandir") as mock_scandir:
+			self._add_frame("one-1.jpg", size=2)
+			self._add_frame("two-0.jpg", size=3)
+			jobs = self.index.jobs()
+
+			self.assertEqual(2, jobs["one"]["count"])
+			self.assertEqual(3, jobs["one"]["bytes"])
+			self.assertEqual(1, jobs["two"]["count"])
+
+			self._remove_matching("two*.jpg")
+			self.assertEqual(["one"], self.index.jobs().keys())
+
+		mock_scandir.assert_not_called()
+
+	def test_external_changes_rescanned(self):
+		self._frame("one-0.jpg")
+		self.assertEqual(["one"], self.index.jobs().keys())
+
+		self._frame("two-0.jpg")
+		os.utime(self.basedir, (0, 0))
+
+		self.assertEqual(["one", "two"], sorted(self.index.jobs().keys()))
+
+	def test_frame_not_counted_twice(self):
+		self._frame("one-0.jpg")
+		self.assertEqual(1, self.index.jobs()["one"]["count"])
+
+		path = os.path.join(self.basedir, "one-1.jpg")
+		jobs = []
+
+		with self.index.adding_frame(path):
+			self._frame("one-1.jpg")
+
+			# a concurrent lookup has to wait until the frame got added
+			import threading
+			thread = threading.Thread(target=lambda: jobs.append(self.index.jobs()))
+			thread.daemon = True
+			thread.start()
+			thread.join(0.1)
+			self.assertEqual([], jobs)
+
+		thread.join()
+		self.assertEqual(2, jobs[0]["one"]["count"])
+		self.assertEqual(2, self.index.jobs()["one"]["count"])
+
+	def test_external_changes_during_add(self):
+		self._frame("one-0.jpg")
+		self.assertEqual(["one"], self.index.jobs().keys())
+
+		# something else puts a frame into the folder...
+		self._frame("two-0.jpg")
+		os.utime(self.basedir, (0, 0))
+
+		# ... before we add ours, which must not hide that change
+		self._add_frame("one-1.jpg")
+
+		jobs = self.index.jobs()
+		self.assertEqual(["one", "two"], sorted(jobs.keys()))
+		self.assertEqual(2, jobs["one"]["count"])
@@ -0,0 +1,84 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+from ddt import ddt, data, unpack
+
+import octoprint.settings
+import octoprint.timelapse
+
+
+@ddt
+class PostRollTest(unittest.TestCase):
+
+	def setUp(self):
+		self.capture_dir = tempfile.mkdtemp()
+
+		self.settings = mock.create_autospec(octoprint.settings.Settings)
+		self.settings.getBaseFolder.return_value = self.capture_dir
+		mock.patch("octoprint.timelapse.settings", return_value=self.settings).start()
+		mock.patch("octoprint.timelapse.eventManager").start()
+		self.addCleanup(mock.patch.stopall)
+
+	def tearDown(self):
+		shutil.rmtree(self.capture_dir)
+
+	def _timelapse(self, mode):
+		self.settings.get.side_effect = lambda path, **kwargs: mode if path == ["webcam", "postRollMode"] else None
+
+		timelapse = octoprint.timelapse.Timelapse(post_roll=2, fps=3)
+		self.addCleanup(timelapse.unload)
+		timelapse.start_timelapse("test.gcode")
+
+		def capture(filename, onerror=None):
+			with open(filename, "wb") as f:
+				f.write(b"frame")
+			return True
+		timelapse._perform_capture = capture
+
+		return timelapse
+
+	def _frames(self):
+		return sorted(os.listdir(self.capture_dir))
+
+	@data(
+		(octoprint.timelapse.POST_ROLL_MODE_COPY, 1),
+		(octoprint.timelapse.POST_ROLL_MODE_HARDLINK, 7)
+	)
+	@unpack
+	def test_frames_written(self, mode, expected_links):
+		timelapse = self._timelapse(mode)
+		timelapse._copying_postroll()
+
+		frames = self._frames()
+		self.assertEqual(7, len(frames))
+		for frame in frames:
+			path = os.path.join(self.capture_dir, frame)
+			with open(path, "rb") as f:
+				self.assertEqual(b"frame", f.read())
+			self.assertEqual(expected_links, os.stat(path).st_nlink)
+		self.assertEqual(0, timelapse._render_post_roll_frames)
+
+	def test_hardlink_fallback(self):
+		timelapse = self._timelapse(octoprint.timelapse.POST_ROLL_MODE_HARDLINK)
+
+		with mock.patch("os.link", side_effect=OSError()) as link:
+			timelapse._copying_postroll()
+
+		self.assertEqual(1, link.call_count)
+		self.assertEqual(7, len(self._frames()))
+
+	def test_render(self):
+		timelapse = self._timelapse(octoprint.timelapse.POST_ROLL_MODE_RENDER)
+		timelapse._copying_postroll()
+
+		self.assertEqual(1, len(self._frames()))
+		self.assertEqual(6, timelapse._render_post_roll_frames)
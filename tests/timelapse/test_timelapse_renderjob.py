@@ -6,6 +6,7 @@ __copyright__ = "Copyright (C) 2016 The OctoPrint Project - Released under terms
 
 import unittest
 
+import mock
 from ddt import ddt, data, unpack
 
 from octoprint.timelapse import TimelapseRenderJob
@@ -24,7 +25,23 @@ class TimelapseRenderJobTest(unittest.TestCase):
 
 		(("/path/to/ffmpeg", 25, "20000k", 4, "/path/to/input/files_%d.jpg", "/path/to/output.mpg"),
 		 dict(rotate=True, watermark="/path/to/watermark.png"),
-		 '/path/to/ffmpeg -framerate 25 -loglevel error -i "/path/to/input/files_%d.jpg" -vcodec mpeg2video -threads 4 -r 25 -y -b 20000k -f vob -vf \'[in] format=yuv420p,transpose=2 [postprocessed]; movie=/path/to/watermark.png [wm]; [postprocessed][wm] overlay=10:main_h-overlay_h-10 [out]\' "/path/to/output.mpg"')
+		 '/path/to/ffmpeg -framerate 25 -loglevel error -i "/path/to/input/files_%d.jpg" -vcodec mpeg2video -threads 4 -r 25 -y -b 20000k -f vob -vf \'[in] format=yuv420p,transpose=2 [postprocessed]; movie=/path/to/watermark.png [wm]; [postprocessed][wm] overlay=10:main_h-overlay_h-10 [out]\' "/path/to/output.mpg"'),
+
+		(("/path/to/ffmpeg", 25, "10000k", 1, "/path/to/input/files_%d.jpg", "/path/to/output.mpg"),
+		 dict(post_roll_frames=125),
+		 '/path/to/ffmpeg -framerate 25 -loglevel error -i "/path/to/input/files_%d.jpg" -vcodec mpeg2video -threads 1 -r 25 -y -b 10000k -f vob -vf \'[in] format=yuv420p,tpad=stop_mode=clone:stop=125 [out]\' "/path/to/output.mpg"'),
+
+		(("/path/to/ffmpeg", 25, "10000k", 2, "/path/to/input/files_%d.jpg", "/path/to/output.mp4"),
+		 dict(encoder_preset="h264"),
+		 '/path/to/ffmpeg -framerate 25 -loglevel error -i "/path/to/input/files_%d.jpg" -vcodec libx264 -threads 2 -preset veryfast -crf 23 -y -movflags +faststart -f mp4 -vf \'[in] format=yuv420p [out]\' "/path/to/output.mp4"'),
+
+		(("/path/to/ffmpeg", 25, "10000k", 1, "/path/to/input/files_%d.jpg", "/path/to/output.mpg"),
+		 dict(progress=True),
+		 '/path/to/ffmpeg -framerate 25 -loglevel error -progress pipe:1 -i "/path/to/input/files_%d.jpg" -vcodec mpeg2video -threads 1 -r 25 -y -b 10000k -f vob -vf \'[in] format=yuv420p [out]\' "/path/to/output.mpg"'),
+
+		(("/path/to/ffmpeg", 25, "10000k", 1, "/path/to/input/files_%d.jpg", "/path/to/output.mpg"),
+		 dict(encoder_preset="unknown"),
+		 '/path/to/ffmpeg -framerate 25 -loglevel error -i "/path/to/input/files_%d.jpg" -vcodec mpeg2video -threads 1 -r 25 -y -b 10000k -f vob -vf \'[in] format=yuv420p [out]\' "/path/to/output.mpg"')
 	)
 	@unpack
 	def test_create_ffmpeg_command_string(self, args, kwargs, expected):
@@ -59,8 +76,68 @@ class TimelapseRenderJobTest(unittest.TestCase):
 		(dict(hflip=True, watermark="/path/to/watermark.png"),
 		 '[in] format=yuv420p,hflip [postprocessed]; movie=/path/to/watermark.png [wm]; [postprocessed][wm] overlay=10:main_h-overlay_h-10 [out]'),
 
+		(dict(post_roll_frames=250),
+		 '[in] format=yuv420p,tpad=stop_mode=clone:stop=250 [out]'),
+
+		(dict(rotate=True, post_roll_frames=250),
+		 '[in] format=yuv420p,transpose=2,tpad=stop_mode=clone:stop=250 [out]'),
+
 	)
 	@unpack
 	def test_create_filter_string(self, kwargs, expected):
 		actual = TimelapseRenderJob._create_filter_string(**kwargs)
 		self.assertEquals(actual, expected)
+
+	@data(
+		("out_time_us=5000000", 10.0, 50),
+		("out_time_ms=2500000", 10.0, 25),
+		("out_time_us=20000000", 10.0, 100),
+		("out_time_us=N/A", 10.0, None),
+		("out_time_us=5000000", 0, None),
+		("out_time=00:00:05.000000", 10.0, None),
+		("frame=125", 10.0, None),
+		("progress=continue", 10.0, None),
+		("progress=end\n", 10.0, 100),
+	)
+	@unpack
+	def test_parse_progress(self, line, duration, expected):
+		actual = TimelapseRenderJob._parse_progress(line, duration)
+		self.assertEqual(actual, expected)
+
+	@data(
+		(True, "paused"),
+		(False, "cancelled")
+	)
+	@unpack
+	def test_cancel_while_rendering(self, reenqueue, reason):
+		import os
+		import shutil
+		import tempfile
+
+		capture_dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, capture_dir)
+		with open(os.path.join(capture_dir, "test-0.jpg"), "wb") as f:
+			f.write(b"frame")
+
+		settings = mock.patch("octoprint.timelapse.settings").start().return_value
+		self.addCleanup(mock.patch.stopall)
+		settings.get.side_effect = lambda path: "/path/to/ffmpeg" if path[-1] == "ffmpeg" else "10000k"
+		settings.getBoolean.return_value = False
+
+		on_start = mock.MagicMock()
+		on_fail = mock.MagicMock()
+		on_success = mock.MagicMock()
+		job = TimelapseRenderJob(capture_dir, capture_dir, "test", on_start=on_start, on_fail=on_fail,
+		                         on_success=on_success)
+
+		def run(command_str, output, duration):
+			job.cancel(reenqueue=reenqueue)
+			return 255, "", ""
+		job._run = run
+
+		job.render()
+
+		# rendering got announced, so it has to be ended
+		on_start.assert_called_once_with(job.output)
+		on_fail.assert_called_once_with(job.output, returncode=255, stdout="", stderr="", reason=reason)
+		self.assertFalse(on_success.called)
@@ -0,0 +1,146 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import threading
+import unittest
+
+import mock
+
+from octoprint.timelapse import TimelapseRenderJob, TimelapseRenderQueue
+
+
+class FakeRenderJob(object):
+
+	def __init__(self, prefix):
+		self.prefix = prefix
+		self.renders = 0
+		self.started = threading.Event()
+		self.finished = threading.Event()
+		self.release = threading.Event()
+		self.cancelled = False
+		self.reenqueue = False
+
+	def _reset(self):
+		self.cancelled = False
+		self.reenqueue = False
+
+	def render(self):
+		self.renders += 1
+		self.finished.clear()
+		self.started.set()
+		self.release.wait(5)
+		self.finished.set()
+
+	def cancel(self, reenqueue=False):
+		self.cancelled = True
+		self.reenqueue = reenqueue
+		self.release.set()
+
+
+class TimelapseRenderQueueTest(unittest.TestCase):
+
+	def test_concurrency(self):
+		queue = TimelapseRenderQueue(concurrency=2)
+		jobs = [FakeRenderJob("job{}".format(i)) for i in range(3)]
+		for job in jobs:
+			self.assertTrue(queue.enqueue(job))
+
+		self.assertTrue(jobs[0].started.wait(5))
+		self.assertTrue(jobs[1].started.wait(5))
+		self.assertFalse(jobs[2].started.is_set())
+		self.assertTrue(queue.is_rendering("job0"))
+		self.assertTrue(queue.is_queued("job2"))
+
+		jobs[0].release.set()
+		self.assertTrue(jobs[2].started.wait(5))
+
+		jobs[1].release.set()
+		jobs[2].release.set()
+
+	def test_enqueue_duplicate(self):
+		queue = TimelapseRenderQueue()
+		job = FakeRenderJob("job")
+		self.assertTrue(queue.enqueue(job))
+		self.assertTrue(job.started.wait(5))
+
+		self.assertFalse(queue.enqueue(FakeRenderJob("job")))
+		job.release.set()
+
+	def test_pause_resume(self):
+		queue = TimelapseRenderQueue()
+		job = FakeRenderJob("job")
+		queue.enqueue(job)
+		self.assertTrue(job.started.wait(5))
+
+		job.started.clear()
+		queue.pause()
+
+		# the running job gets aborted and put back into the queue
+		self.assertTrue(job.cancelled)
+		self.assertTrue(job.finished.wait(5))
+		self.assertFalse(job.started.wait(0.2))
+
+		job.release.clear()
+		queue.resume()
+		self.assertTrue(job.started.wait(5))
+		self.assertEqual(2, job.renders)
+		self.assertFalse(job.cancelled)
+		job.release.set()
+
+	def test_cancel_queued(self):
+		queue = TimelapseRenderQueue()
+		queue.pause()
+
+		job = FakeRenderJob("job")
+		queue.enqueue(job)
+
+		self.assertTrue(queue.cancel("job"))
+		self.assertTrue(job.cancelled)
+		self.assertFalse(job.reenqueue)
+		self.assertFalse(queue.is_queued("job"))
+
+		queue.resume()
+		self.assertFalse(job.started.wait(0.2))
+
+	def test_cancel_running(self):
+		queue = TimelapseRenderQueue()
+		job = FakeRenderJob("job")
+		queue.enqueue(job)
+		self.assertTrue(job.started.wait(5))
+
+		self.assertTrue(queue.cancel("job"))
+		self.assertTrue(job.finished.wait(5))
+		self.assertFalse(job.reenqueue)
+		self.assertFalse(queue.cancel("job"))
+
+
+class TimelapseRenderJobCancelTest(unittest.TestCase):
+
+	def test_cancel_before_start(self):
+		on_fail = mock.MagicMock()
+		on_start = mock.MagicMock()
+		job = TimelapseRenderJob("/capture", "/output", "prefix", encoder_preset="h264",
+		                         on_start=on_start, on_fail=on_fail)
+
+		job.cancel()
+		job.render()
+
+		on_fail.assert_called_once_with("/output/prefix.mp4", returncode=0, stdout="", stderr="", reason="cancelled")
+		self.assertFalse(on_start.called)
+		self.assertFalse(job.reenqueue)
+
+	def test_progress_throttled(self):
+		on_progress = mock.MagicMock()
+		job = TimelapseRenderJob("/capture", "/output", "prefix", progress_interval=1.0, on_progress=on_progress)
+
+		now = [100.0]
+		with mock.patch("octoprint.timelapse.monotonic_time", side_effect=lambda: now[0]):
+			job._process_progress([b"out_time_us=1000000\n"], "movie", 10.0)
+			job._process_progress([b"out_time_us=2000000\n"], "movie", 10.0)
+			now[0] += 1.0
+			job._process_progress([b"out_time_us=3000000\n", b"progress=continue\n"], "movie", 10.0)
+
+		self.assertEqual([mock.call("movie", 10), mock.call("movie", 30)], on_progress.call_args_list)
@@ -0,0 +1,135 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import octoprint.settings
+import octoprint.timelapse
+from octoprint.events import Events
+from octoprint.webcam import Snapshot
+
+
+class ZChangeTriggerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.capture_dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.capture_dir)
+
+		self.settings = mock.create_autospec(octoprint.settings.Settings)
+		self.settings.getBaseFolder.return_value = self.capture_dir
+		self.settings.get.return_value = None
+		mock.patch("octoprint.timelapse.settings", return_value=self.settings).start()
+		self.event_manager = mock.patch("octoprint.timelapse.eventManager").start().return_value
+		self.addCleanup(mock.patch.stopall)
+
+		self.now = 100.0
+		mock.patch("octoprint.timelapse.monotonic_time", side_effect=lambda: self.now).start()
+
+	def _timelapse(self, **kwargs):
+		timelapse = octoprint.timelapse.ZTimelapse(**kwargs)
+		self.addCleanup(timelapse.unload)
+		timelapse.capture_image = mock.MagicMock()
+		return timelapse
+
+	def test_direct_trigger(self):
+		printer = mock.MagicMock()
+		with mock.patch("octoprint.timelapse._direct_z_change_trigger", None):
+			octoprint.timelapse.enable_direct_z_change_trigger(printer)
+			trigger = octoprint.timelapse._direct_z_change_trigger
+
+			timelapse = self._timelapse(min_delay=0)
+			with mock.patch("octoprint.timelapse.current", timelapse):
+				timelapse.start_timelapse("test.gcode")
+				trigger.on_printer_z_change(0.4, 0.2)
+
+		printer.register_callback.assert_called_once_with(trigger)
+		timelapse.capture_image.assert_called_once_with(triggered=100.0)
+
+		# no ZChange subscription while triggered directly
+		subscribed = [call[0][0] for call in self.event_manager.subscribe.call_args_list]
+		self.assertNotIn(Events.Z_CHANGE, subscribed)
+
+	def test_direct_trigger_before_print_started(self):
+		printer = mock.MagicMock()
+		with mock.patch("octoprint.timelapse._direct_z_change_trigger", None):
+			octoprint.timelapse.enable_direct_z_change_trigger(printer)
+			trigger = octoprint.timelapse._direct_z_change_trigger
+
+			timelapse = self._timelapse(min_delay=0)
+			with mock.patch("octoprint.timelapse.current", timelapse):
+				# jogging outside of a print
+				printer.is_printing.return_value = False
+				trigger.on_printer_z_change(10.0, 0.0)
+
+				# the print starts, but handling PrintStarted lags behind the first layers
+				printer.is_printing.return_value = True
+				trigger.on_printer_z_change(0.2, 10.0)
+				self.now += 1
+				trigger.on_printer_z_change(0.4, 0.2)
+				self.assertFalse(timelapse.capture_image.called)
+
+				self.now += 10
+				timelapse.on_print_started(Events.PRINT_STARTED, dict(file="test.gcode"))
+
+		self.assertEqual([mock.call(triggered=100.0), mock.call(triggered=101.0)],
+		                 timelapse.capture_image.call_args_list)
+
+	def test_pending_z_changes_dropped_on_stop(self):
+		timelapse = self._timelapse(min_delay=0)
+		timelapse.on_z_change(0.2, 0.0, printing=True)
+		timelapse.on_print_done(Events.PRINT_FAILED, dict(file="test.gcode"))
+
+		timelapse.start_timelapse("test.gcode")
+		self.assertFalse(timelapse.capture_image.called)
+
+	def test_event_trigger(self):
+		timelapse = self._timelapse(min_delay=0)
+
+		subscribed = [call[0][0] for call in self.event_manager.subscribe.call_args_list]
+		self.assertIn(Events.Z_CHANGE, subscribed)
+
+		timelapse.start_timelapse("test.gcode")
+		timelapse._on_z_change(Events.Z_CHANGE, {"new": 0.4, "old": 0.2})
+		timelapse.capture_image.assert_called_once_with(triggered=100.0)
+
+	def test_not_in_timelapse(self):
+		timelapse = self._timelapse(min_delay=0)
+		timelapse.on_z_change(0.4, 0.2)
+		self.assertFalse(timelapse.capture_image.called)
+
+	def test_zhop_and_min_delay(self):
+		timelapse = self._timelapse(retraction_zhop=0.5, min_delay=5)
+		timelapse.start_timelapse("test.gcode")
+
+		timelapse.on_z_change(0.9, 0.4)
+		self.assertFalse(timelapse.capture_image.called)
+
+		timelapse.on_z_change(0.6, 0.4, triggered=99.5)
+		timelapse.capture_image.assert_called_once_with(triggered=99.5)
+
+		self.now += 1
+		timelapse.on_z_change(0.8, 0.6)
+		self.assertEqual(1, timelapse.capture_image.call_count)
+
+	def test_capture_latency(self):
+		timelapse = octoprint.timelapse.ZTimelapse()
+		self.addCleanup(timelapse.unload)
+		timelapse.start_timelapse("test.gcode")
+
+		service = mock.MagicMock()
+		service.fetch.side_effect = [Snapshot(b"frame", "image/jpeg", {}, 100.25),
+		                             Snapshot(b"frame", "image/jpeg", {}, 101.0)]
+		with mock.patch("octoprint.timelapse.snapshot_service", return_value=service):
+			timelapse._perform_capture(self.capture_dir + "/frame-0.jpg", triggered=100.0)
+			timelapse._perform_capture(self.capture_dir + "/frame-1.jpg", triggered=100.25)
+
+		self.assertEqual(dict(count=2, last=0.75, average=0.5, max=0.75), timelapse.capture_latency)
+		self.event_manager.fire.assert_any_call(Events.CAPTURE_DONE, dict(file=self.capture_dir + "/frame-0.jpg",
+		                                                                   latency=0.25))
@@ -0,0 +1,141 @@
+# coding=utf-8
+"""
+Unit tests for octoprint.users.FilebasedUserManager
+"""
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import octoprint.users
+
+
+class FilebasedUserManagerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+		settings_patcher = mock.patch("octoprint.users.settings")
+		settings = settings_patcher.start()
+		self.addCleanup(settings_patcher.stop)
+		settings.return_value.get.return_value = os.path.join(self.basedir, "users.yaml")
+
+		self.user_manager = octoprint.users.FilebasedUserManager()
+		self.user_manager.addUser("user", "secret", active=True, apikey="userkey")
+		self.user_manager.addUser("other", "secret", active=True)
+
+		# start off with an empty journal
+		self.user_manager._save(force=True)
+
+	def test_find_by_apikey(self):
+		user = self.user_manager.findUser(apikey="userkey")
+
+		self.assertIsNotNone(user)
+		self.assertEqual("user", user.get_name())
+		self.assertIsNone(self.user_manager.findUser(apikey="unknown"))
+
+	def test_find_by_apikey_after_generate(self):
+		apikey = self.user_manager.generateApiKey("other")
+
+		self.assertEqual("other", self.user_manager.findUser(apikey=apikey).get_name())
+
+		new_apikey = self.user_manager.generateApiKey("other")
+
+		self.assertIsNone(self.user_manager.findUser(apikey=apikey))
+		self.assertEqual("other", self.user_manager.findUser(apikey=new_apikey).get_name())
+
+	def test_find_by_apikey_after_delete(self):
+		self.user_manager.deleteApikey("user")
+
+		self.assertIsNone(self.user_manager.findUser(apikey="userkey"))
+
+	def test_find_by_apikey_after_remove(self):
+		self.user_manager.removeUser("user")
+
+		self.assertIsNone(self.user_manager.findUser(apikey="userkey"))
+
+	def test_find_by_apikey_after_reload(self):
+		user_manager = octoprint.users.FilebasedUserManager()
+
+		self.assertEqual("user", user_manager.findUser(apikey="userkey").get_name())
+
+	def _read_userfile(self):
+		import yaml
+		with open(os.path.join(self.basedir, "users.yaml")) as f:
+			return yaml.safe_load(f)
+
+	def _journal_path(self):
+		return os.path.join(self.basedir, "users.yaml.journal")
+
+	def test_change_appends_to_journal(self):
+		before = self._read_userfile()
+
+		with mock.patch.object(self.user_manager, "_load") as load:
+			self.user_manager.changeUserSetting("user", "language", "de")
+			self.user_manager.changeUserSetting("user", ["interface", "color"], "blue")
+			self.assertEqual(0, load.call_count)
+
+		self.assertEqual(before, self._read_userfile())
+		with open(self._journal_path()) as f:
+			self.assertEqual(2, len(f.readlines()))
+
+		self.assertEqual("de", self.user_manager.getUserSetting("user", "language"))
+
+	def test_journal_replayed_and_compacted_on_load(self):
+		self.user_manager.changeUserSetting("user", "language", "de")
+		self.user_manager.changeUserPassword("other", "newsecret")
+		apikey = self.user_manager.generateApiKey("other")
+		self.user_manager.removeUser("user")
+
+		user_manager = octoprint.users.FilebasedUserManager()
+
+		self.assertIsNone(user_manager.findUser("user"))
+		self.assertTrue(user_manager.checkPassword("other", "newsecret"))
+		self.assertEqual("other", user_manager.findUser(apikey=apikey).get_name())
+
+		self.assertFalse(os.path.exists(self._journal_path()))
+		data = self._read_userfile()
+		self.assertEqual(["other"], list(data.keys()))
+		self.assertEqual(apikey, data["other"]["apikey"])
+
+	def test_failed_compaction_on_load(self):
+		self.user_manager.changeUserSetting("user", "language", "de")
+
+		# e.g. a full or read-only SD card
+		with mock.patch("octoprint.users.atomic_write", side_effect=IOError("read-only file system")):
+			user_manager = octoprint.users.FilebasedUserManager()
+
+		self.assertEqual("de", user_manager.getUserSetting("user", "language"))
+		self.assertTrue(os.path.exists(self._journal_path()))
+
+		# the next change compacts the journal after all
+		user_manager.changeUserSetting("user", "language", "fr")
+		self.assertFalse(os.path.exists(self._journal_path()))
+		self.assertEqual("fr", self._read_userfile()["user"]["settings"]["language"])
+
+	def test_journal_compaction_threshold(self):
+		with mock.patch.object(octoprint.users.FilebasedUserManager, "JOURNAL_COMPACTION_THRESHOLD", 3):
+			self.user_manager.changeUserSetting("user", "counter", 1)
+			self.user_manager.changeUserSetting("user", "counter", 2)
+			self.assertTrue(os.path.exists(self._journal_path()))
+
+			self.user_manager.changeUserSetting("user", "counter", 3)
+			self.assertFalse(os.path.exists(self._journal_path()))
+			self.assertEqual(3, self._read_userfile()["user"]["settings"]["counter"])
+
+	def test_incomplete_journal_record_skipped(self):
+		self.user_manager.changeUserSetting("user", "language", "de")
+		with open(self._journal_path(), "ab") as f:
+			f.write(b'{"name": "user", "user": {"passw')
+
+		user_manager = octoprint.users.FilebasedUserManager()
+
+		self.assertEqual("de", user_manager.getUserSetting("user", "language"))
@@ -8,6 +8,7 @@ __copyright__ = "Copyright (C) 2017 The OctoPrint Project - Released under terms
 
 import unittest
 import ddt
+import mock
 
 import octoprint.users
 
@@ -22,3 +23,14 @@ class UserManagerTest(unittest.TestCase):
 
 		# should not throw an exception
 		octoprint.users.UserManager.createPasswordHash(password, salt=salt)
+
+	def test_createPasswordHash_salt_cached(self):
+		with mock.patch("octoprint.users.settings") as settings:
+			settings.return_value.get.return_value = "salt"
+
+			first = octoprint.users.UserManager.createPasswordHash("password")
+			second = octoprint.users.UserManager.createPasswordHash("password")
+
+			self.assertEqual(first, second)
+			self.assertEqual(first, octoprint.users.UserManager.createPasswordHash("password", salt="salt"))
+			self.assertEqual(1, settings.return_value.get.call_count)
@@ -409,3 +409,62 @@ class TestPositionRecord(unittest.TestCase):
 	def _create_position(self, **kwargs):
 		from octoprint.util.comm import PositionRecord
 		return PositionRecord(**kwargs)
+
+class TestReceivedLinePatterns(unittest.TestCase):
+
+	def setUp(self):
+		from octoprint.util.comm import ReceivedLinePatterns
+		self.patterns = ReceivedLinePatterns()
+		self.calls = []
+
+	def _callback(self, tag):
+		def callback(comm_instance, line, match):
+			self.calls.append((tag, line, match.group(0)))
+		return callback
+
+	def test_literal(self):
+		self.patterns.add("Author: (CR-10Slanguage)", self._callback("literal"))
+
+		self.assertEqual(0, self.patterns.match(None, "ok T:20.0 /0.0"))
+		self.assertEqual(0, self.patterns.match(None, " | author: (cr-10slanguage)"))
+		self.assertEqual(1, self.patterns.match(None, " | Author: (CR-10Slanguage)"))
+		self.assertEqual([("literal", " | Author: (CR-10Slanguage)", "Author: (CR-10Slanguage)")], self.calls)
+
+	def test_ignorecase(self):
+		self.patterns.add("Author: (CR-10Slanguage)", self._callback("ignorecase"), ignorecase=True)
+
+		self.assertEqual(1, self.patterns.match(None, " | author: (cr-10slanguage)"))
+
+	def test_multiple_matches(self):
+		self.patterns.add("echo:", self._callback("echo"))
+		self.patterns.add("busy", self._callback("busy"), ignorecase=True)
+		self.patterns.add(r"T:(?P<actual>[\d.]+)", self._callback("temp"), regex=True)
+		self.patterns.add(r"^ok\b", self._callback("ok"), regex=True)
+
+		self.assertEqual(0, self.patterns.match(None, "wait"))
+		self.assertEqual(4, self.patterns.match(None, "ok T:20.0 echo:BUSY"))
+		self.assertEqual(["busy", "echo", "ok", "temp"], sorted(tag for tag, _, _ in self.calls))
+
+	def test_add_after_match(self):
+		self.patterns.add("first", self._callback("first"))
+		self.patterns.match(None, "first second")
+
+		self.patterns.add("second", self._callback("second"))
+		self.patterns.match(None, "first second")
+
+		self.assertEqual(["first", "first", "second"], [tag for tag, _, _ in self.calls])
+
+	def test_failing_callback(self):
+		def fail(comm_instance, line, match):
+			raise RuntimeError("failed")
+
+		self.patterns.add("line", fail)
+		self.patterns.add("line", self._callback("after"))
+
+		self.assertEqual(2, self.patterns.match(None, "line"))
+		self.assertEqual(["after"], [tag for tag, _, _ in self.calls])
+
+	def test_invalid(self):
+		self.assertRaises(ValueError, self.patterns.add, "(unclosed", self._callback("invalid"), regex=True)
+		self.assertRaises(ValueError, self.patterns.add, "line", None)
+		self.assertEqual(0, len(self.patterns))
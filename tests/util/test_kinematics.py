@@ -0,0 +1,215 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import mock
+import yaml
+from ddt import ddt, data, unpack
+
+from octoprint.util import kinematics
+from octoprint.util.kinematics import KinematicModel
+from octoprint.util.gcodeInterpreter import gcode
+
+
+def trapezoid(length, speed, acceleration, entry, exit):
+	"""Time for a move that reaches its cruise speed, calculated independently of the model."""
+	accelerating = (speed - entry) / acceleration
+	decelerating = (speed - exit) / acceleration
+	distance = (speed ** 2 - entry ** 2) / (2 * acceleration) + (speed ** 2 - exit ** 2) / (2 * acceleration)
+	return accelerating + decelerating + (length - distance) / speed
+
+
+def triangle(length, acceleration, entry):
+	"""Time for a move that starts and ends at ``entry`` and never reaches its cruise speed."""
+	peak = math.sqrt(acceleration * length + entry ** 2)
+	return 2 * (peak - entry) / acceleration
+
+
+MODES = [False]
+if kinematics.numpy is not None:
+	MODES.append(True)
+
+
+@ddt
+class KinematicModelTest(unittest.TestCase):
+
+	def _model(self, vectorized, **kwargs):
+		return KinematicModel(acceleration=dict(x=1000, y=1000, z=100, e=3000),
+		                      jerk=dict(x=10, y=10, z=0.4, e=5),
+		                      vectorized=vectorized,
+		                      **kwargs)
+
+	@data(*[
+		(moves, expected, vectorized)
+		for moves, expected in [
+			# a single long move, starting and stopping at jerk speed
+			([(100, 0, 0, 0, 6000)], trapezoid(100, 100, 1000, 10, 10)),
+
+			# collinear moves don't slow down in between
+			([(50, 0, 0, 0, 6000), (50, 0, 0, 0, 6000)], trapezoid(100, 100, 1000, 10, 10)),
+
+			# a right angle corner slows down to jerk speed
+			([(100, 0, 0, 0, 6000), (0, 100, 0, 0, 6000)], 2 * trapezoid(100, 100, 1000, 10, 10)),
+
+			# a short move never reaches its feedrate
+			([(1, 0, 0, 0, 6000)], triangle(1, 1000, 10)),
+
+			# the feedrate gets limited by the speed of the Z axis
+			([(0, 0, 10, 0, 6000)], trapezoid(10, 200 / 60, 100, 0.4, 0.4)),
+
+			# retractions move along E only and are limited by its speed
+			([(0, 0, 0, -1, 2400)], 1 / 5.0),
+		]
+		for vectorized in MODES
+	])
+	@unpack
+	def test_moves(self, moves, expected, vectorized):
+		model = self._model(vectorized)
+		for move in moves:
+			model.add(*move)
+
+		self.assertAlmostEqual(expected, model.finish(), places=6)
+
+	@data(*MODES)
+	def test_chunks(self, vectorized):
+		random.seed(42)
+		moves = [(random.uniform(-5, 5), random.uniform(-5, 5), 0, random.uniform(-0.1, 0.3),
+		          random.choice([1800, 3000, 6000]))
+		         for _ in range(1000)]
+
+		totals = []
+		for chunk_size in (1000000, 100, 7):
+			model = self._model(vectorized, chunk_size=chunk_size)
+			for move in moves:
+				model.add(*move)
+			totals.append(model.finish())
+
+		self.assertAlmostEqual(totals[0], totals[1], places=6)
+		self.assertAlmostEqual(totals[0], totals[2], places=6)
+
+	@unittest.skipIf(kinematics.numpy is None, "NumPy not installed")
+	def test_vectorized_matches_python(self):
+		random.seed(23)
+		moves = [(random.uniform(-20, 20), random.uniform(-20, 20), random.choice([0, 0, 0, 0.2]),
+		          random.uniform(-1, 1), random.choice([600, 1800, 9000]))
+		         for _ in range(5000)]
+
+		totals = []
+		for vectorized in (False, True):
+			model = self._model(vectorized, chunk_size=1000)
+			for move in moves:
+				model.add(*move)
+			totals.append(model.finish())
+
+		self.assertAlmostEqual(totals[0], totals[1], places=6)
+
+	@data(*MODES)
+	def test_markers(self, vectorized):
+		model = self._model(vectorized, chunk_size=2)
+
+		start = model.mark()
+		model.add(100, 0, 0, 0, 6000)
+		corner = model.mark(offset=5.0)
+		model.add(0, 100, 0, 0, 6000)
+		model.add(0, 0, 0, 0, 6000)
+		end = model.mark()
+
+		self.assertRaises(ValueError, float, end)
+		model.finish()
+
+		move = trapezoid(100, 100, 1000, 10, 10)
+		self.assertEqual(0.0, float(start))
+		self.assertAlmostEqual(move + 5.0, float(corner))
+		self.assertAlmostEqual(2 * move, float(end))
+
+
+class KinematicAnalysisTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+	def _analyse(self, lines, model=None):
+		path = os.path.join(self.basedir, "test.gcode")
+		with open(path, "w") as f:
+			f.write("\n".join(lines) + "\n")
+
+		interpreter = gcode()
+		interpreter.load(path, kinematics=model)
+		return interpreter.totalMoveTimeMinute * 60
+
+	def test_long_moves(self):
+		# long straight moves take about as long as their feedrate says
+		lines = ["G1 X200 F6000", "G1 X0", "G4 S10"]
+
+		simple = self._analyse(lines)
+		kinematic = self._analyse(lines, KinematicModel())
+
+		# reversing the direction changes the speed along X twice as much, so the junction is slowed down to half the jerk
+		self.assertAlmostEqual(14.0, simple)
+		self.assertAlmostEqual(trapezoid(200, 100, 1000, 10, 5) * 2 + 10.0, kinematic)
+
+	def test_short_moves(self):
+		# lots of short zig zag moves are dominated by acceleration, which only the kinematic model accounts for
+		lines = ["G1 X{} Y{} F6000".format(i % 2, i) for i in range(1, 200)]
+
+		simple = self._analyse(lines)
+		kinematic = self._analyse(lines, KinematicModel())
+
+		self.assertGreater(kinematic, 2 * simple)
+
+	def test_bundled_file(self):
+		path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "filemanager", "_files",
+		                    "bp_case.gcode")
+
+		simple = gcode()
+		simple.load(path)
+
+		kinematic = gcode()
+		kinematic.load(path, kinematics=KinematicModel())
+
+		# accelerating takes time, the estimate can only get longer
+		self.assertGreater(kinematic.totalMoveTimeMinute, simple.totalMoveTimeMinute)
+		self.assertEqual(simple.extrusionAmount, kinematic.extrusionAmount)
+
+	def _analyse_cli(self, lines, *args):
+		from click.testing import CliRunner
+		from octoprint.cli.analysis import gcode_command
+
+		path = os.path.join(self.basedir, "test.gcode")
+		with open(path, "w") as f:
+			f.write("\n".join(lines) + "\n")
+
+		result = CliRunner().invoke(gcode_command, list(args) + [path])
+		self.assertEqual(0, result.exit_code)
+		return result.output, yaml.safe_load(result.output.split("RESULTS:", 1)[1])["total_time"]
+
+	def test_cli_without_numpy(self):
+		lines = ["G1 X{} Y{} F6000".format(i % 2, i) for i in range(1, 200)]
+
+		_, simple = self._analyse_cli(lines)
+		with mock.patch("octoprint.util.kinematics.numpy", None):
+			output, kinematic = self._analyse_cli(lines, "--kinematics")
+
+		# the pure python planner is too slow for the analysis, so the simple estimate is used
+		self.assertIn("NumPy is not installed", output)
+		self.assertEqual(simple, kinematic)
+
+	def test_cli_with_numpy(self):
+		lines = ["G1 X{} Y{} F6000".format(i % 2, i) for i in range(1, 200)]
+
+		_, simple = self._analyse_cli(lines)
+		with mock.patch("octoprint.util.kinematics.available", return_value=True):
+			output, kinematic = self._analyse_cli(lines, "--kinematics")
+
+		self.assertNotIn("NumPy is not installed", output)
+		self.assertGreater(kinematic, 2 * simple)
@@ -0,0 +1,263 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import gzip
+import io
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from octoprint.logging import handlers
+
+
+def record(message):
+	return logging.LogRecord("SERIAL", logging.INFO, __file__, 1, message, None, None)
+
+
+def wait_for_compression():
+	handlers.compress_in_background(os.devnull + "-does-not-exist").exception()
+
+
+class CompressionTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+	def _write(self, name, content=b"content\n"):
+		path = os.path.join(self.basedir, name)
+		with io.open(path, "wb") as f:
+			f.write(content)
+		return path
+
+	def test_compress_file(self):
+		path = self._write("octoprint.log.2018-05-01", b"line\n" * 1000)
+
+		handlers.compress_file(path)
+
+		self.assertEqual(["octoprint.log.2018-05-01.gz"], os.listdir(self.basedir))
+		with gzip.open(path + ".gz", "rb") as f:
+			self.assertEqual(b"line\n" * 1000, f.read())
+
+	def test_compress_missing_file(self):
+		path = os.path.join(self.basedir, "octoprint.log.2018-05-01")
+
+		self.assertRaises(IOError, handlers.compress_file, path)
+		self.assertEqual([], os.listdir(self.basedir))
+
+	def test_timed_rollover(self):
+		for day in range(1, 5):
+			self._write("octoprint.log.2018-05-0{}.gz".format(day))
+		self._write("octoprint.log.2018-05-05")
+		self._write("octoprint.log")
+
+		handler = handlers.CleaningTimedRotatingFileHandler(os.path.join(self.basedir, "octoprint.log"),
+		                                                    when="D", backupCount=3, compress=True)
+		self.addCleanup(handler.close)
+		wait_for_compression()
+
+		# compressed files count towards the backup count, left over uncompressed ones get compressed
+		self.assertEqual(["octoprint.log",
+		                  "octoprint.log.2018-05-03.gz",
+		                  "octoprint.log.2018-05-04.gz",
+		                  "octoprint.log.2018-05-05.gz"],
+		                 sorted(os.listdir(self.basedir)))
+
+		handler.doRollover()
+		wait_for_compression()
+
+		files = sorted(os.listdir(self.basedir))
+		self.assertEqual(4, len(files))
+		self.assertEqual("octoprint.log.2018-05-04.gz", files[1])
+		self.assertTrue(files[-1].endswith(".gz"))
+
+	def test_files_being_compressed(self):
+		self._write("octoprint.log.2018-05-01")
+		self._write("octoprint.log.2018-05-01.gz")
+		self._write("octoprint.log.2018-05-02.gz")
+
+		handler = handlers.CleaningTimedRotatingFileHandler(os.path.join(self.basedir, "octoprint.log"),
+		                                                    when="D", backupCount=5)
+		self.addCleanup(handler.close)
+
+		# both files of a rotated log count as one
+		self.assertEqual([], handler.getFilesToDelete())
+		handler.backupCount = 1
+		self.assertEqual([os.path.join(self.basedir, "octoprint.log.2018-05-01"),
+		                  os.path.join(self.basedir, "octoprint.log.2018-05-01.gz")],
+		                 handler.getFilesToDelete())
+
+
+class SerialLogHandlerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+		handlers.SerialLogHandler.do_rollover = False
+		self.addCleanup(setattr, handlers.SerialLogHandler, "do_rollover", False)
+
+		self.path = os.path.join(self.basedir, "serial.log")
+
+	def _handler(self, **kwargs):
+		handler = handlers.SerialLogHandler(self.path, **kwargs)
+		self.addCleanup(handler.close)
+		return handler
+
+	def test_size_rollover(self):
+		handler = self._handler(maxBytes=100, backupCount=3, compress=True)
+
+		for i in range(10):
+			handler.emit(record("x" * 40))
+		handler.flush()
+		wait_for_compression()
+
+		# several rollovers within the same second get unique names
+		files = sorted(os.listdir(self.basedir))
+		self.assertEqual(4, len(files))
+		self.assertEqual("serial.log", files[0])
+		for name in files[1:]:
+			self.assertTrue(handlers.SerialLogHandler.file_pattern.match(name[len("serial.log."):-len(".gz")]))
+
+		# two lines fit into each file
+		with io.open(self.path, "rb") as f:
+			self.assertEqual((b"x" * 40 + b"\n") * 2, f.read())
+
+	def test_connection_rollover(self):
+		handler = self._handler(backupCount=3)
+
+		handler.emit(record("first connection"))
+		handler.flush()
+		handlers.SerialLogHandler.on_open_connection()
+		handler.emit(record("second connection"))
+		handler.flush()
+
+		self.assertFalse(handlers.SerialLogHandler.do_rollover)
+		self.assertEqual(2, len(os.listdir(self.basedir)))
+		with io.open(self.path, "rb") as f:
+			self.assertEqual(b"second connection\n", f.read())
+
+
+class AsyncLogHandlerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basedir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.basedir)
+
+		self.path = os.path.join(self.basedir, "serial.log")
+
+	def _handler(self, **kwargs):
+		handler = handlers.SerialLogHandler(self.path, **kwargs)
+		self.addCleanup(handler.close)
+		stream = mock.Mock(wraps=handler.stream)
+		# child mocks are created lazily, which isn't thread safe
+		stream.write
+		stream.flush
+		handler.stream = stream
+		return handler
+
+	def _read(self):
+		with io.open(self.path, "rb") as f:
+			return f.read()
+
+	def test_batched_write(self):
+		handler = self._handler()
+
+		# the writer can't drain the queue while we hold its lock
+		with handler._queue_condition:
+			for i in range(5):
+				handler.emit(record("line {}".format(i)))
+			self.assertEqual(5, handler.queue_depth)
+		handler.flush()
+
+		self.assertEqual(1, handler.stream.write.call_count)
+		self.assertEqual(0, handler.queue_depth)
+		self.assertEqual(b"".join(b"line %d\n" % i for i in range(5)), self._read())
+
+	def test_batch_size(self):
+		handler = self._handler(batchSize=2)
+
+		with handler._queue_condition:
+			for i in range(5):
+				handler.emit(record("line {}".format(i)))
+		handler.flush()
+
+		self.assertEqual(3, handler.stream.write.call_count)
+		self.assertEqual(b"".join(b"line %d\n" % i for i in range(5)), self._read())
+
+	def test_dropped(self):
+		handler = self._handler(queueSize=3)
+
+		with handler._queue_condition:
+			for i in range(10):
+				handler.emit(record("line {}".format(i)))
+			self.assertEqual(3, handler.queue_depth)
+			self.assertEqual(7, handler.dropped)
+		handler.flush()
+
+		# the oldest records get dropped, which is reported in the log
+		lines = self._read().splitlines()
+		self.assertEqual([b"line 7", b"line 8", b"line 9"], lines[:3])
+		self.assertEqual(4, len(lines))
+		self.assertIn(b"Dropped 7 log records", lines[3])
+
+	def test_flush_every_batch(self):
+		handler = self._handler()
+
+		for i in range(5):
+			handler.emit(record("line"))
+			handler.flush()
+
+		self.assertEqual(5, handler.stream.flush.call_count)
+
+	def test_flush_interval(self):
+		handler = self._handler(flushInterval=0.2)
+
+		# the first record after a while is written right away
+		handler.emit(record("first"))
+		self._wait(lambda: handler.stream.flush.call_count == 1)
+
+		for i in range(5):
+			handler.emit(record("line"))
+		time.sleep(0.05)
+		self.assertEqual(1, handler.stream.flush.call_count)
+
+		# the buffered lines get written once the interval is over
+		self._wait(lambda: handler.stream.flush.call_count == 2)
+		self.assertEqual(b"first\n" + b"line\n" * 5, self._read())
+
+	def test_close_writes_queue(self):
+		handler = self._handler(flushInterval=60)
+
+		with handler._queue_condition:
+			handler.emit(record("first"))
+			handler.emit(record("second"))
+		handler.close()
+
+		self.assertEqual(b"first\nsecond\n", self._read())
+		self.assertFalse(handler._writer.is_alive())
+
+	def test_queue_statistics(self):
+		handler = self._handler(queueSize=3)
+		handler.set_name("serialFile")
+
+		logger = logging.getLogger("octoprint.test.handlers")
+		logger.addHandler(handler)
+		self.addCleanup(logger.removeHandler, handler)
+
+		self.assertIn(dict(name="serialFile", queue_depth=0, queue_size=3, dropped=0),
+		              handlers.get_queue_statistics())
+
+	def _wait(self, condition):
+		deadline = time.time() + 5
+		while not condition() and time.time() < deadline:
+			time.sleep(0.01)
+		self.assertTrue(condition())